@@ -0,0 +1 @@
+"""Performance instrumentation for LITRevu (timings, query analysis, profiling)."""
@@ -0,0 +1,161 @@
+"""
+Query budgets: the maximum number of queries (and optionally rows) per view.
+
+The registry is declarative and keyed by URL name. A budget must hold for
+every HTTP method the view accepts and whatever the size of the data: a
+view whose query count grows with the number of tickets, reviews or follows
+is a regression (see reviews/tests/test_query_budgets.py).
+
+``max_rows`` is left to None for views that still load an unbounded list by
+design (the feed reads every followed id to build its visibility clause; the
+follows page lists every relation; "Mes posts" lists every month with posts).
+"""
+
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass
+
+from django.db import connections
+
+from .sql import is_transaction_control
+
+
+@dataclass(frozen=True)
+class QueryBudget:
+    """Upper bounds for one view."""
+
+    max_queries: int
+    max_rows: int | None = None
+
+
+# Measured with the default cached_db sessions (no session query per request).
+QUERY_BUDGETS: dict[str, QueryBudget] = {
+    # project
+    "home": QueryBudget(max_queries=3, max_rows=1),
+    # reviews
+    # session user, followed ids, count and page of the UNION ALL rows, the page's tickets and reviews (reviews.feed)
+    # full page: + the precomputed recommendations (reviews.recommendations)
+    # ?ordre=pertinence: affinity sample and 2 candidate windows instead of the count and page
+    "reviews:feed": QueryBudget(max_queries=9),
+    # session user, the preference UPDATE
+    "reviews:set_feed_order": QueryBudget(max_queries=2, max_rows=1),
+    # session user, followed ids, ranking, highlights of the page, its tickets, its reviews
+    "reviews:search": QueryBudget(max_queries=6),
+    # session user, the book, its totals, its most recent tickets (at most views.BOOK_TICKETS)
+    "reviews:book": QueryBudget(max_queries=4),
+    # session user, the board, a page of its entries with their tickets (cached: none of these)
+    "reviews:trending": QueryBudget(max_queries=3, max_rows=23),
+    "reviews:top_rated": QueryBudget(max_queries=3, max_rows=23),
+    # Ticket writes look their Book up by key, and insert it the first time (reviews.books)
+    # Creating or deleting a post updates its month in the author's archive (reviews.archive); the first
+    # post of a month also inserts the row: 2 more queries, once a month
+    "reviews:create_ticket": QueryBudget(max_queries=5, max_rows=3),
+    # session user, the similar tickets (reviews.similar_tickets)
+    "reviews:similar_tickets": QueryBudget(max_queries=2, max_rows=6),
+    "reviews:edit_ticket": QueryBudget(max_queries=5, max_rows=3),
+    # + its reviews logged to ReviewChange and uncounted from the archive, its RecommendedTicket and
+    # LeaderboardEntry rows deleted
+    "reviews:delete_ticket": QueryBudget(max_queries=9, max_rows=2),
+    # Review writes include the F() update of the ticket's aggregates (reviews.ticket_stats)
+    # and the ReviewChange log INSERT (reviews.signals)
+    "reviews:create_review": QueryBudget(max_queries=9, max_rows=5),
+    "reviews:create_review_for_ticket": QueryBudget(max_queries=8, max_rows=4),
+    "reviews:edit_review": QueryBudget(max_queries=8, max_rows=7),
+    "reviews:delete_review": QueryBudget(max_queries=6, max_rows=3),
+    # users
+    "users:register": QueryBudget(max_queries=3, max_rows=1),
+    "users:logout": QueryBudget(max_queries=3, max_rows=2),
+    # session user, the archive months (reviews.archive), count and page of the UNION ALL rows, the page's
+    # tickets and reviews (reviews.feed); ?mois=: the count is read from the archive row
+    "users:my_posts": QueryBudget(max_queries=6),
+    # session user, ownership, the reviews deleted, their ReviewChange INSERT, DELETEs of the reviews, the
+    # tickets' recommendations and leaderboard entries and the tickets, then the tickets keeping reviews
+    # (reconcile: find, update) and one archive UPDATE per month touched (reviews.bulk)
+    "users:delete_my_posts": QueryBudget(max_queries=11),
+    # session user; the rows are read while the response streams, one query per dataset (reviews.export)
+    "users:export_data": QueryBudget(max_queries=1, max_rows=1),
+    "users:my_follows": QueryBudget(max_queries=4),
+    "users:unfollow": QueryBudget(max_queries=4, max_rows=3),
+}
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised when a view goes over its budget."""
+
+
+class QueryLog:
+    """Connection execute wrapper recording statements and the rows they returned."""
+
+    def __init__(self):
+        """Start with an empty log."""
+        self.queries: list[dict] = []
+
+    @property
+    def total_rows(self):
+        """Rows fetched by every recorded statement."""
+        return sum(query["rows"] for query in self.queries)
+
+    def __call__(self, execute, sql, params, many, context):
+        """Run the statement and count the rows later fetched from its cursor."""
+        if is_transaction_control(sql):
+            # BEGIN in production, SAVEPOINT under TestCase: not part of the budget
+            return execute(sql, params, many, context)
+        entry = {"sql": sql, "params": params, "rows": 0}
+        self.queries.append(entry)
+        result = execute(sql, params, many, context)
+        self._count_rows(context["cursor"].cursor, entry)
+        return result
+
+    @staticmethod
+    def _count_rows(raw_cursor, entry):
+        # Django creates one DB-API cursor per statement, so the fetch methods can
+        # be wrapped on the instance without affecting other queries.
+        fetchone, fetchmany, fetchall = raw_cursor.fetchone, raw_cursor.fetchmany, raw_cursor.fetchall
+
+        def counted_fetchone():
+            row = fetchone()
+            entry["rows"] += row is not None
+            return row
+
+        def counted_fetchmany(*args, **kwargs):
+            rows = fetchmany(*args, **kwargs)
+            entry["rows"] += len(rows)
+            return rows
+
+        def counted_fetchall():
+            rows = fetchall()
+            entry["rows"] += len(rows)
+            return rows
+
+        raw_cursor.fetchone = counted_fetchone
+        raw_cursor.fetchmany = counted_fetchmany
+        raw_cursor.fetchall = counted_fetchall
+
+    def report(self):
+        """Numbered list of statements with their row counts."""
+        return "\n".join(
+            f"  {i}. [{query['rows']} rows] {query['sql']}" for i, query in enumerate(self.queries, start=1)
+        )
+
+
+@contextmanager
+def record_queries():
+    """Yield a QueryLog filled with every statement run in the block."""
+    log = QueryLog()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(log))
+        yield log
+
+
+def check_budget(url_name, log, label=""):
+    """Raise QueryBudgetExceeded (with the offending SQL) if `log` is over budget."""
+    budget = QUERY_BUDGETS[url_name]
+    problems = []
+    if len(log.queries) > budget.max_queries:
+        problems.append(f"{len(log.queries)} queries > budget of {budget.max_queries}")
+    if budget.max_rows is not None and log.total_rows > budget.max_rows:
+        problems.append(f"{log.total_rows} rows fetched > budget of {budget.max_rows}")
+    if problems:
+        raise QueryBudgetExceeded(
+            f"{url_name}{f' ({label})' if label else ''}: {'; '.join(problems)}\n{log.report()}"
+        )
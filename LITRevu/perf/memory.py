@@ -0,0 +1,141 @@
+"""
+Per-request memory instrumentation with tracemalloc.
+
+Opt-in per URL name: with MEMORY_TRACKING_VIEWS="reviews:feed,users:my_posts"
+each request to those views is traced from the moment the view is resolved
+and a JSON line is written to the ``litrevu.perf`` logger with:
+- ``peak_kib``: peak traced memory above the level at the start of the view,
+- ``retained_kib``: memory still allocated when the response is returned,
+- ``top``: allocation sites (file:line) of that retained memory.
+
+tracemalloc is process-wide and slows every allocation while it runs, so
+tracking stops after each request and the middleware unloads itself when
+no view is selected. Concurrent requests in a threaded server blur the
+numbers: measure with a single worker (or ``manage.py memory_scenario``).
+"""
+
+import json
+import logging
+import tracemalloc
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+logger = logging.getLogger("litrevu.perf")
+
+# Allocation sites inside these files are noise, not application memory.
+_IGNORED_FILENAMES = (tracemalloc.__file__, "<frozen importlib._bootstrap>", "<frozen importlib._bootstrap_external>")
+
+
+@dataclass
+class AllocationSite:
+    """Memory allocated (and still held) from one line of code."""
+
+    site: str
+    size: int
+    count: int
+
+    def as_dict(self):
+        """Serializable form, sizes in KiB."""
+        return {"site": self.site, "size_kib": round(self.size / 1024, 1), "count": self.count}
+
+
+@dataclass
+class AllocationReport:
+    """Memory measured over one block of code."""
+
+    peak: int = 0
+    retained: int = 0
+    top: list[AllocationSite] = field(default_factory=list)
+
+    def as_dict(self):
+        """Serializable form, sizes in KiB."""
+        return {
+            "peak_kib": round(self.peak / 1024, 1),
+            "retained_kib": round(self.retained / 1024, 1),
+            "top": [site.as_dict() for site in self.top],
+        }
+
+
+def _site_label(frame):
+    base = str(settings.BASE_DIR) + "/"
+    filename = frame.filename
+    if filename.startswith(base):
+        filename = filename[len(base):]
+    elif "site-packages/" in filename:
+        filename = filename.split("site-packages/", 1)[1]
+    return f"{filename}:{frame.lineno}"
+
+
+class AllocationTracker:
+    """Start / stop tracemalloc around a block and report what it allocated."""
+
+    def __init__(self, top=None, nframes=1):
+        """Report the `top` allocation sites (default MEMORY_TRACKING_TOP)."""
+        self.top = settings.MEMORY_TRACKING_TOP if top is None else top
+        self.nframes = nframes
+        self._started_here = False
+        self._baseline = 0
+        self._before = None
+
+    def start(self):
+        """Begin tracing (or reuse a tracemalloc session already running)."""
+        self._started_here = not tracemalloc.is_tracing()
+        if self._started_here:
+            tracemalloc.start(self.nframes)
+        self._before = tracemalloc.take_snapshot() if self.top else None
+        tracemalloc.reset_peak()
+        self._baseline = tracemalloc.get_traced_memory()[0]
+        return self
+
+    def stop(self):
+        """Stop tracing and return the AllocationReport of the block."""
+        current, peak = tracemalloc.get_traced_memory()
+        report = AllocationReport(peak=max(peak - self._baseline, 0), retained=max(current - self._baseline, 0))
+        if self._before is not None:
+            after = tracemalloc.take_snapshot()
+            filters = [tracemalloc.Filter(False, name) for name in _IGNORED_FILENAMES]
+            diff = after.filter_traces(filters).compare_to(self._before.filter_traces(filters), "lineno")
+            report.top = [
+                AllocationSite(_site_label(stat.traceback[0]), stat.size_diff, stat.count_diff)
+                for stat in diff[:self.top]
+                if stat.size_diff > 0
+            ]
+        if self._started_here:
+            tracemalloc.stop()
+        return report
+
+
+class MemoryTrackingMiddleware:
+    """Trace the allocations of requests to the URL names in MEMORY_TRACKING_VIEWS."""
+
+    def __init__(self, get_response):
+        """Unload the middleware when no view is selected."""
+        self.views = set(settings.MEMORY_TRACKING_VIEWS)
+        if not self.views:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        """Serve the request, then log its memory report when it was traced."""
+        try:
+            response = self.get_response(request)
+        finally:
+            tracker = getattr(request, "_memory_tracker", None)
+            report = tracker.stop() if tracker is not None else None
+        if report is not None:
+            record = {
+                "event": "request_memory",
+                "view": request.resolver_match.view_name,
+                "method": request.method,
+                "path": request.get_full_path(),
+                **report.as_dict(),
+            }
+            logger.info(json.dumps(record))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """Start tracing once the URL name is known."""
+        if request.resolver_match.view_name in self.views:
+            request._memory_tracker = AllocationTracker().start()
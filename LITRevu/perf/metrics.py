@@ -0,0 +1,411 @@
+"""
+Prometheus-style metrics: request rate, latency, errors and DB time per URL name.
+
+MetricsMiddleware records every request into an in-process registry:
+- ``litrevu_http_requests_total{view, method, status}``
+- ``litrevu_http_request_duration_seconds{view}`` (histogram)
+- ``litrevu_http_errors_total{view}`` (5xx responses)
+- ``litrevu_db_queries_total{view}`` / ``litrevu_db_duration_seconds_total{view}``
+- ``litrevu_cache_lookups_total{result}`` (app caches, see ``record_cache``)
+and exposes two gauges computed at scrape time: ``litrevu_cache_hit_ratio``
+and ``litrevu_db_connection_age_seconds{alias, pid}``.
+
+METRICS_MODE selects where values live:
+- ``off``: the middleware unloads itself, nothing is recorded.
+- ``memory``: a single process (runserver, tests).
+- ``multiprocess``: each gunicorn worker dumps its registry to
+  ``METRICS_MULTIPROC_DIR/<pid>-<start>.json`` at most every
+  METRICS_FLUSH_INTERVAL seconds; the endpoint merges every file, so a
+  scrape sees all workers whichever one serves it. Counters of dead workers
+  are kept, their gauges dropped. Wipe the directory on deploy.
+
+Recording is a dict update under a lock (see benchmarks/metrics_overhead.py).
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; tuned for pages answering in a few to a few hundred milliseconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Requests that did not resolve to a URL name (404 on unknown paths)
+UNRESOLVED_VIEW = "<unresolved>"
+
+
+class Metric:
+    """A named family of values keyed by label values."""
+
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        """Declare the metric; values are added by the recording methods."""
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values: dict[tuple, object] = {}
+
+    def merge(self, values, into):
+        """Add snapshot `values` ([labels, value] pairs) into the `into` dict."""
+        for labels, value in values:
+            key = tuple(labels)
+            into[key] = into.get(key, 0.0) + value
+
+    def samples(self, values):
+        """Yield (name suffix, label pairs, value) for the exposition format."""
+        for labels, value in sorted(values.items()):
+            yield "", tuple(zip(self.labelnames, labels)), value
+
+
+class Counter(Metric):
+    """Monotonic total."""
+
+    kind = "counter"
+
+    def inc(self, labels=(), amount=1.0):
+        """Add `amount` to the series identified by `labels`."""
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+
+class Gauge(Metric):
+    """Point-in-time value, reported per process."""
+
+    kind = "gauge"
+
+    def set(self, labels, value):
+        """Replace the value of a series."""
+        self.values[labels] = value
+
+
+class Histogram(Metric):
+    """Distribution in cumulative ``le`` buckets, plus ``_sum`` and ``_count``."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """Declare the metric with its (sorted) upper bounds."""
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, labels, value):
+        """Count one observation; state is [per-bucket counts..., +Inf count, sum]."""
+        state = self.values.get(labels)
+        if state is None:
+            state = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        state[bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    def merge(self, values, into):
+        """Sum bucket counts and sums series by series."""
+        for labels, state in values:
+            key = tuple(labels)
+            current = into.get(key)
+            into[key] = list(state) if current is None else [a + b for a, b in zip(current, state)]
+
+    def samples(self, values):
+        """Cumulative buckets, then sum and count, for each series."""
+        for labels, state in sorted(values.items()):
+            pairs = tuple(zip(self.labelnames, labels))
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), state[:-1]):
+                cumulative += count
+                yield "_bucket", pairs + (("le", _format_value(bound)),), cumulative
+            yield "_sum", pairs, state[-1]
+            yield "_count", pairs, cumulative
+
+
+class MetricsRegistry:
+    """Metrics of the current process and their text exposition."""
+
+    def __init__(self):
+        """Start empty; metrics are declared with counter() / gauge() / histogram()."""
+        self.metrics: dict[str, Metric] = {}
+        self.lock = threading.Lock()
+
+    def _register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        """Declare a Counter."""
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        """Declare a Gauge."""
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """Declare a Histogram."""
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def reset(self):
+        """Forget every recorded value (tests)."""
+        with self.lock:
+            for metric in self.metrics.values():
+                metric.values.clear()
+
+    def snapshot(self):
+        """JSON-serializable copy of every series: {name: [[labels, value], ...]}."""
+        with self.lock:
+            return {
+                name: [[list(labels), value] for labels, value in metric.values.items()]
+                for name, metric in self.metrics.items()
+            }
+
+    def merge(self, snapshots):
+        """Combine process snapshots into {name: {labels: value}}."""
+        merged = {name: {} for name in self.metrics}
+        for snapshot in snapshots:
+            for name, values in snapshot.items():
+                if name in self.metrics:
+                    self.metrics[name].merge(values, merged[name])
+        return merged
+
+    def expose(self, merged):
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for suffix, pairs, value in metric.samples(merged.get(name, {})):
+                labels = ",".join(f'{key}="{_escape(label)}"' for key, label in pairs)
+                series = f"{name}{suffix}{{{labels}}}" if labels else f"{name}{suffix}"
+                lines.append(f"{series} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value):
+    if isinstance(value, str):
+        return value
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "litrevu_http_requests_total", "HTTP requests served.", ("view", "method", "status")
+)
+HTTP_LATENCY = REGISTRY.histogram(
+    "litrevu_http_request_duration_seconds", "Time spent below the metrics middleware.", ("view",)
+)
+HTTP_ERRORS = REGISTRY.counter("litrevu_http_errors_total", "Responses with a 5xx status.", ("view",))
+DB_QUERIES = REGISTRY.counter("litrevu_db_queries_total", "SQL statements run while serving a view.", ("view",))
+DB_TIME = REGISTRY.counter(
+    "litrevu_db_duration_seconds_total", "Time spent in SQL statements while serving a view.", ("view",)
+)
+CACHE_LOOKUPS = REGISTRY.counter(
+    "litrevu_cache_lookups_total", "Lookups in the application caches (page cache...).", ("result",)
+)
+CACHE_HIT_RATIO = REGISTRY.gauge("litrevu_cache_hit_ratio", "Hits / lookups of the application caches.")
+CONNECTION_AGE = REGISTRY.gauge(
+    "litrevu_db_connection_age_seconds", "Age of each open database connection.", ("alias", "pid")
+)
+
+# Per process: alias -> time.monotonic() when its connection was opened
+_connection_opened: dict[str, float] = {}
+
+
+def _track_connection(sender, connection, **kwargs):
+    _connection_opened[connection.alias] = time.monotonic()
+
+
+def record_request(view, method, status, duration, db_queries, db_time):
+    """Record one served request."""
+    with REGISTRY.lock:
+        HTTP_REQUESTS.inc((view, method, str(status)))
+        HTTP_LATENCY.observe((view,), duration)
+        if status >= 500:
+            HTTP_ERRORS.inc((view,))
+        if db_queries:
+            DB_QUERIES.inc((view,), db_queries)
+            DB_TIME.inc((view,), db_time)
+
+
+def record_cache_lookup(hit):
+    """Count an application cache lookup (called by LITRevu.perf.timing.record_cache)."""
+    if _store is None:
+        return
+    with REGISTRY.lock:
+        CACHE_LOOKUPS.inc(("hit" if hit else "miss",))
+
+
+def _update_gauges():
+    """Refresh this process's gauges right before a snapshot."""
+    now = time.monotonic()
+    pid = str(os.getpid())
+    with REGISTRY.lock:
+        CONNECTION_AGE.values.clear()
+        for connection in connections.all(initialized_only=True):
+            opened = _connection_opened.get(connection.alias)
+            if connection.connection is not None and opened is not None:
+                CONNECTION_AGE.set((connection.alias, pid), now - opened)
+
+
+class MemoryStore:
+    """Single-process storage: the registry itself."""
+
+    def flush(self, force=False):
+        """Nothing to persist."""
+
+    def snapshots(self):
+        """Only this process."""
+        _update_gauges()
+        return [REGISTRY.snapshot()]
+
+
+class MultiProcessStore:
+    """One JSON snapshot file per worker process, merged at scrape time."""
+
+    def __init__(self, directory, interval):
+        """Write snapshots to `directory`, at most every `interval` seconds."""
+        self.directory = Path(directory)
+        self.interval = interval
+        self.started = time.time_ns()
+        self.last_flush = 0.0
+
+    @property
+    def path(self):
+        """Snapshot file of the current process (pid + start time: pids get reused)."""
+        return self.directory / f"{os.getpid()}-{self.started}.json"
+
+    def flush(self, force=False):
+        """Dump the registry atomically when the flush interval has elapsed."""
+        now = time.monotonic()
+        if not force and now - self.last_flush < self.interval:
+            return
+        self.last_flush = now
+        _update_gauges()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"pid": os.getpid(), "metrics": REGISTRY.snapshot()}))
+        os.replace(tmp, self.path)
+
+    def snapshots(self):
+        """Every worker's last snapshot; gauges only from live processes."""
+        self.flush(force=True)
+        snapshots = []
+        for file in sorted(self.directory.glob("*.json")):
+            try:
+                data = json.loads(file.read_text())
+            except (OSError, ValueError):
+                continue  # being replaced or truncated
+            metrics = data["metrics"]
+            if not _pid_alive(data["pid"]):
+                metrics = {
+                    name: values for name, values in metrics.items()
+                    if REGISTRY.metrics.get(name) and REGISTRY.metrics[name].kind != "gauge"
+                }
+            snapshots.append(metrics)
+        return snapshots
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+_store: MemoryStore | MultiProcessStore | None = None
+
+
+def configure(mode=None):
+    """Select the storage for METRICS_MODE; returns None when metrics are off."""
+    global _store
+    mode = settings.METRICS_MODE if mode is None else mode
+    if mode == "memory":
+        _store = MemoryStore()
+    elif mode == "multiprocess":
+        _store = MultiProcessStore(settings.METRICS_MULTIPROC_DIR, settings.METRICS_FLUSH_INTERVAL)
+    else:
+        _store = None
+    return _store
+
+
+@atexit.register
+def _flush_at_exit():
+    """Persist the last requests of a worker recycled by gunicorn (max_requests, shutdown)."""
+    if _store is not None:
+        _store.flush(force=True)
+
+
+def render_metrics():
+    """Text exposition merged over every process, or None when metrics are off."""
+    if _store is None:
+        return None
+    merged = REGISTRY.merge(_store.snapshots())
+
+    lookups = merged[CACHE_LOOKUPS.name]
+    total = sum(lookups.values())
+    if total:
+        merged[CACHE_HIT_RATIO.name] = {(): lookups.get(("hit",), 0.0) / total}
+    return REGISTRY.expose(merged)
+
+
+class _DbTimer:
+    """Execute wrapper counting statements and their time."""
+
+    __slots__ = ("count", "elapsed")
+
+    def __init__(self):
+        self.count = 0
+        self.elapsed = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.elapsed += time.perf_counter() - started
+            self.count += 1
+
+
+class MetricsMiddleware:
+    """Record rate, latency, errors and DB time of every request by URL name."""
+
+    def __init__(self, get_response):
+        """Unload the middleware when METRICS_MODE is "off"."""
+        if configure() is None:
+            raise MiddlewareNotUsed
+        connection_created.connect(_track_connection, dispatch_uid="litrevu.perf.metrics")
+        self.get_response = get_response
+
+    def __call__(self, request):
+        """Serve the request and record it."""
+        started = time.perf_counter()
+        timer = _DbTimer()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timer))
+            response = self.get_response(request)
+
+        match = getattr(request, "resolver_match", None)
+        record_request(
+            match.view_name if match else UNRESOLVED_VIEW,
+            request.method,
+            response.status_code,
+            time.perf_counter() - started,
+            timer.count,
+            timer.elapsed,
+        )
+        _store.flush()
+        return response
@@ -0,0 +1,131 @@
+"""
+N+1 query detection for development and tests.
+
+Every statement run while the detector is active is fingerprinted (see
+LITRevu.perf.sql) together with the project call site that issued it. The
+same shape issued ``threshold`` times or more from the same place - e.g. one
+``Review.objects.filter(ticket=...)`` per card from card_tags.py - is
+reported as an N+1 pattern.
+
+Entry points:
+- ``detect_n_plus_one()``: context manager for tests and scripts.
+- ``NPlusOneMiddleware``: per request, NPLUSONE_MODE = off | log | raise.
+- ``NPlusOneDiscoverRunner``: test runner switching the middleware to
+  "raise", so any view test hitting an N+1 regression fails with the report.
+"""
+
+import logging
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.test.runner import DiscoverRunner
+
+from .sql import fingerprint, is_transaction_control, project_stack
+
+logger = logging.getLogger("litrevu.perf")
+
+
+class NPlusOneDetected(AssertionError):
+    """Raised when repeated query shapes exceed the threshold."""
+
+
+@dataclass
+class QueryShape:
+    """A normalized statement issued from one call site."""
+
+    fingerprint: str
+    call_site: str
+    count: int = 0
+    example: str = ""
+    stack: list = field(default_factory=list)
+
+
+class QueryShapeRecorder:
+    """Connection execute wrapper grouping statements by (fingerprint, call site)."""
+
+    def __init__(self):
+        """Start with no recorded shape."""
+        self.shapes: dict[tuple[str, str], QueryShape] = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        """Record the statement shape, then run it."""
+        # Transaction bookkeeping is repetitive by nature.
+        if not is_transaction_control(sql):
+            stack = project_stack(limit=4, skip=2)
+            site = stack[0] if stack else "<unknown>"
+            key = (fingerprint(sql), site)
+            shape = self.shapes.get(key)
+            if shape is None:
+                shape = self.shapes[key] = QueryShape(key[0], site, example=sql, stack=stack)
+            shape.count += 1
+        return execute(sql, params, many, context)
+
+    def repeated(self, threshold):
+        """Shapes issued at least `threshold` times, most frequent first."""
+        found = [shape for shape in self.shapes.values() if shape.count >= threshold]
+        return sorted(found, key=lambda shape: shape.count, reverse=True)
+
+
+def format_report(repeated, label=""):
+    """Human-readable report of repeated query shapes."""
+    title = f"N+1 queries detected{f' in {label}' if label else ''}:"
+    lines = [title]
+    for shape in repeated:
+        lines.append(f"  {shape.count}x  {shape.call_site}")
+        lines.append(f"      {shape.fingerprint[:300]}")
+        for frame in shape.stack[1:]:
+            lines.append(f"      called from {frame}")
+    return "\n".join(lines)
+
+
+@contextmanager
+def detect_n_plus_one(threshold=None, label="", raise_on_detect=True):
+    """
+    Record the queries run in the block and flag repeated shapes.
+
+    Yields the QueryShapeRecorder; on exit raises NPlusOneDetected (or only
+    logs a warning when raise_on_detect is False) if a shape reached the
+    threshold (settings.NPLUSONE_THRESHOLD by default).
+    """
+    threshold = threshold or settings.NPLUSONE_THRESHOLD
+    recorder = QueryShapeRecorder()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        yield recorder
+
+    repeated = recorder.repeated(threshold)
+    if repeated:
+        report = format_report(repeated, label)
+        if raise_on_detect:
+            raise NPlusOneDetected(report)
+        logger.warning(report)
+
+
+class NPlusOneMiddleware:
+    """Run every request under detect_n_plus_one() according to NPLUSONE_MODE."""
+
+    def __init__(self, get_response):
+        """Unload the middleware when NPLUSONE_MODE is "off"."""
+        self.mode = settings.NPLUSONE_MODE
+        if self.mode not in ("log", "raise"):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        """Serve the request while recording its query shapes."""
+        with detect_n_plus_one(label=f"{request.method} {request.path}", raise_on_detect=self.mode == "raise"):
+            response = self.get_response(request)
+        return response
+
+
+class NPlusOneDiscoverRunner(DiscoverRunner):
+    """Test runner turning N+1 regressions in view tests into failures."""
+
+    def setup_test_environment(self, **kwargs):
+        """Force NPLUSONE_MODE to "raise" for the whole test run."""
+        super().setup_test_environment(**kwargs)
+        settings.NPLUSONE_MODE = "raise"
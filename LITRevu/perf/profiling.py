@@ -0,0 +1,162 @@
+"""
+On-demand cProfile capture of a single request, for staff members.
+
+A staff user adds ``X-Profile: 1`` or ``?_profile=1`` to any URL: that one
+request runs under cProfile, and a reviews.RequestProfile row is saved with
+the raw pstats file and a rendered summary (call tree by cumulative time,
+then the functions with the most own time). The response carries
+``X-Profile-Id``; captures are listed in the admin.
+
+Gating: REQUEST_PROFILING_ENABLED=0 unloads the middleware; otherwise a
+request costs one dict lookup and one substring test unless it carries the
+flag, and the flag is ignored for anyone who is not staff.
+"""
+
+import cProfile
+import io
+import marshal
+import pstats
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.files.base import ContentFile
+
+PROFILE_HEADER = "HTTP_X_PROFILE"
+PROFILE_PARAM = "_profile"
+
+# Call tree: branches under this share of the total are pruned
+MIN_BRANCH_FRACTION = 0.01
+MAX_TREE_DEPTH = 30
+BAR_WIDTH = 20
+TOP_FUNCTIONS = 25
+
+
+def wants_profile(request):
+    """True when the request asks for a capture (before any permission check)."""
+    if request.META.get(PROFILE_HEADER) == "1":
+        return True
+    # Substring test first: never parse the query string of ordinary requests
+    return f"{PROFILE_PARAM}=" in request.META.get("QUERY_STRING", "") and request.GET.get(PROFILE_PARAM) == "1"
+
+
+def function_label(func):
+    """Readable name of a pstats function key (filename, line, name)."""
+    filename, lineno, name = func
+    if filename == "~":
+        return name  # built-in, e.g. "<method 'execute' of 'sqlite3.Cursor' objects>"
+    base = str(settings.BASE_DIR) + "/"
+    if filename.startswith(base):
+        filename = filename[len(base):]
+    elif "site-packages/" in filename:
+        filename = filename.split("site-packages/", 1)[1]
+    return f"{filename}:{lineno} {name}"
+
+
+def call_tree(stats, total):
+    """
+    Top-down tree of the profile ("flame summary"), one line per frame.
+
+    cProfile only keeps caller -> callee edges, so each branch shows the
+    cumulative time of that edge; branches under MIN_BRANCH_FRACTION of the
+    total are pruned and recursion is cut at the first repeat.
+    """
+    children = defaultdict(list)
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, (_, _, _, edge_cumulative) in callers.items():
+            children[caller].append((edge_cumulative, func))
+    roots = sorted(((entry[3], func) for func, entry in stats.items() if not entry[4]), reverse=True)
+    if not roots or roots[0][0] < total / 2:
+        # The entry point is recursive (Django's middleware chain calls the same
+        # `inner` wrapper at every level), so it has callers: start from it anyway.
+        roots.insert(0, max((entry[3], func) for func, entry in stats.items()))
+
+    lines = []
+
+    def walk(func, cumulative, depth, ancestors):
+        if cumulative < total * MIN_BRANCH_FRACTION or depth > MAX_TREE_DEPTH:
+            return
+        share = cumulative / total if total else 0.0
+        bar = "█" * round(share * BAR_WIDTH)
+        label = "  " * depth + function_label(func)
+        lines.append(f"{share * 100:5.1f}% {cumulative * 1000:9.2f} ms  {bar:<{BAR_WIDTH}}  {label}")
+        if func in ancestors:
+            return
+        for child_cumulative, child in sorted(children[func], reverse=True):
+            walk(child, child_cumulative, depth + 1, ancestors | {func})
+
+    for cumulative, root in roots:
+        walk(root, cumulative, 0, frozenset())
+    return "\n".join(lines)
+
+
+def render_summary(profiler, total):
+    """Call tree followed by the pstats listing of the most expensive functions."""
+    # pstats.Stats() takes the stats dict away from the profiler: build the tree first
+    tree = call_tree(profiler.stats, total)
+    stream = io.StringIO()
+    pstats.Stats(profiler, stream=stream).strip_dirs().sort_stats("tottime").print_stats(TOP_FUNCTIONS)
+    return f"{tree}\n\n{stream.getvalue().strip()}\n"
+
+
+def delete_profiles(queryset):
+    """Delete profiles together with their pstats files."""
+    for profile in queryset:
+        profile.pstats_file.delete(save=False)
+    queryset.delete()
+
+
+def save_profile(request, response, profiler, duration):
+    """Store the capture of one request and prune the oldest ones."""
+    from reviews.models import RequestProfile
+
+    profiler.create_stats()
+    raw_stats = marshal.dumps(profiler.stats)
+    match = getattr(request, "resolver_match", None)
+    view_name = match.view_name if match else ""
+
+    profile = RequestProfile(
+        user=request.user,
+        view_name=view_name,
+        method=request.method,
+        path=request.get_full_path()[:2048],
+        status_code=response.status_code,
+        duration_ms=duration * 1000,
+        summary=render_summary(profiler, duration),
+    )
+    filename = f"{(view_name or 'request').replace(':', '-')}-{time.strftime('%Y%m%d-%H%M%S')}.pstats"
+    profile.pstats_file.save(filename, ContentFile(raw_stats), save=False)
+    profile.save()
+
+    stale = RequestProfile.objects.order_by("-time_created", "-pk")[settings.REQUEST_PROFILE_KEEP:]
+    delete_profiles(RequestProfile.objects.filter(pk__in=list(stale.values_list("pk", flat=True))))
+    return profile
+
+
+class RequestProfilerMiddleware:
+    """Profile the requests of staff members who ask for it."""
+
+    def __init__(self, get_response):
+        """Unload the middleware when profiling is disabled."""
+        if not settings.REQUEST_PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        """Serve the request, under cProfile when a staff member flagged it."""
+        if not wants_profile(request) or not request.user.is_staff:
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        duration = time.perf_counter() - started
+
+        profile = save_profile(request, response, profiler, duration)
+        response["X-Profile-Id"] = str(profile.pk)
+        return response
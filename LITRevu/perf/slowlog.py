@@ -0,0 +1,161 @@
+"""
+Slow-query log with query plans and call-site attribution.
+
+Every statement slower than SLOW_QUERY_THRESHOLD_MS is written as one JSON
+object per line to the ``litrevu.perf.slowlog`` logger (a rotating file,
+see LOGGING in settings) with:
+- the SQL, its fingerprint (LITRevu.perf.sql) and its parameters,
+- the ``EXPLAIN QUERY PLAN`` output, taken right after the statement ran,
+- the URL name of the view being served and the project call site
+  (``reviews/views.py:83 in feed``) that issued it.
+
+``manage.py slow_queries`` aggregates the file by fingerprint. With a
+threshold of 0 the middleware unloads itself at startup.
+"""
+
+import json
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError, connections
+
+from .sql import call_site, fingerprint, is_transaction_control, project_stack
+
+logger = logging.getLogger("litrevu.perf.slowlog")
+
+# Parameters of these statements may hold password hashes or session data.
+_SESSION_TABLE = "django_session"
+_PASSWORD_COLUMN = '"password"'
+_WRITE_PREFIXES = ("INSERT", "UPDATE")
+_MAX_PARAM_LENGTH = 200
+
+
+class SlowQueryFileHandler(RotatingFileHandler):
+    """RotatingFileHandler creating the log directory on first write."""
+
+    def _open(self):
+        Path(self.baseFilename).parent.mkdir(parents=True, exist_ok=True)
+        return super()._open()
+
+
+def explain_query_plan(connection, sql, params):
+    """
+    ``EXPLAIN QUERY PLAN`` of a statement, one indented line per plan step.
+
+    Runs on a fresh cursor of the same connection, outside the execute
+    wrappers, so it is neither recorded nor timed. Returns None on other
+    backends or when the statement cannot be explained.
+    """
+    if connection.vendor != "sqlite":
+        return None
+    cursor = connection.create_cursor()
+    try:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        rows = cursor.fetchall()
+    except DatabaseError:
+        return None
+    finally:
+        cursor.close()
+
+    depths = {0: -1}
+    plan = []
+    for node_id, parent, _, detail in rows:
+        depths[node_id] = depths.get(parent, -1) + 1
+        plan.append("  " * depths[node_id] + detail)
+    return plan
+
+
+def loggable_params(sql, params, many):
+    """Parameters safe to write to disk: truncated, and redacted for credentials."""
+    if params is None:
+        return None
+    if many:
+        # executemany() may receive a generator: never consume it here
+        return "<executemany>"
+    writes_password = sql.lstrip().upper().startswith(_WRITE_PREFIXES) and _PASSWORD_COLUMN in sql
+    if writes_password or _SESSION_TABLE in sql:
+        return "<redacted>"
+
+    values = []
+    for value in params:
+        if isinstance(value, (bytes, memoryview)):
+            value = f"<{len(value)} bytes>"
+        elif isinstance(value, str) and len(value) > _MAX_PARAM_LENGTH:
+            value = value[:_MAX_PARAM_LENGTH] + "..."
+        values.append(value)
+    return values
+
+
+class SlowQueryRecorder:
+    """Connection execute wrapper logging statements over the threshold."""
+
+    def __init__(self, threshold_ms, view=None):
+        """`view` is the URL name, or a callable returning it when a query is logged."""
+        self.threshold_ms = threshold_ms
+        self.view = view
+
+    def __call__(self, execute, sql, params, many, context):
+        """Time the statement and log it when it is too slow."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if elapsed_ms >= self.threshold_ms and not is_transaction_control(sql):
+                self.log(sql, params, many, context["connection"], elapsed_ms)
+
+    def log(self, sql, params, many, connection, elapsed_ms):
+        """Write one slow statement to the slow-query log."""
+        view = self.view() if callable(self.view) else self.view
+        record = {
+            "event": "slow_query",
+            "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "view": view,
+            "duration_ms": round(elapsed_ms, 3),
+            "fingerprint": fingerprint(sql),
+            "sql": sql,
+            "params": loggable_params(sql, params, many),
+            "call_site": call_site(),
+            "stack": project_stack(limit=3),
+            "plan": None if many else explain_query_plan(connection, sql, params),
+        }
+        logger.warning(json.dumps(record, default=str))
+
+
+@contextmanager
+def capture_slow_queries(threshold_ms=None, view=None):
+    """Log slow statements run in the block, on every database connection."""
+    if threshold_ms is None:
+        threshold_ms = settings.SLOW_QUERY_THRESHOLD_MS
+    recorder = SlowQueryRecorder(threshold_ms, view=view)
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        yield recorder
+
+
+class SlowQueryMiddleware:
+    """Run every request under capture_slow_queries(), tagged with its URL name."""
+
+    def __init__(self, get_response):
+        """Unload the middleware when the threshold is 0."""
+        self.threshold_ms = settings.SLOW_QUERY_THRESHOLD_MS
+        if self.threshold_ms <= 0:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        """Serve the request; resolver_match is only known once the URL is resolved."""
+
+        def view_name():
+            match = getattr(request, "resolver_match", None)
+            return match.view_name if match else request.path
+
+        with capture_slow_queries(self.threshold_ms, view=view_name):
+            return self.get_response(request)
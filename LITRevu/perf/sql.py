@@ -0,0 +1,72 @@
+"""Helpers to fingerprint SQL statements and attribute them to project code."""
+
+import re
+import sys
+
+from django.conf import settings
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_RE = re.compile(r"%s|\?")
+_IN_LIST_RE = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_SPACES_RE = re.compile(r"\s+")
+
+# Transaction bookkeeping, not application queries
+_TRANSACTION_PREFIXES = ("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT", "BEGIN", "COMMIT")
+
+# Frames from these files are never the "call site" of a query.
+_SKIPPED_PATH_PARTS = ("site-packages", "dist-packages", "/LITRevu/perf/", "/lib/python")
+
+
+def fingerprint(sql):
+    """
+    Normalize a statement so that queries of the same shape compare equal.
+
+    Literals and placeholders become ``?`` and ``IN (?, ?, ?)`` lists collapse
+    to ``IN (...)``, so ``Review ... WHERE ticket_id = 3`` and ``... = 7`` share
+    a fingerprint whatever the parameters.
+    """
+    sql = _STRING_RE.sub("?", sql)
+    sql = _NUMBER_RE.sub("?", sql)
+    sql = _PLACEHOLDER_RE.sub("?", sql)
+    sql = _IN_LIST_RE.sub("IN (...)", sql)
+    return _SPACES_RE.sub(" ", sql).strip()
+
+
+def is_transaction_control(sql):
+    """True for BEGIN / COMMIT / savepoint statements."""
+    return sql.lstrip().upper().startswith(_TRANSACTION_PREFIXES)
+
+
+def _relative(path):
+    base = str(settings.BASE_DIR)
+    return path[len(base) + 1:] if path.startswith(base) else path
+
+
+def _is_project_frame(path):
+    if not path.startswith(str(settings.BASE_DIR)):
+        return False
+    return not any(part in path for part in _SKIPPED_PATH_PARTS)
+
+
+def project_stack(limit=5, skip=1):
+    """
+    Return the innermost project frames of the current stack.
+
+    Each entry looks like ``reviews/templatetags/card_tags.py:34 in render_card_grid``;
+    Django, third-party and instrumentation frames are left out.
+    """
+    frames = []
+    frame = sys._getframe(skip)
+    while frame is not None and len(frames) < limit:
+        path = frame.f_code.co_filename
+        if _is_project_frame(path):
+            frames.append(f"{_relative(path)}:{frame.f_lineno} in {frame.f_code.co_name}")
+        frame = frame.f_back
+    return frames
+
+
+def call_site(skip=1):
+    """The innermost project frame that issued the current statement."""
+    stack = project_stack(limit=1, skip=skip + 1)
+    return stack[0] if stack else "<unknown>"
@@ -0,0 +1,37 @@
+"""Django template backend that reports render times to LITRevu.perf.timing."""
+
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+from .timing import current_timings
+
+
+class TimedTemplate(Template):
+    """Backend template whose render() is timed when the request is sampled."""
+
+    def render(self, context=None, request=None):
+        """Render the template, timing it only for instrumented requests."""
+        timings = current_timings()
+        if timings is None:
+            return super().render(context, request)
+        with timings.template(self.origin.template_name):
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Drop-in replacement for DjangoTemplates returning TimedTemplate objects.
+
+    Every render going through the backend is seen: views' render(), and the
+    render_to_string() calls made by template tags such as render_card_grid.
+    """
+
+    def from_string(self, template_code):
+        """Compile a template from a string."""
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        """Load a template by name."""
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
@@ -0,0 +1,173 @@
+"""
+Per-request timings exposed as a ``Server-Timing`` header and a log line.
+
+ServerTimingMiddleware records, for a sample of requests:
+- SQL query count and time (connection execute wrapper),
+- template render time, top-level pages and nested partials such as the
+  cards rendered by ``render_card_grid`` (see LITRevu.perf.templates),
+- cache hits / misses reported by the app's own caches (``record_cache``),
+- total time spent below the middleware.
+
+Everything is keyed by URL name (``reviews:feed``). With a sample rate of 0
+the middleware removes itself from the stack at startup (MiddlewareNotUsed),
+so a disabled instrumentation costs nothing per request.
+"""
+
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from .metrics import record_cache_lookup
+
+logger = logging.getLogger("litrevu.perf")
+
+_current_timings: ContextVar["RequestTimings | None"] = ContextVar("litrevu_request_timings", default=None)
+
+
+class RequestTimings:
+    """Accumulates the measurements of a single request."""
+
+    __slots__ = (
+        "started", "total", "sql_count", "sql_time", "tpl_time", "tpl_count",
+        "partial_time", "partials", "cache_hits", "cache_misses", "_tpl_depth",
+    )
+
+    def __init__(self):
+        """Start the clock with every counter at zero."""
+        self.started = time.perf_counter()
+        self.total = 0.0
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.tpl_time = 0.0
+        self.tpl_count = 0
+        self.partial_time = 0.0
+        self.partials: dict[str, list] = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._tpl_depth = 0
+
+    # Database -------------------------------------------------------------
+
+    def __call__(self, execute, sql, params, many, context):
+        """Connection execute wrapper: time every statement."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - started
+            self.sql_count += 1
+
+    # Templates ------------------------------------------------------------
+
+    @contextmanager
+    def template(self, name):
+        """Time one template render; nested renders are reported as partials."""
+        depth = self._tpl_depth
+        self._tpl_depth += 1
+        self.tpl_count += 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self._tpl_depth = depth
+            if depth == 0:
+                self.tpl_time += elapsed
+            elif depth == 1:
+                # e.g. each render_to_string() of render_card_grid inside the page
+                self.partial_time += elapsed
+                bucket = self.partials.setdefault(name or "<string>", [0, 0.0])
+                bucket[0] += 1
+                bucket[1] += elapsed
+
+    # Reporting ------------------------------------------------------------
+
+    def server_timing(self):
+        """Value of the Server-Timing header (durations in milliseconds)."""
+        entries = [
+            f'db;dur={self.sql_time * 1000:.2f};desc="{self.sql_count} queries"',
+            f'tpl;dur={self.tpl_time * 1000:.2f};desc="{self.tpl_count} renders"',
+        ]
+        if self.partials:
+            entries.append(f'tpl-partials;dur={self.partial_time * 1000:.2f}')
+        if self.cache_hits or self.cache_misses:
+            entries.append(f'cache;desc="hit={self.cache_hits} miss={self.cache_misses}"')
+        entries.append(f"total;dur={self.total * 1000:.2f}")
+        return ", ".join(entries)
+
+    def as_log_record(self, request, response):
+        """Structured representation written to the `litrevu.perf` logger."""
+        match = getattr(request, "resolver_match", None)
+        return {
+            "event": "request_timing",
+            "view": match.view_name if match else None,
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "total_ms": round(self.total * 1000, 2),
+            "db_ms": round(self.sql_time * 1000, 2),
+            "db_queries": self.sql_count,
+            "tpl_ms": round(self.tpl_time * 1000, 2),
+            "tpl_renders": self.tpl_count,
+            "partials": {
+                name: {"count": count, "ms": round(elapsed * 1000, 2)}
+                for name, (count, elapsed) in self.partials.items()
+            },
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+        }
+
+
+def current_timings():
+    """Timings of the request being served, or None when it is not sampled."""
+    return _current_timings.get()
+
+
+def record_cache(hit):
+    """Report a cache lookup made while serving the current request."""
+    record_cache_lookup(hit)
+    timings = _current_timings.get()
+    if timings is None:
+        return
+    if hit:
+        timings.cache_hits += 1
+    else:
+        timings.cache_misses += 1
+
+
+class ServerTimingMiddleware:
+    """Measure sampled requests and emit Server-Timing headers and log lines."""
+
+    def __init__(self, get_response):
+        """Drop out of the middleware chain entirely when sampling is off."""
+        self.sample_rate = settings.PERF_TIMING_SAMPLE_RATE
+        if self.sample_rate <= 0:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        """Serve the request, measuring it when it falls in the sample."""
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        timings = RequestTimings()
+        token = _current_timings.set(timings)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timings))
+                response = self.get_response(request)
+        finally:
+            _current_timings.reset(token)
+
+        timings.total = time.perf_counter() - timings.started
+        response["Server-Timing"] = timings.server_timing()
+        logger.info(json.dumps(timings.as_log_record(request, response)))
+        return response
@@ -85,12 +85,21 @@ AUTH_USER_MODEL = "users.User"
 # MIDDLEWARE
 # -----------------------------------------------------------------------------
 MIDDLEWARE = [
+    # First, so its total covers the whole stack (disabled unless sampled, see PERFORMANCE below)
+    'LITRevu.perf.timing.ServerTimingMiddleware',
+    'LITRevu.perf.metrics.MetricsMiddleware',
+    'LITRevu.perf.nplusone.NPlusOneMiddleware',
+    'LITRevu.perf.slowlog.SlowQueryMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # Needs request.user (staff only); unloaded when REQUEST_PROFILING_ENABLED=0
+    'LITRevu.perf.profiling.RequestProfilerMiddleware',
+    'LITRevu.perf.memory.MemoryTrackingMiddleware',
+    'users.middleware.SessionRefreshMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -102,7 +111,8 @@ ROOT_URLCONF = 'LITRevu.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates + render timings for LITRevu.perf.timing
+        'BACKEND': 'LITRevu.perf.templates.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / "templates"],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -130,6 +140,65 @@ DATABASES = {
     }
 }
 
+# Online backups / maintenance (see `manage.py sqlite_maintenance`)
+DB_BACKUP_DIR = Path(os.environ.get("DB_BACKUP_DIR", DB_DIR / "backups"))
+DB_BACKUP_KEEP = int(os.environ.get("DB_BACKUP_KEEP", "7"))
+
+# Item-item similarity model of `manage.py build_recommendations` (see reviews.recommendations)
+RECOMMENDATIONS_DIR = Path(os.environ.get("RECOMMENDATIONS_DIR", DB_DIR / "recommendations"))
+
+# TF-IDF index of `manage.py build_similar_tickets` (see reviews.similar_tickets)
+SIMILAR_TICKETS_DIR = Path(os.environ.get("SIMILAR_TICKETS_DIR", DB_DIR / "similar_tickets"))
+
+# -----------------------------------------------------------------------------
+# CACHE
+# -----------------------------------------------------------------------------
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "DJANGO_CACHE_BACKEND",
+            "django.core.cache.backends.locmem.LocMemCache",
+        ),
+        "LOCATION": os.getenv("DJANGO_CACHE_LOCATION", "litrevu"),
+    },
+    # Shared by every gunicorn worker of the container, so a logout handled by one
+    # worker is seen by the others (a per-process LocMemCache would not be).
+    "sessions": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.getenv("DJANGO_SESSION_CACHE_DIR", str(DB_DIR / "cache" / "sessions")),
+    },
+}
+
+# Anonymous homepage / registration served from a cached shell (0 = disabled).
+# Off by default locally so template edits show up immediately.
+ANONYMOUS_PAGE_CACHE_TIMEOUT = int(
+    os.getenv("DJANGO_PAGE_CACHE_TIMEOUT", "300" if IS_PRODUCTION else "0")
+)
+
+# Leaderboard pages (reviews.leaderboards) reuse what they read for this long:
+# their staleness is at most this plus the build_leaderboards schedule.
+LEADERBOARD_CACHE_TIMEOUT = int(os.getenv("LEADERBOARD_CACHE_TIMEOUT", "60"))
+
+# -----------------------------------------------------------------------------
+# SESSIONS
+# -----------------------------------------------------------------------------
+# Strategy (explicit): db | cached_db | signed_cookies
+# - cached_db: reads come from the cache, the DB is only written when the session changes
+# - signed_cookies: no server-side storage at all (session data lives in the cookie)
+SESSION_ENGINES = {
+    "db": "django.contrib.sessions.backends.db",
+    "cached_db": "django.contrib.sessions.backends.cached_db",
+    "signed_cookies": "django.contrib.sessions.backends.signed_cookies",
+}
+SESSION_STRATEGY = os.getenv("DJANGO_SESSION_STRATEGY", "cached_db").lower()
+SESSION_ENGINE = SESSION_ENGINES[SESSION_STRATEGY]
+SESSION_CACHE_ALIAS = "sessions"
+
+# Never rewrite the session just because a request was served...
+SESSION_SAVE_EVERY_REQUEST = False
+# ...instead slide the expiry lazily: rewrite once this fraction of the lifetime has elapsed
+SESSION_REFRESH_RATIO = float(os.getenv("DJANGO_SESSION_REFRESH_RATIO", "0.5"))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -213,6 +282,82 @@ if USE_CLOUDINARY:
     }
 
 
+# -----------------------------------------------------------------------------
+# PERFORMANCE INSTRUMENTATION
+# -----------------------------------------------------------------------------
+# Fraction of requests measured by ServerTimingMiddleware (0 = middleware unloaded, 1 = all)
+PERF_TIMING_SAMPLE_RATE = float(os.getenv("PERF_TIMING_SAMPLE_RATE", "0"))
+
+# N+1 detector: off | log | raise (the test runner always uses "raise")
+NPLUSONE_MODE = os.getenv("NPLUSONE_MODE", "log" if DEBUG else "off").lower()
+# Same query shape from the same call site this many times in one request = N+1
+NPLUSONE_THRESHOLD = int(os.getenv("NPLUSONE_THRESHOLD", "5"))
+
+TEST_RUNNER = "LITRevu.perf.nplusone.NPlusOneDiscoverRunner"
+
+# Prometheus-style metrics (see LITRevu.perf.metrics): off | memory | multiprocess
+# multiprocess = one snapshot file per gunicorn worker, merged by the /metrics/ endpoint
+METRICS_MODE = os.getenv("METRICS_MODE", "multiprocess" if IS_PRODUCTION else "off").lower()
+METRICS_MULTIPROC_DIR = Path(os.getenv("METRICS_MULTIPROC_DIR", DB_DIR / "cache" / "metrics"))
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "5"))
+# /metrics/ is staff-only; a scraper can authenticate with "Authorization: Bearer <token>"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# On-demand profiling of single requests (see LITRevu.perf.profiling): staff users add
+# an "X-Profile: 1" header or "?_profile=1" to any URL; captures are listed in the admin
+REQUEST_PROFILING_ENABLED = os.getenv("REQUEST_PROFILING_ENABLED", "1") == "1"
+REQUEST_PROFILE_DIR = Path(os.getenv("REQUEST_PROFILE_DIR", DB_DIR / "profiles"))
+REQUEST_PROFILE_KEEP = int(os.getenv("REQUEST_PROFILE_KEEP", "100"))
+
+# tracemalloc per request for these URL names (comma-separated, empty = off), e.g. "reviews:feed"
+MEMORY_TRACKING_VIEWS = [name.strip() for name in os.getenv("MEMORY_TRACKING_VIEWS", "").split(",") if name.strip()]
+MEMORY_TRACKING_TOP = int(os.getenv("MEMORY_TRACKING_TOP", "10"))
+
+# Slow-query log (0 = disabled): statements slower than this are written with their
+# EXPLAIN QUERY PLAN and call site to a rotating JSONL file (see `manage.py slow_queries`)
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "0"))
+SLOW_QUERY_LOG_FILE = Path(os.getenv("SLOW_QUERY_LOG_FILE", DB_DIR / "logs" / "slow_queries.jsonl"))
+SLOW_QUERY_LOG_MAX_BYTES = int(os.getenv("SLOW_QUERY_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+SLOW_QUERY_LOG_BACKUPS = int(os.getenv("SLOW_QUERY_LOG_BACKUPS", "5"))
+
+# -----------------------------------------------------------------------------
+# LOGGING
+# -----------------------------------------------------------------------------
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+        # Opened on first write only, so nothing is created while the log is disabled
+        "slow_queries": {
+            "class": "LITRevu.perf.slowlog.SlowQueryFileHandler",
+            "filename": str(SLOW_QUERY_LOG_FILE),
+            "maxBytes": SLOW_QUERY_LOG_MAX_BYTES,
+            "backupCount": SLOW_QUERY_LOG_BACKUPS,
+            "delay": True,
+        },
+    },
+    "loggers": {
+        # One JSON object per line (request timings, query reports, ...)
+        "litrevu.perf": {
+            "handlers": ["console"],
+            "level": os.getenv("PERF_LOG_LEVEL", "INFO"),
+            "propagate": False,
+        },
+        "litrevu.perf.slowlog": {
+            "handlers": ["slow_queries"],
+            "level": "INFO",
+            "propagate": False,
+        },
+        # Tracebacks of 5xx responses on stderr even with DEBUG off (gunicorn / container logs)
+        "django.request": {
+            "handlers": ["console"],
+            "level": "ERROR",
+            "propagate": False,
+        },
+    },
+}
+
 # -----------------------------------------------------------------------------
 # AUTH REDIRECTS
 # -----------------------------------------------------------------------------
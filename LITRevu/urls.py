@@ -20,7 +20,7 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
-from LITRevu.views import home
+from LITRevu.views import home, metrics
 from users.views import logout_view
 
 urlpatterns = [
@@ -37,6 +37,9 @@ urlpatterns = [
 
     # Logout endpoint (POST form submits here)
     path("logout/", logout_view, name="logout"),
+
+    # Prometheus scrape endpoint (staff or METRICS_TOKEN only)
+    path("metrics/", metrics, name="metrics"),
 ]
 
 # 👇 Add this block at the end
@@ -0,0 +1,73 @@
+"""Whole-page cache for anonymous GET pages (homepage, registration)."""
+import re
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils.cache import patch_vary_headers
+
+from LITRevu.perf.timing import record_cache
+
+# Stored in place of the CSRF token; swapped for a fresh token on every hit.
+CSRF_PLACEHOLDER = "__litrevu_csrf_token__"
+
+# Output of {% csrf_token %}
+CSRF_INPUT_RE = re.compile(r'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+
+CACHE_KEY_PREFIX = "anon-page"
+
+
+def page_cache_key(path):
+    """Cache key of the rendered shell for a given path."""
+    return f"{CACHE_KEY_PREFIX}:{path}"
+
+
+def is_cacheable_request(request):
+    """True for anonymous GET/HEAD requests when the cache is enabled."""
+    if settings.ANONYMOUS_PAGE_CACHE_TIMEOUT <= 0 or request.method not in ("GET", "HEAD"):
+        return False
+    return not request.user.is_authenticated
+
+
+def cache_anonymous_page(view_func):
+    """
+    Serve a view's anonymous GET response from a cached HTML shell.
+
+    The only per-request part of these pages is the CSRF token, so the shell
+    is stored with a placeholder and the visitor's own token is injected at
+    serve time. Authenticated users, POSTs (form errors) and non-200
+    responses always go through the view.
+
+    Query strings are ignored on purpose: `?registered=1`, `?logout=1` and the
+    toast parameters are only read by JavaScript.
+    """
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if not is_cacheable_request(request):
+            return view_func(request, *args, **kwargs)
+
+        key = page_cache_key(request.path)
+        cached = cache.get(key)
+        record_cache(hit=cached is not None)
+        if cached is not None:
+            content, content_type = cached
+            response = HttpResponse(
+                content.replace(CSRF_PLACEHOLDER, get_token(request)),
+                content_type=content_type,
+            )
+            response["X-Page-Cache"] = "hit"
+            patch_vary_headers(response, ("Cookie",))
+            return response
+
+        response = view_func(request, *args, **kwargs)
+        if response.status_code == 200 and not response.streaming:
+            html = response.content.decode(response.charset)
+            shell = CSRF_INPUT_RE.sub(rf"\g<1>{CSRF_PLACEHOLDER}\g<2>", html)
+            cache.set(key, (shell, response["Content-Type"]), settings.ANONYMOUS_PAGE_CACHE_TIMEOUT)
+            response["X-Page-Cache"] = "miss"
+        return response
+
+    return wrapper
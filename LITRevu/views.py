@@ -1,12 +1,19 @@
-"""View for LITRevu's homepage."""
+"""Project-level views: LITRevu's homepage and the metrics endpoint."""
 
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import login
+from django.http import Http404, HttpResponse
 from django.shortcuts import redirect, render
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.cache import never_cache
 
+from LITRevu.perf.metrics import CONTENT_TYPE, render_metrics
+from LITRevu.utils.page_cache import cache_anonymous_page
 from users.forms import LoginForm
 
 
+@cache_anonymous_page
 def home(request):
     """
     Global homepage for LITRevu.
@@ -16,6 +23,7 @@ def home(request):
     - Handle login via custom LoginForm with 'Se souvenir de moi'.
     - Provide access to registration via link/button.
     - This view is intentionally project-level (not tied to a single feature app).
+    - Anonymous GETs are served from the page cache (see LITRevu.utils.page_cache).
     """
     if request.method == "POST":
         form = LoginForm(request=request, data=request.POST)
@@ -32,7 +40,9 @@ def home(request):
                 # Session ends when browser closes
                 request.session.set_expiry(0)
 
-            request.session.modified = True
+            # set_expiry() already marks the session as modified: it is saved once here,
+            # later requests only rewrite it when the expiry needs to slide
+            # (see users.middleware.SessionRefreshMiddleware).
             return redirect("reviews:feed")
 
         # Invalid credentials: redisplay form with errors
@@ -41,3 +51,28 @@ def home(request):
         form = LoginForm(request=request)
 
     return render(request, "home.html", {"form": form})
+
+
+def _can_read_metrics(request):
+    """Staff users, or a scraper presenting METRICS_TOKEN as a bearer token."""
+    if request.user.is_authenticated and request.user.is_staff:
+        return True
+    token = settings.METRICS_TOKEN
+    header = request.headers.get("Authorization", "")
+    return bool(token) and constant_time_compare(header, f"Bearer {token}")
+
+
+@never_cache
+def metrics(request):
+    """
+    Prometheus text exposition of LITRevu.perf.metrics.
+
+    Answers 404 (not 403) to everyone else, and when METRICS_MODE is "off",
+    so the endpoint is not advertised.
+    """
+    if not _can_read_metrics(request):
+        raise Http404
+    body = render_metrics()
+    if body is None:
+        raise Http404
+    return HttpResponse(body, content_type=CONTENT_TYPE)
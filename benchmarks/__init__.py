@@ -0,0 +1 @@
+"""Benchmarks for LITRevu (run with `python -m benchmarks.<name>`)."""
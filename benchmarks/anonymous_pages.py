@@ -0,0 +1,47 @@
+"""
+Anonymous homepage / registration throughput with and without the page cache.
+
+Usage:
+    python -m benchmarks.anonymous_pages [--requests 2000] [--warmup 50]
+"""
+
+import argparse
+
+from benchmarks.harness import benchmark_database, format_summary, setup_django, summarize, time_requests
+
+
+def run(requests, warmup):
+    """Benchmark each anonymous page with the cache off, then on."""
+    from django.core.cache import cache
+    from django.test import Client, override_settings
+    from django.urls import reverse
+
+    pages = {"home": reverse("home"), "users:register": reverse("users:register")}
+
+    for name, url in pages.items():
+        for label, timeout in (("cache off", 0), ("cache on", 300)):
+            cache.clear()
+            with override_settings(ANONYMOUS_PAGE_CACHE_TIMEOUT=timeout):
+                # A fresh client per request = a fresh anonymous visitor (no cookies)
+                def send():
+                    Client().get(url)
+
+                time_requests(send, warmup)
+                summary = summarize(time_requests(send, requests))
+            print(format_summary(f"{name} ({label})", summary))
+
+
+def main():
+    """Parse arguments and run the benchmark on a throwaway database."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=50)
+    args = parser.parse_args()
+
+    setup_django()
+    with benchmark_database():
+        run(args.requests, args.warmup)
+
+
+if __name__ == "__main__":
+    main()
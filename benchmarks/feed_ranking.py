@@ -0,0 +1,75 @@
+"""
+Ranked ("pertinence") feed latency as the history grows (reviews.feed).
+
+Each history length is seeded in its own throwaway database with the same
+users and follows and the same activity per day: only the number of days,
+hence of tickets and reviews, changes. The ranked page is timed for the
+user following the most accounts; its latency should stay flat, as the
+candidates come from a fixed window. The chronological page (which sorts
+the whole visible history) is timed for comparison unless --skip-recent.
+
+Usage:
+    python -m benchmarks.feed_ranking [--preset medium] [--days 90 365 1460] [--requests 50] [--warmup 5]
+"""
+
+import argparse
+
+from benchmarks.harness import (
+    benchmark_database,
+    busiest_user,
+    format_summary,
+    seed_dataset,
+    setup_django,
+    summarize,
+    time_requests,
+)
+
+
+def run(requests, warmup, skip_recent):
+    """Time the first page of the feed in each mode for the busiest user."""
+    from django.test import Client
+    from django.urls import reverse
+
+    from users.models import User
+
+    viewer = busiest_user()
+    client = Client()
+    client.force_login(viewer)
+    url = reverse("reviews:feed")
+    orders = [User.PERTINENCE] if skip_recent else [User.PERTINENCE, User.RECENT]
+
+    for order in orders:
+        # ?ordre= picks the mode of each request (read only), warm-up requests kept out of the timings
+        def send(order=order):
+            client.get(url, {"ordre": order})
+
+        time_requests(send, warmup)
+        label = f"  {order} ({viewer.following.count()} follows)"
+        print(format_summary(label, summarize(time_requests(send, requests))))
+
+
+def main():
+    """Parse arguments, then seed and measure each history length in a fresh database."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--preset", default="medium")
+    parser.add_argument("--days", type=int, nargs="+", default=[90, 365, 1460])
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--skip-recent", action="store_true", help="do not time the chronological feed")
+    args = parser.parse_args()
+
+    setup_django()
+    from reviews.seed import PRESETS
+
+    preset = PRESETS[args.preset]
+    for days in args.days:
+        # same number of tickets per day as the preset
+        tickets = preset.tickets * days // preset.days
+        print(f"\n{days} days of history")
+        with benchmark_database():
+            seed_dataset(args.preset, days=days, tickets=tickets)
+            run(args.requests, args.warmup, args.skip_recent)
+
+
+if __name__ == "__main__":
+    main()
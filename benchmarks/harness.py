@@ -0,0 +1,153 @@
+"""
+Shared setup for the benchmark scripts.
+
+Benchmarks run against a throwaway test database (never `db.sqlite3`) and
+drive the views in-process through Django's test client, so the numbers
+include the whole middleware stack but no network or gunicorn overhead.
+Datasets come from the presets of reviews.seed (small / medium / large), so
+every benchmark measures the same data as ``manage.py seed_litrevu``.
+"""
+
+import os
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def setup_django():
+    """Configure Django for a standalone script."""
+    if str(BASE_DIR) not in sys.path:
+        sys.path.insert(0, str(BASE_DIR))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "LITRevu.settings")
+
+    import django
+
+    django.setup()
+
+    from django.conf import settings
+
+    # The test client talks to "testserver"
+    if "testserver" not in settings.ALLOWED_HOSTS:
+        settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, "testserver"]
+
+
+@contextmanager
+def benchmark_database():
+    """Create the test database for the duration of the benchmark."""
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def seed_dataset(preset="small", **overrides):
+    """Insert a reviews.seed preset into the benchmark database and return the row counts."""
+    from reviews.seed import Seeder, get_config
+
+    started = time.perf_counter()
+    counts = Seeder(get_config(preset, **overrides)).run()
+    rows = ", ".join(f"{count:,} {label}" for label, count in counts.items())
+    print(f"Seeded preset {preset!r} in {time.perf_counter() - started:.1f} s: {rows}")
+    return counts
+
+
+def busiest_user():
+    """The seeded user following the most accounts (the heaviest feed)."""
+    from django.contrib.auth import get_user_model
+    from django.db.models import Count
+
+    User = get_user_model()
+    return User.objects.annotate(follows=Count("following")).order_by("-follows", "pk").first()
+
+
+def time_requests(send, count):
+    """Call `send()` `count` times and return per-call latencies in seconds."""
+    latencies = []
+    for _ in range(count):
+        started = time.perf_counter()
+        send()
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def summarize(latencies):
+    """Throughput and latency percentiles (milliseconds) for a list of timings."""
+    ordered = sorted(latencies)
+    total = sum(ordered)
+
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))] * 1000
+
+    return {
+        "requests": len(ordered),
+        "throughput_rps": len(ordered) / total if total else 0.0,
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": pct(50),
+        "p90_ms": pct(90),
+        "p99_ms": pct(99),
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def format_summary(label, summary):
+    """One aligned report line."""
+    return (
+        f"{label:<28} {summary['throughput_rps']:>9.1f} req/s   "
+        f"p50 {summary['p50_ms']:>7.2f} ms   p99 {summary['p99_ms']:>7.2f} ms   "
+        f"max {summary['max_ms']:>7.2f} ms"
+    )
+
+
+# Differences smaller than these are noise, whatever their relative size
+MIN_LATENCY_DELTA_MS = 0.5
+MIN_MEMORY_DELTA_KIB = 64
+
+
+def compare_results(current, baseline, tolerance=0.2):
+    """
+    Print `current` against `baseline` ({label: metrics}) and return the regressions.
+
+    A regression is: p50 / p99 latency, peak memory or rows fetched higher by
+    more than `tolerance` (relative), or any additional SQL query. Labels
+    missing from the baseline are skipped.
+    """
+    checks = (
+        ("p50_ms", tolerance, MIN_LATENCY_DELTA_MS),
+        ("p99_ms", tolerance, MIN_LATENCY_DELTA_MS),
+        ("peak_kib", tolerance, MIN_MEMORY_DELTA_KIB),
+        ("rows", tolerance, 0),
+        ("queries", 0, 0),
+    )
+    regressions = []
+    print(f"\n{'':<36} {'p50 ms':>16} {'p99 ms':>16} {'peak KiB':>16} {'rows':>16} {'queries':>10}")
+    for label, metrics in current.items():
+        before = baseline.get(label)
+        if before is None:
+            continue
+        cells, flagged = [], []
+        for key, allowed, floor in checks:
+            if key not in metrics or key not in before:
+                continue
+            old, new = before[key], metrics[key]
+            change = (new - old) / old if old else 0.0
+            cells.append(f"{new:>9.1f} {change * 100:>+5.0f}%" if key != "queries" else f"{old:>4} -> {new:<4}")
+            if new - old > floor and (new > old * (1 + allowed)):
+                flagged.append(key)
+        line = f"{label:<36} " + " ".join(cells)
+        if flagged:
+            line += f"   REGRESSION ({', '.join(flagged)})"
+            regressions.append((label, flagged))
+        print(line)
+    print(f"\n{len(regressions)} regression(s) against the baseline (tolerance {tolerance:.0%}).")
+    return regressions
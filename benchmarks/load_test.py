@@ -0,0 +1,493 @@
+"""
+Closed-loop HTTP load test of LITRevu under gunicorn.
+
+Unlike the in-process benchmarks, this exercises what only shows up with
+real processes: gunicorn workers, SQLite write locks, the shared session
+cache. The script
+1. prepares a throwaway DB_DIR (migrate, seed_litrevu --preset, collectstatic
+   when missing) and starts gunicorn with the Dockerfile's CMD (DEBUG off,
+   WEB_CONCURRENCY from --workers),
+2. logs in --users synthetic accounts through the home page (CSRF + session
+   cookies, like a browser),
+3. lets every virtual user run weighted scenarios back to back for
+   --duration seconds (closed loop: a user waits for its response, then
+   --think seconds, before its next request):
+   - browse: a feed page (the AJAX partial half of the time),
+   - ticket: open the ticket form and post a ticket,
+   - review: find an unanswered ticket in the feed and review it,
+   - follow: open the follows page, then follow or unfollow someone,
+4. reports throughput, latency percentiles and error rates per step, and the
+   exceptions logged by the server ("database is locked"...).
+
+Usage:
+    python -m benchmarks.load_test --users 20 --duration 60 --workers 3
+    python -m benchmarks.load_test --weights browse=50,ticket=20,review=20,follow=10
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 --preset small   # already running and seeded
+
+Only the standard library is used on the client side (asyncio streams).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import shlex
+import signal
+import subprocess
+import tempfile
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from http.cookies import SimpleCookie
+from pathlib import Path
+from urllib.parse import urlencode, urlsplit
+
+from benchmarks.harness import BASE_DIR, setup_django, summarize
+
+DEFAULT_WEIGHTS = {"browse": 70, "ticket": 10, "review": 10, "follow": 10}
+
+# Last line of the tracebacks the server logs, e.g. "django.db.utils.OperationalError: database is locked"
+EXCEPTION_LINE = re.compile(r"^([A-Za-z_][\w.]*(?:Error|Exception)): (.*)$", re.MULTILINE)
+REVIEW_LINK = re.compile(r'href="([^"]*/critique/creer/\d+/)"')
+UNFOLLOW_ACTION = re.compile(r'action="([^"]*/moi/follows/unfollow/\d+/)"')
+
+
+class HTTPError(Exception):
+    """A response the scenario did not expect (status code or content)."""
+
+
+class Client:
+    """Minimal HTTP/1.1 client with a cookie jar, one per virtual user."""
+
+    def __init__(self, base_url, timeout):
+        """Target http://host:port; `timeout` applies to each request."""
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self.cookies = {}
+        self._streams = None
+
+    async def request(self, method, path, data=None, headers=None):
+        """Send one request and return (status, headers, body); keeps the connection if allowed."""
+        return await asyncio.wait_for(self._request(method, path, data, headers or {}), self.timeout)
+
+    async def _request(self, method, path, data, headers):
+        body = urlencode(data).encode() if data is not None else b""
+        lines = [
+            f"{method} {path} HTTP/1.1",
+            f"Host: {self.host}:{self.port}",
+            "Connection: keep-alive",
+            f"Content-Length: {len(body)}",
+        ]
+        if data is not None:
+            lines.append("Content-Type: application/x-www-form-urlencoded")
+        if self.cookies:
+            lines.append("Cookie: " + "; ".join(f"{name}={value}" for name, value in self.cookies.items()))
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        payload = ("\r\n".join(lines) + "\r\n\r\n").encode() + body
+
+        if self._streams is None:
+            self._streams = await asyncio.open_connection(self.host, self.port)
+        reader, writer = self._streams
+        try:
+            writer.write(payload)
+            await writer.drain()
+            status, response_headers, content = await self._read_response(reader)
+        except BaseException:
+            self.close()
+            raise
+        if response_headers.get("connection", "").lower() == "close":
+            self.close()
+        for value in response_headers.get_all("set-cookie"):
+            for name, morsel in SimpleCookie(value).items():
+                self.cookies[name] = morsel.value
+        return status, response_headers, content
+
+    @staticmethod
+    async def _read_response(reader):
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("connection closed by the server")
+        status = int(status_line.split()[1])
+        headers = _Headers()
+        while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+            name, _, value = line.decode("latin-1").partition(":")
+            headers.add(name.strip().lower(), value.strip())
+        if "content-length" in headers:
+            content = await reader.readexactly(int(headers["content-length"]))
+        elif headers.get("transfer-encoding", "").lower() == "chunked":
+            content = b""
+            while size := int((await reader.readline()).split(b";")[0], 16):
+                content += await reader.readexactly(size)
+                await reader.readline()
+            await reader.readline()
+        else:
+            content = await reader.read()
+        return status, headers, content
+
+    def close(self):
+        """Drop the connection (the next request opens a new one)."""
+        if self._streams is not None:
+            self._streams[1].close()
+            self._streams = None
+
+
+class _Headers(dict):
+    """Lower-cased response headers; repeated ones (Set-Cookie) are all kept."""
+
+    def __init__(self):
+        super().__init__()
+        self.repeated = defaultdict(list)
+
+    def add(self, name, value):
+        self[name] = value
+        self.repeated[name].append(value)
+
+    def get_all(self, name):
+        return self.repeated.get(name, [])
+
+
+class Stats:
+    """Latencies and outcomes per step ("GET feed", "POST ticket"...)."""
+
+    def __init__(self):
+        """Empty tallies."""
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(Counter)
+
+    def record(self, step, latency, error=None):
+        """One request; `error` is a short label such as "HTTP 500" or "timeout"."""
+        self.latencies[step].append(latency)
+        if error:
+            self.errors[step][error] += 1
+
+    def report(self, duration):
+        """Per-step and total rows: throughput over `duration`, percentiles, error rate."""
+        rows = {}
+        for step in sorted(self.latencies):
+            summary = summarize(self.latencies[step])
+            errors = sum(self.errors[step].values())
+            rows[step] = {
+                **summary,
+                "throughput_rps": len(self.latencies[step]) / duration,
+                "errors": dict(self.errors[step]),
+                "error_rate": errors / len(self.latencies[step]),
+            }
+        return rows
+
+
+class VirtualUser:
+    """One logged-in account running scenarios in a closed loop."""
+
+    def __init__(self, client, username, password, urls, accounts, stats, rng):
+        """`accounts` are the usernames a follow may target."""
+        self.client = client
+        self.username = username
+        self.password = password
+        self.urls = urls
+        self.accounts = accounts
+        self.stats = stats
+        self.rng = rng
+
+    async def call(self, step, method, path, data=None, headers=None, expect=(200,)):
+        """Timed request; unexpected outcomes are recorded, then raised as HTTPError."""
+        started = time.perf_counter()
+        try:
+            status, response_headers, content = await self.client.request(method, path, data, headers)
+        except asyncio.TimeoutError:
+            self.stats.record(step, time.perf_counter() - started, "timeout")
+            raise HTTPError("timeout")
+        except OSError as exc:
+            self.stats.record(step, time.perf_counter() - started, type(exc).__name__)
+            raise HTTPError(str(exc))
+        latency = time.perf_counter() - started
+        if status not in expect:
+            # A POST answered 200 re-renders its form: the submission was rejected
+            rejected = method == "POST" and status == 200
+            self.stats.record(step, latency, "form rejected" if rejected else f"HTTP {status}")
+            raise HTTPError(f"{method} {path}: HTTP {status}")
+        self.stats.record(step, latency)
+        return status, response_headers, content.decode("utf-8", "replace")
+
+    def form_data(self, **fields):
+        """POST fields with the CSRF token (the cookie's secret is accepted as the form token)."""
+        return {"csrfmiddlewaretoken": self.client.cookies.get("csrftoken", ""), **fields}
+
+    async def login(self):
+        """GET then POST the home page, expecting the redirect to the feed."""
+        await self.call("GET home", "GET", self.urls["home"])
+        _, headers, _ = await self.call(
+            "POST home (login)",
+            "POST",
+            self.urls["home"],
+            self.form_data(username=self.username, password=self.password),
+            expect=(302,),
+        )
+        if not headers.get("location", "").endswith(self.urls["feed"]):
+            raise HTTPError(f"login of {self.username} failed")
+
+    async def browse(self):
+        """A feed page, mostly the first ones; the AJAX partial half of the time."""
+        page = 1 if self.rng.random() < 0.6 else self.rng.randint(2, 5)
+        if self.rng.random() < 0.5:
+            await self.call("GET feed (ajax)", "GET", f"{self.urls['feed']}?page={page}",
+                            headers={"X-Requested-With": "XMLHttpRequest"})
+        else:
+            await self.call("GET feed", "GET", f"{self.urls['feed']}?page={page}")
+
+    async def ticket(self):
+        """Open the ticket form and post a ticket."""
+        await self.call("GET create_ticket", "GET", self.urls["create_ticket"])
+        await self.call("POST create_ticket", "POST", self.urls["create_ticket"], self.form_data(
+            title=f"Charge {self.rng.randrange(10 ** 6)}",
+            author="Auteur de test",
+            description="Ticket créé par le test de charge.",
+        ), expect=(302,))
+
+    async def review(self):
+        """Review a ticket of the feed that has no review yet (only the feed visit when there is none)."""
+        _, _, html = await self.call("GET feed", "GET", self.urls["feed"])
+        links = REVIEW_LINK.findall(html)
+        if not links:
+            return
+        target = self.rng.choice(links)
+        await self.call("GET create_review", "GET", target)
+        await self.call("POST create_review", "POST", target, self.form_data(
+            headline="Critique de charge",
+            rating=self.rng.randint(0, 5),
+            body="Critique écrite par le test de charge.",
+        ), expect=(302,))
+
+    async def follow(self):
+        """Open the follows page, then unfollow someone (40%) or follow a random account."""
+        _, _, html = await self.call("GET my_follows", "GET", self.urls["my_follows"])
+        actions = UNFOLLOW_ACTION.findall(html)
+        if actions and self.rng.random() < 0.4:
+            await self.call("POST unfollow", "POST", self.rng.choice(actions), self.form_data(), expect=(302,))
+        else:
+            target = self.rng.choice(self.accounts)
+            await self.call("POST follow", "POST", self.urls["my_follows"], self.form_data(username=target),
+                            expect=(302,))
+
+    async def run(self, weights, deadline, think):
+        """Run scenarios until `deadline` (loop time)."""
+        loop = asyncio.get_running_loop()
+        names, values = zip(*weights.items())
+        while loop.time() < deadline:
+            scenario = self.rng.choices(names, values)[0]
+            try:
+                await getattr(self, scenario)()
+            except HTTPError:
+                pass
+            if think:
+                await asyncio.sleep(self.rng.expovariate(1 / think))
+
+
+# Server ---------------------------------------------------------------------
+
+def dockerfile_cmd():
+    """The argv of the Dockerfile's CMD (JSON form)."""
+    for line in reversed((BASE_DIR / "Dockerfile").read_text().splitlines()):
+        if line.startswith("CMD "):
+            return json.loads(line[4:])
+    raise RuntimeError("No CMD in the Dockerfile.")
+
+
+def prepare_database(preset, db_dir):
+    """Migrate and seed the throwaway DB_DIR in-process (same settings as the server)."""
+    from django.core.management import call_command
+
+    call_command("migrate", interactive=False, verbosity=0)
+    call_command("seed_litrevu", preset=preset, verbosity=1)
+    # DEBUG off serves hashed static names from the manifest, like the Docker image: always refresh it
+    # (incremental) so a manifest left by an earlier run cannot miss files added since
+    call_command("collectstatic", interactive=False, verbosity=0)
+
+
+@contextmanager
+def gunicorn_server(port, env, log_path):
+    """Run the Dockerfile CMD until the block exits; yields the base URL once it answers."""
+    command = dockerfile_cmd()
+    print(f"Starting: {shlex.join(command)} (PORT={port}, WEB_CONCURRENCY={env.get('WEB_CONCURRENCY', '-')})")
+    with open(log_path, "wb") as log:
+        process = subprocess.Popen(
+            command, cwd=BASE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT, start_new_session=True
+        )
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        asyncio.run(wait_until_up(base_url, process))
+        yield base_url
+    finally:
+        os.killpg(process.pid, signal.SIGTERM)
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            os.killpg(process.pid, signal.SIGKILL)
+
+
+async def wait_until_up(base_url, process, timeout=60):
+    """Poll the home page until the server answers."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("gunicorn exited during start-up (see its log).")
+        client = Client(base_url, timeout=5)
+        try:
+            status, _, _ = await client.request("GET", "/")
+            if status == 200:
+                return
+        except (OSError, asyncio.TimeoutError):
+            await asyncio.sleep(0.2)
+        finally:
+            client.close()
+    raise RuntimeError(f"{base_url} did not answer within {timeout} s.")
+
+
+def server_exceptions(log_path):
+    """Exceptions logged by the server, by "Type: message"."""
+    if not log_path or not Path(log_path).exists():
+        return Counter()
+    text = Path(log_path).read_text(errors="replace")
+    return Counter(f"{name}: {message[:120]}" for name, message in EXCEPTION_LINE.findall(text))
+
+
+# Load -----------------------------------------------------------------------
+
+async def run_load(base_url, args, usernames, accounts, urls):
+    """Log every virtual user in, then run the scenarios for the configured duration."""
+    from reviews.seed import SEED_PASSWORD
+
+    login_stats, stats = Stats(), Stats()
+    rng = random.Random(args.seed)
+    users = [
+        VirtualUser(Client(base_url, args.timeout), username, SEED_PASSWORD, urls, accounts, login_stats,
+                    random.Random(rng.random()))
+        for username in usernames
+    ]
+    logins = asyncio.Semaphore(args.login_concurrency)
+
+    async def login(user):
+        async with logins:
+            try:
+                await user.login()
+                return user
+            except HTTPError:
+                return None
+
+    started = time.perf_counter()
+    users = [user for user in await asyncio.gather(*(login(user) for user in users)) if user]
+    login_duration = time.perf_counter() - started
+    print(f"{len(users)}/{len(usernames)} users logged in in {login_duration:.1f} s")
+    if not users:
+        raise RuntimeError("No user could log in.")
+
+    for user in users:
+        user.stats = stats
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    await asyncio.gather(*(user.run(args.weights, loop.time() + args.duration, args.think) for user in users))
+    duration = time.perf_counter() - started
+    for user in users:
+        user.client.close()
+    return login_stats.report(login_duration), stats.report(duration), duration
+
+
+def print_report(rows, duration, title):
+    """Table of the per-step results and the totals."""
+    print(f"\n{title} ({duration:.1f} s)")
+    print(f"{'step':<22} {'requests':>9} {'req/s':>8} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'errors':>8}  detail")
+    total, failed = 0, 0
+    for step, row in rows.items():
+        errors = sum(row["errors"].values())
+        total += row["requests"]
+        failed += errors
+        detail = ", ".join(f"{label} x{count}" for label, count in row["errors"].items())
+        print(f"{step:<22} {row['requests']:>9} {row['throughput_rps']:>8.1f} {row['p50_ms']:>9.1f} "
+              f"{row['p90_ms']:>9.1f} {row['p99_ms']:>9.1f} {row['error_rate']:>7.1%}  {detail}")
+    if total:
+        print(f"{'total':<22} {total:>9} {total / duration:>8.1f} {'':>29} {failed / total:>7.1%}")
+
+
+def parse_weights(value):
+    """"browse=70,ticket=10" -> {"browse": 70, "ticket": 10}."""
+    weights = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip() not in DEFAULT_WEIGHTS:
+            raise argparse.ArgumentTypeError(f"unknown scenario {name!r} (choose from {', '.join(DEFAULT_WEIGHTS)})")
+        weights[name.strip()] = float(weight)
+    return weights
+
+
+def main():
+    """Parse arguments, start the server (unless --url), run the load and print the report."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=20, help="Concurrent virtual users (default: 20).")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of load after the logins.")
+    parser.add_argument("--think", type=float, default=0, help="Mean pause between two scenarios, in seconds.")
+    parser.add_argument("--weights", type=parse_weights, default=DEFAULT_WEIGHTS)
+    parser.add_argument("--preset", default="small", choices=("small", "medium", "large"))
+    parser.add_argument("--workers", type=int, default=None, help="gunicorn workers (WEB_CONCURRENCY).")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--url", default=None, help="Load an already running server, seeded with --preset.")
+    parser.add_argument("--timeout", type=float, default=30, help="Per-request timeout in seconds.")
+    parser.add_argument("--login-concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--save", default=None, help="Write the results to this JSON file.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="litrevu-load-") as db_dir:
+        if not args.url:
+            # Settings of the server (read by this process too, for migrate / seed)
+            os.environ.update({"DB_DIR": db_dir, "DJANGO_DEBUG": "0", "PORT": str(args.port)})
+            if args.workers:
+                os.environ["WEB_CONCURRENCY"] = str(args.workers)
+        setup_django()
+
+        from django.urls import reverse
+
+        from reviews.seed import PRESETS
+
+        urls = {name: reverse(route) for name, route in (
+            ("home", "home"), ("feed", "reviews:feed"), ("create_ticket", "reviews:create_ticket"),
+            ("my_follows", "users:my_follows"),
+        )}
+        accounts = [f"seed_{index:07d}" for index in range(1, PRESETS[args.preset].users + 1)]
+        usernames = random.Random(args.seed).sample(accounts, min(args.users, len(accounts)))
+
+        log_path = None
+        if args.url:
+            logins, rows, duration = asyncio.run(run_load(args.url, args, usernames, accounts, urls))
+        else:
+            prepare_database(args.preset, db_dir)
+            log_path = Path(db_dir) / "gunicorn.log"
+            with gunicorn_server(args.port, dict(os.environ), log_path) as base_url:
+                logins, rows, duration = asyncio.run(run_load(base_url, args, usernames, accounts, urls))
+
+        print_report(rows, duration, f"{len(usernames)} users, scenarios {args.weights}")
+        exceptions = server_exceptions(log_path)
+        if log_path:
+            locked = sum(count for line, count in exceptions.items() if "database is locked" in line)
+            print(f"\nServer exceptions: {sum(exceptions.values())} ({locked} 'database is locked')")
+            for line, count in exceptions.most_common(10):
+                print(f"  {count:>6}  {line}")
+
+        if args.save:
+            Path(args.save).write_text(json.dumps({
+                "users": len(usernames),
+                "duration_s": duration,
+                "weights": args.weights,
+                "preset": args.preset,
+                "workers": args.workers,
+                "logins": logins,
+                "steps": rows,
+                "server_exceptions": dict(exceptions),
+            }, indent=2))
+            print(f"Saved to {args.save}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Cost of recording Prometheus-style metrics (LITRevu.perf.metrics).
+
+Measures the raw recording call, a multiprocess snapshot flush, a scrape,
+then the authenticated feed with METRICS_MODE off / memory / multiprocess.
+
+Usage:
+    python -m benchmarks.metrics_overhead [--requests 500] [--calls 100000] [--preset small]
+"""
+
+import argparse
+import tempfile
+import time
+
+from benchmarks.harness import (
+    benchmark_database,
+    busiest_user,
+    format_summary,
+    seed_dataset,
+    setup_django,
+    summarize,
+    time_requests,
+)
+
+
+def per_call_us(func, calls):
+    """Mean duration of `func()` in microseconds."""
+    started = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+def run_micro(calls, metrics_dir):
+    """Recording, flushing and rendering costs, outside any request."""
+    from django.test import override_settings
+
+    from LITRevu.perf import metrics
+
+    views = [f"reviews:view{i}" for i in range(20)]
+    with override_settings(METRICS_MODE="multiprocess", METRICS_MULTIPROC_DIR=metrics_dir):
+        metrics.configure()
+        metrics.REGISTRY.reset()
+        i = iter(range(10 ** 9))
+
+        def record():
+            metrics.record_request(views[next(i) % 20], "GET", 200, 0.012, 5, 0.002)
+
+        print(f"{'record_request()':<28} {per_call_us(record, calls):>9.2f} us/call")
+        flush_us = per_call_us(lambda: metrics._store.flush(force=True), max(calls // 100, 10))
+        print(f"{'snapshot flush (20 views)':<28} {flush_us:>9.2f} us/call")
+        render_us = per_call_us(metrics.render_metrics, max(calls // 1000, 10))
+        print(f"{'scrape (20 views)':<28} {render_us:>9.2f} us/call")
+    metrics.configure("off")
+
+
+def run_requests(requests, metrics_dir):
+    """Feed latency with the middleware unloaded, in memory and in multiprocess mode."""
+    from django.test import Client, override_settings
+    from django.urls import reverse
+
+    from LITRevu.perf import metrics
+
+    viewer = busiest_user()
+    url = reverse("reviews:feed")
+    for mode in ("off", "memory", "multiprocess"):
+        with override_settings(METRICS_MODE=mode, METRICS_MULTIPROC_DIR=metrics_dir):
+            # A new client builds a new handler, so the middleware is (un)loaded for `mode`
+            client = Client()
+            client.force_login(viewer)
+            time_requests(lambda: client.get(url), 50)
+            summary = summarize(time_requests(lambda: client.get(url), requests))
+        print(format_summary(f"feed (metrics {mode})", summary))
+    metrics.configure("off")
+
+
+def main():
+    """Parse arguments and run the benchmark on a throwaway database."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--calls", type=int, default=100_000)
+    parser.add_argument("--preset", default="small", choices=("small", "medium", "large"))
+    args = parser.parse_args()
+
+    setup_django()
+    with tempfile.TemporaryDirectory() as metrics_dir, benchmark_database():
+        seed_dataset(args.preset)
+        run_micro(args.calls, metrics_dir)
+        run_requests(args.requests, metrics_dir)
+
+
+if __name__ == "__main__":
+    main()
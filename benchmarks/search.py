@@ -0,0 +1,101 @@
+"""
+Full-text search latency (reviews.search) on a seeded dataset.
+
+The default dataset is the medium preset grown to 450k tickets, which
+with their reviews is about 1M indexed documents. The seed draws every
+title and body from a 30-word vocabulary, so a single common word matches
+a large share of the index: the worst case for bm25 ranking. Queries run
+for the user following the most accounts (the most visible documents) and
+for a user with the median number of follows.
+
+Usage:
+    python -m benchmarks.search [--preset medium] [--tickets 450000] [--requests 200] [--warmup 10]
+"""
+
+import argparse
+
+from benchmarks.harness import (
+    benchmark_database,
+    busiest_user,
+    format_summary,
+    seed_dataset,
+    setup_django,
+    summarize,
+    time_requests,
+)
+
+# label -> (query, pages to walk)
+QUERIES = {
+    "common word": ("roman", 1),
+    "two words": ("roman nuit", 1),
+    "three words": ("silence hiver exil", 1),
+    "prefix": ("philo", 1),
+    "author": ("modiano", 1),
+    "common word, page 10": ("roman", 10),
+    "no match": ("zzzz", 1),
+}
+
+
+def median_user():
+    """A user following the median number of accounts."""
+    from django.contrib.auth import get_user_model
+    from django.db.models import Count
+
+    users = get_user_model().objects.annotate(follows=Count("following")).order_by("follows", "pk")
+    return users[users.count() // 2]
+
+
+def run(requests, warmup):
+    """Time each query for the busiest and a typical user, through search() and through the view."""
+    from django.db import connection
+    from django.test import Client
+    from django.urls import reverse
+
+    from reviews.search import optimize_index, search
+
+    optimize_index()
+    with connection.cursor() as db:
+        db.execute("SELECT count(*) FROM reviews_search")
+        print(f"{db.fetchone()[0]:,} indexed documents")
+
+    for role, viewer in (("busiest", busiest_user()), ("median", median_user())):
+        print(f"\n{role} user ({viewer.following.count()} follows)")
+        for label, (text, pages) in QUERIES.items():
+            cursor = None
+            for _ in range(pages - 1):
+                cursor = search(viewer, text, cursor=cursor).next_cursor
+
+            def send(cursor=cursor, text=text):
+                search(viewer, text, cursor=cursor)
+
+            time_requests(send, warmup)
+            print(format_summary(label, summarize(time_requests(send, requests))))
+
+        client = Client()
+        client.force_login(viewer)
+        url = reverse("reviews:search")
+
+        def view():
+            client.get(url, {"q": "roman"})
+
+        time_requests(view, warmup)
+        print(format_summary("view, common word", summarize(time_requests(view, requests))))
+
+
+def main():
+    """Parse arguments, seed a throwaway database and run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--preset", default="medium")
+    parser.add_argument("--tickets", type=int, default=450_000)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    args = parser.parse_args()
+
+    setup_django()
+    with benchmark_database():
+        seed_dataset(args.preset, tickets=args.tickets)
+        run(args.requests, args.warmup)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Latency, query count and peak memory of the reading views, per dataset size.
+
+For each preset of reviews.seed (small, medium, ... ) the throwaway database
+is seeded, then every scenario is requested through the test client:
+- the feed (page 1, a deep page, the AJAX partial) as the user following
+  the most accounts,
+- my_posts (page 1 and the AJAX partial) as the user with the most posts,
+- my_follows as the user following the most accounts.
+
+Each scenario reports its latency distribution (timed requests after a
+warm-up), the SQL queries it runs and the rows they fetch, and the peak
+traced memory of one request. Results are written as JSON; with --baseline a previous file is
+compared and regressions are flagged (exit status 1), so a change to the
+feed pipeline can be measured before / after:
+
+    python -m benchmarks.views_suite --presets small medium --save before.json
+    (apply the change)
+    python -m benchmarks.views_suite --presets small medium --baseline before.json
+"""
+
+import argparse
+import json
+import platform
+import sqlite3
+import sys
+from pathlib import Path
+
+from benchmarks.harness import (
+    benchmark_database,
+    busiest_user,
+    compare_results,
+    format_summary,
+    seed_dataset,
+    setup_django,
+    summarize,
+    time_requests,
+)
+
+AJAX = {"HTTP_X_REQUESTED_WITH": "XMLHttpRequest"}
+
+
+def scenarios():
+    """(name, URL name, page, extra headers, user kind) of every measured request."""
+    return [
+        ("feed", "reviews:feed", 1, {}, "follower"),
+        ("feed page=20", "reviews:feed", 20, {}, "follower"),
+        ("feed ajax page=2", "reviews:feed", 2, AJAX, "follower"),
+        ("my_posts", "users:my_posts", 1, {}, "author"),
+        ("my_posts ajax page=2", "users:my_posts", 2, AJAX, "author"),
+        ("my_follows", "users:my_follows", 1, {}, "follower"),
+    ]
+
+
+def most_prolific_user():
+    """The user with the most tickets (the heaviest my_posts)."""
+    from django.contrib.auth import get_user_model
+    from django.db.models import Count
+
+    User = get_user_model()
+    return User.objects.annotate(posts=Count("tickets")).order_by("-posts", "pk").first()
+
+
+def measure(client, url, headers, requests, warmup):
+    """Latency summary, SQL queries and rows fetched, peak memory (KiB) of one URL."""
+    from LITRevu.perf.budgets import record_queries
+    from LITRevu.perf.memory import AllocationTracker
+
+    def send():
+        response = client.get(url, **headers)
+        if response.status_code != 200:
+            raise RuntimeError(f"{url} answered {response.status_code}")
+
+    time_requests(send, warmup)
+    summary = summarize(time_requests(send, requests))
+
+    with record_queries() as log:
+        send()
+    tracker = AllocationTracker(top=0).start()
+    try:
+        send()
+    finally:
+        report = tracker.stop()
+    return {
+        **summary,
+        "queries": len(log.queries),
+        "rows": log.total_rows,
+        "peak_kib": round(report.peak / 1024, 1),
+    }
+
+
+def run_preset(preset, requests, warmup):
+    """Seed one preset and measure every scenario on it."""
+    from django.test import Client, override_settings
+    from django.urls import reverse
+
+    from reviews.seed import delete_seeded
+
+    counts = seed_dataset(preset)
+    users = {"follower": busiest_user(), "author": most_prolific_user()}
+    results = {}
+    # The per-request tracker would reset the peak measured here
+    with override_settings(MEMORY_TRACKING_VIEWS=[]):
+        clients = {}
+        for kind, user in users.items():
+            clients[kind] = Client()
+            clients[kind].force_login(user)
+        for name, url_name, page, headers, kind in scenarios():
+            url = f"{reverse(url_name)}?page={page}"
+            results[name] = measure(clients[kind], url, headers, requests, warmup)
+            metrics = results[name]
+            print(f"{format_summary(f'{preset} {name}', metrics)}   {metrics['queries']:>3} queries "
+                  f"{metrics['rows']:>7} rows   {metrics['peak_kib']:>9.1f} KiB peak")
+    delete_seeded()
+    return {"dataset": counts, "scenarios": results}
+
+
+def flatten(results):
+    """{"<preset> <scenario>": metrics} for compare_results()."""
+    return {
+        f"{preset} {name}": metrics
+        for preset, data in results["presets"].items()
+        for name, metrics in data["scenarios"].items()
+    }
+
+
+def environment():
+    """What the numbers were measured on."""
+    import django
+
+    return {
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "machine": platform.machine(),
+    }
+
+
+def main():
+    """Parse arguments, run the suite on a throwaway database, save / compare the results."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--presets", nargs="+", default=["small", "medium"], choices=("small", "medium", "large"))
+    parser.add_argument("--requests", type=int, default=50, help="Timed requests per scenario.")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--save", default=None, help="Write the results to this JSON file.")
+    parser.add_argument("--baseline", default=None, help="JSON file written by --save to compare with.")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Relative slowdown (p50, p99) or memory growth flagged as a regression (default: 0.2).",
+    )
+    args = parser.parse_args()
+    baseline = json.loads(Path(args.baseline).read_text()) if args.baseline else None
+
+    setup_django()
+    with benchmark_database():
+        results = {
+            "environment": environment(),
+            "presets": {preset: run_preset(preset, args.requests, args.warmup) for preset in args.presets},
+        }
+
+    if args.save:
+        Path(args.save).write_text(json.dumps(results, indent=2))
+        print(f"Saved to {args.save}")
+    if baseline:
+        regressions = compare_results(flatten(results), flatten(baseline), args.tolerance)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
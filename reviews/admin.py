@@ -1,21 +1,123 @@
-"""Register Ticket and Review models in the Django admin."""
+"""Register Book, Ticket, Review and RequestProfile models in the Django admin."""
 
 from django.contrib import admin
+from django.db.models.expressions import RawSQL
+from django.http import FileResponse, Http404
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html
 
-from .models import Review, Ticket
+from LITRevu.perf.profiling import delete_profiles
+
+from .models import Book, RequestProfile, Review, Ticket
+from .search import matching_ids_sql
+
+
+class FullTextSearchMixin:
+    """
+    Search the text columns through the FTS5 index (reviews.search) instead of LIKE scans.
+
+    `search_fields` keeps only the non-indexed lookups (the username); rows
+    matching either the index or those lookups are listed.
+    """
+
+    search_kind: str = ""
+
+    def get_search_results(self, request, queryset, search_term):
+        """Rows matching `search_fields`, or whose indexed text matches `search_term`."""
+        matches, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        indexed = matching_ids_sql(search_term, self.search_kind)
+        if indexed is not None:
+            matches |= queryset.filter(pk__in=RawSQL(*indexed))
+        return matches, may_have_duplicates
+
+
+@admin.register(Book)
+class BookAdmin(admin.ModelAdmin):
+    """Book class in Admin panel (searched on the normalized key, a prefix of the unique index)."""
+
+    list_display = ("title", "author", "key", "time_created")
+    search_fields = ("^key",)
+    readonly_fields = ("key",)
 
 
 @admin.register(Ticket)
-class TicketAdmin(admin.ModelAdmin):
+class TicketAdmin(FullTextSearchMixin, admin.ModelAdmin):
     """Ticket class in Admin panel."""
 
-    list_display = ("title", "user", "time_created")
-    search_fields = ("title", "description", "user__username")
+    list_display = ("title", "user", "review_count", "time_created")
+    search_fields = ("user__username",)
+    search_kind = "ticket"
+    raw_id_fields = ("book",)
 
 
 @admin.register(Review)
-class ReviewAdmin(admin.ModelAdmin):
+class ReviewAdmin(FullTextSearchMixin, admin.ModelAdmin):
     """Review class in Admin panel."""
 
     list_display = ("headline", "rating", "user", "ticket", "time_created")
-    search_fields = ("headline", "body", "user__username")
+    search_fields = ("user__username",)
+    search_kind = "review"
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    """Read-only list of on-demand request profiles (see LITRevu.perf.profiling)."""
+
+    list_display = ("time_created", "method", "path", "view_name", "duration_ms", "status_code", "user")
+    list_filter = ("view_name", "method")
+    search_fields = ("path", "view_name", "user__username")
+    fields = (
+        "time_created", "user", "method", "path", "view_name", "status_code", "duration_ms",
+        "pstats_download", "summary_display",
+    )
+    readonly_fields = fields
+
+    def has_add_permission(self, request):
+        """Profiles are only created by the middleware."""
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        """Captures are immutable."""
+        return False
+
+    @admin.display(description="pstats")
+    def pstats_download(self, obj):
+        """Link to the raw stats file (served through the admin, never from MEDIA)."""
+        url = reverse("admin:reviews_requestprofile_pstats", args=[obj.pk])
+        return format_html('<a href="{}">{}</a>', url, obj.pstats_file.name)
+
+    @admin.display(description="Résumé")
+    def summary_display(self, obj):
+        """Call tree and top functions, monospaced."""
+        return format_html('<pre style="white-space: pre; overflow-x: auto;">{}</pre>', obj.summary)
+
+    def get_urls(self):
+        """Add the pstats download view."""
+        urls = [
+            path(
+                "<int:pk>/pstats/",
+                self.admin_site.admin_view(self.pstats_view),
+                name="reviews_requestprofile_pstats",
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def pstats_view(self, request, pk):
+        """Serve a pstats file to users allowed to view profiles."""
+        if not self.has_view_permission(request):
+            raise Http404
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        return FileResponse(
+            profile.pstats_file.open("rb"),
+            as_attachment=True,
+            filename=profile.pstats_file.name.rsplit("/", 1)[-1],
+        )
+
+    def delete_model(self, request, obj):
+        """Remove the pstats file with the row."""
+        delete_profiles(RequestProfile.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        """Bulk action: remove the pstats files with the rows."""
+        delete_profiles(queryset)
@@ -0,0 +1,143 @@
+"""
+Monthly archive of a user's posts ("Mes posts").
+
+MonthlyPostCount holds, per user and month, how many tickets and reviews
+they wrote. The sidebar of "Mes posts" reads the user's rows (a seek on the
+(user, month) unique index, one row per month) and opening a month is a
+range seek on the (user, time_created) indexes bounded by month_range(),
+whose page count comes from the same row: its cost does not depend on how
+old the month is nor on how many posts came after it.
+
+Counters follow every ticket / review created or deleted through the ORM
+(reviews.signals), with one UPDATE using F() in the same transaction as the
+write; the first post of a month inserts the row first. The reviews
+deleted with their ticket are uncounted together (uncount_reviews_of).
+Writes that bypass signals (bulk_create, QuerySet.update / delete, raw SQL,
+reviews.seed) must be followed by rebuild() (``manage.py
+rebuild_post_archive``).
+
+Months are calendar months of the current time zone, computed by
+month_of() on writes and by TruncMonth in rebuild().
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from datetime import MAXYEAR, date, datetime, time
+from typing import Iterable
+
+from django.db import transaction
+from django.db.models import Count, DateField, Exists, F, OuterRef, QuerySet, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest, TruncMonth
+from django.utils import timezone
+
+from .feed import REVIEW, TICKET
+from .models import MONTH_NAMES, MonthlyPostCount, Review, Ticket
+
+COUNT_FIELDS = {Ticket: "ticket_count", Review: "review_count"}
+
+
+def month_of(moment: datetime) -> date:
+    """First day of the month of `moment` in the current time zone."""
+    return timezone.localtime(moment).date().replace(day=1)
+
+
+def month_range(month: date) -> tuple[datetime, datetime]:
+    """[start, end) of `month` as aware datetimes, for the time_created range seek."""
+    following = date(month.year + month.month // 12, month.month % 12 + 1, 1)
+    return tuple(timezone.make_aware(datetime.combine(day, time.min)) for day in (month, following))
+
+
+def month_label(month: date) -> str:
+    """"Mars 2025"."""
+    return f"{MONTH_NAMES[month.month - 1]} {month.year}"
+
+
+def parse_month(value: str | None) -> date | None:
+    """The month of a ``YYYY-MM`` query parameter, None when absent, malformed or without a month_range()."""
+    try:
+        month = datetime.strptime(value or "", "%Y-%m").date()
+    except ValueError:
+        return None
+    # December of the last year has no following month to end its range
+    return None if (month.year, month.month) == (MAXYEAR, 12) else month
+
+
+def apply_post_change(post: Ticket | Review, delta: int) -> None:
+    """Add `delta` (1 or -1) to the month of `post` in its author's archive."""
+    field = COUNT_FIELDS[type(post)]
+    rows = MonthlyPostCount.objects.filter(user_id=post.user_id, month=month_of(post.time_created))
+    # decrements stop at 0 so a month that already drifted cannot break a delete
+    change = {field: F(field) + delta if delta > 0 else Greatest(F(field) + delta, Value(0))}
+    if rows.update(**change) or delta < 0:
+        return
+    # first post of the month: create the row (a concurrent writer may win), then count
+    MonthlyPostCount.objects.bulk_create(
+        [MonthlyPostCount(user_id=post.user_id, month=month_of(post.time_created))], ignore_conflicts=True
+    )
+    rows.update(**change)
+
+
+def uncount_reviews_of(ticket_id: int) -> None:
+    """Remove the reviews of a ticket about to be deleted from their authors' archives, in one UPDATE."""
+    reviews = Review.objects.filter(ticket_id=ticket_id).order_by()
+    same_month = reviews.filter(user_id=OuterRef("user_id")).annotate(
+        written=TruncMonth("time_created", output_field=DateField())
+    ).filter(written=OuterRef("month"))
+    gone = same_month.values("ticket_id").annotate(posts=Count("pk")).values("posts")
+    MonthlyPostCount.objects.filter(user_id__in=reviews.values("user_id")).filter(Exists(same_month)).update(
+        review_count=Greatest(F("review_count") - Coalesce(Subquery(gone), Value(0)), Value(0))
+    )
+
+
+def uncount_posts(tickets: Iterable[tuple[int, datetime]], reviews: Iterable[tuple[int, datetime]]) -> None:
+    """Remove deleted posts, given as (author id, time_created), from the archive: one UPDATE per month touched."""
+    removed: dict[tuple[int, date], Counter] = {}
+    for field, posts in (("ticket_count", tickets), ("review_count", reviews)):
+        for user_id, moment in posts:
+            removed.setdefault((user_id, month_of(moment)), Counter())[field] += 1
+    for (user_id, month), fields in removed.items():
+        MonthlyPostCount.objects.filter(user_id=user_id, month=month).update(
+            **{field: Greatest(F(field) - count, Value(0)) for field, count in fields.items()}
+        )
+
+
+def months(user) -> QuerySet:
+    """The archive rows of `user` with at least one post, most recent month first."""
+    return (
+        MonthlyPostCount.objects.filter(user=user)
+        .exclude(ticket_count=0, review_count=0)
+        .order_by("-month")
+    )
+
+
+def posts_in(row: MonthlyPostCount | None, kind: int | None = None) -> int:
+    """Posts of an archive row (None: a month without any), of one kind (TICKET / REVIEW) or both."""
+    if row is None:
+        return 0
+    return {TICKET: row.ticket_count, REVIEW: row.review_count}.get(kind, row.total)
+
+
+def rebuild(users: QuerySet | None = None, batch_size: int = 1000) -> int:
+    """Recompute the archive of `users` (every user when None) from their posts; returns the number of rows."""
+    counts: dict[tuple[int, date], dict[str, int]] = {}
+    for model, field in COUNT_FIELDS.items():
+        posts = model.objects.all() if users is None else model.objects.filter(user__in=users)
+        per_month = (
+            posts.order_by()
+            .annotate(month=TruncMonth("time_created", output_field=DateField()))
+            .values("user_id", "month")
+            .annotate(posts=Count("pk"))
+            .values_list("user_id", "month", "posts")
+        )
+        for user_id, month, posts in per_month.iterator(chunk_size=batch_size):
+            counts.setdefault((user_id, month), {})[field] = posts
+
+    with transaction.atomic():
+        stale = MonthlyPostCount.objects.all() if users is None else MonthlyPostCount.objects.filter(user__in=users)
+        stale.delete()
+        MonthlyPostCount.objects.bulk_create(
+            (MonthlyPostCount(user_id=user_id, month=month, **fields) for (user_id, month), fields in counts.items()),
+            batch_size=batch_size,
+        )
+    return len(counts)
@@ -0,0 +1,74 @@
+"""
+Canonical books: every ticket about the same title and author shares one Book.
+
+The key is the title and the author transliterated to ASCII by Unidecode
+(accents, ligatures, other scripts: "L'Élégance du hérisson" and "l'elegance
+du herisson" are the same book), lower-cased, with every run of other
+characters collapsed to one space. Matching is exact on that key, so
+attaching a ticket is one lookup on the unique index, never a fuzzy scan;
+"Dune" with and without an author remain two books.
+
+Ticket.save() attaches single tickets (see Book.resolve); assign_books()
+attaches tickets in bulk, for the backfill migration and for writes that
+bypass save() (bulk_create in reviews.seed).
+"""
+
+from __future__ import annotations
+
+import re
+
+from django.db import connections
+from django.db.models import QuerySet
+from unidecode import unidecode
+
+KEY_LENGTH = 255
+BATCH_SIZE = 1000
+
+_NOT_ALPHANUMERIC = re.compile(r"[^a-z0-9]+")
+
+
+def normalize(text: str | None) -> str:
+    """ASCII, lower-case words separated by single spaces."""
+    return _NOT_ALPHANUMERIC.sub(" ", unidecode(text or "").lower()).strip()
+
+
+def book_key(title: str, author: str | None) -> str:
+    """Unique key of the book a ticket is about: "<title>|<author>", normalized."""
+    return f"{normalize(title)}|{normalize(author)}"[:KEY_LENGTH]
+
+
+def assign_books(tickets: QuerySet, batch_size: int = BATCH_SIZE) -> int:
+    """
+    Attach the tickets of `tickets` that have no book yet; returns how many.
+
+    Works on historical models too (migrations): the Book model is the
+    ``book`` field's target. Per batch of ticket ids: one SELECT of the
+    tickets, one INSERT of the missing books (conflicts ignored, so a
+    concurrent save cannot fail it), one SELECT of the books' ids and one
+    executemany UPDATE.
+    """
+    Ticket = tickets.model
+    Book = Ticket._meta.get_field("book").related_model
+    books = Book._default_manager.using(tickets.db)
+    update = f"UPDATE {Ticket._meta.db_table} SET book_id = %s WHERE {Ticket._meta.pk.column} = %s"
+
+    pending = tickets.filter(book__isnull=True).order_by("pk")
+    assigned, last = 0, 0
+    while True:
+        batch = list(pending.filter(pk__gt=last).values_list("pk", "title", "author")[:batch_size])
+        if not batch:
+            return assigned
+        last = batch[-1][0]
+
+        keys, first_seen = {}, {}
+        for pk, title, author in batch:
+            keys[pk] = key = book_key(title, author)
+            first_seen.setdefault(key, (title.strip(), (author or "").strip()))
+        books.bulk_create(
+            [Book(key=key, title=title, author=author) for key, (title, author) in first_seen.items()],
+            ignore_conflicts=True,
+        )
+        book_ids = dict(books.filter(key__in=list(first_seen)).values_list("key", "pk"))
+        with connections[tickets.db].cursor() as cursor:
+            cursor.executemany(update, [(book_ids[key], pk) for pk, key in keys.items()])
+        assigned += len(batch)
@@ -0,0 +1,134 @@
+"""
+Batch deletion of a user's posts ("Mes posts").
+
+delete_posts() removes a selection of the user's tickets and reviews with
+set-based statements instead of one ORM delete() per post, whose collector
+loads every row and sends a signal per review:
+
+- ownership: one UNION ALL query over the selected ids; a selection with a
+  post of someone else (or already deleted) is refused as a whole;
+- in one transaction: the reviews deleted (the selected ones and the answers
+  to the selected tickets) are read once, logged to ReviewChange in one
+  INSERT and deleted in one DELETE, then the tickets' recommendation and
+  leaderboard rows and the tickets themselves; the side effects the signals
+  would have had follow in bulk (reviews.ticket_stats.reconcile() for the
+  tickets that keep reviews, reviews.archive.uncount_posts());
+- once committed, the tickets' images no other ticket uses are removed from
+  the storage (seeded tickets share theirs).
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import partial
+
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.db.models import F, Q, Value
+
+from .archive import uncount_posts
+from .feed import REVIEW, TICKET
+from .models import LeaderboardEntry, RecommendedTicket, Review, ReviewChange, Ticket
+from .ticket_stats import reconcile
+
+MAX_POSTS = 200
+
+
+class NotOwned(Exception):
+    """A selected post does not exist or belongs to someone else."""
+
+
+@dataclass
+class DeletedPosts:
+    """What delete_posts() removed: the selected posts and the others' reviews of the selected tickets."""
+
+    tickets: int = 0
+    reviews: int = 0
+    answers: int = 0
+
+    def message(self) -> str:
+        """Toast text, e.g. "2 tickets et 1 critique supprimés"."""
+        parts = [
+            f"{count} {label}{'s' if count > 1 else ''}"
+            for count, label in ((self.tickets, "ticket"), (self.reviews, "critique"))
+            if count
+        ]
+        text = f"{' et '.join(parts)} supprimé{'s' if self.tickets + self.reviews > 1 else ''}"
+        if self.answers:
+            text += f" (avec {self.answers} réponse{'s' if self.answers > 1 else ''} à vos tickets)"
+        return text + "."
+
+
+def owned_posts(user, ticket_ids: list[int], review_ids: list[int]) -> list[tuple[int, int, object, str]]:
+    """(kind, pk, time_created, image) of the selected posts `user` owns, in one query."""
+    tickets = (
+        Ticket.objects.filter(user=user, pk__in=ticket_ids).order_by()
+        .annotate(kind=Value(TICKET), file=F("image"))
+        .values_list("kind", "pk", "time_created", "file")
+    )
+    reviews = (
+        Review.objects.filter(user=user, pk__in=review_ids).order_by()
+        .annotate(kind=Value(REVIEW), file=Value(""))
+        .values_list("kind", "pk", "time_created", "file")
+    )
+    return list(tickets.union(reviews, all=True))
+
+
+def delete_posts(user, ticket_ids, review_ids) -> DeletedPosts:
+    """Delete the selected tickets and reviews of `user`; NotOwned (nothing deleted) if one is not theirs."""
+    ticket_ids, review_ids = sorted(set(ticket_ids)), sorted(set(review_ids))
+    with transaction.atomic():
+        owned = owned_posts(user, ticket_ids, review_ids)
+        if len(owned) != len(ticket_ids) + len(review_ids):
+            raise NotOwned
+
+        tickets = [row for row in owned if row[0] == TICKET]
+        doomed = Review.objects.filter(Q(pk__in=review_ids) | Q(ticket_id__in=ticket_ids))
+        reviews = list(doomed.values_list("pk", "user_id", "ticket_id", "rating", "time_created"))
+
+        ReviewChange.objects.bulk_create(
+            ReviewChange(ticket_id=ticket_id, user_id=user_id, previous_rating=rating)
+            for _, user_id, ticket_id, rating, _ in reviews
+        )
+        # QuerySet.delete() would collect and signal review by review: the effects are applied below
+        _delete_rows(Review, {"id": review_ids, "ticket_id": ticket_ids})
+        if ticket_ids:
+            RecommendedTicket.objects.filter(ticket_id__in=ticket_ids).delete()
+            LeaderboardEntry.objects.filter(ticket_id__in=ticket_ids).delete()
+            _delete_rows(Ticket, {"id": ticket_ids})
+
+        answered = {ticket_id for _, _, ticket_id, _, _ in reviews} - set(ticket_ids)
+        if answered:
+            reconcile(Ticket.objects.filter(pk__in=answered))
+        uncount_posts(
+            [(user.pk, row[2]) for row in tickets],
+            [(user_id, moment) for _, user_id, _, _, moment in reviews],
+        )
+        images = [row[3] for row in tickets if row[3]]
+        if images:
+            transaction.on_commit(partial(release_images, images))
+
+    return DeletedPosts(
+        tickets=len(tickets), reviews=len(review_ids), answers=len(reviews) - len(review_ids)
+    )
+
+
+def _delete_rows(model, ids_by_column: dict[str, list[int]]) -> None:
+    """One DELETE of the rows of `model` matching any of the columns' ids (as in reviews.seed.delete_seeded)."""
+    quote = connection.ops.quote_name
+    clauses, params = [], []
+    for column, ids in ids_by_column.items():
+        if ids:
+            clauses.append(f"{quote(column)} IN ({', '.join(['%s'] * len(ids))})")
+            params.extend(ids)
+    if not clauses:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {quote(model._meta.db_table)} WHERE {' OR '.join(clauses)}", params)
+
+
+def release_images(names: list[str]) -> None:
+    """Remove the image files no remaining ticket uses (one query, then the storage calls)."""
+    in_use = set(Ticket.objects.filter(image__in=names).values_list("image", flat=True))
+    for name in set(names) - in_use:
+        default_storage.delete(name)
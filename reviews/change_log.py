@@ -0,0 +1,44 @@
+"""
+Pruning of the ReviewChange log.
+
+The log is only read above the watermarks of its consumers: the saved
+recommendation model (reviews.recommendations) and each leaderboard
+(reviews.leaderboards). The rows at or below the smallest of them have
+been processed by every consumer, so prune() deletes them; the
+build_recommendations and build_leaderboards commands run it after their
+refresh, which keeps the table (and the consumers' range scans) bounded by
+what changed since the slowest job last ran.
+
+A consumer that never ran counts as watermark 0 and holds the whole log
+back, so that a first full build in progress never loses the changes it
+will look for on its next run.
+"""
+
+from __future__ import annotations
+
+from django.db.models import Min
+
+from .models import Leaderboard, ReviewChange
+from .recommendations import ItemModel
+
+
+def watermarks() -> dict[str, int]:
+    """{consumer: last ReviewChange id it processed}, 0 for a consumer that never ran."""
+    boards = dict(Leaderboard.objects.values_list("name", "watermark"))
+    return {
+        "recommendations": ItemModel.saved_watermark() or 0,
+        **{f"leaderboard {name}": boards.get(name, 0) for name, _ in Leaderboard.NAMES},
+    }
+
+
+def prune(batch_size: int = 10_000) -> int:
+    """Delete the changes every consumer has processed, `batch_size` ids per DELETE; the number deleted."""
+    limit = min(watermarks().values())
+    first = ReviewChange.objects.filter(pk__lte=limit).aggregate(first=Min("pk"))["first"]
+    if first is None:
+        return 0
+    deleted = 0
+    for start in range(first, limit + 1, batch_size):
+        end = min(start + batch_size - 1, limit)
+        deleted += ReviewChange.objects.filter(pk__gte=start, pk__lte=end).delete()[0]
+    return deleted
@@ -0,0 +1,148 @@
+"""
+Streaming data export: a user's (or the whole site's) tickets, reviews and follows.
+
+Used by the "Exporter mes données" view (users.views.export_data, a
+StreamingHttpResponse) and ``manage.py export_data``. Rows are read with
+QuerySet.iterator(chunk_size=...) as plain value tuples (no model instances)
+in primary key order, and written out CHUNK_SIZE rows at a time, so memory
+stays flat whatever the size of the export. gzipped() compresses the stream
+on the fly.
+
+- CSV: one dataset per file, a header line first. Text starting with one
+  of FORMULA_PREFIXES gets a leading ``'`` so that a spreadsheet shows it
+  instead of evaluating it (user-written titles, headlines...).
+- JSONL: one JSON object per line with its "type"; several datasets follow
+  each other in the same stream.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import json
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+from functools import reduce
+from operator import or_
+from typing import Iterable, Iterator
+
+from django.db.models import Q, QuerySet
+
+from users.models import UserFollows
+
+from .models import Review, Ticket
+
+CHUNK_SIZE = 2000
+CONTENT_TYPES = {"csv": "text/csv; charset=utf-8", "jsonl": "application/x-ndjson; charset=utf-8"}
+FORMATS = tuple(CONTENT_TYPES)
+# First characters a spreadsheet reads as the start of a formula (tab and CR included)
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+@dataclass(frozen=True)
+class Dataset:
+    """An exported table: (column, ORM lookup) pairs read from `model`; a user's rows name them in `owners`."""
+
+    name: str
+    model: type
+    columns: tuple[tuple[str, str], ...]
+    owners: tuple[str, ...] = ("user",)
+
+    def queryset(self, user=None) -> QuerySet:
+        """Value tuples of the rows of `user` (every row when None), in primary key order."""
+        rows = self.model.objects.all()
+        if user is not None:
+            rows = rows.filter(reduce(or_, (Q(**{owner: user}) for owner in self.owners)))
+        return rows.order_by("pk").values_list(*(lookup for _, lookup in self.columns))
+
+    @property
+    def header(self) -> list[str]:
+        """Column names."""
+        return [name for name, _ in self.columns]
+
+
+DATASETS = {
+    "tickets": Dataset("tickets", Ticket, (
+        ("id", "pk"),
+        ("title", "title"),
+        ("author", "author"),
+        ("description", "description"),
+        ("user", "user__username"),
+        ("image", "image"),
+        ("book", "book_id"),
+        ("review_count", "review_count"),
+        ("rating_sum", "rating_sum"),
+        ("time_created", "time_created"),
+    )),
+    "reviews": Dataset("reviews", Review, (
+        ("id", "pk"),
+        ("ticket", "ticket_id"),
+        ("ticket_title", "ticket__title"),
+        ("user", "user__username"),
+        ("rating", "rating"),
+        ("headline", "headline"),
+        ("body", "body"),
+        ("time_created", "time_created"),
+    )),
+    "follows": Dataset("follows", UserFollows, (
+        ("user", "user__username"),
+        ("followed_user", "followed_user__username"),
+    ), owners=("user", "followed_user")),
+}
+
+
+def _value(value, csv_cell: bool = False):
+    """CSV / JSON representation of a column value (dates in ISO 8601, CSV formulas neutralised)."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if csv_cell and isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return f"'{value}"
+    return value
+
+
+def export(names: Iterable[str], fmt: str, user=None, chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+    """The `names` datasets of `user` (the whole site when None) as CSV or JSONL text, chunk_size rows per piece."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}")
+    names = list(names)
+    if fmt == "csv" and len(names) != 1:
+        raise ValueError("A CSV export holds a single dataset")
+
+    for name in names:
+        dataset = DATASETS[name]
+        buffer = io.StringIO()
+        if fmt == "csv":
+            writer = csv.writer(buffer)
+            writer.writerow(dataset.header)
+        rows = 0
+        for row in dataset.queryset(user).iterator(chunk_size=chunk_size):
+            if fmt == "csv":
+                writer.writerow([_value(value, csv_cell=True) for value in row])
+            else:
+                record = {"type": name, **{column: _value(value) for column, value in zip(dataset.header, row)}}
+                buffer.write(json.dumps(record, ensure_ascii=False))
+                buffer.write("\n")
+            rows += 1
+            if rows % chunk_size == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+
+
+def gzipped(chunks: Iterable[str]) -> Iterator[bytes]:
+    """`chunks` encoded in UTF-8 and gzip-compressed as they come."""
+    compressor = zlib.compressobj(wbits=31)  # 16 + 15: gzip header and trailer
+    for chunk in chunks:
+        compressed = compressor.compress(chunk.encode())
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def filename(names: list[str], fmt: str, label: str, compressed: bool) -> str:
+    """Download name, e.g. ``litrevu-alice-tickets.csv.gz``."""
+    what = names[0] if len(names) == 1 else "donnees"
+    return f"litrevu-{label}-{what}.{fmt}{'.gz' if compressed else ''}"
@@ -0,0 +1,242 @@
+"""
+The feed pipeline: which posts a page may list, filtered, in which order.
+
+Sources: visible_posts() (the viewer's and the followed users' posts, and
+the reviews answering the viewer's tickets) and own_posts() ("Mes posts")
+give one Ticket and one Review queryset. FeedFilters narrows them with
+predicates on indexed columns (author, date range) or on the rows those
+indexes lead to (rating), all in SQL.
+
+Chronological ("Récents"): chronological() merges both sources in one
+UNION ALL of (kind, id, date) rows, ordered and paginated by the database;
+a page then loads the cards of its ten rows only (load_items), where the
+feed used to load and sort every visible post in Python.
+
+Threads ("Par ticket"): the items of a chronological page grouped by ticket,
+so a ticket and its reviews on the page make one card instead of a ticket
+card repeated inside every review card. Grouping works on the page already
+loaded: no query of its own.
+
+Ranked ("pertinence"): the visible posts ordered by a composite score.
+
+The candidates are the CANDIDATES most recent tickets and the CANDIDATES
+most recent reviews of the (filtered) sources written in the last
+CANDIDATE_WINDOW. Each is a range seek on a (user,
+time_created) or (ticket, time_created) index, so the cost depends on the
+activity of the window, never on the length of the history; older posts
+are only listed by the chronological mode.
+
+Scoring is vectorized (numpy) over the candidates' ids, authors, dates and
+ticket engagement; the cards are loaded afterwards for the page only.
+
+    score = 2 ** (-age / HALF_LIFE)
+            x (1 + AFFINITY_WEIGHT x log(1 + reviews I wrote on the author's tickets))
+            x (1 + ENGAGEMENT_WEIGHT x log(1 + reviews of the ticket))
+
+Affinity counts the authors of the tickets answered by the viewer's last
+AFFINITY_SAMPLE reviews (the viewer's own tickets excluded), one bounded
+seek as well. Ties go to the most recent post.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+import numpy as np
+from django.db.models import Q, QuerySet, Value
+
+from .models import Review, Ticket
+
+CANDIDATES = 200
+CANDIDATE_WINDOW = timedelta(days=14)
+AFFINITY_SAMPLE = 500
+
+HALF_LIFE = timedelta(days=2)
+AFFINITY_WEIGHT = 1.0
+ENGAGEMENT_WEIGHT = 0.5
+
+# Kinds of feed rows (first column of chronological(), first item of ranked_items())
+TICKET, REVIEW = 0, 1
+
+Sources = tuple[QuerySet | None, QuerySet | None]
+
+
+def with_card_data(queryset: QuerySet) -> QuerySet:
+    """Load everything the feed cards display alongside Tickets or Reviews.
+
+    - Ticket cards: author (select_related); `has_review` and the rating are
+      columns of the ticket itself (see reviews.ticket_stats).
+    - Review cards: author, answered ticket and its author.
+    """
+    if queryset.model is Ticket:
+        return queryset.select_related("user")
+    return queryset.select_related("user", "ticket__user")
+
+
+def visible_posts(user, visible_ids: list[int]) -> Sources:
+    """Tickets written by visible users; reviews written by them OR answering one of the viewer's tickets."""
+    own_tickets = Ticket.objects.filter(user=user).values("pk")
+    return (
+        Ticket.objects.filter(user_id__in=visible_ids),
+        Review.objects.filter(Q(user_id__in=visible_ids) | Q(ticket_id__in=own_tickets)),
+    )
+
+
+def own_posts(user) -> Sources:
+    """The viewer's tickets and reviews ("Mes posts")."""
+    return Ticket.objects.filter(user=user), Review.objects.filter(user=user)
+
+
+@dataclass(frozen=True)
+class FeedFilters:
+    """
+    Optional filters of the feed pages (see reviews.forms.FeedFilterForm).
+
+    `min_rating` only concerns reviews: tickets are left out when it is set.
+    The date range is [since, until), compared with time_created itself so
+    the (user, time_created) indexes bound it; `author` is a username.
+    """
+
+    kind: int | None = None
+    min_rating: int | None = None
+    since: datetime | None = None
+    until: datetime | None = None
+    author: str | None = None
+
+    def apply(self, sources: Sources) -> Sources:
+        """Both sources narrowed by the filters; None for a source the filters exclude."""
+        tickets, reviews = sources
+        if self.kind == REVIEW or self.min_rating is not None:
+            tickets = None
+        if self.kind == TICKET:
+            reviews = None
+        if reviews is not None and self.min_rating is not None:
+            reviews = reviews.filter(rating__gte=self.min_rating)
+        return tuple(None if source is None else self._common(source) for source in (tickets, reviews))
+
+    def _common(self, queryset: QuerySet) -> QuerySet:
+        """Filters shared by tickets and reviews."""
+        if self.since is not None:
+            queryset = queryset.filter(time_created__gte=self.since)
+        if self.until is not None:
+            queryset = queryset.filter(time_created__lt=self.until)
+        if self.author:
+            queryset = queryset.filter(user__username=self.author)
+        return queryset
+
+
+def chronological(sources: Sources) -> QuerySet:
+    """(kind, pk, time_created) rows of both sources, newest first, in one UNION ALL query."""
+    rows = [
+        queryset.order_by().annotate(kind=Value(kind)).values_list("kind", "pk", "time_created")
+        for kind, queryset in zip((TICKET, REVIEW), sources)
+        if queryset is not None
+    ]
+    if not rows:
+        return Ticket.objects.none().values_list("pk")
+    merged = rows[0].union(*rows[1:], all=True) if len(rows) > 1 else rows[0]
+    # posts of the same second keep a stable order across pages
+    return merged.order_by("-time_created", "-kind", "-pk")
+
+
+def load_items(rows) -> list[Ticket | Review]:
+    """The Tickets and Reviews of (kind, pk, ...) `rows`, in that order, with their card data (a query per kind)."""
+    ids: dict[int, list[int]] = {TICKET: [], REVIEW: []}
+    for kind, pk, *_ in rows:
+        ids[kind].append(pk)
+    loaded = {
+        kind: with_card_data(model.objects.all()).in_bulk(ids[kind]) if ids[kind] else {}
+        for kind, model in ((TICKET, Ticket), (REVIEW, Review))
+    }
+    # a post deleted in the meantime is skipped
+    return [loaded[kind][pk] for kind, pk, *_ in rows if pk in loaded[kind]]
+
+
+def affinities(user) -> tuple[np.ndarray, np.ndarray]:
+    """(author ids, sorted; how many of the viewer's last reviews answered each one's tickets)."""
+    authors = (
+        Review.objects.filter(user=user).exclude(ticket__user=user)
+        .order_by("-time_created").values_list("ticket__user_id", flat=True)[:AFFINITY_SAMPLE]
+    )
+    return np.unique(np.fromiter(authors, np.int64), return_counts=True)
+
+
+def _most_recent(queryset, since: datetime):
+    """The CANDIDATES most recent rows of `queryset` since `since`.
+
+    The inner query orders and limits on the index entries alone (they hold
+    the author, the date and the id); only the rows kept are then read.
+    """
+    recent = queryset.filter(time_created__gte=since).order_by("-time_created").values("pk")[:CANDIDATES]
+    return queryset.model.objects.filter(pk__in=recent)
+
+
+def candidates(sources: Sources, now: datetime) -> list[tuple[int, int, int, datetime, int]]:
+    """(kind, pk, author id, time_created, ticket review count) of the posts that may be ranked."""
+    since = now - CANDIDATE_WINDOW
+    tickets, reviews = sources
+    fields = ("pk", "user_id", "time_created")
+    rows = []
+    if tickets is not None:
+        tickets = _most_recent(tickets, since).values_list(*fields, "review_count")
+        rows += [(TICKET, *row) for row in tickets]
+    if reviews is not None:
+        reviews = _most_recent(reviews, since).values_list(*fields, "ticket__review_count")
+        rows += [(REVIEW, *row) for row in reviews]
+    return rows
+
+
+def score(rows, affinity: tuple[np.ndarray, np.ndarray], now: datetime) -> np.ndarray:
+    """Indexes of `rows` (as returned by candidates()) from the most to the least relevant."""
+    if not rows:
+        return np.empty(0, np.int64)
+    count = len(rows)
+    authors = np.fromiter((row[2] for row in rows), np.int64, count)
+    ages = np.fromiter(((now - row[3]).total_seconds() for row in rows), np.float64, count)
+    engagement = np.fromiter((row[4] for row in rows), np.float64, count)
+
+    known, reviewed = affinity
+    positions = np.minimum(np.searchsorted(known, authors), max(len(known) - 1, 0))
+    hits = np.where(known[positions] == authors, reviewed[positions], 0) if len(known) else np.zeros(count)
+
+    recency = np.exp2(-ages / HALF_LIFE.total_seconds())
+    scores = recency * (1 + AFFINITY_WEIGHT * np.log1p(hits)) * (1 + ENGAGEMENT_WEIGHT * np.log1p(engagement))
+    # np.lexsort sorts by the last key first: best score, then youngest
+    return np.lexsort((ages, -scores))
+
+
+def ranked_items(user, sources: Sources, now: datetime) -> list[tuple[int, int]]:
+    """(kind, pk) of the ranked feed, best first; at most 2 x CANDIDATES entries."""
+    rows = candidates(sources, now)
+    return [(rows[index][0], rows[index][1]) for index in score(rows, affinities(user), now).tolist()]
+
+
+@dataclass
+class Thread:
+    """A ticket and, oldest first, its reviews found on the same page."""
+
+    ticket: Ticket
+    reviews: list[Review] = field(default_factory=list)
+
+
+def group_by_ticket(items: list[Ticket | Review]) -> list[Ticket | Review | Thread]:
+    """
+    A page of tickets and reviews with each ticket's items merged into one Thread.
+
+    Threads take the place of their first (most recent) item. A ticket or a
+    review alone on the page is kept as it is: its card already shows the
+    ticket once, and a thread card around it would only add markup.
+    """
+    groups: dict[int, list[Ticket | Review]] = {}
+    for item in items:
+        groups.setdefault(item.pk if isinstance(item, Ticket) else item.ticket_id, []).append(item)
+    merged = []
+    for group in groups.values():
+        if len(group) == 1:
+            merged.append(group[0])
+            continue
+        reviews = [item for item in reversed(group) if isinstance(item, Review)]
+        ticket = next((item for item in group if isinstance(item, Ticket)), reviews[0].ticket)
+        merged.append(Thread(ticket, reviews))
+    return merged
@@ -1,8 +1,12 @@
-"""Forms for creating and validating Ticket and Review objects."""
+"""Forms for creating and validating Ticket and Review objects, and for filtering the feed."""
+
+from datetime import date, datetime, time, timedelta
 
 from django import forms
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 
+from .feed import REVIEW, TICKET, FeedFilters
 from .models import Review, Ticket
 
 
@@ -134,3 +138,85 @@ class ReviewForm(NoColonLabelForm):
                 raise ValidationError("Une critique existe déjà pour ce ticket.")
 
         return data
+
+
+FILTER_INPUT_CLASS = "border border-gray-300 rounded-md px-3 py-1 bg-white"
+
+
+class FeedFilterForm(forms.Form):
+    """
+    GET filters of the feed and "Mes posts" (reviews.feed.FeedFilters).
+
+    Every field is optional and an invalid value only drops its own filter,
+    so a hand-edited URL never fails the page. The author field is left out
+    of "Mes posts" (`with_author=False`).
+    """
+
+    TYPES = {"tickets": TICKET, "critiques": REVIEW}
+
+    type = forms.ChoiceField(
+        label="Type",
+        required=False,
+        choices=[("", "Tout"), ("tickets", "Tickets"), ("critiques", "Critiques")],
+        widget=forms.Select(attrs={"class": FILTER_INPUT_CLASS}),
+    )
+    note = forms.TypedChoiceField(
+        label="Note",
+        required=False,
+        choices=[("", "Toutes"), *((i, f"{i}★ et plus") for i in range(1, 6))],
+        coerce=int,
+        empty_value=None,
+        widget=forms.Select(attrs={"class": FILTER_INPUT_CLASS}),
+    )
+    du = forms.DateField(
+        label="Du", required=False, widget=forms.DateInput(attrs={"type": "date", "class": FILTER_INPUT_CLASS}),
+    )
+    au = forms.DateField(
+        label="Au", required=False, widget=forms.DateInput(attrs={"type": "date", "class": FILTER_INPUT_CLASS}),
+    )
+    auteur = forms.CharField(
+        label="Auteur",
+        required=False,
+        max_length=150,
+        widget=forms.TextInput(attrs={"class": FILTER_INPUT_CLASS, "placeholder": "nom d'utilisateur"}),
+    )
+
+    def __init__(self, *args, with_author: bool = True, **kwargs):
+        """Remove the colon of the labels, and the author field when not wanted."""
+        super().__init__(*args, **kwargs)
+        if not with_author:
+            del self.fields["auteur"]
+        for field in self.fields.values():
+            field.label_suffix = ""
+
+    def _bounded_day(self, name):
+        """The date of `name`, refused when it is the last representable day (no next day to stop at)."""
+        day = self.cleaned_data.get(name)
+        if day == date.max:
+            raise ValidationError("Date hors limites.")
+        return day
+
+    def clean_du(self):
+        """Start day of the range."""
+        return self._bounded_day("du")
+
+    def clean_au(self):
+        """End day of the range, included: its next day must exist."""
+        return self._bounded_day("au")
+
+    def filters(self) -> FeedFilters:
+        """The filters of the valid fields."""
+        self.is_valid()
+        data = self.cleaned_data
+
+        def day_start(day):
+            return timezone.make_aware(datetime.combine(day, time.min)) if day else None
+
+        return FeedFilters(
+            kind=self.TYPES.get(data.get("type")),
+            min_rating=data.get("note"),
+            since=day_start(data.get("du")),
+            # "au" is inclusive: up to the start of the next day
+            until=day_start(data.get("au") and data["au"] + timedelta(days=1)),
+            author=data.get("auteur", "").lstrip("@") or None,
+        )
@@ -0,0 +1,208 @@
+"""
+Public rankings: "Tendances" (trending) and "Mieux notés" (top rated).
+
+Both are materialized as LeaderboardEntry rows by ``manage.py
+build_leaderboards``, so a page is one indexed LIMIT query and never an
+aggregate over the reviews.
+
+- Trending: every review adds (1 + rating / 5) to its ticket, halved every
+  HALF_LIFE since it was written. Scores are stored relative to the board's
+  epoch, sum(weight x 2 ** ((written - epoch) / HALF_LIFE)): decaying them
+  all to "now" multiplies every score by the same factor, so the order of
+  tickets without new reviews never changes and only the tickets whose
+  reviews changed are rescored. Reviews older than TRENDING_WINDOW
+  (weighing less than 1/256 of a new one) are left out.
+- Top rated: Bayesian average, (PRIOR_MEAN x PRIOR_REVIEWS + sum of the
+  ratings) / (PRIOR_REVIEWS + count), so a single 5-star review does not
+  outrank forty reviews averaging 4.5. Read from the tickets' aggregate
+  columns (reviews.ticket_stats).
+
+Incremental runs read the ReviewChange log past each board's watermark and
+rescore only the tickets it mentions. Only the BOARD_SIZE best tickets are
+stored; a ticket pushed out comes back when it is rescored or at the next
+full run (``--full``), which also moves the trending epoch to the present so
+that scores stay far from the float range.
+
+Pages cache what they read for settings.LEADERBOARD_CACHE_TIMEOUT seconds:
+a page is at most that much older than the table, itself at most one
+schedule interval (``--every``) older than the reviews.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from functools import partial
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from LITRevu.perf.timing import record_cache
+
+from .models import Leaderboard, LeaderboardEntry, Review, ReviewChange, Ticket
+
+BOARD_SIZE = 500
+PAGE_SIZE = 20
+
+HALF_LIFE = timedelta(days=3)
+TRENDING_WINDOW = HALF_LIFE * 8
+
+PRIOR_MEAN = 3.0
+PRIOR_REVIEWS = 5
+
+CACHE_KEY_PREFIX = "leaderboard"
+
+
+def trending_scores(epoch: datetime, now: datetime, tickets=None) -> dict[int, float]:
+    """{ticket id: decayed weight of its recent reviews}, for `tickets` (every ticket when None)."""
+    reviews = Review.objects.filter(time_created__gte=now - TRENDING_WINDOW)
+    if tickets is not None:
+        reviews = reviews.filter(ticket_id__in=tickets)
+    rows = list(reviews.values_list("ticket_id", "rating", "time_created").iterator(chunk_size=10_000))
+    if not rows:
+        return {}
+    ticket_ids = np.fromiter((row[0] for row in rows), np.int64, len(rows))
+    ratings = np.fromiter((row[1] for row in rows), np.float64, len(rows))
+    ages = np.fromiter(((row[2] - epoch).total_seconds() for row in rows), np.float64, len(rows))
+    weights = (1 + ratings / 5) * np.exp2(ages / HALF_LIFE.total_seconds())
+    unique, positions = np.unique(ticket_ids, return_inverse=True)
+    return dict(zip(unique.tolist(), np.bincount(positions, weights).tolist()))
+
+
+def top_rated_scores(tickets=None) -> dict[int, float]:
+    """{ticket id: Bayesian average rating} of the reviewed `tickets` (every ticket when None)."""
+    reviewed = Ticket.objects.filter(review_count__gt=0)
+    if tickets is not None:
+        reviewed = reviewed.filter(pk__in=tickets)
+    return {
+        pk: (PRIOR_MEAN * PRIOR_REVIEWS + rating_sum) / (PRIOR_REVIEWS + count)
+        for pk, count, rating_sum in reviewed.values_list("pk", "review_count", "rating_sum").iterator()
+    }
+
+
+def _store(board: Leaderboard, scores: dict[int, float], rescored=None, batch_size: int = 1000) -> None:
+    """Replace the entries of the `rescored` tickets (all entries when None), keeping the best BOARD_SIZE."""
+    entries = board.entries.all()
+    if rescored is None:
+        entries.delete()
+        best = sorted(scores.items(), key=lambda item: (item[1], item[0]), reverse=True)[:BOARD_SIZE]
+    else:
+        for start in range(0, len(rescored), batch_size):
+            entries.filter(ticket_id__in=rescored[start:start + batch_size]).delete()
+        best = list(scores.items())
+    LeaderboardEntry.objects.bulk_create(
+        [LeaderboardEntry(leaderboard=board, ticket_id=pk, score=score) for pk, score in best],
+        batch_size=batch_size,
+    )
+    if rescored is not None:
+        beyond = entries.order_by("-score", "-ticket_id").values_list("pk", flat=True)[BOARD_SIZE:]
+        LeaderboardEntry.objects.filter(pk__in=list(beyond)).delete()
+
+
+@dataclass
+class RefreshResult:
+    """What a refresh did, per board."""
+
+    full: bool
+    tickets: dict[str, int] = field(default_factory=dict)
+
+
+def refresh(full: bool = False, batch_size: int = 1000) -> RefreshResult:
+    """Rescore the tickets whose reviews changed since the last run (every ticket when `full`)."""
+    now = timezone.now()
+    # Read first: changes logged while scoring are picked up by the next run
+    last_change = ReviewChange.objects.aggregate(last=Max("pk"))["last"] or 0
+    result = RefreshResult(full=full)
+
+    for name, _ in Leaderboard.NAMES:
+        board, created = Leaderboard.objects.get_or_create(name=name)
+        rebuild = full or created or board.epoch is None
+        result.full = result.full or rebuild
+        if rebuild:
+            board.epoch = now
+            rescored = None
+        else:
+            changes = ReviewChange.objects.filter(pk__gt=board.watermark, pk__lte=last_change)
+            rescored = sorted(set(changes.values_list("ticket_id", flat=True)))
+
+        scorer = partial(trending_scores, board.epoch, now) if name == Leaderboard.TRENDING else top_rated_scores
+        scores = {}
+        for tickets in _batches(rescored, batch_size):
+            scores.update(scorer(tickets))
+
+        with transaction.atomic():
+            _store(board, scores, rescored, batch_size)
+            board.watermark, board.time_refreshed = last_change, timezone.now()
+            board.save()
+        result.tickets[name] = len(scores) if rescored is None else len(rescored)
+    return result
+
+
+def _batches(tickets, size):
+    """`tickets` in lists of `size`, or a single None (every ticket)."""
+    if tickets is None:
+        yield None
+        return
+    for start in range(0, len(tickets), size):
+        yield tickets[start:start + size]
+
+
+# ----------------------------------------
+# Reading
+# ----------------------------------------
+
+
+@dataclass
+class LeaderboardPage:
+    """A page of ranked tickets; `start` is the rank of the first one (from 1)."""
+
+    name: str
+    entries: list[LeaderboardEntry]
+    start: int = 1
+    next_cursor: str | None = None
+    time_refreshed: datetime | None = None
+
+
+def encode_cursor(entry: LeaderboardEntry, rank: int) -> str:
+    """Opaque position after `entry`, ranked `rank`."""
+    return f"{entry.score!r}~{entry.ticket_id}~{rank}"
+
+
+def decode_cursor(value: str | None) -> tuple[float, int, int] | None:
+    """(score, ticket id, rank) of a cursor, None when absent or malformed (first page)."""
+    if not value:
+        return None
+    try:
+        score, ticket_id, rank = value.split("~")
+        return float(score), int(ticket_id), int(rank)
+    except ValueError:
+        return None
+
+
+def leaderboard_page(name: str, cursor: str | None = None, limit: int = PAGE_SIZE) -> LeaderboardPage:
+    """A page of the `name` board, from the cache when read less than LEADERBOARD_CACHE_TIMEOUT ago."""
+    after = decode_cursor(cursor)
+    position = "~".join(map(repr, after)) if after else "first"
+    key = f"{CACHE_KEY_PREFIX}:{name}:{limit}:{position}"
+    page = cache.get(key)
+    record_cache(hit=page is not None)
+    if page is not None:
+        return page
+
+    board = Leaderboard.objects.filter(pk=name).first()
+    page = LeaderboardPage(name=name, entries=[], time_refreshed=board.time_refreshed if board else None)
+    if board is not None:
+        entries = board.entries.select_related("ticket__user").order_by("-score", "-ticket_id")
+        if after is not None:
+            score, ticket_id, page.start = after[0], after[1], after[2] + 1
+            entries = entries.filter(Q(score__lt=score) | Q(score=score, ticket_id__lt=ticket_id))
+        rows = list(entries[:limit + 1])
+        page.entries = rows[:limit]
+        if len(rows) > limit:
+            page.next_cursor = encode_cursor(page.entries[-1], page.start + limit - 1)
+    cache.set(key, page, settings.LEADERBOARD_CACHE_TIMEOUT)
+    return page
@@ -0,0 +1,54 @@
+"""
+Refresh the "Tendances" and "Mieux notés" leaderboards (reviews.leaderboards).
+
+    manage.py build_leaderboards               # incremental: tickets whose reviews changed
+    manage.py build_leaderboards --full        # rescore every ticket, reset the trending epoch
+    manage.py build_leaderboards --every 300   # run every 5 minutes (sidecar container)
+
+The interval bounds how stale the pages can be (plus
+settings.LEADERBOARD_CACHE_TIMEOUT). Run --full after a bulk import
+(seed_litrevu, loaddata), whose reviews are not in the change log, and
+from time to time (daily) to keep the trending scores near the epoch.
+Each run then prunes the changes every consumer of the log has processed.
+"""
+
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from reviews.change_log import prune
+from reviews.leaderboards import refresh
+
+
+class Command(BaseCommand):
+    """Rescore the tickets on the public leaderboards."""
+
+    help = "Rescore the trending and top-rated leaderboards from the review change log."
+
+    def add_arguments(self, parser):
+        """Declare the full-rebuild and schedule options."""
+        parser.add_argument("--full", action="store_true", help="Rescore every ticket.")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Tickets per query / INSERT.")
+        parser.add_argument("--every", type=float, default=0, help="Repeat every N seconds (0 = run once).")
+        parser.add_argument("--iterations", type=int, default=0, help="Stop after N runs (0 = until interrupted).")
+
+    def handle(self, *args, **options):
+        """Run once, or on a schedule with --every."""
+        run = 0
+        while True:
+            run += 1
+            started = time.perf_counter()
+            result = refresh(full=options["full"] and run == 1, batch_size=options["batch_size"])
+            counts = ", ".join(f"{name}: {count} ticket(s)" for name, count in result.tickets.items())
+            kind = "Full build" if result.full else "Incremental run"
+            self.stdout.write(
+                self.style.SUCCESS(f"{kind} — {counts} rescored ({time.perf_counter() - started:.1f} s).")
+            )
+            pruned = prune()
+            if pruned:
+                self.stdout.write(f"{pruned} processed review change(s) pruned from the log.")
+            if not options["every"] or (options["iterations"] and run >= options["iterations"]):
+                break
+            time.sleep(options["every"])
@@ -0,0 +1,54 @@
+"""
+Build the "Recommandé pour vous" lists (reviews.recommendations).
+
+    manage.py build_recommendations          # incremental: reviews changed since the last run
+    manage.py build_recommendations --full   # rebuild the similarity model and every list
+
+Meant to run on a schedule (cron, a sidecar container...). The first run
+is always a full one, and so should be the run after a bulk import
+(seed_litrevu, loaddata), whose reviews are not in the change log. Each
+run then prunes the changes every consumer of the log has processed.
+"""
+
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from reviews.change_log import prune
+from reviews.recommendations import refresh
+
+
+class Command(BaseCommand):
+    """Refresh the item-item model and the stored recommendations."""
+
+    help = "Compute the recommended tickets of every user whose reviews (or reviewed tickets) changed."
+
+    def add_arguments(self, parser):
+        """Declare the full-rebuild option."""
+        parser.add_argument("--full", action="store_true", help="Rebuild the model and every user's list.")
+        parser.add_argument("--batch-size", type=int, default=2000, help="Rows per INSERT / DELETE.")
+
+    def handle(self, *args, **options):
+        """Run the job, prune the change log and print what it did."""
+        started = time.perf_counter()
+        result = refresh(full=options["full"], batch_size=options["batch_size"])
+        elapsed = time.perf_counter() - started
+        pruned = prune()
+        if pruned:
+            self.stdout.write(f"{pruned} processed review change(s) pruned from the log.")
+
+        if result.full:
+            summary = f"Full build: {result.tickets} ticket(s) in the model"
+        elif result.changes:
+            summary = f"{result.changes} review change(s) on {result.tickets} ticket(s)"
+        else:
+            self.stdout.write("No review change since the last run.")
+            return
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{summary}, {result.recommendations} recommendation(s) for {result.users} user(s) "
+                f"({elapsed:.1f} s)."
+            )
+        )
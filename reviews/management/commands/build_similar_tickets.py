@@ -0,0 +1,40 @@
+"""
+Build the similar-ticket TF-IDF index (reviews.similar_tickets).
+
+    manage.py build_similar_tickets
+
+Tickets created after a build are appended to it as they are committed, so
+a nightly run is enough; run it after a bulk import too (seed_litrevu,
+loaddata), whose tickets bypass the signal. Pages keep serving the previous
+build until the new one is complete.
+"""
+
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from reviews.similar_tickets import build_index
+
+
+class Command(BaseCommand):
+    """Rebuild the TF-IDF vectors of every ticket."""
+
+    help = "Vectorise every ticket (title, author, description) into a new similar-ticket index."
+
+    def add_arguments(self, parser):
+        """Declare the read batch size."""
+        parser.add_argument("--batch-size", type=int, default=10_000, help="Tickets read per query.")
+
+    def handle(self, *args, **options):
+        """Build, switch to the new build and print its size."""
+        started = time.perf_counter()
+        index = build_index(batch_size=options["batch_size"])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{len(index.ticket_ids)} ticket(s) indexed on {len(index.vocabulary)} term(s), "
+                f"{len(index.postings_rows)} posting(s) ({elapsed:.1f} s)."
+            )
+        )
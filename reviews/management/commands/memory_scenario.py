@@ -0,0 +1,155 @@
+"""
+Replay a scripted browsing scenario and print what each step allocates.
+
+Steps: feed pages 1..N, then my_posts, all as one user through the full
+middleware stack (Django test client, no network). Each step runs under
+tracemalloc (LITRevu.perf.memory) and reports its peak and retained memory
+and the allocation sites of the retained part.
+
+Typical use, to check a change to reviews.views.feed objectively:
+    manage.py memory_scenario --save before.json
+    (apply the change)
+    manage.py memory_scenario --baseline before.json
+
+Only GET requests are sent; the session opened for the user is deleted at
+the end.
+"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from LITRevu.perf.memory import AllocationTracker
+
+
+def scenario(pages: int) -> list[tuple[str, str]]:
+    """(step label, URL) pairs of the scripted scenario."""
+    feed = reverse("reviews:feed")
+    steps = [(f"feed page={page}", f"{feed}?page={page}") for page in range(1, pages + 1)]
+    steps.append(("my_posts", reverse("users:my_posts")))
+    return steps
+
+
+class Command(BaseCommand):
+    """Measure the memory allocated by the feed and my_posts for one user."""
+
+    help = "Run the feed (pages 1..N) and my_posts under tracemalloc and print the allocations of each step."
+
+    def add_arguments(self, parser):
+        """Declare the user, scenario length and baseline options."""
+        parser.add_argument(
+            "--user",
+            default=None,
+            help="Username to browse as (default: the user following the most accounts).",
+        )
+        parser.add_argument("--pages", type=int, default=5, help="Feed pages to load (default: 5).")
+        parser.add_argument("--top", type=int, default=5, help="Allocation sites shown per step (default: 5).")
+        parser.add_argument(
+            "--no-warmup",
+            action="store_true",
+            help="Measure cold requests (template compilation, lazy imports...) too.",
+        )
+        parser.add_argument("--save", default=None, help="Write the results to this JSON file.")
+        parser.add_argument(
+            "--baseline",
+            default=None,
+            help="JSON file written by --save: print the difference with it.",
+        )
+
+    def handle(self, *args, **options):
+        """Run the scenario and print (and optionally save / compare) the results."""
+        user = self.get_user(options["user"])
+        baseline = self.load_baseline(options["baseline"])
+        steps = scenario(options["pages"])
+
+        client = Client()
+        # The test client talks to "testserver"; the per-request tracker would reset our peak
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"], MEMORY_TRACKING_VIEWS=[]):
+            client.force_login(user)
+            try:
+                if not options["no_warmup"]:
+                    for _, url in steps:
+                        client.get(url)
+                results = [self.measure(client, label, url, options["top"]) for label, url in steps]
+            finally:
+                client.logout()
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"Memory scenario for {user.username} ({user.following.count()} follows)"
+        ))
+        self.write_table(results, baseline)
+        for result in results:
+            self.write_sites(result)
+
+        if options["save"]:
+            Path(options["save"]).write_text(json.dumps({"user": user.username, "steps": results}, indent=2))
+            self.stdout.write(f"Saved to {options['save']}")
+
+    @staticmethod
+    def get_user(username):
+        """The requested user, or the one with the largest follow graph."""
+        User = get_user_model()
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f"Unknown user {username!r}.")
+        user = User.objects.annotate(follows=Count("following")).order_by("-follows", "pk").first()
+        if user is None:
+            raise CommandError("No user in the database (seed one first).")
+        return user
+
+    @staticmethod
+    def load_baseline(path):
+        """Steps of a previous --save, keyed by label."""
+        if not path:
+            return {}
+        try:
+            data = json.loads(Path(path).read_text())
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"Cannot read baseline {path}: {exc}")
+        return {step["step"]: step for step in data["steps"]}
+
+    @staticmethod
+    def measure(client, label, url, top):
+        """Run one step under tracemalloc."""
+        tracker = AllocationTracker(top=top).start()
+        try:
+            response = client.get(url)
+        finally:
+            report = tracker.stop()
+        if response.status_code != 200:
+            raise CommandError(f"{label}: {url} answered {response.status_code}.")
+        return {"step": label, "url": url, **report.as_dict()}
+
+    def write_table(self, results, baseline):
+        """One line per step, with the delta against the baseline if any."""
+        header = f"{'step':<16} {'peak KiB':>10} {'retained KiB':>13}"
+        if baseline:
+            header += f" {'Δ peak KiB':>11} {'Δ peak %':>9}"
+        self.stdout.write(header)
+        for result in results:
+            line = f"{result['step']:<16} {result['peak_kib']:>10.1f} {result['retained_kib']:>13.1f}"
+            before = baseline.get(result["step"])
+            if before:
+                delta = result["peak_kib"] - before["peak_kib"]
+                share = delta / before["peak_kib"] * 100 if before["peak_kib"] else 0.0
+                line += f" {delta:>+11.1f} {share:>+8.1f}%"
+            self.stdout.write(line)
+        self.stdout.write("")
+
+    def write_sites(self, result):
+        """Allocation sites of the memory a step still held at the end."""
+        if not result["top"]:
+            return
+        self.stdout.write(f"{result['step']}: top allocation sites")
+        for site in result["top"]:
+            self.stdout.write(f"  {site['size_kib']:>9.1f} KiB {site['count']:>7} blocks  {site['site']}")
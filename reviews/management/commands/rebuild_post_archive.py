@@ -0,0 +1,44 @@
+"""
+Recompute the monthly archive counters of "Mes posts" (reviews.archive).
+
+The counters follow every ticket and review created or deleted through the
+ORM; run this after writes that bypass signals (bulk imports, SQL run by
+hand) or to check them:
+
+    manage.py rebuild_post_archive                 # every user
+    manage.py rebuild_post_archive --user 12 --user 40
+"""
+
+from __future__ import annotations
+
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from reviews.archive import rebuild
+
+
+class Command(BaseCommand):
+    """Rewrite the MonthlyPostCount rows from the tickets and reviews."""
+
+    help = "Recompute the per-month post counters of the users' archives."
+
+    def add_arguments(self, parser):
+        """Declare the user selection option."""
+        parser.add_argument(
+            "--user",
+            type=int,
+            action="append",
+            default=None,
+            help="Only rebuild this user id (repeatable).",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000, help="Rows per fetch / INSERT.")
+
+    def handle(self, *args, **options):
+        """Rebuild and print how many months were counted."""
+        users = get_user_model().objects.filter(pk__in=options["user"]) if options["user"] else None
+        started = time.perf_counter()
+        months = rebuild(users, batch_size=options["batch_size"])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"{months} month(s) counted ({elapsed:.1f} s)."))
@@ -0,0 +1,52 @@
+"""
+Recompute the denormalized review aggregates of tickets (reviews.ticket_stats).
+
+The aggregates are kept up to date by signals on every review write made
+through the ORM; anything else (bulk imports, SQL run by hand, a crash
+between two statements outside a transaction) can leave them drifting.
+This command finds the tickets whose stored values differ from their
+reviews and rewrites them:
+
+    manage.py reconcile_ticket_stats             # fix every drifted ticket
+    manage.py reconcile_ticket_stats --dry-run   # only count them
+    manage.py reconcile_ticket_stats --ticket 12 --ticket 40
+"""
+
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from reviews.models import Ticket
+from reviews.ticket_stats import reconcile
+
+
+class Command(BaseCommand):
+    """Fix the review_count / rating_sum / histogram columns of drifted tickets."""
+
+    help = "Recompute the review aggregates of the tickets whose stored values drifted from their reviews."
+
+    def add_arguments(self, parser):
+        """Declare the ticket selection and dry-run options."""
+        parser.add_argument(
+            "--ticket",
+            type=int,
+            action="append",
+            default=None,
+            help="Only check this ticket id (repeatable).",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Report the drifted tickets without fixing them.")
+        parser.add_argument("--batch-size", type=int, default=2000, help="Tickets rewritten per UPDATE.")
+
+    def handle(self, *args, **options):
+        """Reconcile and print how many tickets drifted."""
+        tickets = Ticket.objects.filter(pk__in=options["ticket"]) if options["ticket"] else None
+        started = time.perf_counter()
+        drifted = reconcile(tickets, dry_run=options["dry_run"], batch_size=options["batch_size"])
+        elapsed = time.perf_counter() - started
+
+        if options["dry_run"]:
+            self.stdout.write(f"{drifted} ticket(s) with drifted review aggregates ({elapsed:.1f} s).")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{drifted} ticket(s) reconciled ({elapsed:.1f} s)."))
@@ -0,0 +1,105 @@
+"""
+Fill the database with a reproducible synthetic dataset (reviews.seed).
+
+    manage.py seed_litrevu --preset medium
+    manage.py seed_litrevu --preset large --seed 7 --image-ratio 0.1
+    manage.py seed_litrevu --flush            # replace a previous dataset
+    manage.py seed_litrevu --delete           # only remove the seeded users and their data
+
+Generated accounts are named <prefix>_0000001... and share the password
+reviews.seed.SEED_PASSWORD. Pass --until to pin the time window as well as
+the random seed when two runs must produce the same rows.
+"""
+
+from __future__ import annotations
+
+import time
+from datetime import datetime
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from reviews.seed import PRESETS, SEED_PASSWORD, Seeder, delete_seeded, get_config
+
+
+class Command(BaseCommand):
+    """Generate users, follows, tickets and reviews in bulk."""
+
+    help = "Insert a synthetic dataset (preset small / medium / large), reproducible from its seed."
+
+    def add_arguments(self, parser):
+        """Declare the preset, its overrides and the flush option."""
+        parser.add_argument(
+            "--preset", choices=sorted(PRESETS), default="small", help="Dataset size (default: small)."
+        )
+        parser.add_argument("--users", type=int, default=None, help="Override the preset's number of users.")
+        parser.add_argument("--tickets", type=int, default=None, help="Override the preset's number of tickets.")
+        parser.add_argument("--avg-follows", type=float, default=None, help="Override the mean follows per user.")
+        parser.add_argument("--image-ratio", type=float, default=None, help="Share of tickets with a cover image.")
+        parser.add_argument("--seed", type=int, default=None, help="Random seed (default: the preset's).")
+        parser.add_argument(
+            "--until",
+            default=None,
+            help="ISO datetime ending the time window (default: now, to the hour).",
+        )
+        parser.add_argument("--prefix", default="seed", help="Username prefix of the generated accounts.")
+        parser.add_argument(
+            "--flush",
+            action="store_true",
+            help="Delete the accounts with this prefix (and their data) before seeding.",
+        )
+        parser.add_argument("--delete", action="store_true", help="Only delete the accounts with this prefix.")
+
+    def handle(self, *args, **options):
+        """Flush and / or seed, then print the row counts."""
+        self.verbosity = options["verbosity"]
+        prefix = options["prefix"]
+        User = get_user_model()
+
+        if options["flush"] or options["delete"]:
+            deleted = delete_seeded(prefix)
+            self.stdout.write(f"Deleted {deleted:,} {prefix}_* accounts and their data.")
+            if options["delete"]:
+                return
+        elif User.objects.filter(username__startswith=f"{prefix}_").exists():
+            raise CommandError(f"Accounts {prefix}_* already exist: pass --flush to replace them.")
+
+        config = get_config(
+            options["preset"],
+            users=options["users"],
+            tickets=options["tickets"],
+            avg_follows=options["avg_follows"],
+            image_ratio=options["image_ratio"],
+            seed=options["seed"],
+        )
+        if config.users < 2:
+            raise CommandError("At least 2 users are needed.")
+        seeder = Seeder(config, prefix=prefix, until=self.parse_until(options["until"]), progress=self.progress)
+
+        started = time.perf_counter()
+        counts = seeder.run()
+        elapsed = time.perf_counter() - started
+
+        total = sum(counts.values())
+        detail = ", ".join(f"{count:,} {label}" for label, count in counts.items())
+        rate = total / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(f"Seeded {total:,} rows in {elapsed:.1f} s ({rate:,.0f} rows/s)."))
+        self.stdout.write(f"  {detail}")
+        self.stdout.write(f"Password of every {prefix}_* account: {SEED_PASSWORD}")
+
+    def progress(self, message):
+        """Progress line (verbosity >= 2 only, the command is silent otherwise)."""
+        if self.verbosity >= 2:
+            self.stdout.write(f"  {message}")
+
+    @staticmethod
+    def parse_until(value):
+        """Aware datetime from --until."""
+        if value is None:
+            return None
+        try:
+            until = datetime.fromisoformat(value)
+        except ValueError:
+            raise CommandError(f"--until: invalid ISO datetime {value!r}.")
+        return until if timezone.is_aware(until) else timezone.make_aware(until)
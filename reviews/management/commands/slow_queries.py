@@ -0,0 +1,140 @@
+"""
+Summarize the slow-query log (see LITRevu.perf.slowlog) by statement fingerprint.
+
+Reads the current JSONL file and its rotated backups (``.1``, ``.2``, ...)
+and prints, for each fingerprint: how many times it was slow, total / mean /
+max duration, the views and call sites that issued it and the query plan of
+its slowest occurrence.
+"""
+
+from __future__ import annotations
+
+import json
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+SORT_KEYS = ("total", "count", "max", "mean")
+
+
+def log_files(path: Path) -> list[Path]:
+    """The log file followed by its rotated backups, oldest last."""
+    files = [path] if path.exists() else []
+    index = 1
+    while (rotated := path.with_name(f"{path.name}.{index}")).exists():
+        files.append(rotated)
+        index += 1
+    return files
+
+
+def aggregate(records) -> dict[str, dict]:
+    """Group slow-query records by fingerprint."""
+    groups: dict[str, dict] = {}
+    for record in records:
+        group = groups.setdefault(record["fingerprint"], {
+            "fingerprint": record["fingerprint"],
+            "count": 0,
+            "total": 0.0,
+            "max": 0.0,
+            "views": Counter(),
+            "call_sites": Counter(),
+            "slowest": None,
+        })
+        duration = record["duration_ms"]
+        group["count"] += 1
+        group["total"] += duration
+        group["views"][record.get("view") or "<none>"] += 1
+        group["call_sites"][record.get("call_site") or "<unknown>"] += 1
+        if group["slowest"] is None or duration > group["max"]:
+            group["max"] = duration
+            group["slowest"] = record
+
+    for group in groups.values():
+        group["mean"] = group["total"] / group["count"]
+    return groups
+
+
+class Command(BaseCommand):
+    """Aggregate the slow-query log by statement fingerprint."""
+
+    help = "Summarize the slow-query JSONL log, grouped by statement fingerprint."
+
+    def add_arguments(self, parser):
+        """Declare input, filtering and sorting options."""
+        parser.add_argument(
+            "--file",
+            default=None,
+            help="Slow-query log to read (default: settings.SLOW_QUERY_LOG_FILE, plus rotated backups).",
+        )
+        parser.add_argument("--view", default=None, help="Only keep statements issued by this URL name.")
+        parser.add_argument(
+            "--sort",
+            choices=SORT_KEYS,
+            default="total",
+            help="Order fingerprints by total time (default), count, max or mean duration.",
+        )
+        parser.add_argument("--limit", type=int, default=10, help="Number of fingerprints shown (default: 10).")
+        parser.add_argument(
+            "--no-plans",
+            action="store_true",
+            help="Do not print the query plan of the slowest occurrence.",
+        )
+
+    def handle(self, *args, **options):
+        """Read every log file, aggregate and print the report."""
+        path = Path(options["file"] or settings.SLOW_QUERY_LOG_FILE)
+        files = log_files(path)
+        if not files:
+            raise CommandError(f"No slow-query log at {path}.")
+
+        records, skipped = self.read_records(files, options["view"])
+        if skipped:
+            self.stderr.write(self.style.WARNING(f"{skipped} malformed line(s) skipped."))
+        if not records:
+            self.stdout.write("No slow queries recorded.")
+            return
+
+        groups = sorted(aggregate(records).values(), key=lambda g: g[options["sort"]], reverse=True)
+        self.stdout.write(
+            f"{len(records)} slow queries, {len(groups)} distinct statements ({len(files)} file(s))\n"
+        )
+        for rank, group in enumerate(groups[:options["limit"]], start=1):
+            self.write_group(rank, group, show_plan=not options["no_plans"])
+
+    @staticmethod
+    def read_records(files, view):
+        """Parse the JSONL files, optionally keeping a single view."""
+        records, skipped = [], 0
+        for file in files:
+            with file.open(encoding="utf-8") as handle:
+                for line in handle:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        record = None
+                    if not isinstance(record, dict) or not {"fingerprint", "duration_ms"} <= record.keys():
+                        skipped += 1
+                        continue
+                    if view is None or record.get("view") == view:
+                        records.append(record)
+        return records, skipped
+
+    def write_group(self, rank, group, show_plan):
+        """Print one fingerprint with its statistics, origins and plan."""
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"#{rank}  total {group['total']:.1f} ms  count {group['count']}  "
+            f"mean {group['mean']:.1f} ms  max {group['max']:.1f} ms"
+        ))
+        self.stdout.write(f"    {group['fingerprint']}")
+        self.stdout.write("    views: " + ", ".join(f"{v} ({n})" for v, n in group["views"].most_common()))
+        self.stdout.write("    call sites: " + ", ".join(
+            f"{site} ({n})" for site, n in group["call_sites"].most_common(3)
+        ))
+        plan = group["slowest"].get("plan")
+        if show_plan and plan:
+            self.stdout.write("    plan (slowest):")
+            for step in plan:
+                self.stdout.write(f"      {step}")
+        self.stdout.write("")
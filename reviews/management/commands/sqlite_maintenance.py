@@ -0,0 +1,225 @@
+"""
+Online backup and routine maintenance for the SQLite database.
+
+Tasks (run in the given order, all of them by default):
+- backup: consistent copy through SQLite's online backup API, copied in small
+  page steps with a pause between steps so writers are never starved.
+- optimize: ``PRAGMA optimize`` (or a full ``ANALYZE`` with --analyze), and
+  a merge of the full-text search index b-trees.
+- vacuum: ``PRAGMA incremental_vacuum`` to give free pages back to the OS.
+
+With --every the tasks are repeated on a fixed schedule, which is how the
+command is meant to run next to gunicorn (cron, a sidecar container, ...).
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from reviews.search import optimize_index
+
+TASKS = ("backup", "optimize", "vacuum")
+
+# auto_vacuum values reported by PRAGMA auto_vacuum
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+class Command(BaseCommand):
+    """Back up, analyze and vacuum the SQLite database without blocking traffic."""
+
+    help = "Take an online SQLite backup and run ANALYZE / incremental vacuum, optionally on a schedule."
+
+    def add_arguments(self, parser):
+        """Declare task selection, backup tuning and scheduling options."""
+        parser.add_argument(
+            "tasks",
+            nargs="*",
+            choices=TASKS,
+            help="Tasks to run (default: backup optimize vacuum).",
+        )
+        parser.add_argument("--database", default="default", help="Database alias (default: 'default').")
+        parser.add_argument(
+            "--backup-dir",
+            default=None,
+            help="Directory receiving backups (default: settings.DB_BACKUP_DIR).",
+        )
+        parser.add_argument(
+            "--keep",
+            type=int,
+            default=None,
+            help="Number of backups to keep, older ones are deleted (default: settings.DB_BACKUP_KEEP).",
+        )
+        parser.add_argument(
+            "--pages",
+            type=int,
+            default=64,
+            help="Pages copied per backup step; smaller steps hold the read lock for less time.",
+        )
+        parser.add_argument(
+            "--step-sleep",
+            type=float,
+            default=0.005,
+            help="Seconds to sleep between backup steps so writers can get the lock.",
+        )
+        parser.add_argument(
+            "--analyze",
+            action="store_true",
+            help="Run a full ANALYZE instead of PRAGMA optimize.",
+        )
+        parser.add_argument(
+            "--vacuum-pages",
+            type=int,
+            default=0,
+            help="Pages released per incremental vacuum run (0 = every free page).",
+        )
+        parser.add_argument(
+            "--enable-incremental-vacuum",
+            action="store_true",
+            help="Switch auto_vacuum to INCREMENTAL (one-off full VACUUM, blocks writers while it runs).",
+        )
+        parser.add_argument(
+            "--every",
+            type=float,
+            default=0,
+            help="Repeat the tasks every N seconds (0 = run once).",
+        )
+        parser.add_argument(
+            "--iterations",
+            type=int,
+            default=0,
+            help="Stop after N scheduled runs (0 = run until interrupted).",
+        )
+
+    def handle(self, *args, **options):
+        """Run the selected tasks once, or repeatedly when --every is given."""
+        connection = connections[options["database"]]
+        if connection.vendor != "sqlite":
+            raise CommandError("sqlite_maintenance only supports SQLite databases.")
+
+        tasks = options["tasks"] or list(TASKS)
+        every = options["every"]
+        iterations = options["iterations"]
+
+        run = 0
+        while True:
+            run += 1
+            started = time.perf_counter()
+            for task in tasks:
+                getattr(self, f"run_{task}")(connection, options)
+            self.stdout.write(f"maintenance run #{run} done in {time.perf_counter() - started:.2f}s")
+
+            if not every or (iterations and run >= iterations):
+                break
+            time.sleep(every)
+
+    # ----------------------------------------
+    # Tasks
+    # ----------------------------------------
+
+    def run_backup(self, connection, options):
+        """Copy the live database to a timestamped file, a few pages at a time."""
+        backup_dir = Path(options["backup_dir"] or settings.DB_BACKUP_DIR)
+        backup_dir.mkdir(parents=True, exist_ok=True)
+
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        target = backup_dir / f"db-{stamp}.sqlite3"
+        partial = target.with_suffix(".partial")
+
+        step_sleep = options["step_sleep"]
+        steps = 0
+
+        def progress(status, remaining, total):
+            # Called after every step: the source lock is released at this point,
+            # so sleeping here lets pending writers go through.
+            nonlocal steps
+            steps += 1
+            if remaining and step_sleep:
+                time.sleep(step_sleep)
+
+        if connection.in_atomic_block:
+            # The backup would wait forever on this connection's own write lock.
+            raise CommandError("Cannot take a backup from inside a transaction.")
+
+        connection.ensure_connection()
+        started = time.perf_counter()
+        destination = sqlite3.connect(partial)
+        try:
+            connection.connection.backup(destination, pages=options["pages"], progress=progress)
+            page_count = destination.execute("PRAGMA page_count").fetchone()[0]
+        finally:
+            destination.close()
+        partial.replace(target)
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f"backup: {page_count} pages in {steps} steps, {elapsed:.2f}s -> {target}"
+        )
+        self._prune_backups(backup_dir, options)
+        return target
+
+    def run_optimize(self, connection, options):
+        """Refresh the query planner statistics and merge the search index."""
+        statement = "ANALYZE" if options["analyze"] else "PRAGMA optimize"
+        started = time.perf_counter()
+        with connection.cursor() as cursor:
+            cursor.execute(statement)
+        self.stdout.write(f"optimize: {statement} in {time.perf_counter() - started:.2f}s")
+        started = time.perf_counter()
+        optimize_index(connection)
+        self.stdout.write(f"optimize: search index merged in {time.perf_counter() - started:.2f}s")
+
+    def run_vacuum(self, connection, options):
+        """Release free pages with an incremental vacuum (no full rewrite)."""
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA auto_vacuum")
+            mode = cursor.fetchone()[0]
+
+            if mode != AUTO_VACUUM_INCREMENTAL:
+                if not options["enable_incremental_vacuum"]:
+                    self.stdout.write(
+                        "vacuum: skipped, auto_vacuum is not INCREMENTAL "
+                        "(run once with --enable-incremental-vacuum)"
+                    )
+                    return
+                started = time.perf_counter()
+                cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                cursor.execute("VACUUM")
+                self.stdout.write(
+                    f"vacuum: auto_vacuum switched to INCREMENTAL in {time.perf_counter() - started:.2f}s"
+                )
+
+            cursor.execute("PRAGMA freelist_count")
+            free_before = cursor.fetchone()[0]
+            started = time.perf_counter()
+            pages = options["vacuum_pages"]
+            cursor.execute(f"PRAGMA incremental_vacuum({pages})" if pages else "PRAGMA incremental_vacuum")
+            # incremental_vacuum only makes progress while its rows are stepped through
+            cursor.fetchall()
+            cursor.execute("PRAGMA freelist_count")
+            free_after = cursor.fetchone()[0]
+
+        self.stdout.write(
+            f"vacuum: released {free_before - free_after} of {free_before} free pages "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
+
+    # ----------------------------------------
+    # Helpers
+    # ----------------------------------------
+
+    def _prune_backups(self, backup_dir: Path, options) -> None:
+        """Delete the oldest backups beyond the retention count."""
+        keep = options["keep"] if options["keep"] is not None else settings.DB_BACKUP_KEEP
+        if keep <= 0:
+            return
+        backups = sorted(backup_dir.glob("db-*.sqlite3"))
+        for old in backups[:-keep]:
+            old.unlink()
+            self.stdout.write(f"backup: removed {old.name}")
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.16 on 2026-10-19 01:23
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import reviews.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('reviews', '0006_alter_review_options'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('view_name', models.CharField(blank=True, max_length=128)),
+                ('method', models.CharField(max_length=8)),
+                ('path', models.CharField(max_length=2048)),
+                ('status_code', models.PositiveSmallIntegerField()),
+                ('duration_ms', models.FloatField()),
+                ('pstats_file', models.FileField(storage=reviews.models.request_profile_storage, upload_to='%Y/%m/')),
+                ('summary', models.TextField(blank=True)),
+                ('time_created', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Request profile',
+                'verbose_name_plural': 'Request profiles',
+                'ordering': ['-time_created'],
+            },
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 4.2.16 on 2026-10-19 01:40
+
+from django.db import migrations, models
+from django.db.models import Count, Exists, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_review_stats(apps, schema_editor):
+    """Compute the new aggregates of every reviewed ticket (one UPDATE)."""
+    Ticket = apps.get_model("reviews", "Ticket")
+    Review = apps.get_model("reviews", "Review")
+
+    def aggregate(expression):
+        reviews = Review.objects.filter(ticket=OuterRef("pk")).order_by().values("ticket")
+        return Coalesce(Subquery(reviews.annotate(value=expression).values("value")), Value(0))
+
+    updates = {"review_count": aggregate(Count("pk")), "rating_sum": aggregate(Sum("rating"))}
+    for rating in range(6):
+        updates[f"rating_count_{rating}"] = aggregate(Count("pk", filter=Q(rating=rating)))
+    Ticket.objects.filter(Exists(Review.objects.filter(ticket=OuterRef("pk")))).update(**updates)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0007_requestprofile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='rating_count_0',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='rating_count_1',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='rating_count_2',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='rating_count_3',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='rating_count_4',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='rating_count_5',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_review_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,102 @@
+"""
+FTS5 full-text index over tickets and reviews (see reviews.search).
+
+reviews_search holds one row per ticket (rowid = 2 * id) and per review
+(rowid = 2 * id + 1). Besides the searchable text, the ``audience`` column
+holds the tokens deciding who can see the row: ``u<author id>``, plus
+``t<ticket owner id>`` for reviews. Triggers keep it in sync with every
+write, bulk ones included. Ticket triggers watch only the indexed columns,
+so the F() updates of the review aggregates never touch the index.
+"""
+
+from django.db import migrations
+
+TICKET_ROW = (
+    "INSERT INTO reviews_search(rowid, title, author, body, audience, kind, object_id) "
+    "VALUES (new.id * 2, new.title, new.author, new.description, 'u' || new.user_id, 'ticket', new.id);"
+)
+REVIEW_ROW = (
+    "INSERT INTO reviews_search(rowid, title, author, body, audience, kind, object_id) "
+    "VALUES (new.id * 2 + 1, new.headline, '', new.body, "
+    "'u' || new.user_id || ' t' || (SELECT user_id FROM reviews_ticket WHERE id = new.ticket_id), "
+    "'review', new.id);"
+)
+
+CREATE = [
+    """
+    CREATE VIRTUAL TABLE reviews_search USING fts5(
+        title, author, body, audience,
+        kind UNINDEXED, object_id UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2'
+    );
+    """,
+    f"""
+    CREATE TRIGGER reviews_search_ticket_insert AFTER INSERT ON reviews_ticket BEGIN
+        {TICKET_ROW}
+    END;
+    """,
+    f"""
+    CREATE TRIGGER reviews_search_ticket_update AFTER UPDATE OF title, author, description, user_id
+    ON reviews_ticket BEGIN
+        DELETE FROM reviews_search WHERE rowid = old.id * 2;
+        {TICKET_ROW}
+    END;
+    """,
+    # A ticket changing hands changes who can see the reviews answering it
+    """
+    CREATE TRIGGER reviews_search_ticket_owner AFTER UPDATE OF user_id ON reviews_ticket
+    WHEN old.user_id <> new.user_id BEGIN
+        UPDATE reviews_search SET audience = 'u' || (SELECT user_id FROM reviews_review WHERE id = object_id)
+                                             || ' t' || new.user_id
+        WHERE rowid IN (SELECT id * 2 + 1 FROM reviews_review WHERE ticket_id = new.id);
+    END;
+    """,
+    """
+    CREATE TRIGGER reviews_search_ticket_delete AFTER DELETE ON reviews_ticket BEGIN
+        DELETE FROM reviews_search WHERE rowid = old.id * 2;
+    END;
+    """,
+    f"""
+    CREATE TRIGGER reviews_search_review_insert AFTER INSERT ON reviews_review BEGIN
+        {REVIEW_ROW}
+    END;
+    """,
+    f"""
+    CREATE TRIGGER reviews_search_review_update AFTER UPDATE OF headline, body, ticket_id, user_id
+    ON reviews_review BEGIN
+        DELETE FROM reviews_search WHERE rowid = old.id * 2 + 1;
+        {REVIEW_ROW}
+    END;
+    """,
+    """
+    CREATE TRIGGER reviews_search_review_delete AFTER DELETE ON reviews_review BEGIN
+        DELETE FROM reviews_search WHERE rowid = old.id * 2 + 1;
+    END;
+    """,
+    """
+    INSERT INTO reviews_search(rowid, title, author, body, audience, kind, object_id)
+    SELECT id * 2, title, author, description, 'u' || user_id, 'ticket', id FROM reviews_ticket;
+    """,
+    """
+    INSERT INTO reviews_search(rowid, title, author, body, audience, kind, object_id)
+    SELECT r.id * 2 + 1, r.headline, '', r.body, 'u' || r.user_id || ' t' || t.user_id, 'review', r.id
+    FROM reviews_review r JOIN reviews_ticket t ON t.id = r.ticket_id;
+    """,
+]
+
+DROP = [
+    f"DROP TRIGGER IF EXISTS reviews_search_{table}_{event};"
+    for table in ("ticket", "review")
+    for event in ("insert", "update", "owner", "delete")
+] + ["DROP TABLE IF EXISTS reviews_search;"]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0008_ticket_review_stats'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE, DROP),
+    ]
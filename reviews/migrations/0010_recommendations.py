@@ -0,0 +1,49 @@
+# Generated by Django 4.2.16 on 2026-10-19 02:45
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('reviews', '0009_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rating', models.PositiveSmallIntegerField(null=True)),
+                ('previous_rating', models.PositiveSmallIntegerField(null=True)),
+                ('time_created', models.DateTimeField(auto_now_add=True)),
+                ('ticket', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='reviews.ticket')),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Review change',
+                'verbose_name_plural': 'Review changes',
+            },
+        ),
+        migrations.CreateModel(
+            name='RecommendedTicket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('ticket', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='reviews.ticket')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Recommended ticket',
+                'verbose_name_plural': 'Recommended tickets',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='recommendedticket',
+            constraint=models.UniqueConstraint(fields=('user', 'rank'), name='unique_recommendation_rank_per_user'),
+        ),
+    ]
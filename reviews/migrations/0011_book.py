@@ -0,0 +1,42 @@
+# Generated by Django 4.2.16 on 2026-10-19 03:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from reviews.books import assign_books
+
+
+def backfill_books(apps, schema_editor):
+    """Attach every existing ticket to its book, 1000 tickets per batch (see reviews.books)."""
+    Ticket = apps.get_model("reviews", "Ticket")
+    assign_books(Ticket.objects.using(schema_editor.connection.alias))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0010_recommendations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Book',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=128)),
+                ('author', models.CharField(blank=True, max_length=128, verbose_name='Auteur')),
+                ('key', models.CharField(max_length=255, unique=True)),
+                ('time_created', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Livre',
+                'verbose_name_plural': 'Livres',
+            },
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='book',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tickets', to='reviews.book'),
+        ),
+        migrations.RunPython(backfill_books, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.16 on 2026-10-19 03:15
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0011_book'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Leaderboard',
+            fields=[
+                ('name', models.CharField(choices=[('trending', 'Tendances'), ('top_rated', 'Mieux notés')], max_length=16, primary_key=True, serialize=False)),
+                ('watermark', models.BigIntegerField(default=0)),
+                ('epoch', models.DateTimeField(null=True)),
+                ('time_refreshed', models.DateTimeField(null=True)),
+            ],
+            options={
+                'verbose_name': 'Leaderboard',
+                'verbose_name_plural': 'Leaderboards',
+            },
+        ),
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('leaderboard', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='reviews.leaderboard')),
+                ('ticket', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='reviews.ticket')),
+            ],
+            options={
+                'verbose_name': 'Leaderboard entry',
+                'verbose_name_plural': 'Leaderboard entries',
+                'indexes': [models.Index(fields=['leaderboard', '-score', '-ticket'], name='leaderboard_rank_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='leaderboardentry',
+            constraint=models.UniqueConstraint(fields=('leaderboard', 'ticket'), name='unique_leaderboard_ticket'),
+        ),
+    ]
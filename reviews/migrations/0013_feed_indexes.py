@@ -0,0 +1,25 @@
+# Generated by Django 4.2.16 on 2026-10-19 03:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0012_leaderboards'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['user', '-time_created'], name='review_user_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['ticket', '-time_created'], name='review_ticket_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['user', '-time_created'], name='ticket_user_recent_idx'),
+        ),
+    ]
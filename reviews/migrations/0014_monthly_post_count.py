@@ -0,0 +1,57 @@
+# Generated by Django 4.2.16 on 2026-10-19 03:58
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, DateField
+from django.db.models.functions import TruncMonth
+
+
+def backfill_post_counts(apps, schema_editor):
+    """Count the existing tickets and reviews of every user per month (see reviews.archive.rebuild)."""
+    MonthlyPostCount = apps.get_model("reviews", "MonthlyPostCount")
+    counts = {}
+    for model, field in (("Ticket", "ticket_count"), ("Review", "review_count")):
+        per_month = (
+            apps.get_model("reviews", model).objects.order_by()
+            .annotate(month=TruncMonth("time_created", output_field=DateField()))
+            .values("user_id", "month")
+            .annotate(posts=Count("pk"))
+            .values_list("user_id", "month", "posts")
+        )
+        for user_id, month, posts in per_month.iterator(chunk_size=1000):
+            counts.setdefault((user_id, month), {})[field] = posts
+    MonthlyPostCount.objects.bulk_create(
+        (MonthlyPostCount(user_id=user_id, month=month, **fields) for (user_id, month), fields in counts.items()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('reviews', '0013_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyPostCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('ticket_count', models.PositiveIntegerField(default=0)),
+                ('review_count', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Monthly post count',
+                'verbose_name_plural': 'Monthly post counts',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='monthlypostcount',
+            constraint=models.UniqueConstraint(fields=('user', 'month'), name='unique_post_count_month'),
+        ),
+        migrations.RunPython(backfill_post_counts, migrations.RunPython.noop),
+    ]
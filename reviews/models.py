@@ -1,18 +1,65 @@
-"""Define models for Ticket and Review within Reviews app."""
+"""Define models for Book, Ticket and Review within Reviews app."""
 
 from __future__ import annotations
 
+import os
 from typing import TYPE_CHECKING
 
 from django.conf import settings
+from django.core.files.storage import FileSystemStorage
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 from django.db.models import UniqueConstraint
 
+from .books import KEY_LENGTH, book_key
+
 if TYPE_CHECKING:
     from django.contrib.auth.models import AbstractBaseUser
 
 
+class Book(models.Model):
+    """
+    A book (or article) that several tickets can be about.
+
+    Tickets are attached when saved, by the normalized key of their title and
+    author (see reviews.books): one lookup on the unique index.
+
+    Fields:
+    - title / author: As typed in the first ticket about the book
+    - key: Unique normalized "title|author"
+    - time_created: Auto timestamp for when the book is first requested
+    """
+
+    title = models.CharField(max_length=128)
+    author = models.CharField("Auteur", max_length=128, blank=True)
+    key = models.CharField(max_length=KEY_LENGTH, unique=True)
+    time_created = models.DateTimeField(auto_now_add=True)
+
+    @classmethod
+    def resolve(cls, title: str, author: str | None) -> "Book":
+        """The book with this title and author, created on first request."""
+        book, _ = cls.objects.get_or_create(
+            key=book_key(title, author),
+            defaults={"title": title.strip(), "author": (author or "").strip()},
+        )
+        return book
+
+    @property
+    def display_author(self) -> str:
+        """Return the author name, or the default label of tickets."""
+        return self.author or Ticket.DEFAULT_AUTHOR_LABEL
+
+    class Meta:
+        """Django metadata options for the Book model."""
+
+        verbose_name = "Livre"
+        verbose_name_plural = "Livres"
+
+    def __str__(self):
+        """Return the title and the author."""
+        return f"{self.title} — {self.display_author}"
+
+
 class Ticket(models.Model):
     """
     Placeholder for content a user wants to review.
@@ -23,6 +70,9 @@ class Ticket(models.Model):
     - user: Author of the ticket
     - image: Optional image associated to the ticket
     - time_created: Auto timestamp for when the ticket is created
+    - book: The canonical Book, resolved from title and author on save
+    - review_count / rating_sum / rating_count_0..5: denormalized review
+      aggregates, kept up to date by reviews.signals (see reviews.ticket_stats)
     """
 
     DEFAULT_AUTHOR_LABEL = "Auteur inconnu"
@@ -47,12 +97,62 @@ class Ticket(models.Model):
         null=True,
     )
     time_created = models.DateTimeField(auto_now_add=True)
+    book = models.ForeignKey(
+        Book,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="tickets",
+    )
+
+    # Review aggregates (F() updates on every review save / delete, never edited by hand)
+    review_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_count_0 = models.PositiveIntegerField(default=0, editable=False)
+    rating_count_1 = models.PositiveIntegerField(default=0, editable=False)
+    rating_count_2 = models.PositiveIntegerField(default=0, editable=False)
+    rating_count_3 = models.PositiveIntegerField(default=0, editable=False)
+    rating_count_4 = models.PositiveIntegerField(default=0, editable=False)
+    rating_count_5 = models.PositiveIntegerField(default=0, editable=False)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember the stored book key, so a save only looks the book up again when it changed."""
+        instance = super().from_db(db, field_names, values)
+        if "title" in instance.__dict__ and "author" in instance.__dict__:
+            instance._loaded_book_key = book_key(instance.title, instance.author)
+        return instance
+
+    def save(self, *args, **kwargs):
+        """Attach the ticket to its Book when created, or when its title or author changed."""
+        key = book_key(self.title, self.author)
+        if self.book_id is None or key != getattr(self, "_loaded_book_key", None):
+            self.book = Book.resolve(self.title, self.author)
+            if kwargs.get("update_fields") is not None:
+                kwargs["update_fields"] = {*kwargs["update_fields"], "book"}
+        super().save(*args, **kwargs)
+        self._loaded_book_key = key
 
     @property
     def display_title(self) -> str:
         """Title used in the feed."""
         return self.title
 
+    @property
+    def has_review(self) -> bool:
+        """True once anyone has reviewed the ticket (a column read, no query)."""
+        return self.review_count > 0
+
+    @property
+    def average_rating(self) -> float | None:
+        """Mean rating of the reviews, None without reviews."""
+        return self.rating_sum / self.review_count if self.review_count else None
+
+    @property
+    def rating_histogram(self) -> list[int]:
+        """Number of reviews per rating, index 0 to 5."""
+        return [getattr(self, f"rating_count_{rating}") for rating in range(6)]
+
     @property
     def display_author(self) -> str:
         """Return the author name, or a default French label if none is provided."""
@@ -68,6 +168,10 @@ class Ticket(models.Model):
         verbose_name = "Ticket"
         verbose_name_plural = "Tickets"
         ordering = ['-time_created']
+        indexes = [
+            # An author's most recent tickets: one range seek per author (reviews.feed)
+            models.Index(fields=["user", "-time_created"], name="ticket_user_recent_idx"),
+        ]
 
     def __str__(self):
         """Return a readable representation with title and author username."""
@@ -104,6 +208,13 @@ class Review(models.Model):
         to=settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     time_created = models.DateTimeField(auto_now_add=True)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember the stored ticket and rating, so a save can adjust the ticket's aggregates."""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_stats = (instance.__dict__.get("ticket_id"), instance.__dict__.get("rating"))
+        return instance
+
     @property
     def display_title(self) -> str:
         """Return the title used in the feed."""
@@ -118,7 +229,259 @@ class Review(models.Model):
         constraints = [
             UniqueConstraint(fields=['user', 'ticket'], name='unique_review_per_user_ticket')
         ]
+        indexes = [
+            # An author's most recent reviews, and a ticket's: range seeks of the feed (reviews.feed)
+            models.Index(fields=["user", "-time_created"], name="review_user_recent_idx"),
+            models.Index(fields=["ticket", "-time_created"], name="review_ticket_recent_idx"),
+        ]
 
     def __str__(self):
         """Return a readable representation with headlineand author."""
         return f"{self.headline} — {self.user}"
+
+
+class ReviewChange(models.Model):
+    """
+    Append-only log of review writes, read by batch jobs that update incrementally.
+
+    One row per review created, re-rated or deleted through the ORM (written
+    by reviews.signals). Consumers remember the last id they processed; the
+    rows all of them processed are pruned (reviews.change_log). The ticket
+    and user are kept as plain ids so the log outlives them.
+
+    Fields:
+        ticket / user: The reviewed ticket and the reviewer.
+        rating: Rating after the change (None: review deleted).
+        previous_rating: Rating before the change (None: review created).
+        time_created: Timestamp set on creation.
+    """
+
+    ticket = models.ForeignKey(Ticket, on_delete=models.DO_NOTHING, db_constraint=False, related_name="+")
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="+",
+    )
+    rating = models.PositiveSmallIntegerField(null=True)
+    previous_rating = models.PositiveSmallIntegerField(null=True)
+    time_created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        """Django metadata options for the ReviewChange model."""
+
+        verbose_name = "Review change"
+        verbose_name_plural = "Review changes"
+
+    def __str__(self):
+        """Return the ticket, user and rating transition."""
+        return f"ticket {self.ticket_id} / user {self.user_id}: {self.previous_rating} -> {self.rating}"
+
+
+class RecommendedTicket(models.Model):
+    """
+    A ticket recommended to a user, precomputed by ``manage.py build_recommendations``.
+
+    See reviews.recommendations. The feed reads a user's first rows in rank
+    order, through the (user, rank) unique index.
+
+    Fields:
+        user: Who the ticket is recommended to.
+        ticket: The recommended ticket.
+        score: Predicted affinity (higher first).
+        rank: Position in the user's list, from 1.
+    """
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+    ticket = models.ForeignKey(Ticket, on_delete=models.CASCADE, related_name="+")
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        """Django metadata options for the RecommendedTicket model."""
+
+        verbose_name = "Recommended ticket"
+        verbose_name_plural = "Recommended tickets"
+        constraints = [
+            UniqueConstraint(fields=["user", "rank"], name="unique_recommendation_rank_per_user"),
+        ]
+
+    def __str__(self):
+        """Return the user, rank and ticket."""
+        return f"{self.user_id} #{self.rank}: ticket {self.ticket_id}"
+
+
+class Leaderboard(models.Model):
+    """
+    State of one public ranking, maintained by ``manage.py build_leaderboards``.
+
+    See reviews.leaderboards.
+
+    Fields:
+        name: The ranking ("trending" or "top_rated").
+        watermark: Last ReviewChange id reflected in the entries.
+        epoch: Reference time of the time-decayed scores (reset by full builds).
+        time_refreshed: End of the last run (shown on the pages).
+    """
+
+    TRENDING = "trending"
+    TOP_RATED = "top_rated"
+    NAMES = [(TRENDING, "Tendances"), (TOP_RATED, "Mieux notés")]
+
+    name = models.CharField(max_length=16, choices=NAMES, primary_key=True)
+    watermark = models.BigIntegerField(default=0)
+    epoch = models.DateTimeField(null=True)
+    time_refreshed = models.DateTimeField(null=True)
+
+    class Meta:
+        """Django metadata options for the Leaderboard model."""
+
+        verbose_name = "Leaderboard"
+        verbose_name_plural = "Leaderboards"
+
+    def __str__(self):
+        """Return the ranking's label."""
+        return self.get_name_display()
+
+
+class LeaderboardEntry(models.Model):
+    """
+    A ticket ranked on a Leaderboard; pages read them by descending score.
+
+    Fields:
+        leaderboard: The ranking.
+        ticket: The ranked ticket.
+        score: Ranking score (higher first); ties broken by ticket id.
+    """
+
+    leaderboard = models.ForeignKey(Leaderboard, on_delete=models.CASCADE, related_name="entries")
+    ticket = models.ForeignKey(Ticket, on_delete=models.CASCADE, related_name="+")
+    score = models.FloatField()
+
+    class Meta:
+        """Django metadata options for the LeaderboardEntry model."""
+
+        verbose_name = "Leaderboard entry"
+        verbose_name_plural = "Leaderboard entries"
+        constraints = [
+            UniqueConstraint(fields=["leaderboard", "ticket"], name="unique_leaderboard_ticket"),
+        ]
+        indexes = [
+            # Pages seek on (score, ticket) after the cursor, in this order
+            models.Index(fields=["leaderboard", "-score", "-ticket"], name="leaderboard_rank_idx"),
+        ]
+
+    def __str__(self):
+        """Return the ranking, ticket and score."""
+        return f"{self.leaderboard_id}: ticket {self.ticket_id} ({self.score:.3g})"
+
+
+MONTH_NAMES = (
+    "Janvier", "Février", "Mars", "Avril", "Mai", "Juin",
+    "Juillet", "Août", "Septembre", "Octobre", "Novembre", "Décembre",
+)
+
+
+class MonthlyPostCount(models.Model):
+    """
+    How many tickets and reviews a user wrote in a month ("Mes posts" archive).
+
+    Maintained by reviews.signals on every ticket / review created or deleted
+    through the ORM; see reviews.archive.
+
+    Fields:
+        user: The author.
+        month: First day of the month (current time zone).
+        ticket_count / review_count: Posts of that month still existing.
+    """
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+    month = models.DateField()
+    ticket_count = models.PositiveIntegerField(default=0)
+    review_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        """Django metadata options for the MonthlyPostCount model."""
+
+        verbose_name = "Monthly post count"
+        verbose_name_plural = "Monthly post counts"
+        constraints = [
+            # also the index the archive reads (user, then months in either order)
+            UniqueConstraint(fields=["user", "month"], name="unique_post_count_month"),
+        ]
+
+    def __str__(self):
+        """Return the author, month and counts."""
+        return f"{self.user_id} {self.month:%Y-%m}: {self.ticket_count} ticket(s), {self.review_count} review(s)"
+
+    @property
+    def total(self) -> int:
+        """Tickets and reviews of the month."""
+        return self.ticket_count + self.review_count
+
+    @property
+    def month_name(self) -> str:
+        """French name of the month (the site does not enable translations)."""
+        return MONTH_NAMES[self.month.month - 1]
+
+
+class RequestProfileStorage(FileSystemStorage):
+    """Private storage for profile captures, never under MEDIA_ROOT / Cloudinary."""
+
+    @property
+    def base_location(self):
+        """Follow settings.REQUEST_PROFILE_DIR (read on every access, not at import)."""
+        return str(settings.REQUEST_PROFILE_DIR)
+
+    @property
+    def location(self):
+        """Absolute path of base_location."""
+        return os.path.abspath(self.base_location)
+
+
+def request_profile_storage():
+    """Storage of RequestProfile.pstats_file."""
+    return RequestProfileStorage()
+
+
+class RequestProfile(models.Model):
+    """
+    cProfile capture of a single request, asked for by a staff member.
+
+    Created by LITRevu.perf.profiling.RequestProfilerMiddleware and browsed in
+    the admin.
+
+    Fields:
+        user: Staff member who asked for the capture.
+        view_name / method / path / status_code: What was profiled.
+        duration_ms: Wall time of the profiled part of the request.
+        pstats_file: Raw stats, loadable with ``pstats.Stats(path)`` or snakeviz.
+        summary: Rendered call tree ("flame summary") and top functions.
+        time_created: Timestamp set on creation.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name="+",
+    )
+    view_name = models.CharField(max_length=128, blank=True)
+    method = models.CharField(max_length=8)
+    path = models.CharField(max_length=2048)
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    pstats_file = models.FileField(upload_to="%Y/%m/", storage=request_profile_storage)
+    summary = models.TextField(blank=True)
+    time_created = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        """Django metadata options for the RequestProfile model."""
+
+        verbose_name = "Request profile"
+        verbose_name_plural = "Request profiles"
+        ordering = ["-time_created"]
+
+    def __str__(self):
+        """Return the profiled request and its duration."""
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
@@ -0,0 +1,421 @@
+"""
+"Recommandé pour vous": item-item collaborative filtering on review ratings.
+
+Reviews form a sparse user x ticket rating matrix. Each rating is centred
+on the middle of the scale (0-1 stars count against a ticket, 4-5 for it),
+so a review's contribution never depends on the reviewer's other ratings.
+Only each reviewer's MAX_ITEMS_PER_USER most recent reviews are used, so a
+very active reviewer cannot blow up the number of co-rated pairs.
+
+1. Similarity: the cosine of two tickets' rating columns, shrunk towards 0
+   when few users rated both (``count / (count + SHRINKAGE)``). Co-rated
+   pairs are generated with NumPy, one np.triu_indices per group of
+   reviewers with the same number of reviews, and summed by pair key. Only
+   the NEIGHBORS most similar tickets of each ticket are kept: the "model",
+   saved as ``.npz`` in settings.RECOMMENDATIONS_DIR.
+2. Scoring: a user's candidates are the neighbours of the tickets they
+   reviewed, scored by sum(similarity x centred rating). Reviewed and own
+   tickets are skipped; the best RECOMMENDATIONS_PER_USER are stored as
+   RecommendedTicket rows, so a page reads them with one indexed query.
+
+``manage.py build_recommendations`` runs the job. The first run (or
+``--full``) builds everything. Later runs read the ReviewChange log past
+the model's watermark, recompute only the similarity rows of the tickets
+whose reviews changed (patching them into their neighbours' lists too),
+then the recommendations of the users who reviewed those tickets. Other
+users' lists catch up at the next full run. Writes that bypass signals
+(bulk_create, reviews.seed) are not logged: run ``--full`` after them.
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+
+from .models import RecommendedTicket, Review, ReviewChange, Ticket
+
+NEIGHBORS = 20
+RECOMMENDATIONS_PER_USER = 20
+MAX_ITEMS_PER_USER = 200
+SHRINKAGE = 5.0
+MIDPOINT = 2.5
+# Co-rated pairs summed in memory at once (~30 bytes each): a full build
+# with more pairs than this splits them into partitions by ticket id
+PAIRS_IN_MEMORY = 10_000_000
+PAIR_CHUNK = 1_000_000
+SIMILARITY_BITS = 24
+
+MODEL_FILE = "item_neighbors.npz"
+
+
+@dataclass
+class Ratings:
+    """Reviews as parallel arrays, sorted by user then by review id."""
+
+    users: np.ndarray
+    tickets: np.ndarray
+    values: np.ndarray
+
+    @classmethod
+    def load(cls) -> "Ratings":
+        """Read (user, ticket, rating) of every review in one query."""
+        rows = Review.objects.order_by("user_id", "pk").values_list("user_id", "ticket_id", "rating")
+        data = np.array(list(rows.iterator(chunk_size=10_000)), dtype=np.int64).reshape(-1, 3)
+        return cls(users=data[:, 0], tickets=data[:, 1], values=data[:, 2] - MIDPOINT)
+
+    def user_slices(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(user ids, start offsets, review counts) of each user's run of reviews."""
+        return np.unique(self.users, return_index=True, return_counts=True)
+
+    def recent(self) -> "Ratings":
+        """Only each user's MAX_ITEMS_PER_USER most recent reviews."""
+        _, starts, counts = self.user_slices()
+        position = np.arange(len(self.users)) - np.repeat(starts, counts)
+        keep = position >= np.repeat(counts - MAX_ITEMS_PER_USER, counts)
+        return Ratings(self.users[keep], self.tickets[keep], self.values[keep])
+
+    def norms(self) -> tuple[np.ndarray, np.ndarray]:
+        """(ticket ids, Euclidean norm of each ticket's centred rating column)."""
+        tickets, inverse = np.unique(self.tickets, return_inverse=True)
+        return tickets, np.sqrt(np.bincount(inverse, weights=self.values ** 2))
+
+
+@dataclass
+class ItemModel:
+    """The NEIGHBORS most similar tickets of each ticket; neighbour id 0 marks an empty slot."""
+
+    ticket_ids: np.ndarray
+    neighbors: np.ndarray
+    similarities: np.ndarray
+    # Last ReviewChange id reflected in the model
+    watermark: int = 0
+
+    @staticmethod
+    def path() -> Path:
+        """Location of the saved model."""
+        return Path(settings.RECOMMENDATIONS_DIR) / MODEL_FILE
+
+    @classmethod
+    def load(cls) -> "ItemModel | None":
+        """The saved model, None when there is none yet."""
+        try:
+            with np.load(cls.path()) as data:
+                return cls(data["ticket_ids"], data["neighbors"], data["similarities"], int(data["watermark"]))
+        except FileNotFoundError:
+            return None
+
+    @classmethod
+    def saved_watermark(cls) -> int | None:
+        """Watermark of the saved model, read without its arrays; None when there is no model yet."""
+        try:
+            with np.load(cls.path()) as data:
+                return int(data["watermark"])
+        except FileNotFoundError:
+            return None
+
+    def save(self) -> None:
+        """Write the model to a temporary file, then move it in place."""
+        path = self.path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_name(f"partial-{MODEL_FILE}")
+        np.savez(
+            partial,
+            ticket_ids=self.ticket_ids,
+            neighbors=self.neighbors,
+            similarities=self.similarities,
+            watermark=np.int64(self.watermark),
+        )
+        os.replace(partial, path)
+
+    def rows(self, tickets: np.ndarray) -> np.ndarray:
+        """Row of each ticket id, -1 for tickets the model does not know."""
+        if not len(self.ticket_ids):
+            return np.full(len(tickets), -1)
+        index = np.minimum(np.searchsorted(self.ticket_ids, tickets), len(self.ticket_ids) - 1)
+        return np.where(self.ticket_ids[index] == tickets, index, -1)
+
+    def replace_rows(self, tickets: np.ndarray, neighbors: np.ndarray, similarities: np.ndarray) -> None:
+        """Overwrite the rows of `tickets`, adding the ones the model does not know yet."""
+        missing = np.setdiff1d(tickets, self.ticket_ids)
+        if len(missing):
+            ticket_ids = np.concatenate([self.ticket_ids, missing])
+            order = np.argsort(ticket_ids, kind="stable")
+            self.ticket_ids = ticket_ids[order]
+            self.neighbors = np.concatenate([self.neighbors, np.zeros((len(missing), NEIGHBORS), np.int64)])[order]
+            self.similarities = np.concatenate(
+                [self.similarities, np.zeros((len(missing), NEIGHBORS), np.float32)]
+            )[order]
+        rows = self.rows(tickets)
+        self.neighbors[rows] = neighbors
+        self.similarities[rows] = similarities
+
+
+def _sum_by_key(keys: np.ndarray, products: np.ndarray):
+    """Sum the products of identical pair keys: (unique keys, sums, number of products)."""
+    if not len(keys):
+        return keys, products.astype(np.float64), np.empty(0)
+    order = np.argsort(keys)
+    keys, products = keys[order], products[order]
+    starts = np.flatnonzero(np.concatenate([[True], keys[1:] != keys[:-1]]))
+    counts = np.diff(np.append(starts, len(keys))).astype(np.float64)
+    return keys[starts], np.add.reduceat(products.astype(np.float64), starts), counts
+
+
+def _pair_batches(ratings: Ratings, span: np.int64):
+    """
+    Yield (pair keys, products) over every pair of tickets co-rated by a user.
+
+    A key packs (smaller ticket id, larger ticket id) into one int64 as
+    ``low * span + high``. Users with the same number of reviews share one
+    np.triu_indices, and batches hold about PAIR_CHUNK pairs.
+    """
+    _, starts, counts = ratings.user_slices()
+    for size in np.unique(counts[counts > 1]):
+        first, second = np.triu_indices(size, k=1)
+        group = starts[counts == size]
+        step = max(1, PAIR_CHUNK // len(first))
+        for offset in range(0, len(group), step):
+            bases = group[offset:offset + step, None]
+            left, right = (bases + first).ravel(), (bases + second).ravel()
+            low = np.minimum(ratings.tickets[left], ratings.tickets[right])
+            high = np.maximum(ratings.tickets[left], ratings.tickets[right])
+            yield low * span + high, ratings.values[left] * ratings.values[right]
+
+
+def _cosine(ratings: Ratings, low, high, dots, counts) -> np.ndarray:
+    """Shrunk cosine similarity of the ticket pairs (low, high) from their dot products and co-rating counts."""
+    tickets, norms = ratings.norms()
+    denominator = norms[np.searchsorted(tickets, low)] * norms[np.searchsorted(tickets, high)]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cosine = np.where(denominator > 0, dots / denominator, 0.0)
+    return cosine * counts / (counts + SHRINKAGE)
+
+
+def _top_neighbors(rows: np.ndarray, cols: np.ndarray, sims: np.ndarray):
+    """
+    Keep the NEIGHBORS best (col, sim) of each row, similarity > 0.
+
+    Returns (row ids, neighbours matrix, similarities matrix), one line per
+    distinct row, padded with 0 / 0.0. Rows and similarities are packed into
+    one int64 sort key (similarities quantized to 2**-SIMILARITY_BITS), which
+    sorts several times faster than np.lexsort on two keys.
+    """
+    positive = sims > 0
+    rows, cols, sims = rows[positive], cols[positive], sims[positive]
+    scale = (1 << SIMILARITY_BITS) - 1
+    order = np.argsort((rows << SIMILARITY_BITS) | np.floor((1 - sims) * scale).astype(np.int64))
+    rows, cols, sims = rows[order], cols[order], sims[order]
+    row_ids, starts, counts = np.unique(rows, return_index=True, return_counts=True)
+    position = np.arange(len(rows)) - np.repeat(starts, counts)
+    keep = position < NEIGHBORS
+    line = np.repeat(np.arange(len(row_ids)), counts)[keep]
+    neighbors = np.zeros((len(row_ids), NEIGHBORS), np.int64)
+    similarities = np.zeros((len(row_ids), NEIGHBORS), np.float32)
+    neighbors[line, position[keep]] = cols[keep]
+    similarities[line, position[keep]] = sims[keep]
+    return row_ids, neighbors, similarities
+
+
+def build_model(ratings: Ratings) -> ItemModel:
+    """
+    Item-item neighbours of every reviewed ticket, from (recent) ratings.
+
+    Beyond PAIRS_IN_MEMORY co-rated pairs, pairs are summed one partition of
+    smaller ticket ids at a time, and neighbours selected one partition of
+    row ids at a time, so memory stays bounded whatever the dataset size.
+    """
+    span = np.int64(ratings.tickets.max(initial=0) + 1)
+    _, _, sizes = ratings.user_slices()
+    partitions = max(1, -(-int((sizes * (sizes - 1) // 2).sum()) // PAIRS_IN_MEMORY))
+
+    similar = []
+    for partition in range(partitions):
+        batches = []
+        for keys, products in _pair_batches(ratings, span):
+            if partitions > 1:
+                mine = (keys // span) % partitions == partition
+                keys, products = keys[mine], products[mine]
+            batches.append((keys, products.astype(np.float32)))
+        keys, dots, counts = _sum_by_key(
+            np.concatenate([np.empty(0, np.int64), *(keys for keys, _ in batches)]),
+            np.concatenate([np.empty(0, np.float32), *(products for _, products in batches)]),
+        )
+        del batches
+        low, high = keys // span, keys % span
+        sims = _cosine(ratings, low, high, dots, counts).astype(np.float32)
+        positive = sims > 0
+        similar.append((low[positive], high[positive], sims[positive]))
+    low, high, sims = (np.concatenate(parts) for parts in zip(*similar))
+    del similar
+
+    ticket_ids = np.unique(ratings.tickets)
+    model = ItemModel(
+        ticket_ids,
+        np.zeros((len(ticket_ids), NEIGHBORS), np.int64),
+        np.zeros((len(ticket_ids), NEIGHBORS), np.float32),
+    )
+    for partition in range(partitions):
+        forward = low % partitions == partition
+        backward = high % partitions == partition
+        model.replace_rows(*_top_neighbors(
+            np.concatenate([low[forward], high[backward]]),
+            np.concatenate([high[forward], low[backward]]),
+            np.concatenate([sims[forward], sims[backward]]),
+        ))
+    return model
+
+
+def update_model(model: ItemModel, ratings: Ratings, tickets: np.ndarray) -> None:
+    """
+    Recompute the similarity rows of `tickets` from (recent) ratings, in place.
+
+    Pairs (ticket, other) come from the reviewers of each ticket only. In
+    the other rows, the tickets are removed, then re-inserted with their new
+    similarity where it makes the top NEIGHBORS (a ticket that drops out is
+    not replaced by the next best one until the next full build).
+    """
+    users, starts, counts = ratings.user_slices()
+    user_line = np.searchsorted(users, ratings.users)
+    dirty = np.flatnonzero(np.isin(ratings.tickets, tickets))
+    # Pair each review of a dirty ticket with every other review of its author
+    sizes = counts[user_line[dirty]]
+    offsets = np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    left = np.repeat(dirty, sizes)
+    right = np.repeat(starts[user_line[dirty]], sizes) + offsets
+    other = left != right
+    left, right = left[other], right[other]
+
+    span = np.int64(ratings.tickets.max(initial=0) + 1)
+    keys, dots, co_counts = _sum_by_key(
+        ratings.tickets[left] * span + ratings.tickets[right],
+        ratings.values[left] * ratings.values[right],
+    )
+    source, target = keys // span, keys % span
+    sims = _cosine(ratings, source, target, dots, co_counts)
+
+    def clear(ticket_ids):
+        empty = np.zeros((len(ticket_ids), NEIGHBORS))
+        model.replace_rows(ticket_ids, empty.astype(np.int64), empty)
+
+    # Other rows: drop the dirty tickets, merge their new similarities back in
+    stale = np.isin(model.neighbors, tickets) & ~np.isin(model.ticket_ids, tickets)[:, None]
+    model.neighbors[stale], model.similarities[stale] = 0, 0.0
+    reverse = ~np.isin(target, tickets)
+    touched = np.union1d(np.flatnonzero(stale.any(axis=1)), model.rows(np.unique(target[reverse])))
+    touched = touched[touched >= 0]
+    line, slot = np.nonzero(model.neighbors[touched])
+    rows = np.concatenate([model.ticket_ids[touched][line], target[reverse]])
+    cols = np.concatenate([model.neighbors[touched][line, slot], source[reverse]])
+    values = np.concatenate([model.similarities[touched][line, slot], sims[reverse]])
+    clear(model.ticket_ids[touched])
+    model.replace_rows(*_top_neighbors(rows, cols, values))
+
+    # The dirty tickets' own rows
+    clear(tickets)
+    model.replace_rows(*_top_neighbors(source, target, sims))
+
+
+def recommend(model: ItemModel, ratings: Ratings, recent: Ratings, users) -> list[RecommendedTicket]:
+    """Unsaved RecommendedTicket rows for `users` (ids), best first."""
+    # Deleted tickets are missing here: treated as the user's own, so skipped
+    owners = dict(Ticket.objects.values_list("pk", "user_id").iterator(chunk_size=10_000))
+    all_users, all_starts, all_counts = ratings.user_slices()
+    recent_users, recent_starts, recent_counts = recent.user_slices()
+    results = []
+    for user_id in users:
+        line = np.searchsorted(recent_users, user_id)
+        if line >= len(recent_users) or recent_users[line] != user_id:
+            continue
+        window = slice(recent_starts[line], recent_starts[line] + recent_counts[line])
+        rows = model.rows(recent.tickets[window])
+        known = rows >= 0
+        neighbors = model.neighbors[rows[known]].ravel()
+        weights = (model.similarities[rows[known]] * recent.values[window][known, None]).ravel()
+        line = np.searchsorted(all_users, user_id)
+        reviewed = ratings.tickets[all_starts[line]:all_starts[line] + all_counts[line]]
+        candidates, inverse = np.unique(neighbors, return_inverse=True)
+        scores = np.bincount(inverse, weights=weights)
+        eligible = (candidates > 0) & (scores > 0) & ~np.isin(candidates, reviewed)
+        ranked = 0
+        for index in np.lexsort((candidates, -scores)):
+            ticket_id = int(candidates[index])
+            if not eligible[index] or owners.get(ticket_id, user_id) == user_id:
+                continue
+            ranked += 1
+            results.append(
+                RecommendedTicket(user_id=int(user_id), ticket_id=ticket_id, score=float(scores[index]), rank=ranked)
+            )
+            if ranked == RECOMMENDATIONS_PER_USER:
+                break
+    return results
+
+
+@dataclass
+class RefreshResult:
+    """What a run of refresh() did."""
+
+    full: bool
+    changes: int
+    tickets: int
+    users: int
+    recommendations: int
+
+
+def refresh(full: bool = False, batch_size: int = 2000) -> RefreshResult:
+    """
+    Bring the model and the stored recommendations up to date.
+
+    Incremental unless `full` or when no model was saved yet. The database
+    rows are replaced in one transaction, then the model is saved: a crash
+    in between only makes the next run process the same changes again.
+    """
+    model = None if full else ItemModel.load()
+    rebuild = model is None
+    if rebuild:
+        # Read first: changes logged while the model builds are processed next time
+        watermark = ReviewChange.objects.aggregate(last=Max("pk"))["last"] or 0
+        ratings = Ratings.load()
+        recent = ratings.recent()
+        model = build_model(recent)
+        model.watermark = watermark
+        users = np.unique(ratings.users)
+        changes, tickets = 0, len(model.ticket_ids)
+    else:
+        log = np.array(
+            ReviewChange.objects.filter(pk__gt=model.watermark).values_list("pk", "ticket_id", "user_id"),
+            dtype=np.int64,
+        ).reshape(-1, 3)
+        if not len(log):
+            return RefreshResult(full=False, changes=0, tickets=0, users=0, recommendations=0)
+        ratings = Ratings.load()
+        recent = ratings.recent()
+        dirty = np.unique(log[:, 1])
+        update_model(model, recent, dirty)
+        model.watermark = int(log[:, 0].max())
+        users = np.union1d(log[:, 2], ratings.users[np.isin(ratings.tickets, dirty)])
+        changes, tickets = len(log), len(dirty)
+
+    recommendations = recommend(model, ratings, recent, users)
+    with transaction.atomic():
+        if rebuild:
+            RecommendedTicket.objects.all().delete()
+        else:
+            for start in range(0, len(users), batch_size):
+                RecommendedTicket.objects.filter(user_id__in=users[start:start + batch_size].tolist()).delete()
+        RecommendedTicket.objects.bulk_create(recommendations, batch_size=batch_size)
+    model.save()
+    return RefreshResult(
+        full=rebuild, changes=changes, tickets=tickets, users=len(users), recommendations=len(recommendations)
+    )
+
+
+def recommended_tickets(user, limit: int = 5) -> list[Ticket]:
+    """The `limit` best tickets recommended to `user` (one indexed query, author included)."""
+    picks = RecommendedTicket.objects.filter(user=user).select_related("ticket__user").order_by("rank")[:limit]
+    return [pick.ticket for pick in picks]
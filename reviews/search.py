@@ -0,0 +1,193 @@
+"""
+Full-text search over tickets and reviews (SQLite FTS5).
+
+The ``reviews_search`` virtual table (migration 0009) indexes ticket title,
+author and description and review headline and body, accent-insensitively
+(unicode61, remove_diacritics 2). Triggers keep it in sync with every write,
+so nothing in Python has to remember to reindex.
+
+Visibility is part of the full-text query: every row carries ``audience``
+tokens (``u<author id>``, and ``t<ticket owner id>`` for reviews), and the
+viewer's query ANDs the typed words with ``u<self> OR u<followed>... OR
+t<self>``. FTS5 intersects the doclists before scoring, so bm25 only runs on
+rows the viewer may see; filtering on UNINDEXED columns instead read every
+matching row and was 15-30x slower on common words.
+
+A search runs in three statements:
+1. the ids of the followed users (to build the audience clause);
+2. ranking: bm25 (title weighs more than author, author more than body),
+   ordered by (score, rowid) and keyset-paginated on that pair - a deep
+   page costs the same as the first one, no OFFSET;
+3. highlighting: highlight() / snippet() only for the rows of the page.
+
+Matched text is wrapped in control characters by SQLite, then escaped and
+turned into ``<mark>`` here, so user content can never inject HTML.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+
+from django.db import connection
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from users.models import UserFollows
+
+from .models import Review, Ticket
+
+PAGE_SIZE = 20
+MAX_TERMS = 8
+SNIPPET_TOKENS = 24
+
+# bm25 column weights: title, author, body, audience
+BM25_WEIGHTS = "10.0, 5.0, 1.0, 0.0"
+TEXT_COLUMNS = "{title author body}"
+
+# Highlight delimiters: cannot appear in indexed words, escaped text or markup
+_MARK_START, _MARK_END = "\x02", "\x03"
+
+_RANK_SQL = f"""
+    SELECT rowid, kind, object_id, bm25(reviews_search, {BM25_WEIGHTS}) AS score
+    FROM reviews_search
+    WHERE reviews_search MATCH %s
+      {{after}}
+    ORDER BY score, rowid
+    LIMIT %s
+"""
+_AFTER_SQL = (
+    f"AND (bm25(reviews_search, {BM25_WEIGHTS}) > %s "
+    f"OR (bm25(reviews_search, {BM25_WEIGHTS}) = %s AND rowid > %s))"
+)
+
+# "+rowid" keeps SQLite from seeking each rowid in the index: a seek rebuilds
+# the whole doclist of a prefix term ("roman"*) every time, ~50 ms per row
+# on 1M documents, while scanning the viewer's matches again is one pass.
+_HIGHLIGHT_SQL = f"""
+    SELECT rowid,
+           highlight(reviews_search, 0, '{_MARK_START}', '{_MARK_END}'),
+           snippet(reviews_search, 2, '{_MARK_START}', '{_MARK_END}', '…', {SNIPPET_TOKENS})
+    FROM reviews_search
+    WHERE reviews_search MATCH %s AND +rowid IN ({{rowids}})
+"""
+
+
+@dataclass
+class SearchHit:
+    """One ranked result; `obj` is the Ticket or Review, `title` / `snippet` are safe HTML."""
+
+    kind: str
+    object_id: int
+    score: float
+    rowid: int
+    title: str = ""
+    snippet: str = ""
+    obj: Ticket | Review | None = None
+
+
+@dataclass
+class SearchPage:
+    """A page of results and the cursor of the next one (None on the last page)."""
+
+    query: str
+    hits: list[SearchHit] = field(default_factory=list)
+    next_cursor: str | None = None
+
+
+def match_expression(text: str) -> str | None:
+    """
+    FTS5 query for free user input: every word must match, the last one as a prefix.
+
+    Words are quoted, so FTS5 operators typed by the user (AND, NEAR, col:...)
+    are searched as plain words and can never cause a syntax error. Only the
+    text columns are searched, never the audience tokens.
+    """
+    terms = re.findall(r"\w+", text)[:MAX_TERMS]
+    if not terms:
+        return None
+    return f"{TEXT_COLUMNS} : (" + " ".join(f'"{term}"' for term in terms) + "*)"
+
+
+def audience_expression(viewer) -> str:
+    """FTS5 clause matching the rows `viewer` sees in the feed: own and followed posts, answers to own tickets."""
+    followed = UserFollows.objects.filter(user=viewer).values_list("followed_user_id", flat=True)
+    tokens = [f"u{viewer.pk}", f"t{viewer.pk}", *(f"u{user_id}" for user_id in followed)]
+    return "audience : (" + " OR ".join(tokens) + ")"
+
+
+def encode_cursor(hit: SearchHit) -> str:
+    """Opaque position after `hit` (its bm25 score and rowid)."""
+    return f"{hit.score!r}~{hit.rowid}"
+
+
+def decode_cursor(value: str | None) -> tuple[float, int] | None:
+    """(score, rowid) of a cursor, None when absent or malformed (first page)."""
+    if not value:
+        return None
+    try:
+        score, rowid = value.split("~")
+        return float(score), int(rowid)
+    except ValueError:
+        return None
+
+
+def _markup(fragment: str) -> str:
+    """Escape indexed text and turn the highlight delimiters into <mark>."""
+    html = escape(fragment or "").replace(_MARK_START, "<mark>").replace(_MARK_END, "</mark>")
+    return mark_safe(html)
+
+
+def search(viewer, text: str, cursor: str | None = None, limit: int = PAGE_SIZE) -> SearchPage:
+    """Ranked page of the tickets and reviews `viewer` can see that match `text`."""
+    page = SearchPage(query=text)
+    match = match_expression(text)
+    if match is None:
+        return page
+
+    match = f"{match} AND {audience_expression(viewer)}"
+    params = [match]
+    after = decode_cursor(cursor)
+    if after is not None:
+        params += [after[0], after[0], after[1]]
+    with connection.cursor() as db:
+        db.execute(_RANK_SQL.format(after=_AFTER_SQL if after else ""), [*params, limit + 1])
+        rows = db.fetchall()
+    page.hits = [SearchHit(kind, object_id, score, rowid) for rowid, kind, object_id, score in rows[:limit]]
+    if len(rows) > limit:
+        page.next_cursor = encode_cursor(page.hits[-1])
+    if not page.hits:
+        return page
+
+    with connection.cursor() as db:
+        db.execute(_HIGHLIGHT_SQL.format(rowids=", ".join(["%s"] * len(page.hits))),
+                   [match, *(hit.rowid for hit in page.hits)])
+        highlights = {rowid: (title, snippet) for rowid, title, snippet in db.fetchall()}
+
+    tickets = Ticket.objects.select_related("user").in_bulk(
+        [hit.object_id for hit in page.hits if hit.kind == "ticket"]
+    )
+    reviews = Review.objects.select_related("user", "ticket__user").in_bulk(
+        [hit.object_id for hit in page.hits if hit.kind == "review"]
+    )
+    for hit in page.hits:
+        title, snippet = highlights.get(hit.rowid, ("", ""))
+        hit.title, hit.snippet = _markup(title), _markup(snippet)
+        hit.obj = (tickets if hit.kind == "ticket" else reviews).get(hit.object_id)
+    # A row deleted between the two statements
+    page.hits = [hit for hit in page.hits if hit.obj is not None]
+    return page
+
+
+def matching_ids_sql(text: str, kind: str) -> tuple[str, list] | None:
+    """SQL (and params) selecting the ids of every `kind` row matching `text`, for pk__in=RawSQL(...)."""
+    match = match_expression(text)
+    if match is None:
+        return None
+    return "SELECT object_id FROM reviews_search WHERE reviews_search MATCH %s AND kind = %s", [match, kind]
+
+
+def optimize_index(using=None) -> None:
+    """Merge the index b-trees (worth it after bulk loads); `using` defaults to the default connection."""
+    with (using or connection).cursor() as db:
+        db.execute("INSERT INTO reviews_search(reviews_search) VALUES ('optimize')")
@@ -0,0 +1,371 @@
+"""
+Synthetic LITRevu dataset for load tests and benchmarks.
+
+``Seeder`` generates, from a single random seed:
+- users sharing one password (SEED_PASSWORD, hashed once),
+- a power-law follow graph: out-degrees follow a Pareto law and targets are
+  drawn by preferential attachment, so a few accounts have most followers,
+- tickets owned mostly by a minority of active users, with optional
+  generated cover images,
+- reviews: "standalone" critiques by the ticket's own author plus answers by
+  other users, with a J-shaped rating distribution,
+- timestamps over the last ``days`` days, denser towards the present.
+
+Rows are written with bulk_create in transactions of ``chunk_size`` objects
+and explicit primary keys (no RETURNING round-trips). The same seed and the
+same ``until`` produce the same rows.
+
+bulk_create sends no signal, so the tickets' review aggregates are
+computed afterwards by reviews.ticket_stats.reconcile(), the tickets
+attached to their books by reviews.books.assign_books() and the posts
+counted in the monthly archive by reviews.archive.rebuild().
+
+Presets (PRESETS) are shared by ``manage.py seed_litrevu`` and the
+benchmarks.
+"""
+
+from __future__ import annotations
+
+import io
+import random
+from bisect import bisect
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+from itertools import accumulate
+from typing import Callable, Iterator
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from reviews.archive import rebuild as rebuild_archive
+from reviews.books import assign_books
+from reviews.models import LeaderboardEntry, MonthlyPostCount, RecommendedTicket, Review, Ticket
+from reviews.search import optimize_index
+from reviews.ticket_stats import reconcile
+from users.models import UserFollows
+
+# Password of every generated account (load tests log in with it)
+SEED_PASSWORD = "litrevu-seed"
+
+# Share of each rating 0..5 among reviews (J-shaped, like most rating sites)
+RATING_WEIGHTS = (2, 3, 7, 18, 35, 35)
+
+IMAGE_POOL_SIZE = 24
+IMAGE_DIR = "ticket_images/seed"
+
+_WORDS = (
+    "roman", "essai", "poésie", "histoire", "voyage", "mémoire", "lumière", "nuit", "jardin", "mer",
+    "ville", "silence", "temps", "guerre", "amour", "enfance", "secret", "chemin", "hiver", "été",
+    "lettre", "musique", "science", "philosophie", "mystère", "île", "montagne", "rêve", "famille", "exil",
+)
+_AUTHORS = (
+    "Annie Ernaux", "Albert Camus", "Marguerite Duras", "Victor Hugo", "Colette", "Émile Zola",
+    "Simone de Beauvoir", "Jules Verne", "George Sand", "Marcel Proust", "Leïla Slimani", "Patrick Modiano",
+)
+
+
+@dataclass(frozen=True)
+class SeedConfig:
+    """Size and shape of a generated dataset."""
+
+    users: int
+    avg_follows: float
+    max_follows: int
+    tickets: int
+    # Share of tickets created together with their author's own review ("standalone" critiques)
+    self_review_ratio: float = 0.4
+    # Mean number of reviews by other users per ticket
+    avg_answers: float = 0.8
+    image_ratio: float = 0.0
+    days: int = 365
+    seed: int = 42
+    batch_size: int = 1000
+    chunk_size: int = 50_000
+
+
+PRESETS: dict[str, SeedConfig] = {
+    # ~6k rows: unit-sized, seconds
+    "small": SeedConfig(users=200, avg_follows=12, max_follows=100, tickets=2_000),
+    # ~270k rows: well under a minute
+    "medium": SeedConfig(users=5_000, avg_follows=30, max_follows=1_000, tickets=60_000),
+    # ~4.5M rows: minutes
+    "large": SeedConfig(users=50_000, avg_follows=50, max_follows=5_000, tickets=1_000_000),
+}
+
+
+def get_config(preset: str, **overrides) -> SeedConfig:
+    """A preset with some fields replaced (None values are ignored)."""
+    return replace(PRESETS[preset], **{key: value for key, value in overrides.items() if value is not None})
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Let bulk_create keep the time_created values we generate (auto_now_add off)."""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields if getattr(field, "auto_now_add", False)
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+@contextmanager
+def relaxed_durability():
+    """PRAGMA synchronous=OFF while seeding SQLite (throwaway data, far fewer fsyncs)."""
+    # SQLite refuses to change it inside a transaction (e.g. a TestCase)
+    if connection.vendor != "sqlite" or connection.in_atomic_block:
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA synchronous")
+        previous = cursor.fetchone()[0]
+        cursor.execute("PRAGMA synchronous = OFF")
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA synchronous = {int(previous)}")
+
+
+class Seeder:
+    """Generate and insert one dataset."""
+
+    def __init__(
+        self,
+        config: SeedConfig,
+        prefix: str = "seed",
+        until: datetime | None = None,
+        progress: Callable[[str], None] | None = None,
+    ):
+        """`until` anchors every timestamp (default: now, to the hour)."""
+        self.config = config
+        self.prefix = prefix
+        self.until = until or timezone.now().replace(minute=0, second=0, microsecond=0)
+        self.progress = progress or (lambda message: None)
+        self.rng = random.Random(config.seed)
+        self.counts = {"users": 0, "follows": 0, "tickets": 0, "reviews": 0}
+
+    # Helpers --------------------------------------------------------------
+
+    def _moment(self, skew=1.6):
+        """A datetime in the window, skewed towards `until` (recent activity is denser)."""
+        seconds = self.config.days * 86_400 * (self.rng.random() ** skew)
+        return self.until - timedelta(seconds=seconds)
+
+    def _sentence(self, words):
+        return " ".join(self.rng.choice(_WORDS) for _ in range(words)).capitalize()
+
+    def _pareto_weights(self, count, shape):
+        """Cumulative heavy-tailed weights (Pareto), one per item, for bisect() draws."""
+        weights = [self.rng.paretovariate(shape) for _ in range(count)]
+        return list(accumulate(weights))
+
+    def _insert(self, model, objects: Iterator, label):
+        """bulk_create in transactions of chunk_size objects."""
+        chunk = []
+        for obj in objects:
+            chunk.append(obj)
+            if len(chunk) >= self.config.chunk_size:
+                self._flush(model, chunk, label)
+                chunk = []
+        if chunk:
+            self._flush(model, chunk, label)
+
+    def _flush(self, model, chunk, label):
+        with transaction.atomic():
+            model.objects.bulk_create(chunk, batch_size=self.config.batch_size)
+        self.counts[label] += len(chunk)
+        self.progress(f"{label}: {self.counts[label]:,}")
+
+    @staticmethod
+    def _next_pk(model):
+        return (model.objects.aggregate(top=Max("pk"))["top"] or 0) + 1
+
+    # Generation -----------------------------------------------------------
+
+    def run(self) -> dict[str, int]:
+        """Generate everything; returns the number of rows per table."""
+        with relaxed_durability(), explicit_timestamps(Ticket, Review):
+            user_ids = self.create_users()
+            self.create_follows(user_ids)
+            first_ticket = self._next_pk(Ticket)
+            self.create_tickets_and_reviews(user_ids)
+            # bulk_create sends no signal: compute the tickets' review aggregates now
+            self.progress("reconciling ticket review aggregates")
+            reconcile(Ticket.objects.filter(pk__gte=first_ticket))
+            # nor goes through Ticket.save(): attach the tickets to their books
+            self.progress("attaching tickets to their books")
+            assign_books(Ticket.objects.filter(pk__gte=first_ticket))
+            # nor through the archive counters: count the new users' posts per month
+            if user_ids:
+                self.progress("counting posts per month")
+                rebuild_archive(get_user_model().objects.filter(pk__gte=user_ids[0]))
+        if connection.vendor == "sqlite":
+            with connection.cursor() as cursor:
+                cursor.execute("PRAGMA optimize")
+            # the triggers indexed every row one by one: merge the FTS b-trees
+            optimize_index()
+        return self.counts
+
+    def create_users(self) -> list[int]:
+        """Users <prefix>_0000001...; the password is hashed once for all of them."""
+        User = get_user_model()
+        first = self._next_pk(User)
+        password = make_password(SEED_PASSWORD)
+        joined_from = self.until - timedelta(days=self.config.days * 1.2)
+        ids = list(range(first, first + self.config.users))
+
+        def users():
+            for index, pk in enumerate(ids, start=1):
+                yield User(
+                    pk=pk,
+                    username=f"{self.prefix}_{index:07d}",
+                    password=password,
+                    date_joined=joined_from + timedelta(seconds=self.rng.random() * self.config.days * 86_400),
+                )
+
+        self._insert(User, users(), "users")
+        return ids
+
+    def create_follows(self, user_ids):
+        """Pareto out-degrees, targets by preferential attachment (popular accounts attract follows)."""
+        config = self.config
+        popularity = self._pareto_weights(len(user_ids), shape=1.2)
+        # Pareto(1.5, xm) has mean 3 * xm
+        scale = config.avg_follows / 3
+
+        def follows():
+            for follower in user_ids:
+                degree = min(int(scale * self.rng.paretovariate(1.5)), config.max_follows, len(user_ids) - 1)
+                targets = set()
+                # a bounded number of draws: popular targets are drawn again and again
+                for _ in range(degree * 3):
+                    if len(targets) >= degree:
+                        break
+                    target = user_ids[bisect(popularity, self.rng.random() * popularity[-1])]
+                    if target != follower:
+                        targets.add(target)
+                for target in sorted(targets):
+                    yield UserFollows(user_id=follower, followed_user_id=target)
+
+        self._insert(UserFollows, follows(), "follows")
+
+    def create_tickets_and_reviews(self, user_ids):
+        """Tickets by activity-weighted owners, each chunk followed by its reviews."""
+        config = self.config
+        activity = self._pareto_weights(len(user_ids), shape=1.5)
+        images = self.image_pool() if config.image_ratio > 0 else []
+        first = self._next_pk(Ticket)
+        last = first + config.tickets
+
+        for start in range(first, last, config.chunk_size):
+            tickets = []
+            for pk in range(start, min(start + config.chunk_size, last)):
+                owner = user_ids[bisect(activity, self.rng.random() * activity[-1])]
+                with_image = images and self.rng.random() < config.image_ratio
+                tickets.append(Ticket(
+                    pk=pk,
+                    user_id=owner,
+                    title=self._sentence(self.rng.randint(1, 5)),
+                    author=self.rng.choice(_AUTHORS) if self.rng.random() < 0.8 else "",
+                    description=self._sentence(self.rng.randint(0, 30)),
+                    image=self.rng.choice(images) if with_image else None,
+                    time_created=self._moment(),
+                ))
+            self._flush(Ticket, tickets, "tickets")
+            self._insert(Review, self.reviews_for(tickets, user_ids, activity), "reviews")
+
+    def reviews_for(self, tickets, user_ids, activity):
+        """Own review of standalone critiques, then answers by other (active) users."""
+        config = self.config
+        ratings = list(accumulate(RATING_WEIGHTS))
+        # geometric number of answers with the configured mean
+        stop = 1 / (1 + config.avg_answers)
+
+        def review(user_id, ticket, created):
+            return Review(
+                user_id=user_id,
+                ticket_id=ticket.pk,
+                rating=bisect(ratings, self.rng.random() * ratings[-1]),
+                headline=self._sentence(self.rng.randint(2, 6)),
+                body=self._sentence(self.rng.randint(0, 60)),
+                time_created=created,
+            )
+
+        for ticket in tickets:
+            if self.rng.random() < config.self_review_ratio:
+                yield review(ticket.user_id, ticket, ticket.time_created + timedelta(seconds=1))
+            reviewers = {ticket.user_id}
+            while self.rng.random() > stop and len(reviewers) < len(user_ids):
+                reviewer = user_ids[bisect(activity, self.rng.random() * activity[-1])]
+                if reviewer in reviewers:
+                    continue
+                reviewers.add(reviewer)
+                delay = timedelta(seconds=self.rng.expovariate(1 / (2 * 86_400)))
+                yield review(reviewer, ticket, min(ticket.time_created + delay, self.until))
+
+    def image_pool(self) -> list[str]:
+        """A few generated covers in the default storage, shared by every ticket with an image."""
+        from PIL import Image, ImageDraw
+
+        names = []
+        for index in range(IMAGE_POOL_SIZE):
+            name = f"{IMAGE_DIR}/cover_{self.config.seed}_{index:02d}.png"
+            if not default_storage.exists(name):
+                color = tuple(self.rng.randrange(40, 220) for _ in range(3))
+                image = Image.new("RGB", (240, 360), color)
+                ImageDraw.Draw(image).rectangle((20, 40, 220, 120), fill=(250, 250, 245))
+                buffer = io.BytesIO()
+                image.save(buffer, format="PNG")
+                default_storage.save(name, ContentFile(buffer.getvalue()))
+            names.append(name)
+        return names
+
+
+def delete_seeded(prefix: str = "seed") -> int:
+    """
+    Delete the users created with `prefix` and everything they own.
+
+    Reviews, leaderboard entries and recommendations of their tickets,
+    tickets, follows and archive counters are removed with one DELETE each:
+    going through the ORM collector would load millions of rows. Returns the
+    number of accounts deleted.
+    """
+    User = get_user_model()
+    quote = connection.ops.quote_name
+    users, tickets = quote(User._meta.db_table), quote(Ticket._meta.db_table)
+    reviews, follows = quote(Review._meta.db_table), quote(UserFollows._meta.db_table)
+    archive, entries = quote(MonthlyPostCount._meta.db_table), quote(LeaderboardEntry._meta.db_table)
+    recommended = quote(RecommendedTicket._meta.db_table)
+    seeded = f"SELECT id FROM {users} WHERE username LIKE %s ESCAPE '\\'"
+    pattern = prefix.replace("\\", "\\\\").replace("_", "\\_").replace("%", "\\%") + "\\_%"
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {reviews} WHERE user_id IN ({seeded}) "
+            f"OR ticket_id IN (SELECT id FROM {tickets} WHERE user_id IN ({seeded}))",
+            [pattern, pattern],
+        )
+        # rows with a foreign key constraint on the tickets go first (as in reviews.bulk.delete_posts)
+        seeded_tickets = f"SELECT id FROM {tickets} WHERE user_id IN ({seeded})"
+        cursor.execute(f"DELETE FROM {entries} WHERE ticket_id IN ({seeded_tickets})", [pattern])
+        cursor.execute(f"DELETE FROM {recommended} WHERE ticket_id IN ({seeded_tickets})", [pattern])
+        cursor.execute(f"DELETE FROM {tickets} WHERE user_id IN ({seeded})", [pattern])
+        cursor.execute(
+            f"DELETE FROM {follows} WHERE user_id IN ({seeded}) OR followed_user_id IN ({seeded})",
+            [pattern, pattern],
+        )
+        cursor.execute(f"DELETE FROM {archive} WHERE user_id IN ({seeded})", [pattern])
+        # the total of delete() includes the rows cascaded with the accounts (their recommendations...)
+        _, deleted = User.objects.filter(username__startswith=f"{prefix}_").delete()
+    return deleted.get(User._meta.label, 0)
@@ -0,0 +1,103 @@
+"""
+Side effects of Review writes.
+
+- Ticket's review aggregates follow every write (see reviews.ticket_stats).
+- Every write is appended to the ReviewChange log, which the batch jobs
+  (reviews.recommendations) read to update incrementally.
+- New tickets are appended to the similar-ticket index once committed
+  (reviews.similar_tickets).
+- Tickets and reviews created or deleted are counted in their author's
+  monthly archive (reviews.archive).
+"""
+
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .archive import apply_post_change, uncount_reviews_of
+from .models import Review, ReviewChange, Ticket
+from .similar_tickets import add_ticket
+from .ticket_stats import apply_review_change, reconcile
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, raw=False, **kwargs):
+    """Count a new review, or move an edited one to its new rating (or ticket)."""
+    if raw:
+        # loaddata: fixtures carry their tickets' aggregates
+        return
+    ticket_id, rating, user_id = instance.ticket_id, instance.rating, instance.user_id
+    changes = []
+    if created:
+        apply_post_change(instance, 1)
+        apply_review_change(ticket_id, added=rating)
+        changes.append(ReviewChange(ticket_id=ticket_id, user_id=user_id, rating=rating))
+    elif hasattr(instance, "_loaded_stats"):
+        old_ticket_id, old_rating = instance._loaded_stats
+        if old_ticket_id == ticket_id:
+            apply_review_change(ticket_id, removed=old_rating, added=rating)
+            if old_rating != rating:
+                changes.append(
+                    ReviewChange(ticket_id=ticket_id, user_id=user_id, rating=rating, previous_rating=old_rating)
+                )
+        else:
+            apply_review_change(old_ticket_id, removed=old_rating)
+            apply_review_change(ticket_id, added=rating)
+            changes.append(ReviewChange(ticket_id=old_ticket_id, user_id=user_id, previous_rating=old_rating))
+            changes.append(ReviewChange(ticket_id=ticket_id, user_id=user_id, rating=rating))
+    else:
+        # Saved without being loaded first: the previous rating is unknown
+        reconcile(Ticket.objects.filter(pk=ticket_id))
+        changes.append(ReviewChange(ticket_id=ticket_id, user_id=user_id, rating=rating))
+    ReviewChange.objects.bulk_create(changes)
+    instance._loaded_stats = (ticket_id, rating)
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, origin=None, **kwargs):
+    """Log and uncount a deleted review, unless its ticket is being deleted with it (see ticket_deleting)."""
+    if isinstance(origin, Ticket) or (isinstance(origin, QuerySet) and origin.model is Ticket):
+        return
+    uncount_post(instance, origin)
+    ticket_id, rating = getattr(instance, "_loaded_stats", (instance.ticket_id, instance.rating))
+    ReviewChange.objects.create(ticket_id=ticket_id, user_id=instance.user_id, previous_rating=rating)
+    apply_review_change(ticket_id, removed=rating)
+
+
+@receiver(pre_delete, sender=Ticket)
+def ticket_deleting(sender, instance, origin=None, **kwargs):
+    """Log and uncount the reviews about to be deleted with the ticket, in one INSERT ... SELECT and one UPDATE."""
+    if not isinstance(origin, get_user_model()):
+        uncount_reviews_of(instance.pk)
+    change, review = ReviewChange._meta, Review._meta
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {change.db_table} (ticket_id, user_id, rating, previous_rating, time_created) "
+            f"SELECT ticket_id, user_id, NULL, rating, %s FROM {review.db_table} WHERE ticket_id = %s",
+            [timezone.now(), instance.pk],
+        )
+
+
+@receiver(post_save, sender=Ticket)
+def ticket_saved(sender, instance, created, raw=False, **kwargs):
+    """Count a new ticket in the archive; append it to the similar-ticket index once its transaction commits."""
+    if created and not raw:
+        apply_post_change(instance, 1)
+        transaction.on_commit(partial(add_ticket, instance))
+
+
+@receiver(post_delete, sender=Ticket)
+def ticket_deleted(sender, instance, origin=None, **kwargs):
+    """Uncount a deleted ticket from its author's archive."""
+    uncount_post(instance, origin)
+
+
+def uncount_post(post, origin) -> None:
+    """Remove a deleted post from the archive, unless its author is deleted too (the rows go with them)."""
+    if not isinstance(origin, get_user_model()):
+        apply_post_change(post, -1)
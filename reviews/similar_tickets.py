@@ -0,0 +1,291 @@
+"""
+Similar tickets: TF-IDF vectors of title, author and description.
+
+Shown while answering a ticket (ReviewCreateView) and, as the user types,
+while requesting one (TicketCreateView), so that the same book is not
+requested twice.
+
+Vectors: words are lower-cased and stripped of their accents; a term weighs
+(1 + log tf) x idf, a title word counting TITLE_WEIGHT times. Only the
+MAX_TERMS heaviest terms of a ticket are kept and the vector is L2
+normalised, so a dot product is a cosine. Terms found in more than
+MAX_DOCUMENT_FREQUENCY of the tickets ("le", "de", "roman"...) are dropped:
+they say nothing about the book and would be the longest posting lists.
+
+Storage (settings.SIMILAR_TICKETS_DIR): ``manage.py build_similar_tickets``
+writes one directory per build, then points ``CURRENT`` at it, so readers
+never see a half-written index:
+- ``index.json``: the vocabulary (term id = position) and the watermark
+  (highest ticket id of the build);
+- ``.npy`` arrays, memory-mapped by every process: the idf, the ticket ids
+  and an inverted index (term -> ticket rows and weights), so a lookup only
+  reads the posting lists of its own terms;
+- ``recent.bin``: the tickets created since the build, one fixed-size record
+  each, appended (O_APPEND) right after their commit and scored by brute
+  force, which stays cheap until the next build.
+
+New tickets are vectorised with the build's vocabulary and idf: words no
+ticket used at build time are ignored until the next build, and so are
+edits. Deleted tickets drop out when the results are loaded.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import shutil
+import unicodedata
+from array import array
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Ticket
+
+logger = logging.getLogger(__name__)
+
+MAX_TERMS = 64
+TITLE_WEIGHT = 2
+MAX_DOCUMENT_FREQUENCY = 0.5
+# Below this many tickets nothing is dropped: one book requested twice would already be "frequent"
+MIN_PRUNED_TICKETS = 100
+MIN_SIMILARITY = 0.2
+SIMILAR_LIMIT = 5
+
+CURRENT_FILE = "CURRENT"
+INDEX_FILE = "index.json"
+RECENT_FILE = "recent.bin"
+ARRAYS = ("idf", "ticket_ids", "postings_ptr", "postings_rows", "postings_weights")
+
+# One appended ticket; unused term slots are -1 (they read the zero past the last term)
+RECENT_RECORD = np.dtype([
+    ("ticket_id", "<i8"),
+    ("terms", "<i4", (MAX_TERMS,)),
+    ("weights", "<f4", (MAX_TERMS,)),
+])
+
+_WORD = re.compile(r"\w{2,}")
+
+
+def words(text: str | None) -> list[str]:
+    """Lower-cased, accent-free words of at least two characters."""
+    decomposed = unicodedata.normalize("NFKD", (text or "").lower())
+    return _WORD.findall("".join(char for char in decomposed if not unicodedata.combining(char)))
+
+
+def term_counts(title: str, author: str | None, description: str | None) -> Counter:
+    """Weighted term frequencies of a ticket (title words count TITLE_WEIGHT times)."""
+    counts = Counter(words(author))
+    counts.update(words(description))
+    for word in words(title):
+        counts[word] += TITLE_WEIGHT
+    return counts
+
+
+def _weigh(rows: np.ndarray, terms: np.ndarray, counts: np.ndarray, idf: np.ndarray, n_rows: int):
+    """Normalised TF-IDF (rows, terms, weights) keeping each row's MAX_TERMS heaviest terms."""
+    weights = (1.0 + np.log(counts)) * idf[terms]
+    order = np.lexsort((-weights, rows))
+    rows, terms, weights = rows[order], terms[order], weights[order]
+    keep = np.arange(len(rows)) - np.searchsorted(rows, rows) < MAX_TERMS
+    rows, terms, weights = rows[keep], terms[keep], weights[keep]
+    norms = np.sqrt(np.bincount(rows, weights * weights, minlength=n_rows))
+    return rows, terms, (weights / norms[rows]).astype(np.float32)
+
+
+@dataclass
+class SimilarityIndex:
+    """One build of the index (memory-mapped) and the tickets appended to it since."""
+
+    path: Path
+    vocabulary: dict[str, int]
+    watermark: int
+    idf: np.ndarray
+    ticket_ids: np.ndarray
+    postings_ptr: np.ndarray
+    postings_rows: np.ndarray
+    postings_weights: np.ndarray
+
+    @classmethod
+    def open(cls, path: Path) -> "SimilarityIndex":
+        """Map the arrays of the build in `path`."""
+        meta = json.loads((path / INDEX_FILE).read_text(encoding="utf-8"))
+        arrays = {name: np.load(path / f"{name}.npy", mmap_mode="r") for name in ARRAYS}
+        vocabulary = {term: term_id for term_id, term in enumerate(meta["terms"])}
+        return cls(path, vocabulary, meta["watermark"], **arrays)
+
+    def vectorize(self, title: str, author: str | None = "", description: str | None = "") -> tuple:
+        """(term ids, weights) of a ticket; unknown words are ignored."""
+        known = [
+            (self.vocabulary[word], count)
+            for word, count in term_counts(title, author, description).items()
+            if word in self.vocabulary
+        ]
+        if not known:
+            return np.empty(0, np.int32), np.empty(0, np.float32)
+        terms, counts = np.array(known, dtype=np.int64).T
+        _, terms, weights = _weigh(np.zeros(len(terms), np.int64), terms, counts.astype(np.float64), self.idf, 1)
+        return terms.astype(np.int32), weights
+
+    def add(self, tickets) -> int:
+        """Append (pk, title, author, description) tickets to recent.bin; returns how many."""
+        vectors = [(pk, *self.vectorize(title, author, description)) for pk, title, author, description in tickets]
+        records = np.zeros(len(vectors), RECENT_RECORD)
+        records["terms"] = -1
+        for record, (pk, terms, weights) in zip(records, vectors):
+            record["ticket_id"] = pk
+            record["terms"][:len(terms)] = terms
+            record["weights"][:len(terms)] = weights
+        if len(records):
+            # One write() per call: concurrent appends from several workers never interleave
+            descriptor = os.open(self.path / RECENT_FILE, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(descriptor, records.tobytes())
+            finally:
+                os.close(descriptor)
+        return len(records)
+
+    def recent(self) -> np.ndarray:
+        """The records appended since the build (memory-mapped; a torn last record is skipped)."""
+        path = self.path / RECENT_FILE
+        count = path.stat().st_size // RECENT_RECORD.itemsize if path.exists() else 0
+        if not count:
+            return np.zeros(0, RECENT_RECORD)
+        return np.memmap(path, dtype=RECENT_RECORD, mode="r", shape=(count,))
+
+    def scores(self, terms: np.ndarray, weights: np.ndarray, limit: int) -> dict[int, float]:
+        """{ticket id: cosine} of the best matches of a vector, at least MIN_SIMILARITY."""
+        found: dict[int, float] = {}
+        if not len(terms):
+            return found
+
+        # Built tickets: dot products over the posting lists of the query terms only
+        starts, lengths = self.postings_ptr[terms], self.postings_ptr[terms + 1] - self.postings_ptr[terms]
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        contributions = self.postings_weights[offsets] * np.repeat(weights, lengths)
+        scores = np.bincount(self.postings_rows[offsets], contributions, minlength=len(self.ticket_ids))
+        best = np.argpartition(-scores, limit)[:limit] if len(scores) > limit else np.arange(len(scores))
+        found.update(
+            (int(self.ticket_ids[row]), float(scores[row])) for row in best if scores[row] >= MIN_SIMILARITY
+        )
+
+        # Appended tickets: dense query vector gathered by every record's terms
+        recent = self.recent()
+        if len(recent):
+            dense = np.zeros(len(self.idf) + 1, np.float32)
+            dense[terms] = weights
+            recent_scores = (dense[recent["terms"]] * recent["weights"]).sum(axis=1)
+            for row in np.flatnonzero(recent_scores >= MIN_SIMILARITY):
+                found[int(recent["ticket_id"][row])] = float(recent_scores[row])
+        return found
+
+
+_opened: dict[Path, SimilarityIndex] = {}
+
+
+def load_index() -> SimilarityIndex | None:
+    """The current build (opened once per process), None before the first build."""
+    directory = Path(settings.SIMILAR_TICKETS_DIR)
+    try:
+        path = directory / (directory / CURRENT_FILE).read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return None
+    if path not in _opened:
+        _opened.clear()
+        _opened[path] = SimilarityIndex.open(path)
+    return _opened[path]
+
+
+def similar_tickets(
+    title: str,
+    author: str | None = "",
+    description: str | None = "",
+    exclude: int | None = None,
+    limit: int = SIMILAR_LIMIT,
+) -> list[Ticket]:
+    """The tickets closest to the given text, best first (one query; none before the first build)."""
+    index = load_index()
+    if index is None:
+        return []
+    found = index.scores(*index.vectorize(title, author, description), limit=limit + 1)
+    found.pop(exclude, None)
+    best = sorted(found, key=found.get, reverse=True)[:limit]
+    tickets = Ticket.objects.select_related("user").in_bulk(best)
+    return [tickets[pk] for pk in best if pk in tickets]
+
+
+def add_ticket(ticket: Ticket) -> None:
+    """Append a newly created ticket to the current build (post_save, on commit)."""
+    index = load_index()
+    if index is None or ticket.pk <= index.watermark:
+        return
+    try:
+        index.add([(ticket.pk, ticket.title, ticket.author, ticket.description)])
+    except OSError:
+        # The ticket is saved already: it will be indexed by the next build
+        logger.warning("Could not add ticket %s to the similar-ticket index", ticket.pk, exc_info=True)
+
+
+def build_index(batch_size: int = 10_000) -> SimilarityIndex:
+    """Vectorise every ticket into a new build, switch CURRENT to it and drop the older builds."""
+    watermark = Ticket.objects.aggregate(last=Max("pk"))["last"] or 0
+    vocabulary: dict[str, int] = {}
+    ticket_ids, rows, terms, counts = array("q"), array("q"), array("q"), array("d")
+    tickets = Ticket.objects.filter(pk__lte=watermark).order_by("pk")
+    for row, (pk, title, author, description) in enumerate(
+        tickets.values_list("pk", "title", "author", "description").iterator(chunk_size=batch_size)
+    ):
+        ticket_ids.append(pk)
+        for word, count in term_counts(title, author, description).items():
+            rows.append(row)
+            terms.append(vocabulary.setdefault(word, len(vocabulary)))
+            counts.append(count)
+
+    n_tickets = len(ticket_ids)
+    rows, terms, counts = (np.frombuffer(values, dtype=values.typecode) for values in (rows, terms, counts))
+    frequencies = np.bincount(terms, minlength=len(vocabulary))
+    kept = (frequencies <= MAX_DOCUMENT_FREQUENCY * n_tickets) | (n_tickets < MIN_PRUNED_TICKETS)
+    renumber = np.cumsum(kept) - 1
+    keep = kept[terms]
+    rows, terms, counts = rows[keep], renumber[terms[keep]], counts[keep]
+    idf = (np.log((1 + n_tickets) / (1 + frequencies[kept])) + 1).astype(np.float32)
+    rows, terms, weights = _weigh(rows, terms, counts, idf, n_tickets)
+
+    # Inverted index: postings of term t are rows[ptr[t]:ptr[t + 1]]
+    order = np.argsort(terms, kind="stable")
+    postings_ptr = np.concatenate([[0], np.cumsum(np.bincount(terms, minlength=len(idf)))]).astype(np.int64)
+
+    directory = Path(settings.SIMILAR_TICKETS_DIR)
+    path = directory / f"build-{timezone.now():%Y%m%d%H%M%S%f}"
+    path.mkdir(parents=True)
+    arrays = {
+        "idf": idf,
+        "ticket_ids": np.frombuffer(ticket_ids, dtype=np.int64),
+        "postings_ptr": postings_ptr,
+        "postings_rows": rows[order].astype(np.int32),
+        "postings_weights": weights[order],
+    }
+    for name, values in arrays.items():
+        np.save(path / f"{name}.npy", values)
+    terms_list = [word for word, keep_term in zip(vocabulary, kept) if keep_term]
+    (path / INDEX_FILE).write_text(json.dumps({"watermark": watermark, "terms": terms_list}), encoding="utf-8")
+    partial = directory / f"partial-{CURRENT_FILE}"
+    partial.write_text(path.name, encoding="utf-8")
+    os.replace(partial, directory / CURRENT_FILE)
+
+    # Tickets created while building: their on-commit appends may have gone to the previous build
+    index = SimilarityIndex.open(path)
+    index.add(Ticket.objects.filter(pk__gt=watermark).order_by("pk").values_list(
+        "pk", "title", "author", "description"
+    ))
+    for old in directory.glob("build-*"):
+        if old != path:
+            shutil.rmtree(old, ignore_errors=True)
+    return index
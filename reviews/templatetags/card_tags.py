@@ -2,14 +2,16 @@
 Custom template tags for rendering ticket and review cards in the feed.
 
 Defines the ``render_card_grid`` tag, which selects the appropriate card
-template for Ticket or Review instances and adapts actions based on the
-current page context (flux vs. "Mes Posts").
+template for Ticket, Review or Thread (a ticket with its reviews, threaded
+feed) instances and adapts actions based on the current page context (flux
+vs. "Mes Posts").
 """
 
 from django import template
 from django.template.loader import render_to_string
 from django.utils.safestring import mark_safe
 
+from reviews.feed import Thread
 from reviews.models import Review, Ticket
 
 register = template.Library()
@@ -27,7 +29,8 @@ def render_card_grid(context, item):
     is_my_posts_page = context.get("is_my_posts_page", False)
 
     if isinstance(item, Ticket):
-        has_review = Review.objects.filter(ticket=item).exists()
+        # Denormalized column (Ticket.review_count): no query per card
+        has_review = item.has_review
 
         allow_review = (not is_my_posts_page and not has_review)
 
@@ -45,6 +48,22 @@ def render_card_grid(context, item):
         )
         return mark_safe(html)
 
+    if isinstance(item, Thread):
+        # One ticket card, its reviews under it without repeating the ticket
+        html = render_to_string(
+            "reviews/components/thread_card.html",
+            {
+                "thread": item,
+                "ticket": item.ticket,
+                "request": request,
+                "show_actions": True,
+                "allow_review": not item.ticket.has_review,
+                "has_review": item.ticket.has_review,
+            },
+            request=request,
+        )
+        return mark_safe(html)
+
     if isinstance(item, Review):
         html = render_to_string(
             "reviews/components/review_card.html",
@@ -0,0 +1,148 @@
+"""Tests for the monthly archive of "Mes posts" (reviews.archive)."""
+
+from datetime import date, datetime, timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from reviews.archive import month_range, months, parse_month, rebuild
+from reviews.models import Review, Ticket
+
+User = get_user_model()
+
+
+def written_on(post, day: date):
+    """Move `post` (and its archive count) to noon of `day`, as if written then."""
+    moment = timezone.make_aware(datetime.combine(day, datetime.min.time())) + timedelta(hours=12)
+    type(post).objects.filter(pk=post.pk).update(time_created=moment)
+    rebuild(User.objects.filter(pk=post.user_id))
+    return post
+
+
+class ArchiveCounterTests(TestCase):
+    """The per-month counters follow the posts written and deleted through the ORM."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """An author and a reader."""
+        cls.author = User.objects.create_user(username="author", password="pass12345")
+        cls.reader = User.objects.create_user(username="reader", password="pass12345")
+
+    def counts(self, user):
+        """{month: (tickets, reviews)} of `user`'s archive."""
+        return {row.month: (row.ticket_count, row.review_count) for row in months(user)}
+
+    def test_creates_and_deletes_are_counted(self):
+        """The first post of a month inserts its row; later ones update it; deletes uncount."""
+        this_month = timezone.localdate().replace(day=1)
+        ticket = Ticket.objects.create(title="Dune", user=self.author)
+        with self.assertNumQueries(3):  # the book lookup, the ticket INSERT and, the month existing, one UPDATE
+            Ticket.objects.create(title="Dune", user=self.author)
+        review = Review.objects.create(ticket=ticket, user=self.reader, rating=4, headline="Bien")
+        self.assertEqual(self.counts(self.author), {this_month: (2, 0)})
+        self.assertEqual(self.counts(self.reader), {this_month: (0, 1)})
+
+        review.delete()
+        self.assertEqual(self.counts(self.reader), {})
+        self.assertEqual(rebuild(), 1)
+        self.assertEqual(self.counts(self.author), {this_month: (2, 0)})
+
+    def test_deleting_a_ticket_uncounts_its_reviews(self):
+        """The reviews deleted with their ticket leave their authors' archives, each in its own month."""
+        ticket = Ticket.objects.create(title="Dune", user=self.author)
+        Review.objects.create(ticket=ticket, user=self.author, rating=5, headline="Relu")
+        old = written_on(Review.objects.create(ticket=ticket, user=self.reader, rating=4, headline="Bien"),
+                         date(2024, 3, 10))
+        kept = Review.objects.create(ticket=Ticket.objects.create(title="Emma", user=self.author),
+                                     user=self.reader, rating=3, headline="Moyen")
+        self.assertEqual(self.counts(self.reader)[date(2024, 3, 1)], (0, 1))
+
+        ticket.delete()
+        self.assertEqual(self.counts(self.author), {kept.time_created.date().replace(day=1): (1, 0)})
+        self.assertEqual(self.counts(self.reader), {kept.time_created.date().replace(day=1): (0, 1)})
+        self.assertFalse(Review.objects.filter(pk=old.pk).exists())
+
+    def test_month_helpers(self):
+        """month_range wraps December; parse_month ignores malformed values and months without a range."""
+        start, end = month_range(date(2024, 12, 1))
+        self.assertEqual((start.date(), end.date()), (date(2024, 12, 1), date(2025, 1, 1)))
+        self.assertEqual(parse_month("2024-02"), date(2024, 2, 1))
+        self.assertIsNone(parse_month("février"))
+        self.assertIsNone(parse_month(None))
+        self.assertIsNone(parse_month("9999-12"))
+        self.assertEqual(month_range(parse_month("9999-11"))[1].date(), date(9999, 12, 1))
+
+    def test_rebuild_command(self):
+        """rebuild_post_archive recomputes the counters of writes that bypassed the signals."""
+        Ticket.objects.bulk_create(Ticket(title=f"T{i}", user=self.author) for i in range(3))
+        self.assertEqual(self.counts(self.author), {})
+        out = StringIO()
+        call_command("rebuild_post_archive", "--user", str(self.author.pk), stdout=out)
+        self.assertIn("1 month(s) counted", out.getvalue())
+        self.assertEqual(list(self.counts(self.author).values()), [(3, 0)])
+
+
+class MyPostsArchiveTests(TestCase):
+    """The archive sidebar of "Mes posts" and the month pages."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Fifteen tickets in March 2023, two reviews in May 2025, a ticket this month."""
+        cls.user = User.objects.create_user(username="alice", password="pass12345")
+        cls.old = [written_on(Ticket.objects.create(title=f"Ancien {i}", user=cls.user), date(2023, 3, 5 + i))
+                   for i in range(15)]
+        cls.reviews = [
+            written_on(Review.objects.create(ticket=cls.old[i], user=cls.user, rating=i + 3, headline="H"),
+                       date(2025, 5, 1 + i))
+            for i in range(2)
+        ]
+        cls.recent = Ticket.objects.create(title="Récent", user=cls.user)
+
+    def setUp(self):
+        """Log the author in."""
+        self.client.force_login(self.user)
+
+    def test_sidebar_lists_the_months_with_their_counts(self):
+        """Most recent month first, grouped by year, with French month names."""
+        resp = self.client.get(reverse("users:my_posts"))
+        self.assertEqual(
+            [(row.month, row.total) for row in resp.context["archive"]],
+            [(timezone.localdate().replace(day=1), 1), (date(2025, 5, 1), 2), (date(2023, 3, 1), 15)],
+        )
+        self.assertContains(resp, "?mois=2023-03")
+        self.assertContains(resp, "Mars")
+
+    def test_month_page(self):
+        """mois lists that month only, newest first, with the count read from the archive."""
+        self.client.get(reverse("users:my_posts"))  # the first request refreshes the session
+        with self.assertNumQueries(4):  # session user, archive, page rows, tickets (no review): no COUNT
+            resp = self.client.get(reverse("users:my_posts"), {"mois": "2023-03"})
+        self.assertEqual(resp.context["feed_items"], self.old[::-1][:10])
+        self.assertEqual(resp.context["page_obj"].paginator.count, 15)
+        self.assertEqual(resp.context["month_label"], "Mars 2023")
+
+        resp = self.client.get(reverse("users:my_posts"), {"mois": "2023-03", "page": 2})
+        self.assertEqual(resp.context["feed_items"], self.old[::-1][10:])
+
+    def test_month_with_other_filters(self):
+        """The type filter still counts from the archive; the rating one falls back to a COUNT."""
+        resp = self.client.get(reverse("users:my_posts"), {"mois": "2025-05", "type": "critiques"})
+        self.assertEqual(resp.context["feed_items"], self.reviews[::-1])
+        self.assertEqual(resp.context["page_obj"].paginator.count, 2)
+        self.assertContains(resp, "?mois=2023-03&amp;type=critiques")
+
+        resp = self.client.get(reverse("users:my_posts"), {"mois": "2025-05", "note": 4})
+        self.assertEqual(resp.context["feed_items"], [self.reviews[1]])
+        self.assertEqual(resp.context["page_obj"].paginator.count, 1)
+
+    def test_months_without_posts_and_malformed_values(self):
+        """An empty month shows no post; a malformed mois is ignored."""
+        resp = self.client.get(reverse("users:my_posts"), {"mois": "2024-01"})
+        self.assertEqual((resp.context["feed_items"], resp.context["page_obj"].paginator.count), ([], 0))
+        for value in ("13-2024", "9999-12"):
+            resp = self.client.get(reverse("users:my_posts"), {"mois": value})
+            self.assertEqual(resp.context["page_obj"].paginator.count, 18)
@@ -0,0 +1,98 @@
+"""Tests for the canonical Book of tickets (reviews.books) and the book page."""
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from reviews.books import assign_books, book_key
+from reviews.models import Book, Review, Ticket
+
+User = get_user_model()
+
+
+class BookKeyTests(TestCase):
+    """Normalization of the title and author into the unique key."""
+
+    def test_accents_case_and_punctuation_are_folded(self):
+        """Typing variants of the same book give the same key."""
+        self.assertEqual(book_key("L'Élégance du hérisson", "Muriel Barbery"), "l elegance du herisson|muriel barbery")
+        self.assertEqual(
+            book_key("  l’elegance   du HERISSON ", "muriel  BARBERY"),
+            book_key("L'Élégance du hérisson", "Muriel Barbery"),
+        )
+        self.assertEqual(book_key("Œdipe roi", None), "oedipe roi|")
+
+    def test_author_is_part_of_the_key(self):
+        """No fuzzy matching: the same title by another (or no) author is another book."""
+        self.assertNotEqual(book_key("Dune", "Herbert"), book_key("Dune", ""))
+
+
+class TicketBookTests(TestCase):
+    """Tickets resolve their book on save."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """One user."""
+        cls.user = User.objects.create_user(username="alice", password="pass12345")
+
+    def test_same_book_is_shared(self):
+        """Two requests for the same book share one Book, created by the first."""
+        first = Ticket.objects.create(title="L'Élégance du hérisson", author="Barbery", user=self.user)
+        with self.assertNumQueries(3):  # the book lookup, the ticket INSERT, the archive UPDATE
+            second = Ticket.objects.create(title="l'elegance du herisson", author="BARBERY", user=self.user)
+        self.assertEqual(second.book_id, first.book_id)
+        self.assertEqual(first.book.title, "L'Élégance du hérisson")
+
+    def test_edits_move_the_ticket_only_when_title_or_author_change(self):
+        """A description edit keeps the book without a lookup; a title edit resolves it again."""
+        Ticket.objects.create(title="Dune", user=self.user)
+        ticket = Ticket.objects.get(title="Dune")
+        book_id = ticket.book_id
+        ticket.description = "Arrakis"
+        with self.assertNumQueries(1):
+            ticket.save()
+        ticket.title = "Dune Messiah"
+        ticket.save(update_fields=["title"])
+        ticket.refresh_from_db()
+        self.assertNotEqual(ticket.book_id, book_id)
+
+    def test_bulk_backfill(self):
+        """assign_books attaches bulk-created tickets, batch by batch, reusing existing books."""
+        existing = Ticket.objects.create(title="Germinal", author="Zola", user=self.user).book
+        Ticket.objects.bulk_create(
+            Ticket(title=title, author="Zola", user=self.user) for title in ("GERMINAL", "Nana", "Nana", "L'Œuvre")
+        )
+        self.assertEqual(assign_books(Ticket.objects.all(), batch_size=2), 4)
+        self.assertFalse(Ticket.objects.filter(book__isnull=True).exists())
+        self.assertEqual(Ticket.objects.filter(book=existing).count(), 2)
+        self.assertEqual(Book.objects.count(), 3)
+        self.assertEqual(assign_books(Ticket.objects.all()), 0)
+
+
+class BookPageTests(TestCase):
+    """The page grouping every request for a book."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Two users requesting the same book, each ticket reviewed once."""
+        cls.alice = User.objects.create_user(username="alice", password="pass12345")
+        cls.bob = User.objects.create_user(username="bob", password="pass12345")
+        cls.first = Ticket.objects.create(title="Candide", author="Voltaire", user=cls.alice)
+        cls.second = Ticket.objects.create(title="candide", author="voltaire", user=cls.bob)
+        Review.objects.create(ticket=cls.first, user=cls.bob, rating=5, headline="Drôle")
+        Review.objects.create(ticket=cls.second, user=cls.alice, rating=2, headline="Daté")
+
+    def test_page_lists_tickets_and_combined_rating(self):
+        """Both tickets are listed with the average of all their reviews."""
+        self.client.force_login(self.alice)
+        resp = self.client.get(reverse("reviews:book", args=[self.first.book_id]))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(set(resp.context["tickets"]), {self.first, self.second})
+        self.assertEqual((resp.context["review_count"], resp.context["average_rating"]), (2, 3.5))
+        self.assertContains(resp, "2 demandes")
+
+    def test_feed_cards_link_to_the_book(self):
+        """Ticket cards link to their book page."""
+        self.client.force_login(self.alice)
+        book_url = reverse("reviews:book", args=[self.first.book_id])
+        self.assertContains(self.client.get(reverse("users:my_posts")), book_url)
@@ -0,0 +1,152 @@
+"""Tests for the batch deletion of "Mes posts" (reviews.bulk) and its view."""
+
+import tempfile
+from urllib.parse import parse_qs, urlsplit
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from reviews.archive import months
+from reviews.bulk import NotOwned, delete_posts
+from reviews.leaderboards import refresh as refresh_leaderboards
+from reviews.models import LeaderboardEntry, Review, ReviewChange, Ticket
+from reviews.ticket_stats import reconcile
+
+User = get_user_model()
+
+
+class DeletePostsTests(TestCase):
+    """delete_posts() removes a selection with set-based statements and keeps the derived data right."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Alice's two tickets (one answered by Bob) and her review of Bob's ticket."""
+        cls.alice = User.objects.create_user(username="alice", password="pass12345")
+        cls.bob = User.objects.create_user(username="bob", password="pass12345")
+        cls.first = Ticket.objects.create(title="Dune", user=cls.alice)
+        cls.second = Ticket.objects.create(title="Emma", user=cls.alice)
+        cls.answer = Review.objects.create(ticket=cls.first, user=cls.bob, rating=2, headline="Long")
+        cls.bobs = Ticket.objects.create(title="Nana", user=cls.bob)
+        Review.objects.create(ticket=cls.bobs, user=cls.bob, rating=5, headline="Relu")
+        cls.review = Review.objects.create(ticket=cls.bobs, user=cls.alice, rating=3, headline="Bof")
+
+    def totals(self, user):
+        """(tickets, reviews) counted in `user`'s archive."""
+        rows = list(months(user))
+        return sum(row.ticket_count for row in rows), sum(row.review_count for row in rows)
+
+    def test_selection_and_answers_are_deleted(self):
+        """The selected posts go, with the others' reviews of the selected tickets; the rest is untouched."""
+        refresh_leaderboards(full=True)
+        changes = ReviewChange.objects.count()
+
+        deleted = delete_posts(self.alice, [self.first.pk], [self.review.pk])
+
+        self.assertEqual((deleted.tickets, deleted.reviews, deleted.answers), (1, 1, 1))
+        self.assertEqual(deleted.message(), "1 ticket et 1 critique supprimés (avec 1 réponse à vos tickets).")
+        self.assertEqual(set(Ticket.objects.values_list("pk", flat=True)), {self.second.pk, self.bobs.pk})
+        self.assertEqual(list(Review.objects.values_list("user__username", flat=True)), ["bob"])
+        self.assertFalse(LeaderboardEntry.objects.filter(ticket_id=self.first.pk).exists())
+        # the signals' work, done in bulk: change log, aggregates of the ticket kept, archives
+        self.assertEqual(ReviewChange.objects.count(), changes + 2)
+        self.assertEqual(reconcile(dry_run=True), 0)
+        self.assertEqual(Ticket.objects.get(pk=self.bobs.pk).review_count, 1)
+        self.assertEqual(self.totals(self.alice), (1, 0))
+        self.assertEqual(self.totals(self.bob), (1, 1))
+
+    def test_someone_elses_post_refuses_the_whole_selection(self):
+        """One post that is not the user's (or no longer exists) and nothing is deleted."""
+        for tickets, reviews in (([self.first.pk, self.bobs.pk], []), ([], [self.review.pk, 10_000])):
+            with self.subTest(tickets=tickets, reviews=reviews), self.assertRaises(NotOwned):
+                delete_posts(self.alice, tickets, reviews)
+        self.assertEqual((Ticket.objects.count(), Review.objects.count()), (3, 3))
+
+    def test_query_count_does_not_grow_with_the_selection(self):
+        """Ownership, reading, logging and deleting are one statement each, whatever the number of posts."""
+        tickets = Ticket.objects.bulk_create(Ticket(title=f"T{i}", user=self.alice) for i in range(30))
+        Review.objects.bulk_create(Review(ticket=t, user=self.alice, rating=4, headline="H") for t in tickets)
+        # savepoint, ownership, reviews read, ReviewChange INSERT, 4 DELETEs (reviews, recommendations,
+        # leaderboards, tickets), Alice's month in the archive, release
+        with self.assertNumQueries(10):
+            delete_posts(self.alice, [ticket.pk for ticket in tickets], [])
+        Review.objects.create(ticket=self.second, user=self.alice, rating=1, headline="H")
+        with self.assertNumQueries(10):
+            delete_posts(self.alice, [self.second.pk], [])
+
+
+class ReleaseImagesTests(TestCase):
+    """Images are removed from the storage once the deletion is committed, unless still in use."""
+
+    def setUp(self):
+        """A throwaway MEDIA_ROOT holding two images, one shared with a ticket that stays."""
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.user = User.objects.create_user(username="alice", password="pass12345")
+        own = default_storage.save("ticket_images/own.png", ContentFile(b"png"))
+        shared = default_storage.save("ticket_images/shared.png", ContentFile(b"png"))
+        self.tickets = [Ticket.objects.create(title=f"T{i}", user=self.user, image=name)
+                        for i, name in enumerate((own, shared, shared))]
+        self.names = own, shared
+
+    def test_unused_images_are_released_after_commit(self):
+        """The file of the deleted ticket goes, the shared one stays; nothing happens before the commit."""
+        own, shared = self.names
+        with self.captureOnCommitCallbacks() as callbacks:
+            delete_posts(self.user, [self.tickets[0].pk, self.tickets[1].pk], [])
+            self.assertTrue(default_storage.exists(own))
+        for callback in callbacks:
+            callback()
+        self.assertFalse(default_storage.exists(own))
+        self.assertTrue(default_storage.exists(shared))
+
+
+class DeleteMyPostsViewTests(TestCase):
+    """The "Supprimer la sélection" form of "Mes posts"."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Alice with two tickets and a review; Bob with a ticket."""
+        cls.alice = User.objects.create_user(username="alice", password="pass12345")
+        cls.bob = User.objects.create_user(username="bob", password="pass12345")
+        cls.tickets = [Ticket.objects.create(title=f"T{i}", user=cls.alice) for i in range(2)]
+        cls.review = Review.objects.create(ticket=cls.tickets[0], user=cls.alice, rating=4, headline="H")
+        cls.bobs = Ticket.objects.create(title="Nana", user=cls.bob)
+
+    def setUp(self):
+        """Log Alice in."""
+        self.client.force_login(self.alice)
+        self.url = reverse("users:delete_my_posts")
+
+    def assertToast(self, response, type_, message):
+        """The response redirects to "Mes posts" with this toast."""
+        self.assertEqual(response.status_code, 302)
+        url = urlsplit(response.url)
+        query = parse_qs(url.query)
+        self.assertEqual((url.path, query["toast_type"]), (reverse("users:my_posts"), [type_]))
+        self.assertIn(message, query["toast_msg"][0])
+
+    def test_deletes_and_toasts_a_summary(self):
+        """The checked tickets and reviews go; the toast says how many."""
+        selection = {"tickets": [ticket.pk for ticket in self.tickets], "critiques": [self.review.pk]}
+        response = self.client.post(self.url, selection)
+        self.assertToast(response, "success", "2 tickets et 1 critique supprimés.")
+        self.assertEqual(list(Ticket.objects.all()), [self.bobs])
+
+    def test_refusals(self):
+        """Empty, malformed or foreign selections delete nothing; GET only redirects."""
+        self.assertToast(self.client.post(self.url, {}), "info", "Aucun post sélectionné.")
+        self.assertToast(self.client.post(self.url, {"tickets": ["abc"]}), "error", "Sélection invalide.")
+        self.assertToast(self.client.post(self.url, {"tickets": [self.bobs.pk]}), "error", "rien n'a été supprimé")
+        self.assertRedirects(self.client.get(self.url), reverse("users:my_posts"))
+        self.assertEqual(Ticket.objects.count(), 3)
+
+    def test_cards_have_a_selection_box(self):
+        """Each card of "Mes posts" has a checkbox bound to the batch form."""
+        response = self.client.get(reverse("users:my_posts"))
+        self.assertContains(response, f'name="tickets" value="{self.tickets[0].pk}" form="posts-batch"')
+        self.assertContains(response, f'name="critiques" value="{self.review.pk}" form="posts-batch"')
+        self.assertContains(response, 'id="posts-batch"')
@@ -0,0 +1,275 @@
+"""Tests for the custom management commands of the reviews app."""
+
+import json
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta
+from io import StringIO
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import F, Max, Min
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.utils import timezone
+
+from reviews.leaderboards import refresh as refresh_leaderboards
+from reviews.models import LeaderboardEntry, RecommendedTicket, Review, Ticket
+from reviews.seed import SEED_PASSWORD
+from users.models import UserFollows
+
+User = get_user_model()
+
+
+class SqliteMaintenanceCommandTests(TransactionTestCase):
+    """Backup / optimize / vacuum tasks of `sqlite_maintenance`.
+
+    TransactionTestCase: an online backup cannot run inside the open
+    transaction TestCase wraps every test in.
+    """
+
+    def setUp(self):
+        """Create a throwaway backup directory and a little data to copy."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.backup_dir = Path(self.tmp.name)
+
+        user = User.objects.create_user(username="alice", password="pass12345")
+        Ticket.objects.create(title="Book", description="", user=user)
+
+    def _run(self, *args):
+        out = StringIO()
+        call_command("sqlite_maintenance", *args, "--backup-dir", str(self.backup_dir), stdout=out)
+        return out.getvalue()
+
+    def test_backup_copies_live_database_in_steps(self):
+        """A backup is a readable SQLite file containing the current rows."""
+        output = self._run("backup", "--pages", "1", "--step-sleep", "0")
+
+        backups = list(self.backup_dir.glob("db-*.sqlite3"))
+        self.assertEqual(len(backups), 1)
+        self.assertIn("backup:", output)
+
+        copy = sqlite3.connect(backups[0])
+        try:
+            titles = [row[0] for row in copy.execute("SELECT title FROM reviews_ticket")]
+        finally:
+            copy.close()
+        self.assertEqual(titles, ["Book"])
+
+    def test_backup_keeps_only_the_most_recent_files(self):
+        """--keep prunes older backups."""
+        for _ in range(3):
+            self._run("backup", "--keep", "2", "--step-sleep", "0")
+        self.assertEqual(len(list(self.backup_dir.glob("db-*.sqlite3"))), 2)
+
+    def test_optimize_and_vacuum_report_timings(self):
+        """Maintenance tasks print a timing line each."""
+        output = self._run("optimize", "vacuum")
+        self.assertIn("optimize: PRAGMA optimize", output)
+        self.assertIn("optimize: search index merged", output)
+        self.assertIn("vacuum:", output)
+        self.assertIn("maintenance run #1", output)
+
+    def test_scheduled_runs_enable_incremental_vacuum(self):
+        """--every repeats the tasks; --enable-incremental-vacuum switches the vacuum mode."""
+        output = self._run(
+            "vacuum", "--enable-incremental-vacuum", "--every", "0.01", "--iterations", "2"
+        )
+        self.assertIn("auto_vacuum switched to INCREMENTAL", output)
+        self.assertIn("maintenance run #2", output)
+        self.assertIn("vacuum: released", output)
+
+
+class SlowQueriesCommandTests(SimpleTestCase):
+    """`slow_queries` aggregates the JSONL slow-query log by fingerprint."""
+
+    def setUp(self):
+        """Write a log file and one rotated backup."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.log = Path(self.tmp.name) / "slow_queries.jsonl"
+
+        feed_query = {
+            "fingerprint": 'SELECT ... FROM "reviews_ticket" WHERE "user_id" IN (...)',
+            "view": "reviews:feed",
+            "call_site": "reviews/views.py:80 in feed",
+            "plan": ["SCAN reviews_ticket"],
+        }
+        self.log.write_text("\n".join([
+            json.dumps({**feed_query, "duration_ms": 120.0}),
+            json.dumps({**feed_query, "duration_ms": 80.0, "plan": ["SEARCH reviews_ticket"]}),
+            "not json",
+        ]) + "\n")
+        self.log.with_name("slow_queries.jsonl.1").write_text(json.dumps({
+            "fingerprint": 'SELECT ... FROM "users_userfollows"',
+            "duration_ms": 300.0,
+            "view": "users:my_follows",
+            "call_site": "users/views.py:40 in my_follows",
+        }) + "\n")
+
+    def _run(self, *args):
+        out, err = StringIO(), StringIO()
+        call_command("slow_queries", "--file", str(self.log), *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_groups_by_fingerprint_across_rotated_files(self):
+        """Counts and totals are per fingerprint; the slowest sample's plan is shown."""
+        output, errors = self._run("--sort", "count")
+
+        self.assertIn("3 slow queries, 2 distinct statements (2 file(s))", output)
+        self.assertIn("#1  total 200.0 ms  count 2  mean 100.0 ms  max 120.0 ms", output)
+        self.assertIn("views: reviews:feed (2)", output)
+        self.assertIn("call sites: reviews/views.py:80 in feed (2)", output)
+        self.assertIn("SCAN reviews_ticket", output)
+        self.assertNotIn("SEARCH reviews_ticket", output)
+        self.assertIn("1 malformed line(s) skipped", errors)
+
+    def test_view_filter_and_default_sort_by_total(self):
+        """--view keeps one URL name; the default order is total time."""
+        output, _ = self._run()
+        self.assertLess(output.index("users_userfollows"), output.index("reviews_ticket"))
+
+        output, _ = self._run("--view", "reviews:feed")
+        self.assertNotIn("users_userfollows", output)
+
+    def test_missing_log_is_an_error(self):
+        """A clear error instead of an empty report."""
+        with self.assertRaises(CommandError):
+            call_command("slow_queries", "--file", str(Path(self.tmp.name) / "missing.jsonl"))
+
+
+class MemoryScenarioCommandTests(TestCase):
+    """`memory_scenario` replays feed pages and my_posts under tracemalloc."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """The user with the largest follow graph is picked by default."""
+        cls.reader = User.objects.create_user(username="reader", password="pass12345")
+        author = User.objects.create_user(username="author", password="pass12345")
+        UserFollows.objects.create(user=cls.reader, followed_user=author)
+        for i in range(15):
+            ticket = Ticket.objects.create(title=f"Book {i}", description="", user=author)
+            Review.objects.create(headline=f"Review {i}", rating=3, user=author, ticket=ticket)
+
+    def setUp(self):
+        """Throwaway directory for --save / --baseline files."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def _run(self, *args):
+        out = StringIO()
+        call_command("memory_scenario", *args, stdout=out)
+        return out.getvalue()
+
+    def test_runs_every_step_and_compares_with_baseline(self):
+        """Each step is reported; a second run prints deltas against the saved one."""
+        saved = Path(self.tmp.name) / "before.json"
+        output = self._run("--pages", "2", "--save", str(saved))
+
+        self.assertIn("Memory scenario for reader (1 follows)", output)
+        for step in ("feed page=1", "feed page=2", "my_posts"):
+            self.assertIn(step, output)
+        steps = json.loads(saved.read_text())["steps"]
+        self.assertEqual([s["step"] for s in steps], ["feed page=1", "feed page=2", "my_posts"])
+        self.assertTrue(all(s["peak_kib"] > 0 for s in steps))
+
+        self.assertIn("Δ peak KiB", self._run("--pages", "2", "--baseline", str(saved)))
+
+    def test_unknown_user(self):
+        """A clear error for a username that does not exist."""
+        with self.assertRaises(CommandError):
+            self._run("--user", "nobody")
+
+
+class SeedCommandTests(TestCase):
+    """Synthetic datasets of `seed_litrevu` (reviews.seed)."""
+
+    ARGS = ("--users", "30", "--tickets", "120", "--avg-follows", "6", "--until", "2025-06-01T12:00:00")
+
+    def _run(self, *args):
+        out = StringIO()
+        call_command("seed_litrevu", *self.ARGS, *args, stdout=out)
+        return out.getvalue()
+
+    def _snapshot(self):
+        return (
+            list(User.objects.filter(username__startswith="seed_").values_list("username", "date_joined")),
+            list(UserFollows.objects.values_list("user__username", "followed_user__username")),
+            list(Ticket.objects.values_list("user__username", "title", "time_created")),
+            list(Review.objects.values_list("user__username", "ticket__title", "rating", "time_created")),
+        )
+
+    def test_inserts_a_consistent_dataset(self):
+        """Row counts, time window, ratings, no self-follow, one review per user and ticket."""
+        output = self._run()
+
+        self.assertIn("30 users", output)
+        self.assertEqual(User.objects.filter(username__startswith="seed_").count(), 30)
+        self.assertEqual(Ticket.objects.count(), 120)
+        self.assertTrue(Review.objects.exists())
+        self.assertTrue(UserFollows.objects.exists())
+        self.assertFalse(UserFollows.objects.filter(user=F("followed_user")).exists())
+        self.assertFalse(Review.objects.exclude(rating__range=(0, 5)).exists())
+        self.assertEqual(Review.objects.values("user", "ticket").distinct().count(), Review.objects.count())
+        window = Ticket.objects.aggregate(first=Min("time_created"), last=Max("time_created"))
+        until = timezone.make_aware(datetime(2025, 6, 1, 12))
+        self.assertLessEqual(window["last"], until)
+        self.assertGreaterEqual(window["first"], until - timedelta(days=365))
+        self.assertFalse(Review.objects.filter(time_created__lt=F("ticket__time_created")).exists())
+        self.assertTrue(User.objects.get(username="seed_0000001").check_password(SEED_PASSWORD))
+
+    def test_same_seed_same_rows(self):
+        """--flush then the same arguments reproduce the same dataset; refusing to mix datasets otherwise."""
+        self._run()
+        first = self._snapshot()
+        with self.assertRaises(CommandError):
+            self._run()
+
+        self._run("--flush")
+        self.assertEqual(self._snapshot(), first)
+
+        self._run("--flush", "--seed", "7")
+        self.assertNotEqual(self._snapshot(), first)
+
+    def test_delete_keeps_other_accounts(self):
+        """--delete removes the prefixed accounts with their tickets, reviews and follows only."""
+        alice = User.objects.create_user(username="alice", password="pass12345")
+        Ticket.objects.create(title="Book", description="", user=alice)
+        self._run()
+        refresh_leaderboards(full=True)
+        self.assertTrue(LeaderboardEntry.objects.exists())
+        # seeded tickets recommended to alice, and to a seeded account (cascaded, not counted as accounts)
+        seeded = Ticket.objects.filter(user__username__startswith="seed_")[:2]
+        RecommendedTicket.objects.bulk_create([
+            RecommendedTicket(user=alice, ticket=seeded[0], score=1.0, rank=1),
+            RecommendedTicket(user=seeded[1].user, ticket=seeded[0], score=1.0, rank=1),
+        ])
+
+        self.assertIn("Deleted 30 seed_* accounts", self._run("--delete"))
+        self.assertEqual(list(User.objects.values_list("username", flat=True)), ["alice"])
+        self.assertEqual(Ticket.objects.count(), 1)
+        self.assertFalse(Review.objects.exists() or UserFollows.objects.exists())
+        self.assertFalse(LeaderboardEntry.objects.exists() or RecommendedTicket.objects.exists())
+        # the constraints are deferred to a commit TestCase never makes: check them now
+        connection.check_constraints()
+
+
+class ReconcileTicketStatsCommandTests(TestCase):
+    """`reconcile_ticket_stats` repairs the review aggregates of tickets."""
+
+    def test_dry_run_then_fix(self):
+        """Drift left by a bulk insert is counted by --dry-run and fixed by a plain run."""
+        owner = User.objects.create_user(username="owner", password="pass12345")
+        reader = User.objects.create_user(username="reader", password="pass12345")
+        ticket = Ticket.objects.create(title="Book", description="", user=owner)
+        Review.objects.bulk_create([Review(ticket=ticket, user=reader, rating=3, headline="H")])
+
+        out = StringIO()
+        call_command("reconcile_ticket_stats", "--dry-run", stdout=out)
+        self.assertIn("1 ticket(s) with drifted", out.getvalue())
+
+        call_command("reconcile_ticket_stats", "--ticket", str(ticket.pk), stdout=out)
+        ticket.refresh_from_db()
+        self.assertEqual((ticket.review_count, ticket.rating_sum, ticket.rating_count_3), (1, 3, 1))
@@ -0,0 +1,154 @@
+"""Tests for the streaming data export (reviews.export), its view and its command."""
+
+import csv
+import gzip
+import io
+import json
+import tempfile
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from reviews.export import export, gzipped
+from reviews.models import Review, Ticket
+from users.models import UserFollows
+
+User = get_user_model()
+
+
+class ExportTests(TestCase):
+    """Datasets, formats and scope of export()."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Alice and Bob follow each other; five tickets of Alice, one reviewed by Bob."""
+        cls.alice = User.objects.create_user(username="alice", password="pass12345")
+        cls.bob = User.objects.create_user(username="bob", password="pass12345")
+        cls.carol = User.objects.create_user(username="carol", password="pass12345")
+        UserFollows.objects.bulk_create([
+            UserFollows(user=cls.alice, followed_user=cls.bob),
+            UserFollows(user=cls.bob, followed_user=cls.alice),
+            UserFollows(user=cls.bob, followed_user=cls.carol),
+        ])
+        cls.tickets = [Ticket.objects.create(title=f"Livre {i}", user=cls.alice) for i in range(5)]
+        cls.review = Review.objects.create(ticket=cls.tickets[0], user=cls.bob, rating=4, headline="Très « bien »")
+
+    def test_csv_of_one_dataset(self):
+        """A header, then one line per row in primary key order, dates in ISO 8601."""
+        rows = list(csv.reader(io.StringIO("".join(export(["tickets"], "csv", self.alice)))))
+        self.assertEqual(rows[0][:2], ["id", "title"])
+        self.assertEqual([row[1] for row in rows[1:]], [f"Livre {i}" for i in range(5)])
+        self.assertEqual(rows[1][-1], self.tickets[0].time_created.isoformat())
+        with self.assertRaises(ValueError):
+            list(export(["tickets", "reviews"], "csv"))
+
+    def test_csv_neutralises_formulas(self):
+        """User text a spreadsheet would evaluate is prefixed with a quote in CSV, left as is in JSONL."""
+        for i, title in enumerate(("=HYPERLINK(\"http://x\")", "+1", "-2", "@SUM(A1)", "Sans danger")):
+            Ticket.objects.filter(pk=self.tickets[i].pk).update(title=title)
+        rows = list(csv.reader(io.StringIO("".join(export(["tickets"], "csv", self.alice)))))
+        self.assertEqual(
+            [row[1] for row in rows[1:]],
+            ["'=HYPERLINK(\"http://x\")", "'+1", "'-2", "'@SUM(A1)", "Sans danger"],
+        )
+        self.assertIn('"title": "+1"', "".join(export(["tickets"], "jsonl", self.alice)))
+
+    def test_jsonl_scope(self):
+        """A user's export holds their posts and the follow edges on either side; the site's holds everything."""
+        lines = [json.loads(line) for line in "".join(export(["reviews", "follows"], "jsonl", self.bob)).splitlines()]
+        self.assertEqual(lines[0], {
+            "type": "reviews", "id": self.review.pk, "ticket": self.tickets[0].pk, "ticket_title": "Livre 0",
+            "user": "bob", "rating": 4, "headline": "Très « bien »", "body": "",
+            "time_created": self.review.time_created.isoformat(),
+        })
+        self.assertEqual(
+            [(line["user"], line["followed_user"]) for line in lines[1:]],
+            [("alice", "bob"), ("bob", "alice"), ("bob", "carol")],
+        )
+        self.assertEqual("".join(export(["follows"], "jsonl", self.carol)).count("\n"), 1)
+        self.assertEqual("".join(export(["tickets", "reviews", "follows"], "jsonl")).count("\n"), 9)
+
+    def test_stream_in_chunks_with_one_query_per_dataset(self):
+        """Rows are fetched and written chunk_size at a time."""
+        with self.assertNumQueries(2):
+            pieces = list(export(["tickets", "reviews"], "jsonl", chunk_size=2))
+        self.assertEqual([piece.count("\n") for piece in pieces], [2, 2, 1, 1])
+
+    def test_gzip_on_the_fly(self):
+        """The compressed stream inflates back to the plain one."""
+        plain = "".join(export(["tickets"], "csv"))
+        self.assertEqual(gzip.decompress(b"".join(gzipped(export(["tickets"], "csv", chunk_size=2)))).decode(), plain)
+
+
+class ExportViewTests(TestCase):
+    """The "Exporter mes données" download."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Alice with a ticket, Bob with another; a staff member."""
+        cls.alice = User.objects.create_user(username="alice", password="pass12345")
+        cls.bob = User.objects.create_user(username="bob", password="pass12345")
+        cls.staff = User.objects.create_user(username="staff", password="pass12345", is_staff=True)
+        Ticket.objects.create(title="Dune", user=cls.alice)
+        Ticket.objects.create(title="Emma", user=cls.bob)
+        cls.url = reverse("users:export_data")
+
+    def download(self, user, **params):
+        """The response and its streamed body."""
+        self.client.force_login(user)
+        response = self.client.get(self.url, params)
+        return response, b"".join(response.streaming_content) if response.streaming else response.content
+
+    def test_user_download(self):
+        """A streamed attachment of the user's own data, gzipped on demand."""
+        response, body = self.download(self.alice, format="csv", donnees="tickets")
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="litrevu-alice-tickets.csv"')
+        self.assertIn(b"Dune", body)
+        self.assertNotIn(b"Emma", body)
+
+        response, body = self.download(self.alice, gzip="1")
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="litrevu-alice-donnees.jsonl.gz"')
+        self.assertEqual(gzip.decompress(body).decode().count("\n"), 1)
+
+    def test_non_ascii_username_in_the_file_name(self):
+        """A Cyrillic username is percent-encoded as UTF-8 (filename*), which browsers decode."""
+        boris = User.objects.create_user(username="борис", password="pass12345")
+        response, _ = self.download(boris, format="csv", donnees="tickets")
+        self.assertEqual(
+            response["Content-Disposition"],
+            "attachment; filename*=utf-8''litrevu-%D0%B1%D0%BE%D1%80%D0%B8%D1%81-tickets.csv",
+        )
+
+    def test_site_export_is_for_staff(self):
+        """site=1 exports every user's data, for staff members only."""
+        response, _ = self.download(self.alice, site="1")
+        self.assertEqual(response.status_code, 403)
+        _, body = self.download(self.staff, site="1", donnees="tickets")
+        self.assertEqual(body.count(b"\n"), 2)
+
+    def test_invalid_requests_redirect_with_a_toast(self):
+        """Unknown format or dataset, or several datasets in CSV."""
+        for params in ({"format": "xml"}, {"donnees": "mots"}, {"format": "csv"}):
+            with self.subTest(params=params):
+                response, _ = self.download(self.alice, **params)
+                self.assertEqual(response.status_code, 302)
+                self.assertIn("toast_type=error", response.url)
+
+
+class ExportCommandTests(TestCase):
+    """manage.py export_data."""
+
+    def test_writes_a_gzipped_file(self):
+        """--output with --gzip writes the compressed export of the selected user."""
+        alice = User.objects.create_user(username="alice", password="pass12345")
+        Ticket.objects.create(title="Dune", user=alice)
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "alice.jsonl.gz"
+            call_command("export_data", "--user", "alice", "--output", str(path), "--gzip", stderr=io.StringIO())
+            lines = gzip.decompress(path.read_bytes()).decode().splitlines()
+        self.assertEqual([json.loads(line)["type"] for line in lines], ["tickets"])
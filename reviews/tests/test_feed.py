@@ -0,0 +1,300 @@
+"""Tests for the ranked ("pertinence") feed (reviews.feed) and the feed mode preference."""
+
+from datetime import timedelta
+from itertools import product
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from reviews.feed import (
+    CANDIDATE_WINDOW,
+    REVIEW,
+    TICKET,
+    FeedFilters,
+    Thread,
+    chronological,
+    group_by_ticket,
+    own_posts,
+    ranked_items,
+    visible_posts,
+)
+from reviews.models import Review, Ticket
+from users.models import UserFollows
+
+User = get_user_model()
+
+
+def backdate(obj, **delta):
+    """Move a ticket or review back in time (time_created is auto_now_add)."""
+    type(obj).objects.filter(pk=obj.pk).update(time_created=timezone.now() - timedelta(**delta))
+
+
+class RankedFeedTests(TestCase):
+    """Candidate window and scoring."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """A viewer following two authors; a stranger answering one of the viewer's tickets."""
+        cls.viewer = User.objects.create_user(username="viewer", password="pass12345")
+        cls.friend = User.objects.create_user(username="friend", password="pass12345")
+        cls.other = User.objects.create_user(username="other", password="pass12345")
+        cls.stranger = User.objects.create_user(username="stranger", password="pass12345")
+        UserFollows.objects.bulk_create([
+            UserFollows(user=cls.viewer, followed_user=cls.friend),
+            UserFollows(user=cls.viewer, followed_user=cls.other),
+        ])
+        cls.visible = [cls.friend.pk, cls.other.pk, cls.viewer.pk]
+
+    def rank(self):
+        """(kind, pk) of the viewer's ranked feed."""
+        return ranked_items(self.viewer, visible_posts(self.viewer, self.visible), timezone.now())
+
+    def test_recent_posts_first(self):
+        """Without affinity or engagement, the youngest post wins."""
+        old = Ticket.objects.create(title="Old", user=self.friend)
+        new = Ticket.objects.create(title="New", user=self.other)
+        backdate(old, days=3)
+        self.assertEqual(self.rank(), [(TICKET, new.pk), (TICKET, old.pk)])
+
+    def test_affinity_and_engagement_lift_older_posts(self):
+        """An author whose tickets I review, or a much-reviewed ticket, beats a slightly younger post."""
+        for i in range(3):
+            answered = Ticket.objects.create(title=f"Answered {i}", user=self.friend)
+            Review.objects.create(ticket=answered, user=self.viewer, rating=4, headline="h")
+            backdate(answered, days=CANDIDATE_WINDOW.days + 1)
+        Review.objects.filter(user=self.viewer).update(time_created=timezone.now() - CANDIDATE_WINDOW * 2)
+        from_friend = Ticket.objects.create(title="Friend", user=self.friend)
+        from_other = Ticket.objects.create(title="Other", user=self.other)
+        backdate(from_friend, hours=12)
+        self.assertEqual(self.rank()[0], (TICKET, from_friend.pk))
+
+        popular = Ticket.objects.create(title="Popular", user=self.other)
+        for reader in (self.viewer, self.friend, self.stranger):
+            Review.objects.create(ticket=popular, user=reader, rating=5, headline="h")
+        Review.objects.filter(ticket=popular).update(time_created=timezone.now() - CANDIDATE_WINDOW * 2)
+        backdate(popular, hours=6)
+        ranked = self.rank()
+        self.assertLess(ranked.index((TICKET, popular.pk)), ranked.index((TICKET, from_other.pk)))
+
+    def test_candidates_are_the_visible_recent_posts(self):
+        """Posts older than the window and strangers' posts are left out; answers to my tickets are in."""
+        mine = Ticket.objects.create(title="Mine", user=self.viewer)
+        answer = Review.objects.create(ticket=mine, user=self.stranger, rating=3, headline="h")
+        Ticket.objects.create(title="Stranger's", user=self.stranger)
+        old = Ticket.objects.create(title="Old", user=self.friend)
+        backdate(old, days=CANDIDATE_WINDOW.days + 1)
+        self.assertCountEqual(self.rank(), [(TICKET, mine.pk), (REVIEW, answer.pk)])
+
+    @mock.patch("reviews.feed.CANDIDATES", 2)
+    def test_candidate_window_is_bounded(self):
+        """At most CANDIDATES tickets (and reviews) are ranked, the most recent ones."""
+        tickets = [Ticket.objects.create(title=f"T{i}", user=self.friend) for i in range(4)]
+        for hours, ticket in enumerate(reversed(tickets)):
+            backdate(ticket, hours=hours)
+        self.assertEqual(self.rank(), [(TICKET, tickets[3].pk), (TICKET, tickets[2].pk)])
+
+
+class FeedOrderViewTests(TestCase):
+    """The feed mode: query parameter, remembered preference."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """A viewer following an author with an old, much-reviewed ticket and a fresh one."""
+        cls.viewer = User.objects.create_user(username="viewer", password="pass12345")
+        author = User.objects.create_user(username="author", password="pass12345")
+        UserFollows.objects.create(user=cls.viewer, followed_user=author)
+        cls.popular = Ticket.objects.create(title="Popular", user=author)
+        readers = [User.objects.create(username=f"reader{i}") for i in range(5)]
+        for reader in readers:
+            Review.objects.create(ticket=cls.popular, user=reader, rating=5, headline="h")
+        Review.objects.update(time_created=timezone.now() - CANDIDATE_WINDOW * 2)
+        backdate(cls.popular, hours=30)
+        cls.fresh = Ticket.objects.create(title="Fresh", user=author)
+
+    def setUp(self):
+        """Log the viewer in."""
+        self.client.force_login(self.viewer)
+
+    def test_chronological_by_default(self):
+        """The feed is chronological until another order is asked for."""
+        resp = self.client.get(reverse("reviews:feed"))
+        self.assertEqual(resp.context["feed_order"], User.RECENT)
+        self.assertEqual(resp.context["feed_items"][0], self.fresh)
+
+    def test_ordre_parameter_is_read_only(self):
+        """?ordre=pertinence ranks the feed and its page links, but never writes the preference."""
+        resp = self.client.get(reverse("reviews:feed"), {"ordre": User.PERTINENCE, "type": "tickets"})
+        self.assertEqual(resp.context["feed_items"][0], self.popular)
+        self.assertEqual(resp.context["filter_query"], "ordre=pertinence&type=tickets")
+        self.viewer.refresh_from_db()
+        self.assertEqual(self.viewer.feed_order, User.RECENT)
+
+    def test_tabs_post_the_preference(self):
+        """The order tabs save the preference with a POST and come back to the feed with the same filters."""
+        url = reverse("reviews:set_feed_order")
+        resp = self.client.post(url, {"ordre": User.PERTINENCE, "filtres": "ordre=recent&type=tickets&page=3"})
+        self.assertRedirects(resp, reverse("reviews:feed") + "?type=tickets", fetch_redirect_response=False)
+        self.viewer.refresh_from_db()
+        self.assertEqual(self.viewer.feed_order, User.PERTINENCE)
+
+        partial = self.client.get(reverse("reviews:feed"), HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+        self.assertEqual(partial.context["feed_items"][0], self.popular)
+
+        self.client.post(url, {"ordre": "n'importe quoi"})
+        self.assertRedirects(self.client.get(url, {"ordre": User.RECENT}), reverse("reviews:feed"))
+        self.viewer.refresh_from_db()
+        self.assertEqual(self.viewer.feed_order, User.PERTINENCE)
+
+    def test_deleted_posts_are_skipped(self):
+        """A ranked post deleted before its page is loaded is left out of the page."""
+        self.viewer.feed_order = User.PERTINENCE
+        self.viewer.save()
+        with mock.patch("reviews.views.ranked_items", return_value=[(TICKET, self.fresh.pk), (TICKET, 0)]):
+            resp = self.client.get(reverse("reviews:feed"))
+        self.assertEqual(resp.context["feed_items"], [self.fresh])
+
+
+class ThreadedFeedTests(TestCase):
+    """The "Par ticket" mode: each ticket of a page once, with its reviews."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """A followed author's ticket answered three times, and a lone review of another ticket."""
+        cls.viewer = User.objects.create_user(username="viewer", password="pass12345")
+        author = User.objects.create_user(username="author", password="pass12345")
+        UserFollows.objects.create(user=cls.viewer, followed_user=author)
+        cls.ticket = Ticket.objects.create(title="Germinal", user=author)
+        cls.reviews = [
+            Review.objects.create(ticket=cls.ticket, user=user, rating=4, headline=f"Critique {i}")
+            for i, user in enumerate([author, cls.viewer, User.objects.create(username="reader")])
+        ]
+        other = Ticket.objects.create(title="Nana", user=User.objects.create(username="stranger"))
+        cls.lone = Review.objects.create(ticket=other, user=author, rating=2, headline="Seule")
+
+    def test_group_by_ticket(self):
+        """Items of a ticket merge where the first one was, reviews oldest first; lone items stay as they are."""
+        items = [self.lone, *reversed(self.reviews), self.ticket]
+        self.assertEqual(group_by_ticket(items), [self.lone, Thread(self.ticket, self.reviews)])
+        self.assertEqual(group_by_ticket(self.reviews[:2]), [Thread(self.ticket, self.reviews[1::-1])])
+
+    def test_threaded_page_renders_each_ticket_once(self):
+        """Same queries as the chronological feed, fewer ticket cards and a smaller page."""
+        self.client.force_login(self.viewer)
+        url = reverse("reviews:feed")
+        recent = self.client.get(url, {"ordre": User.RECENT})
+        # session user, followed ids, count, page rows, its tickets, its reviews, recommendations
+        with self.assertNumQueries(7):
+            threaded = self.client.get(url, {"ordre": User.THREADS})
+
+        def ticket_cards(response):
+            return sum(t.name == "reviews/components/ticket_card.html" for t in response.templates)
+
+        self.assertEqual((ticket_cards(recent), ticket_cards(threaded)), (4, 2))
+        self.assertLess(len(threaded.content), len(recent.content))
+        self.assertEqual(threaded.content.decode().count("Germinal"), 1)
+        self.assertContains(threaded, "Critique 1")
+
+
+class FeedFilterTests(TestCase):
+    """Type, rating, date range and author filters of the feed and "Mes posts"."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """A viewer following `friend` and `other`; tickets and reviews of both, some backdated."""
+        cls.viewer = User.objects.create_user(username="viewer", password="pass12345")
+        cls.friend = User.objects.create_user(username="friend", password="pass12345")
+        cls.other = User.objects.create_user(username="other", password="pass12345")
+        UserFollows.objects.bulk_create([
+            UserFollows(user=cls.viewer, followed_user=cls.friend),
+            UserFollows(user=cls.viewer, followed_user=cls.other),
+        ])
+        cls.old_ticket = Ticket.objects.create(title="Ancien", user=cls.friend)
+        backdate(cls.old_ticket, days=40)
+        cls.ticket = Ticket.objects.create(title="Récent", user=cls.other)
+        cls.good = Review.objects.create(ticket=cls.old_ticket, user=cls.other, rating=5, headline="Superbe")
+        cls.bad = Review.objects.create(ticket=cls.ticket, user=cls.friend, rating=1, headline="Ennuyeux")
+        cls.own = Review.objects.create(ticket=cls.ticket, user=cls.viewer, rating=4, headline="Le mien")
+        cls.visible = [cls.friend.pk, cls.other.pk, cls.viewer.pk]
+
+    def setUp(self):
+        """Log the viewer in."""
+        self.client.force_login(self.viewer)
+
+    def feed(self, url="reviews:feed", **params):
+        """Items of a filtered page."""
+        return list(self.client.get(reverse(url), params).context["feed_items"])
+
+    def test_type_and_rating(self):
+        """type keeps one kind of post; note keeps the reviews rated at least that much."""
+        self.assertEqual(self.feed(type="tickets"), [self.ticket, self.old_ticket])
+        self.assertEqual(self.feed(type="critiques"), [self.own, self.bad, self.good])
+        self.assertEqual(self.feed(note=4), [self.own, self.good])
+
+    def test_date_range_and_author(self):
+        """du / au bound the creation date (both days included); auteur keeps one user's posts."""
+        today = timezone.localdate()
+        self.assertEqual(self.feed(du=today - timedelta(days=1)), [self.own, self.bad, self.good, self.ticket])
+        self.assertEqual(self.feed(au=today - timedelta(days=40)), [self.old_ticket])
+        self.assertEqual(self.feed(auteur="@friend"), [self.bad, self.old_ticket])
+        self.assertEqual(self.feed(auteur="friend", type="critiques", note=1), [self.bad])
+
+    def test_invalid_values_only_drop_their_filter(self):
+        """A malformed parameter is ignored, the others still apply."""
+        self.assertEqual(self.feed(type="critiques", note="beaucoup", du="hier"), [self.own, self.bad, self.good])
+        # the last representable day has no next day to bound "au" with
+        self.assertEqual(self.feed(type="critiques", au="9999-12-31"), [self.own, self.bad, self.good])
+        self.assertEqual(self.feed(type="critiques", du="9999-12-31"), [self.own, self.bad, self.good])
+        self.assertEqual(self.feed("users:my_posts", au="9999-12-31"), [self.own])
+
+    def test_filters_follow_the_pagination_and_the_other_modes(self):
+        """Page links, the AJAX partial and the ranked mode keep the filters."""
+        for i in range(12):
+            Review.objects.create(ticket=self.old_ticket, user=User.objects.create(username=f"r{i}"), rating=5,
+                                  headline="h")
+            Review.objects.create(ticket=Ticket.objects.create(title=f"T{i}", user=self.friend), user=self.friend,
+                                  rating=5, headline="h")
+        resp = self.client.get(reverse("reviews:feed"), {"auteur": "friend", "note": 5},
+                               HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+        self.assertTemplateUsed(resp, "reviews/partials/feed_list.html")
+        self.assertContains(resp, "?page=2&amp;auteur=friend&amp;note=5")
+        self.assertEqual(resp.context["page_obj"].paginator.count, 12)
+        ranked = self.feed(ordre=User.PERTINENCE, auteur="friend", note=5)
+        self.assertTrue(ranked and all(item.user == self.friend and item.rating == 5 for item in ranked))
+
+    def test_my_posts(self):
+        """Mes posts takes the same filters, without the author one."""
+        Ticket.objects.create(title="Le mien", user=self.viewer)
+        self.assertEqual(self.feed("users:my_posts", type="critiques"), [self.own])
+        self.assertNotIn("auteur", self.client.get(reverse("users:my_posts")).context["filter_form"].fields)
+
+    def test_query_plans_use_the_indexes(self):
+        """Whatever the combination, every table is searched through an index, never scanned."""
+        now = timezone.now()
+        for kind, rating, dates, author in product(
+            (None, TICKET, REVIEW), (None, 4), (None, (now - timedelta(days=7), now)), (None, "friend")
+        ):
+            filters = FeedFilters(kind, rating, *(dates or (None, None)), author)
+            feed, mine = visible_posts(self.viewer, self.visible), own_posts(self.viewer)
+            for label, sources in (("feed", feed), ("my_posts", mine)):
+                with self.subTest(filters=filters, source=label):
+                    rows = chronological(filters.apply(sources))
+                    if kind == TICKET and rating is not None:
+                        # nothing can match: no query at all
+                        with self.assertNumQueries(0):
+                            self.assertEqual(list(rows), [])
+                        continue
+                    steps = [line.split(" ", 3)[3] for line in rows.explain().splitlines()]
+                    tables = [step for step in steps if step.startswith(("SCAN", "SEARCH"))]
+                    self.assertTrue(tables)
+                    self.assertFalse([step for step in tables if step.startswith("SCAN")], steps)
+                    if dates:
+                        self.assertTrue(all(
+                            "time_created>? AND time_created<?" in step
+                            for step in tables if "_recent_idx" in step
+                        ), steps)
+                    if author:
+                        # the username is looked up through its unique index (or the author's primary key)
+                        self.assertTrue(any(step.startswith("SEARCH users_user") for step in tables), steps)
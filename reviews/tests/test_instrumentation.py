@@ -0,0 +1,345 @@
+"""Tests for the performance instrumentation (LITRevu.perf) on the reviews views."""
+
+import json
+import os
+import pstats
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from LITRevu.perf import metrics
+from LITRevu.perf.nplusone import NPlusOneDetected, detect_n_plus_one
+from LITRevu.perf.slowlog import capture_slow_queries
+from reviews.models import RequestProfile, Review, Ticket
+from users.models import UserFollows
+
+User = get_user_model()
+
+
+def seed_feed(user, tickets=3):
+    """Create `tickets` tickets for `user`, each answered by one review."""
+    for i in range(tickets):
+        ticket = Ticket.objects.create(title=f"Book {i}", description="", user=user)
+        Review.objects.create(headline=f"Review {i}", rating=4, user=user, ticket=ticket)
+
+
+@override_settings(PERF_TIMING_SAMPLE_RATE=1.0)
+class ServerTimingMiddlewareTests(TestCase):
+    """Sampled requests get a Server-Timing header and a structured log line."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create a user with a few feed items."""
+        cls.user = User.objects.create_user(username="alice", password="pass12345")
+        seed_feed(cls.user)
+
+    def setUp(self):
+        """Authenticate the feed owner."""
+        self.client.force_login(self.user)
+
+    def test_feed_response_has_server_timing_entries(self):
+        """db, tpl, partials (cards) and total are reported, and logged as one structured record."""
+        with self.assertLogs("litrevu.perf", level="INFO") as logs:
+            resp = self.client.get(reverse("reviews:feed"))
+        header = resp["Server-Timing"]
+        for entry in ("db;dur=", "tpl;dur=", "tpl-partials;dur=", "total;dur="):
+            self.assertIn(entry, header)
+
+        [record] = [json.loads(record.getMessage()) for record in logs.records]
+        self.assertEqual((record["event"], record["status"]), ("request_timing", 200))
+        self.assertIn(f'desc="{record["db_queries"]} queries"', header)
+
+    def test_log_line_is_keyed_by_url_name(self):
+        """The JSON log record carries the view name and the per-card partial renders."""
+        with self.assertLogs("litrevu.perf", level="INFO") as logs:
+            self.client.get(reverse("reviews:feed"))
+
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record["view"], "reviews:feed")
+        self.assertGreater(record["db_queries"], 0)
+        self.assertEqual(record["partials"]["reviews/components/ticket_card.html"]["count"], 3)
+        self.assertEqual(record["partials"]["reviews/components/review_card.html"]["count"], 3)
+
+
+class ServerTimingDisabledTests(TestCase):
+    """With the default sample rate of 0 nothing is added to responses."""
+
+    def test_no_header_when_disabled(self):
+        """The middleware unloads itself; responses are untouched."""
+        resp = self.client.get(reverse("home"))
+        self.assertNotIn("Server-Timing", resp.headers)
+
+
+class NPlusOneDetectorTests(TestCase):
+    """Repeated query shapes are reported with their call site."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """A user following an author with a full page of tickets and reviews."""
+        cls.user = User.objects.create_user(username="alice", password="pass12345")
+        cls.author = User.objects.create_user(username="bob", password="pass12345")
+        UserFollows.objects.create(user=cls.user, followed_user=cls.author)
+        seed_feed(cls.author, tickets=12)
+
+    def setUp(self):
+        """Authenticate the follower."""
+        self.client.force_login(self.user)
+
+    def test_repeated_shape_is_reported_with_call_site(self):
+        """A query per ticket from the same line is flagged, with a readable report."""
+        tickets = list(Ticket.objects.all())
+        with self.assertRaises(NPlusOneDetected) as ctx:
+            with detect_n_plus_one(threshold=5, label="loop"):
+                for ticket in tickets:
+                    Review.objects.filter(ticket=ticket).exists()
+
+        report = str(ctx.exception)
+        self.assertIn("N+1 queries detected in loop", report)
+        self.assertIn("12x  reviews/tests/test_instrumentation.py:", report)
+        self.assertIn('WHERE "reviews_review"."ticket_id" = ?', report)
+
+    def test_feed_cards_do_not_query_per_item(self):
+        """Full feed and my_posts pages render without an N+1 pattern."""
+        for url in (reverse("reviews:feed"), reverse("reviews:feed") + "?page=2"):
+            with detect_n_plus_one(threshold=3, label=url):
+                self.client.get(url)
+
+        self.client.force_login(self.author)
+        with detect_n_plus_one(threshold=3, label="my_posts"):
+            self.client.get(reverse("users:my_posts"))
+
+
+# Any non-zero threshold below the fastest statement logs every query.
+@override_settings(SLOW_QUERY_THRESHOLD_MS=1e-6)
+class SlowQueryLogTests(TestCase):
+    """Slow statements are logged with their plan, view and call site."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """A user with a few feed items."""
+        cls.user = User.objects.create_user(username="alice", password="pass12345")
+        seed_feed(cls.user)
+
+    def _records(self, logs):
+        return [json.loads(record.getMessage()) for record in logs.records]
+
+    def test_feed_queries_are_attributed_to_view_and_call_site(self):
+        """The ticket cards query of the feed carries reviews:feed, its call site in reviews.feed and a plan."""
+        self.client.force_login(self.user)
+        with self.assertLogs("litrevu.perf.slowlog", level="WARNING") as logs:
+            self.client.get(reverse("reviews:feed"))
+
+        records = self._records(logs)
+        self.assertTrue(all(record["view"] == "reviews:feed" for record in records))
+        ticket_query = next(
+            record for record in records
+            if record["sql"].startswith('SELECT "reviews_ticket"') and "feed.py" in record["call_site"]
+        )
+        self.assertRegex(ticket_query["call_site"], r"^reviews/feed\.py:\d+ in load_items$")
+        self.assertTrue(ticket_query["plan"])
+        self.assertTrue(any("reviews_ticket" in step for step in ticket_query["plan"]))
+        self.assertGreater(ticket_query["duration_ms"], 0)
+
+    def test_credentials_are_redacted(self):
+        """Parameters of statements touching the password column are not written."""
+        with self.assertLogs("litrevu.perf.slowlog", level="WARNING") as logs:
+            with capture_slow_queries(view="script"):
+                User.objects.create_user(username="bob", password="pass12345")
+
+        insert = next(r for r in self._records(logs) if r["sql"].startswith('INSERT INTO "users_user"'))
+        self.assertEqual(insert["params"], "<redacted>")
+        self.assertEqual(insert["view"], "script")
+
+    def test_fast_queries_are_not_logged(self):
+        """Statements under the threshold produce nothing."""
+        with self.assertNoLogs("litrevu.perf.slowlog", level="WARNING"):
+            with capture_slow_queries(threshold_ms=60_000):
+                list(Ticket.objects.all())
+
+
+@override_settings(METRICS_MODE="memory", METRICS_TOKEN="scrape-me")
+class MetricsTests(TestCase):
+    """Per-view counters and histograms, exposed to staff and token holders only."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """A regular user with a few feed items and a staff user."""
+        cls.user = User.objects.create_user(username="alice", password="pass12345")
+        cls.staff = User.objects.create_user(username="ops", password="pass12345", is_staff=True)
+        seed_feed(cls.user)
+
+    def setUp(self):
+        """Start every test from an empty registry."""
+        metrics.REGISTRY.reset()
+        self.addCleanup(metrics.configure, "off")
+
+    def _scrape(self, **headers):
+        return self.client.get(reverse("metrics"), **headers)
+
+    def test_requests_are_recorded_per_url_name(self):
+        """Rate, latency histogram and DB time are labelled with the URL name."""
+        self.client.force_login(self.user)
+        self.client.get(reverse("reviews:feed"))
+        self.client.get(reverse("users:my_posts"))
+
+        body = self._scrape(HTTP_AUTHORIZATION="Bearer scrape-me").content.decode()
+        self.assertIn('litrevu_http_requests_total{view="reviews:feed",method="GET",status="200"} 1', body)
+        self.assertIn('litrevu_http_requests_total{view="users:my_posts",method="GET",status="200"} 1', body)
+        self.assertIn('litrevu_http_request_duration_seconds_bucket{view="reviews:feed",le="+Inf"} 1', body)
+        self.assertIn('litrevu_http_request_duration_seconds_count{view="reviews:feed"} 1', body)
+        self.assertRegex(body, r'litrevu_db_queries_total\{view="reviews:feed"\} [1-9]')
+        self.assertIn("# TYPE litrevu_http_request_duration_seconds histogram", body)
+
+    def test_errors_and_cache_ratio(self):
+        """5xx responses are counted as errors; the hit ratio comes from cache lookups."""
+        metrics.configure("memory")
+        metrics.record_request("reviews:feed", "GET", 503, 0.2, 0, 0.0)
+        for hit in (True, True, True, False):
+            metrics.record_cache_lookup(hit)
+
+        body = metrics.render_metrics()
+        self.assertIn('litrevu_http_errors_total{view="reviews:feed"} 1', body)
+        self.assertIn("litrevu_cache_hit_ratio 0.75", body)
+
+    def test_endpoint_is_hidden_from_everyone_else(self):
+        """Anonymous, regular users and wrong tokens get a 404; staff get the exposition."""
+        self.assertEqual(self._scrape().status_code, 404)
+        self.assertEqual(self._scrape(HTTP_AUTHORIZATION="Bearer wrong").status_code, 404)
+        self.client.force_login(self.user)
+        self.assertEqual(self._scrape().status_code, 404)
+
+        self.client.force_login(self.staff)
+        response = self._scrape()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], metrics.CONTENT_TYPE)
+
+
+class MultiProcessMetricsTests(TestCase):
+    """Worker snapshots are merged; gauges of dead workers are dropped."""
+
+    def setUp(self):
+        """A throwaway snapshot directory and an empty registry."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        metrics.REGISTRY.reset()
+        self.addCleanup(metrics.configure, "off")
+
+    def test_counters_are_summed_across_worker_files(self):
+        """A dead worker's requests still count, its connection age does not."""
+        directory = Path(self.tmp.name)
+        dead_pid = 2 ** 22 + 1  # above the default pid_max
+        (directory / f"{dead_pid}-1.json").write_text(json.dumps({"pid": dead_pid, "metrics": {
+            "litrevu_http_requests_total": [[["reviews:feed", "GET", "200"], 4.0]],
+            "litrevu_http_request_duration_seconds": [[["reviews:feed"], [4] + [0] * 11 + [0.01]]],
+            "litrevu_db_connection_age_seconds": [[["default", str(dead_pid)], 12.0]],
+        }}))
+
+        with override_settings(METRICS_MODE="multiprocess", METRICS_MULTIPROC_DIR=directory):
+            metrics.configure()
+            metrics.record_request("reviews:feed", "GET", 200, 0.02, 3, 0.001)
+            body = metrics.render_metrics()
+
+        self.assertIn('litrevu_http_requests_total{view="reviews:feed",method="GET",status="200"} 5', body)
+        self.assertIn('litrevu_http_request_duration_seconds_bucket{view="reviews:feed",le="0.005"} 4', body)
+        self.assertIn('litrevu_http_request_duration_seconds_count{view="reviews:feed"} 5', body)
+        self.assertNotIn(f'pid="{dead_pid}"', body)
+        self.assertTrue((directory / f"{os.getpid()}-{metrics._store.started}.json").exists())
+
+
+class RequestProfilerTests(TestCase):
+    """Staff-only, on-demand cProfile captures stored for the admin."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """A staff member with a few feed items and a regular user."""
+        cls.staff = User.objects.create_superuser(username="ops", password="pass12345")
+        cls.user = User.objects.create_user(username="alice", password="pass12345")
+        seed_feed(cls.staff)
+
+    def setUp(self):
+        """Store captures in a throwaway directory."""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings_override = override_settings(REQUEST_PROFILE_DIR=Path(tmp.name), REQUEST_PROFILE_KEEP=2)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_header_captures_the_request(self):
+        """The capture has a loadable pstats file and a call tree through the view."""
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse("reviews:feed"), HTTP_X_PROFILE="1")
+
+        profile = RequestProfile.objects.get(pk=response["X-Profile-Id"])
+        self.assertEqual((profile.view_name, profile.method, profile.status_code), ("reviews:feed", "GET", 200))
+        self.assertEqual(profile.user, self.staff)
+        self.assertRegex(profile.summary, r"reviews/views\.py:\d+ feed")
+        stats = pstats.Stats(profile.pstats_file.path)
+        self.assertGreater(stats.total_calls, 0)
+
+    def test_flag_is_ignored_for_non_staff(self):
+        """Regular users cannot trigger a capture, whatever they send."""
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("reviews:feed") + "?_profile=1", HTTP_X_PROFILE="1")
+
+        self.assertNotIn("X-Profile-Id", response.headers)
+        self.assertFalse(RequestProfile.objects.exists())
+
+    def test_query_flag_and_pruning(self):
+        """?_profile=1 works too; only REQUEST_PROFILE_KEEP captures (and files) are kept."""
+        self.client.force_login(self.staff)
+        for _ in range(3):
+            self.client.get(reverse("users:my_posts") + "?_profile=1")
+        self.client.get(reverse("users:my_posts") + "?_profile=0")
+
+        profiles = list(RequestProfile.objects.all())
+        self.assertEqual(len(profiles), 2)
+        stored = [p for p in Path(profiles[0].pstats_file.storage.location).rglob("*.pstats")]
+        self.assertEqual(len(stored), 2)
+
+    def test_admin_lists_and_serves_profiles(self):
+        """The changelist shows captures and the pstats file is downloadable."""
+        self.client.force_login(self.staff)
+        profile_id = self.client.get(reverse("reviews:feed"), HTTP_X_PROFILE="1")["X-Profile-Id"]
+
+        changelist = self.client.get(reverse("admin:reviews_requestprofile_changelist"))
+        self.assertContains(changelist, "reviews:feed")
+        download = self.client.get(reverse("admin:reviews_requestprofile_pstats", args=[profile_id]))
+        self.assertEqual(download.status_code, 200)
+        self.assertIn("attachment", download["Content-Disposition"])
+
+
+@override_settings(MEMORY_TRACKING_VIEWS=["reviews:feed"], MEMORY_TRACKING_TOP=5)
+class MemoryTrackingTests(TestCase):
+    """Selected URL names get a tracemalloc report per request."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """A user with a few feed items."""
+        cls.user = User.objects.create_user(username="alice", password="pass12345")
+        seed_feed(cls.user)
+
+    def setUp(self):
+        """Authenticate the feed owner."""
+        self.client.force_login(self.user)
+
+    def test_selected_view_is_traced(self):
+        """Peak, retained memory and allocation sites are logged for the feed."""
+        with self.assertLogs("litrevu.perf", level="INFO") as logs:
+            self.client.get(reverse("reviews:feed"))
+
+        records = [json.loads(r.getMessage()) for r in logs.records]
+        record = next(r for r in records if r["event"] == "request_memory")
+        self.assertEqual(record["view"], "reviews:feed")
+        self.assertGreater(record["peak_kib"], 0)
+        self.assertLessEqual(len(record["top"]), 5)
+        self.assertTrue(all({"site", "size_kib", "count"} <= site.keys() for site in record["top"]))
+
+    def test_other_views_are_not_traced(self):
+        """my_posts is not selected: no report, tracemalloc left off."""
+        with self.assertNoLogs("litrevu.perf", level="INFO"):
+            self.client.get(reverse("users:my_posts"))
+        self.assertFalse(tracemalloc.is_tracing())
@@ -0,0 +1,136 @@
+"""Tests for the trending / top-rated leaderboards (reviews.leaderboards) and their pages."""
+
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from reviews.leaderboards import HALF_LIFE, leaderboard_page, refresh
+from reviews.models import Leaderboard, Review, Ticket
+
+User = get_user_model()
+
+
+def ranked(name):
+    """Ticket ids of a board, best first."""
+    board = Leaderboard.objects.get(pk=name)
+    return list(board.entries.order_by("-score", "-ticket_id").values_list("ticket_id", flat=True))
+
+
+class LeaderboardTests(TestCase):
+    """Scores, incremental runs and the table size."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Four readers; `old` was loved a month ago, `fresh` liked today, `mixed` has one 5 and many 4s."""
+        cls.readers = [User.objects.create_user(username=f"reader{i}", password="pass12345") for i in range(4)]
+        cls.owner = User.objects.create_user(username="owner", password="pass12345")
+        cls.old, cls.fresh, cls.single, cls.mixed = (
+            Ticket.objects.create(title=title, user=cls.owner) for title in ("Old", "Fresh", "Single", "Mixed")
+        )
+        for reader in cls.readers:
+            review = Review.objects.create(ticket=cls.old, user=reader, rating=5, headline="h")
+            Review.objects.filter(pk=review.pk).update(time_created=timezone.now() - 10 * HALF_LIFE)
+            Review.objects.create(ticket=cls.mixed, user=reader, rating=4, headline="h")
+        Review.objects.create(ticket=cls.fresh, user=cls.readers[0], rating=3, headline="h")
+        Review.objects.create(ticket=cls.single, user=cls.readers[0], rating=5, headline="h")
+
+    def test_full_build(self):
+        """Recent activity wins the trending board; many good reviews beat a single perfect one."""
+        self.assertTrue(refresh().full)
+        self.assertEqual(ranked(Leaderboard.TRENDING), [self.mixed.pk, self.single.pk, self.fresh.pk])
+        self.assertEqual(ranked(Leaderboard.TOP_RATED)[:2], [self.old.pk, self.mixed.pk])
+        self.assertLess(ranked(Leaderboard.TOP_RATED).index(self.mixed.pk),
+                        ranked(Leaderboard.TOP_RATED).index(self.single.pk))
+
+    def test_incremental_run_rescores_changed_tickets_only(self):
+        """New reviews move their ticket up; deleted ones move it down; nothing else is read."""
+        refresh()
+        for reader in self.readers[1:]:
+            Review.objects.create(ticket=self.fresh, user=reader, rating=5, headline="h")
+        result = refresh()
+        self.assertFalse(result.full)
+        self.assertEqual(result.tickets, {Leaderboard.TRENDING: 1, Leaderboard.TOP_RATED: 1})
+        self.assertEqual(ranked(Leaderboard.TRENDING)[0], self.fresh.pk)
+
+        Review.objects.filter(ticket=self.single).delete()
+        refresh()
+        self.assertNotIn(self.single.pk, ranked(Leaderboard.TRENDING))
+        self.assertNotIn(self.single.pk, ranked(Leaderboard.TOP_RATED))
+
+    def test_incremental_matches_full_build(self):
+        """An incremental run ranks like a rebuild."""
+        refresh()
+        Review.objects.create(ticket=self.old, user=self.owner, rating=1, headline="h")
+        refresh()
+        incremental = ranked(Leaderboard.TRENDING), ranked(Leaderboard.TOP_RATED)
+        refresh(full=True)
+        self.assertEqual(incremental, (ranked(Leaderboard.TRENDING), ranked(Leaderboard.TOP_RATED)))
+
+    @mock.patch("reviews.leaderboards.BOARD_SIZE", 2)
+    def test_board_size_is_bounded(self):
+        """Only the BOARD_SIZE best tickets are kept, by full and incremental runs alike."""
+        refresh()
+        self.assertEqual(len(ranked(Leaderboard.TOP_RATED)), 2)
+        Review.objects.create(ticket=self.fresh, user=self.readers[1], rating=5, headline="h")
+        refresh()
+        self.assertEqual(len(ranked(Leaderboard.TOP_RATED)), 2)
+
+    def test_command(self):
+        """The command reports what it rescored."""
+        out = StringIO()
+        call_command("build_leaderboards", stdout=out)
+        call_command("build_leaderboards", stdout=out)
+        self.assertIn("Full build", out.getvalue())
+        self.assertIn("Incremental run — trending: 0 ticket(s)", out.getvalue())
+
+
+@override_settings(LEADERBOARD_CACHE_TIMEOUT=60)
+class LeaderboardPageTests(TestCase):
+    """Public pages: keyset pagination and bounded-staleness cache."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Five reviewed tickets."""
+        owner = User.objects.create_user(username="owner", password="pass12345")
+        reader = User.objects.create_user(username="reader", password="pass12345")
+        for rating in range(5):
+            ticket = Ticket.objects.create(title=f"Livre {rating}", user=owner)
+            Review.objects.create(ticket=ticket, user=reader, rating=rating, headline="h")
+        refresh()
+
+    def setUp(self):
+        """Start with an empty cache."""
+        cache.clear()
+
+    def test_pages_walk_every_entry_once(self):
+        """Following next_cursor lists the whole board in order, with running ranks."""
+        seen, cursor, starts = [], None, []
+        while True:
+            page = leaderboard_page(Leaderboard.TOP_RATED, cursor=cursor, limit=2)
+            seen += [entry.ticket_id for entry in page.entries]
+            starts.append(page.start)
+            if page.next_cursor is None:
+                break
+            cursor = page.next_cursor
+        self.assertEqual(seen, ranked(Leaderboard.TOP_RATED))
+        self.assertEqual(starts, [1, 3, 5])
+
+    def test_pages_are_public_and_cached(self):
+        """Anonymous visitors see the board; a second hit reads nothing from the database."""
+        url = reverse("reviews:top_rated")
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        self.assertContains(resp, "Livre 4")
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+    def test_unbuilt_board(self):
+        """Before the first build the page says so."""
+        Leaderboard.objects.all().delete()
+        self.assertContains(self.client.get(reverse("reviews:trending")), "pas encore été calculé")
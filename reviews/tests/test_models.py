@@ -3,7 +3,8 @@
 from django.contrib.auth import get_user_model
 from django.test import TestCase
 
-from reviews.models import Ticket
+from reviews.models import Review, Ticket
+from reviews.ticket_stats import reconcile
 
 User = get_user_model()
 
@@ -35,3 +36,80 @@ class TicketModelTests(TestCase):
         t2 = Ticket.objects.create(title="new", description="", user=u)
         ordered = list(Ticket.objects.all())  # respects Meta.ordering
         self.assertEqual([t.id for t in ordered], [t2.id, t1.id])
+
+
+class TicketReviewStatsTests(TestCase):
+    """Denormalized review aggregates of Ticket (reviews.ticket_stats / reviews.signals)."""
+
+    def setUp(self):
+        """A ticket and three potential reviewers."""
+        self.owner = User.objects.create_user(username="owner", password="pass")
+        self.readers = [User.objects.create_user(username=f"reader{i}", password="pass") for i in range(3)]
+        self.ticket = Ticket.objects.create(title="Book", description="", user=self.owner)
+
+    def review(self, user, rating):
+        return Review.objects.create(ticket=self.ticket, user=user, rating=rating, headline="H")
+
+    def assertStats(self, count, total, histogram):
+        self.ticket.refresh_from_db()
+        self.assertEqual((self.ticket.review_count, self.ticket.rating_sum), (count, total))
+        self.assertEqual(self.ticket.rating_histogram, histogram)
+
+    def test_create_update_delete_keep_the_aggregates_exact(self):
+        """Each ORM write moves the counters by one F() update; reconcile finds nothing to fix."""
+        self.review(self.readers[0], 4)
+        second = self.review(self.readers[1], 2)
+        self.assertStats(2, 6, [0, 0, 1, 0, 1, 0])
+        self.assertEqual(self.ticket.average_rating, 3)
+        self.assertTrue(self.ticket.has_review)
+
+        edited = Review.objects.get(pk=second.pk)
+        edited.rating = 5
+        with self.assertNumQueries(3):  # the review UPDATE, the ticket's F() UPDATE, the ReviewChange INSERT
+            edited.save()
+        self.assertStats(2, 9, [0, 0, 0, 0, 1, 1])
+
+        edited.headline = "Same rating"
+        with self.assertNumQueries(1):
+            edited.save()
+
+        Review.objects.get(pk=second.pk).delete()
+        self.assertStats(1, 4, [0, 0, 0, 0, 1, 0])
+        self.assertEqual(reconcile(), 0)
+
+    def test_save_of_an_instance_not_loaded_from_the_database(self):
+        """Without the loaded rating, the ticket is recomputed from its reviews."""
+        review = self.review(self.readers[0], 1)
+        Review(
+            pk=review.pk, ticket=self.ticket, user=self.readers[0], rating=3, headline="H",
+            time_created=review.time_created,
+        ).save()
+        self.assertStats(1, 3, [0, 0, 0, 1, 0, 0])
+
+    def test_deleting_the_ticket_skips_per_review_updates(self):
+        """Cascaded review deletions do not update the ticket being deleted, and are logged at once."""
+        for reader in self.readers:
+            self.review(reader, 3)
+        # collect the reviews, uncount them from the archive (one UPDATE), log them (one INSERT ... SELECT),
+        # delete them, their recommendations and leaderboard entries, the ticket, uncount the ticket
+        with self.assertNumQueries(8):
+            self.ticket.delete()
+
+    def test_reconcile_fixes_writes_that_bypass_signals(self):
+        """bulk_create / QuerySet.update drift; reconcile() rewrites only the drifted tickets."""
+        Review.objects.bulk_create([
+            Review(ticket=self.ticket, user=reader, rating=rating, headline="H")
+            for reader, rating in zip(self.readers, (5, 4, 0))
+        ])
+        untouched = Ticket.objects.create(title="Other", description="", user=self.owner)
+        self.assertStats(0, 0, [0] * 6)
+
+        self.assertEqual(reconcile(dry_run=True), 1)
+        self.assertStats(0, 0, [0] * 6)
+        self.assertEqual(reconcile(), 1)
+        self.assertStats(3, 9, [1, 0, 0, 0, 1, 1])
+
+        Review.objects.filter(rating=0).update(rating=1)
+        self.assertEqual(reconcile(Ticket.objects.filter(pk=untouched.pk)), 0)
+        self.assertEqual(reconcile(), 1)
+        self.assertStats(3, 10, [0, 1, 0, 0, 1, 1])
@@ -0,0 +1,176 @@
+"""Query-budget contract: every view stays within its budget whatever the data size.
+
+Budgets live in LITRevu.perf.budgets.QUERY_BUDGETS (URL name -> max queries,
+optional max rows). Each scenario below is replayed on a small and a large
+dataset; a failure prints every statement the view ran.
+"""
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.urls import get_resolver, reverse
+from django.utils import timezone
+
+from LITRevu.perf.budgets import QUERY_BUDGETS, check_budget, record_queries
+from reviews.archive import rebuild as rebuild_archive
+from reviews.books import assign_books
+from reviews.leaderboards import refresh as refresh_leaderboards
+from reviews.models import Review, Ticket
+from users.models import UserFollows
+
+User = get_user_model()
+
+PASSWORD = "StrongPassw0rd!"
+
+DATASET_SIZES = {
+    # followed authors, tickets per author
+    "small": (2, 2),
+    "large": (8, 15),
+}
+
+# (url name, method, url args, POST data) - args/data are callables of the dataset
+SCENARIOS = [
+    ("home", "get", None, None),
+    ("home", "post", None, lambda d: {"username": d["viewer"].username, "password": PASSWORD}),
+    ("users:register", "get", None, None),
+    ("users:register", "post", None, lambda d: {
+        "username": "newcomer", "password1": PASSWORD, "password2": PASSWORD,
+    }),
+    ("users:logout", "post", None, None),
+    ("reviews:feed", "get", None, None),
+    ("reviews:feed", "get", None, lambda d: {"ordre": "pertinence"}),
+    ("reviews:feed", "get", None, lambda d: {"ordre": "threads"}),
+    ("reviews:set_feed_order", "post", None, lambda d: {"ordre": "pertinence", "filtres": "type=tickets"}),
+    ("reviews:search", "get", None, lambda d: {"q": "book"}),
+    ("reviews:book", "get", lambda d: [d["book"].pk], None),
+    ("reviews:trending", "get", None, None),
+    ("reviews:top_rated", "get", None, None),
+    ("users:my_posts", "get", None, None),
+    ("users:my_posts", "get", None, lambda d: {"mois": timezone.localdate().strftime("%Y-%m")}),
+    ("users:export_data", "get", None, None),
+    ("users:my_follows", "get", None, None),
+    ("users:my_follows", "post", None, lambda d: {"username": d["stranger"].username}),
+    ("users:unfollow", "post", lambda d: [d["followed"].pk], None),
+    ("reviews:create_ticket", "get", None, None),
+    ("reviews:create_ticket", "post", None, lambda d: {"title": "New", "description": "Desc"}),
+    ("reviews:similar_tickets", "get", None, lambda d: {"title": "Book"}),
+    ("reviews:edit_ticket", "get", lambda d: [d["own_ticket"].pk], None),
+    ("reviews:edit_ticket", "post", lambda d: [d["own_ticket"].pk], lambda d: {"title": "Edited"}),
+    ("reviews:delete_ticket", "post", lambda d: [d["own_ticket"].pk], None),
+    ("users:delete_my_posts", "post", None, lambda d: {
+        "tickets": d["own_tickets"], "critiques": [d["own_review"].pk],
+    }),
+    ("reviews:create_review", "get", None, None),
+    ("reviews:create_review", "post", None, lambda d: {
+        "title": "Standalone", "headline": "Great", "rating": 4, "body": "",
+    }),
+    ("reviews:create_review_for_ticket", "get", lambda d: [d["open_ticket"].pk], None),
+    ("reviews:create_review_for_ticket", "post", lambda d: [d["open_ticket"].pk], lambda d: {
+        "headline": "Reply", "rating": 3, "body": "",
+    }),
+    ("reviews:edit_review", "get", lambda d: [d["own_review"].pk], None),
+    ("reviews:edit_review", "post", lambda d: [d["own_review"].pk], lambda d: {
+        "headline": "Edited", "rating": 5, "body": "",
+    }),
+    ("reviews:delete_review", "post", lambda d: [d["own_review"].pk], None),
+]
+
+
+def seed_dataset(authors, tickets_per_author):
+    """Viewer following `authors` users, everyone with tickets and reviews."""
+    viewer = User.objects.create_user(username="viewer", password=PASSWORD)
+    stranger = User.objects.create(username="stranger")
+    followed = [User.objects.create(username=f"author{i}") for i in range(authors)]
+
+    UserFollows.objects.bulk_create([
+        *(UserFollows(user=viewer, followed_user=author) for author in followed),
+        *(UserFollows(user=author, followed_user=viewer) for author in followed),
+    ])
+
+    for author in [viewer, *followed]:
+        tickets = Ticket.objects.bulk_create(
+            Ticket(title=f"{author.username} book {i}", description="", user=author)
+            for i in range(tickets_per_author)
+        )
+        # every other ticket already answered by its author
+        Review.objects.bulk_create(
+            Review(headline="Review", rating=i % 6, user=author, ticket=ticket)
+            for i, ticket in enumerate(tickets[::2])
+        )
+
+    # bulk_create skips Ticket.save() and the signals: attach the tickets to their books and count them in
+    # the monthly archive as seed_litrevu does
+    assign_books(Ticket.objects.all())
+    rebuild_archive()
+    refresh_leaderboards(full=True)
+    own_review = Review.objects.filter(user=viewer).first()
+    return {
+        "viewer": viewer,
+        "stranger": stranger,
+        "followed": followed[0],
+        "own_ticket": Ticket.objects.filter(user=viewer).exclude(reviews__isnull=False).first(),
+        "open_ticket": Ticket.objects.filter(user=followed[0], reviews__isnull=True).first(),
+        "own_review": own_review,
+        "own_tickets": list(Ticket.objects.filter(user=viewer).values_list("pk", flat=True)),
+        "book": Ticket.objects.filter(user=viewer).first().book,
+    }
+
+
+class QueryBudgetMixin:
+    """Replays every scenario on the dataset built by `setUpTestData`."""
+
+    size = None
+
+    @classmethod
+    def setUpTestData(cls):
+        """Seed the dataset for this size."""
+        cls.dataset = seed_dataset(*DATASET_SIZES[cls.size])
+
+    def test_every_view_stays_within_its_budget(self):
+        """Each scenario is run in its own rolled-back transaction."""
+        for url_name, method, args, data in SCENARIOS:
+            with self.subTest(view=url_name, method=method.upper()):
+                self.client.force_login(self.dataset["viewer"])
+                url = reverse(url_name, args=args(self.dataset) if args else None)
+                payload = data(self.dataset) if data else None
+
+                with transaction.atomic():
+                    with record_queries() as log:
+                        response = getattr(self.client, method)(url, payload)
+                    transaction.set_rollback(True)
+
+                self.assertLess(response.status_code, 400)
+                check_budget(url_name, log, label=f"{method.upper()}, {self.size} dataset")
+
+
+# Budgets are measured without a session query per request.
+@override_settings(SESSION_ENGINE="django.contrib.sessions.backends.cached_db")
+class SmallDatasetQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Budgets on a handful of rows."""
+
+    size = "small"
+
+
+@override_settings(SESSION_ENGINE="django.contrib.sessions.backends.cached_db")
+class LargeDatasetQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Budgets on ~10x more follows, tickets and reviews."""
+
+    size = "large"
+
+
+class QueryBudgetRegistryTests(TestCase):
+    """The registry covers every routed view of the reviews and users apps."""
+
+    def test_every_url_name_has_a_budget(self):
+        """Adding a URL without a budget fails here."""
+        resolver = get_resolver()
+        names = {"home"}
+        for namespace in ("reviews", "users"):
+            _, sub_resolver = resolver.namespace_dict[namespace]
+            names |= {f"{namespace}:{name}" for name in sub_resolver.reverse_dict if isinstance(name, str)}
+
+        self.assertEqual(names - set(QUERY_BUDGETS), set())
+
+    def test_every_budgeted_view_has_a_scenario(self):
+        """Each budget is actually exercised by the harness."""
+        self.assertEqual(set(QUERY_BUDGETS) - {name for name, *_ in SCENARIOS}, set())
@@ -0,0 +1,190 @@
+"""Tests for the review change log, its pruning and the item-item recommendations (reviews.recommendations)."""
+
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from reviews.change_log import prune, watermarks
+from reviews.leaderboards import refresh as refresh_leaderboards
+from reviews.models import Leaderboard, RecommendedTicket, Review, ReviewChange, Ticket
+from reviews.recommendations import ItemModel, refresh
+
+User = get_user_model()
+
+
+class ReviewChangeLogTests(TestCase):
+    """Every review write through the ORM is appended to ReviewChange."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """One reviewer and one ticket."""
+        cls.user = User.objects.create_user(username="alice", password="pass12345")
+        cls.ticket = Ticket.objects.create(title="Dune", user=cls.user)
+
+    def log(self):
+        """(ticket, user, previous rating, rating) of every logged change."""
+        changes = ReviewChange.objects.order_by("pk")
+        return list(changes.values_list("ticket_id", "user_id", "previous_rating", "rating"))
+
+    def test_create_rerate_edit_delete(self):
+        """Creation, re-rating and deletion are logged; an edit keeping the rating is not."""
+        review = Review.objects.create(ticket=self.ticket, user=self.user, rating=3, headline="Bien")
+        review = Review.objects.get(pk=review.pk)
+        review.rating = 5
+        review.save()
+        review.headline = "Très bien"
+        review.save()
+        review.delete()
+        ids = (self.ticket.pk, self.user.pk)
+        self.assertEqual(self.log(), [(*ids, None, 3), (*ids, 3, 5), (*ids, 5, None)])
+
+    def test_ticket_deletion_logs_its_reviews(self):
+        """Reviews removed with their ticket are logged too."""
+        Review.objects.create(ticket=self.ticket, user=self.user, rating=4, headline="Bien")
+        ticket_id = self.ticket.pk
+        self.ticket.delete()
+        self.assertEqual(self.log()[-1], (ticket_id, self.user.pk, 4, None))
+
+
+class RecommendationTests(TestCase):
+    """Model build, scoring rules and incremental refresh."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """
+        alice liked t1 and t2; bob liked t1, t2 and t3; carol hated t1 and liked t4.
+
+        So t3 goes with t1 / t2 (recommended to alice), t4 against them (not recommended).
+        """
+        cls.owner = User.objects.create_user(username="owner", password="pass12345")
+        cls.alice, cls.bob, cls.carol = (
+            User.objects.create_user(username=name, password="pass12345") for name in ("alice", "bob", "carol")
+        )
+        cls.t1, cls.t2, cls.t3, cls.t4 = (Ticket.objects.create(title=f"T{i}", user=cls.owner) for i in range(1, 5))
+        cls.alice_ticket = Ticket.objects.create(title="Mine", user=cls.alice)
+        for user, ratings in (
+            (cls.alice, {cls.t1: 5, cls.t2: 5}),
+            (cls.bob, {cls.t1: 5, cls.t2: 5, cls.t3: 5, cls.alice_ticket: 5}),
+            (cls.carol, {cls.t1: 0, cls.t4: 5}),
+        ):
+            for ticket, rating in ratings.items():
+                Review.objects.create(ticket=ticket, user=user, rating=rating, headline="h")
+
+    def setUp(self):
+        """Keep the saved model in a temporary directory."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(RECOMMENDATIONS_DIR=directory.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def recommended(self, user):
+        """Ticket ids recommended to `user`, best first."""
+        return list(RecommendedTicket.objects.filter(user=user).order_by("rank").values_list("ticket_id", flat=True))
+
+    def test_full_build(self):
+        """Similar tickets are recommended; reviewed, own and dissimilar ones are not."""
+        result = refresh()
+        self.assertTrue(result.full)
+        self.assertEqual(self.recommended(self.alice), [self.t3.pk])
+        self.assertEqual(self.recommended(self.carol), [])
+        self.assertEqual(ItemModel.load().watermark, ReviewChange.objects.latest("pk").pk)
+
+    def test_incremental_refresh(self):
+        """New reviews update the model rows of their tickets and the affected users' lists."""
+        refresh()
+        self.assertEqual(refresh().changes, 0)
+
+        dave = User.objects.create_user(username="dave", password="pass12345")
+        t5 = Ticket.objects.create(title="T5", user=self.owner)
+        Review.objects.create(ticket=self.t3, user=dave, rating=5, headline="h")
+        Review.objects.create(ticket=t5, user=dave, rating=5, headline="h")
+
+        result = refresh()
+        self.assertFalse(result.full)
+        self.assertEqual((result.changes, result.tickets), (2, 2))
+        # t5 now goes with t3, which bob reviewed
+        self.assertIn(t5.pk, self.recommended(self.bob))
+        self.assertIn(t5.pk, ItemModel.load().neighbors[ItemModel.load().rows([self.t3.pk])[0]])
+        # and dave gets what goes with t3
+        self.assertLessEqual({self.t1.pk, self.t2.pk, self.alice_ticket.pk}, set(self.recommended(dave)))
+
+    def test_incremental_matches_full_build_for_changed_tickets(self):
+        """The patched rows of the changed tickets equal a rebuild's."""
+        refresh()
+        Review.objects.filter(ticket=self.t3).get().delete()
+        Review.objects.create(ticket=self.t3, user=self.carol, rating=5, headline="h")
+        refresh()
+        patched = ItemModel.load()
+        refresh(full=True)
+        rebuilt = ItemModel.load()
+        for ticket in (self.t3.pk, self.t4.pk, self.t1.pk):
+            self.assertEqual(
+                patched.neighbors[patched.rows([ticket])[0]].tolist(),
+                rebuilt.neighbors[rebuilt.rows([ticket])[0]].tolist(),
+            )
+
+    def test_command_and_feed(self):
+        """The command reports its work and the feed shows the recommendations."""
+        out = StringIO()
+        call_command("build_recommendations", stdout=out)
+        self.assertIn("Full build", out.getvalue())
+        call_command("build_recommendations", stdout=out)
+        self.assertIn("No review change since the last run.", out.getvalue())
+
+        self.client.force_login(self.alice)
+        response = self.client.get(reverse("reviews:feed"))
+        self.assertContains(response, "Recommandé pour vous")
+        self.assertContains(response, reverse("reviews:create_review_for_ticket", args=[self.t3.pk]))
+        self.assertNotContains(
+            self.client.get(reverse("reviews:feed"), HTTP_X_REQUESTED_WITH="XMLHttpRequest"),
+            "Recommandé pour vous",
+        )
+
+
+class ChangeLogPruningTests(TestCase):
+    """The changes every consumer processed are pruned, the others kept (reviews.change_log)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Three logged reviews."""
+        cls.user = User.objects.create_user(username="alice", password="pass12345")
+        cls.tickets = [Ticket.objects.create(title=f"T{i}", user=cls.user) for i in range(4)]
+        for ticket in cls.tickets[:3]:
+            Review.objects.create(ticket=ticket, user=cls.user, rating=4, headline="h")
+
+    def setUp(self):
+        """Keep the saved model in a temporary directory."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(RECOMMENDATIONS_DIR=directory.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_prunes_up_to_the_slowest_consumer(self):
+        """Nothing goes before every consumer ran, then only what the slowest one processed."""
+        refresh()
+        self.assertEqual(prune(), 0)  # the leaderboards never ran
+        refresh_leaderboards()
+        Review.objects.create(ticket=self.tickets[3], user=self.user, rating=2, headline="h")
+        refresh()
+        self.assertEqual(watermarks()["recommendations"], ReviewChange.objects.latest("pk").pk)
+
+        self.assertEqual(prune(batch_size=2), 3)
+        self.assertEqual(list(ReviewChange.objects.values_list("ticket_id", flat=True)), [self.tickets[3].pk])
+        # the leaderboards still find the change they have not processed
+        self.assertEqual(refresh_leaderboards().tickets[Leaderboard.TOP_RATED], 1)
+        self.assertEqual(prune(), 1)
+        self.assertFalse(ReviewChange.objects.exists())
+
+    def test_commands_prune(self):
+        """The batch commands prune once both kinds of consumer are up to date."""
+        out = StringIO()
+        call_command("build_recommendations", stdout=out)
+        call_command("build_leaderboards", stdout=out)
+        self.assertIn("3 processed review change(s) pruned from the log.", out.getvalue())
+        self.assertEqual(refresh().changes, 0)
@@ -0,0 +1,175 @@
+"""Tests for the FTS5 full-text search (index triggers, ranking, visibility, pagination, views)."""
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from reviews.models import Review, Ticket
+from reviews.search import decode_cursor, match_expression, search
+from users.models import UserFollows
+
+User = get_user_model()
+
+
+def indexed_rows():
+    """(rowid, title, body, kind, audience) of every row of the search index."""
+    with connection.cursor() as db:
+        db.execute("SELECT rowid, title, body, kind, audience FROM reviews_search ORDER BY rowid")
+        return db.fetchall()
+
+
+class SearchIndexTests(TestCase):
+    """The triggers keep reviews_search in step with every ticket and review write."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """One user and one ticket."""
+        cls.user = User.objects.create_user(username="alice", password="pass12345")
+        cls.ticket = Ticket.objects.create(title="Dune", author="Herbert", description="Arrakis", user=cls.user)
+
+    def test_create_update_delete_are_indexed(self):
+        """Inserts add a row, edits replace it, deletes (cascades included) remove it."""
+        review = Review.objects.create(ticket=self.ticket, user=self.user, rating=4, headline="Épique", body="Sable")
+        self.assertEqual(
+            indexed_rows(),
+            [
+                (self.ticket.pk * 2, "Dune", "Arrakis", "ticket", f"u{self.user.pk}"),
+                (review.pk * 2 + 1, "Épique", "Sable", "review", f"u{self.user.pk} t{self.user.pk}"),
+            ],
+        )
+
+        review.body = "Vers géants"
+        review.save()
+        self.assertEqual(indexed_rows()[1][2], "Vers géants")
+
+        self.ticket.delete()
+        self.assertEqual(indexed_rows(), [])
+
+    def test_bulk_writes_are_indexed(self):
+        """bulk_create and QuerySet.update bypass signals but not the triggers."""
+        Ticket.objects.bulk_create([Ticket(title=f"Bulk {i}", user=self.user) for i in range(3)])
+        Ticket.objects.filter(title="Bulk 0").update(title="Renamed")
+        titles = sorted(title for _, title, _, kind, _ in indexed_rows() if kind == "ticket")
+        self.assertEqual(titles, ["Bulk 1", "Bulk 2", "Dune", "Renamed"])
+
+    def test_aggregate_updates_leave_the_index_alone(self):
+        """Review aggregates are F() updates of columns the ticket trigger does not watch."""
+        with connection.cursor() as db:
+            db.execute("SELECT count(*) FROM reviews_search")
+            before = db.fetchone()[0]
+        Ticket.objects.filter(pk=self.ticket.pk).update(review_count=3)
+        self.assertEqual(len(indexed_rows()), before)
+
+
+class SearchTests(TestCase):
+    """Ranking, visibility, highlighting and keyset pagination of reviews.search.search."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """alice follows bob; carol is a stranger who reviewed one of alice's tickets."""
+        cls.alice = User.objects.create_user(username="alice", password="pass12345")
+        cls.bob = User.objects.create_user(username="bob", password="pass12345")
+        cls.carol = User.objects.create_user(username="carol", password="pass12345")
+        UserFollows.objects.create(user=cls.alice, followed_user=cls.bob)
+
+        cls.own = Ticket.objects.create(title="Les Misérables", author="Hugo", description="", user=cls.alice)
+        cls.followed = Ticket.objects.create(
+            title="Notre-Dame", author="Hugo", description="Quasimodo et les misérables", user=cls.bob
+        )
+        cls.stranger = Ticket.objects.create(title="Misérables encore", description="", user=cls.carol)
+        cls.answer = Review.objects.create(
+            ticket=cls.own, user=cls.carol, rating=5, headline="Chef-d'œuvre", body="Les misérables, enfin lu"
+        )
+
+    def hits(self, text, viewer=None, **kwargs):
+        """(kind, object_id) of the results of `text` for `viewer` (alice by default)."""
+        page = search(viewer or self.alice, text, **kwargs)
+        return [(hit.kind, hit.object_id) for hit in page.hits]
+
+    def test_match_expression_quotes_terms(self):
+        """Operators typed by the user are plain words; the last term is a prefix."""
+        self.assertEqual(match_expression('hugo NEAR "x'), '{title author body} : ("hugo" "NEAR" "x"*)')
+        self.assertIsNone(match_expression("  ?! "))
+
+    def test_visibility_and_ranking(self):
+        """Title matches rank first; strangers' posts are hidden unless they answer the viewer."""
+        hits = self.hits("miserables")
+        self.assertEqual(hits[0], ("ticket", self.own.pk))
+        self.assertCountEqual(hits[1:], [("review", self.answer.pk), ("ticket", self.followed.pk)])
+        self.assertEqual(self.hits("miserables", viewer=self.carol)[0], ("ticket", self.stranger.pk))
+
+    def test_audience_tokens_are_not_searchable(self):
+        """Typing an audience token finds nothing."""
+        self.assertEqual(self.hits(f"u{self.alice.pk}"), [])
+
+    def test_ticket_changing_hands_moves_its_answers(self):
+        """The answers to a ticket follow it to its new owner."""
+        Ticket.objects.filter(pk=self.own.pk).update(user=self.bob)
+        self.assertNotIn(("review", self.answer.pk), self.hits("enfin"))
+        self.assertEqual(self.hits("enfin", viewer=self.bob), [("review", self.answer.pk)])
+
+    def test_accents_and_prefixes(self):
+        """Search is accent-insensitive and completes the last word."""
+        self.assertEqual(self.hits("quasim"), [("ticket", self.followed.pk)])
+        self.assertEqual(self.hits("CHEF-D"), [("review", self.answer.pk)])
+
+    def test_highlight_escapes_user_content(self):
+        """Matches are wrapped in <mark>, the rest of the text is escaped."""
+        Ticket.objects.create(title="<b>Hugo</b> & co", user=self.alice)
+        page = search(self.alice, "co")
+        self.assertEqual(str(page.hits[0].title), "&lt;b&gt;Hugo&lt;/b&gt; &amp; <mark>co</mark>")
+
+    def test_keyset_pagination_covers_every_hit_once(self):
+        """Following next_cursor walks every result exactly once."""
+        Ticket.objects.bulk_create([Ticket(title=f"Hugo {i}", user=self.alice) for i in range(7)])
+        expected = self.hits("hugo", limit=100)
+
+        seen, cursor = [], None
+        while True:
+            page = search(self.alice, "hugo", cursor=cursor, limit=3)
+            seen += [(hit.kind, hit.object_id) for hit in page.hits]
+            if page.next_cursor is None:
+                break
+            cursor = page.next_cursor
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(expected), 9)
+
+    def test_malformed_cursor_restarts(self):
+        """A tampered cursor is ignored instead of failing."""
+        self.assertIsNone(decode_cursor("nope"))
+        self.assertEqual(self.hits("hugo", cursor="1~x"), self.hits("hugo"))
+
+
+class SearchViewTests(TestCase):
+    """The search page and the admin search."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """A staff user with one ticket."""
+        cls.user = User.objects.create_user(username="alice", password="pass12345", is_staff=True, is_superuser=True)
+        cls.ticket = Ticket.objects.create(title="Germinal", author="Zola", description="La mine", user=cls.user)
+
+    def setUp(self):
+        """Log in."""
+        self.client.force_login(self.user)
+
+    def test_page_lists_highlighted_hits(self):
+        """The page shows the matches with their highlighted title."""
+        resp = self.client.get(reverse("reviews:search"), {"q": "germ"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertTemplateUsed(resp, "reviews/pages/search.html")
+        self.assertContains(resp, "<mark>Germinal</mark>", html=False)
+
+    def test_empty_query_renders_the_form(self):
+        """Without a query nothing is searched."""
+        resp = self.client.get(reverse("reviews:search"))
+        self.assertEqual(resp.status_code, 200)
+        self.assertIsNone(resp.context["page"])
+
+    def test_admin_search_uses_the_index(self):
+        """The changelist finds tickets by indexed words and by username."""
+        url = reverse("admin:reviews_ticket_changelist")
+        self.assertContains(self.client.get(url, {"q": "mine"}), "Germinal")
+        self.assertContains(self.client.get(url, {"q": "alice"}), "Germinal")
+        self.assertNotContains(self.client.get(url, {"q": "balzac"}), "Germinal")
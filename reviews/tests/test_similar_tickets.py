@@ -0,0 +1,138 @@
+"""Tests for the TF-IDF similar-ticket index (reviews.similar_tickets) and its views."""
+
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from reviews.models import Ticket
+from reviews.similar_tickets import build_index, load_index, similar_tickets, words
+
+User = get_user_model()
+
+
+class SimilarTicketsTests(TestCase):
+    """Build, lookup, incremental add and rebuild of the index."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Two Dune requests, a Fondation one and fillers sharing a frequent word."""
+        cls.user = User.objects.create_user(username="alice", password="pass12345")
+        cls.dune = Ticket.objects.create(
+            title="Dune", author="Frank Herbert", description="Le désert d'Arrakis", user=cls.user
+        )
+        cls.dune_again = Ticket.objects.create(title="Dune (édition poche)", author="Herbert", user=cls.user)
+        cls.foundation = Ticket.objects.create(title="Fondation", author="Isaac Asimov", user=cls.user)
+        for title in ("Roman noir", "Roman policier", "Roman d'amour"):
+            Ticket.objects.create(title=title, user=cls.user)
+
+    def setUp(self):
+        """Keep the index in a temporary directory."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        settings_override = override_settings(SIMILAR_TICKETS_DIR=directory.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def similar(self, title, **kwargs):
+        """Ids of the tickets similar to `title`."""
+        return [ticket.pk for ticket in similar_tickets(title, **kwargs)]
+
+    def test_words_are_folded(self):
+        """Case and accents are ignored, one-letter words dropped."""
+        self.assertEqual(words("L'Étranger, À PARIS"), ["etranger", "paris"])
+
+    def test_no_index_before_the_first_build(self):
+        """Nothing is suggested (and nothing fails) before a build."""
+        self.assertIsNone(load_index())
+        self.assertEqual(self.similar("Dune"), [])
+
+    def test_lookup_ranks_by_cosine(self):
+        """The same book comes first; the ticket itself can be excluded."""
+        build_index()
+        self.assertEqual(self.similar("dune herbert")[:2], [self.dune.pk, self.dune_again.pk])
+        self.assertEqual(self.similar("Dune", author="Herbert", exclude=self.dune.pk)[0], self.dune_again.pk)
+        self.assertEqual(self.similar("Asimov"), [self.foundation.pk])
+        self.assertEqual(self.similar("Proust"), [])
+
+    @mock.patch("reviews.similar_tickets.MIN_PRUNED_TICKETS", 0)
+    def test_frequent_terms_are_dropped(self):
+        """A word in more than half of the tickets is not in the vocabulary."""
+        index = build_index()
+        self.assertIn("noir", index.vocabulary)
+        Ticket.objects.create(title="Roman", user=self.user)
+        self.assertNotIn("roman", build_index().vocabulary)
+
+    def test_new_tickets_are_appended_on_commit(self):
+        """A ticket created after the build is found without rebuilding."""
+        build_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            ticket = Ticket.objects.create(title="Les Enfants de Dune", author="Herbert", user=self.user)
+        self.assertEqual(len(load_index().recent()), 1)
+        self.assertIn(ticket.pk, self.similar("Dune", author="Herbert"))
+
+    def test_deleted_tickets_are_not_suggested(self):
+        """Tickets deleted since the build drop out of the results."""
+        build_index()
+        self.dune_again.delete()
+        self.assertNotIn(self.dune_again.pk, self.similar("Dune herbert"))
+
+    def test_rebuild_switches_and_cleans_up(self):
+        """A rebuild replaces the current build and absorbs the appended tickets."""
+        build_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            Ticket.objects.create(title="Hyperion", author="Dan Simmons", user=self.user)
+        out = StringIO()
+        call_command("build_similar_tickets", stdout=out)
+        self.assertIn("7 ticket(s) indexed", out.getvalue())
+        self.assertEqual(len(list(self.directory.glob("build-*"))), 1)
+        self.assertEqual(len(load_index().recent()), 0)
+
+
+class SimilarTicketsViewTests(TestCase):
+    """The suggestions on the review form and the AJAX partial of the ticket form."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Two requests for the same book by different users, and a filler."""
+        cls.alice = User.objects.create_user(username="alice", password="pass12345")
+        cls.bob = User.objects.create_user(username="bob", password="pass12345")
+        cls.first = Ticket.objects.create(title="Germinal", author="Zola", user=cls.alice)
+        cls.second = Ticket.objects.create(title="Germinal", description="Zola, la mine", user=cls.bob)
+        Ticket.objects.create(title="Madame Bovary", author="Flaubert", user=cls.bob)
+
+    def setUp(self):
+        """Build the index in a temporary directory and log in."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(SIMILAR_TICKETS_DIR=directory.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        build_index()
+        self.client.force_login(self.alice)
+
+    def test_review_form_lists_other_requests_for_the_book(self):
+        """Answering a ticket shows the other tickets about the same book, not itself."""
+        resp = self.client.get(reverse("reviews:create_review_for_ticket", args=[self.second.pk]))
+        self.assertEqual(resp.context["similar_tickets"], [self.first])
+        self.assertContains(resp, "Billets similaires")
+
+    def test_ajax_partial(self):
+        """The partial lists matches for the typed title, and nothing for a short one."""
+        url = reverse("reviews:similar_tickets")
+        resp = self.client.get(url, {"title": "germinal", "author": "zola"}, HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+        self.assertTemplateUsed(resp, "reviews/partials/similar_tickets.html")
+        self.assertContains(resp, reverse("reviews:create_review_for_ticket", args=[self.first.pk]))
+        self.assertNotContains(self.client.get(url, {"title": "ge"}), "Billets similaires")
+
+    def test_ticket_form_wires_the_endpoint(self):
+        """The creation form points its script at the endpoint; the edit form does not."""
+        self.assertContains(self.client.get(reverse("reviews:create_ticket")), reverse("reviews:similar_tickets"))
+        edit = self.client.get(reverse("reviews:edit_ticket", args=[self.first.pk]))
+        self.assertNotContains(edit, "data-similar-url")
@@ -1,10 +1,11 @@
 """Tests for ticket and review views (ticket CRUD, review CRUD, and feed pages)."""
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.test import SimpleTestCase, TestCase
 from django.urls import reverse
 
 from reviews.models import Review, Ticket
+from reviews.views import paginate
 
 User = get_user_model()
 
@@ -159,6 +160,16 @@ class ReviewAndFeedViewsTests(TestCase):
         self.assertIn("feed_items", resp.context)
         self.assertGreaterEqual(len(resp.context["feed_items"]), 1)
 
+    def test_ticket_cards_show_average_rating_and_count(self):
+        """Ticket cards read the denormalized aggregates; re-rating through edit_review updates them."""
+        resp = self.client.get(self.urls["feed"])
+        self.assertContains(resp, "★ 4.0 / 5 · 1 critique")
+
+        self.client.post(self.urls["edit_review"], data={"headline": "Good", "rating": 2, "body": ""})
+        self.ticket.refresh_from_db()
+        self.assertEqual((self.ticket.review_count, self.ticket.rating_sum), (1, 2))
+        self.assertContains(self.client.get(self.urls["feed"]), "★ 2.0 / 5 · 1 critique")
+
     # ------------------------
     # CREATE REVIEW — RESPONSE MODE
     # ------------------------
@@ -270,3 +281,17 @@ class ReviewAndFeedViewsTests(TestCase):
         resp = self.client.post(url)
 
         self.assertEqual(resp.status_code, 404)
+
+
+class PaginationTests(SimpleTestCase):
+    """Page links of the feed and "Mes posts"."""
+
+    def test_links_are_elided(self):
+        """Only both ends and the pages around the current one get a link."""
+        page = paginate(list(range(1000)), 50)
+        self.assertEqual(page.page_links, [1, "…", 48, 49, 50, 51, 52, "…", 100])
+        self.assertEqual(paginate(list(range(30)), "x").page_links, [1, 2, 3])
+
+    def test_known_count_skips_the_count(self):
+        """A count given by the caller is used as is."""
+        self.assertEqual(paginate(list(range(30)), 1, count=15).paginator.num_pages, 2)
@@ -0,0 +1,90 @@
+"""
+Denormalized review aggregates of Ticket.
+
+``review_count``, ``rating_sum`` and the per-star histogram
+``rating_count_0`` .. ``rating_count_5`` let a card show the average rating
+and the number of reviews (and decide whether it can still be reviewed)
+without touching the review table.
+
+They are maintained incrementally by reviews.signals: every review created,
+re-rated or deleted through the ORM runs one UPDATE with F() expressions on
+its ticket, inside the same transaction as the review write, so concurrent
+writers never lose an increment. Writes that bypass model signals
+(bulk_create, QuerySet.update / delete, raw SQL, reviews.seed) must be
+followed by reconcile(), which recomputes the aggregates from the reviews
+and rewrites only the tickets that drifted (``manage.py reconcile_ticket_stats``).
+"""
+
+from __future__ import annotations
+
+from functools import reduce
+from operator import or_
+
+from django.db.models import Count, F, OuterRef, Q, QuerySet, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Review, Ticket
+
+RATINGS = range(6)
+STATS_FIELDS = ("review_count", "rating_sum", *(f"rating_count_{rating}" for rating in RATINGS))
+
+
+def histogram_field(rating: int) -> str:
+    """Name of the Ticket column counting the reviews rated `rating`."""
+    return f"rating_count_{rating}"
+
+
+def apply_review_change(ticket_id: int, removed: int | None = None, added: int | None = None) -> None:
+    """
+    Move one review out of the `removed` rating and / or into the `added` one, in a single UPDATE.
+
+    (None, 4) is a new 4-star review, (4, None) a deleted one, (4, 2) a re-rating.
+    Decrements stop at 0 so a ticket that already drifted cannot break a delete.
+    """
+    if removed == added:
+        return
+    deltas = {field: 0 for field in STATS_FIELDS}
+    if removed is not None:
+        deltas["review_count"] -= 1
+        deltas["rating_sum"] -= removed
+        deltas[histogram_field(removed)] -= 1
+    if added is not None:
+        deltas["review_count"] += 1
+        deltas["rating_sum"] += added
+        deltas[histogram_field(added)] += 1
+    updates = {
+        field: F(field) + delta if delta > 0 else Greatest(F(field) + delta, Value(0))
+        for field, delta in deltas.items()
+        if delta
+    }
+    Ticket.objects.filter(pk=ticket_id).update(**updates)
+
+
+def expected_stats() -> dict:
+    """Subquery expressions recomputing every aggregate of the outer ticket from its reviews."""
+
+    def aggregate(expression):
+        reviews = Review.objects.filter(ticket=OuterRef("pk")).order_by().values("ticket")
+        return Coalesce(Subquery(reviews.annotate(value=expression).values("value")), Value(0))
+
+    expressions = {"review_count": aggregate(Count("pk")), "rating_sum": aggregate(Sum("rating"))}
+    for rating in RATINGS:
+        expressions[histogram_field(rating)] = aggregate(Count("pk", filter=Q(rating=rating)))
+    return expressions
+
+
+def drifted_tickets(tickets: QuerySet | None = None) -> QuerySet:
+    """Primary keys of the tickets whose stored aggregates differ from their reviews."""
+    queryset = (Ticket.objects.all() if tickets is None else tickets).order_by()
+    expected = {f"expected_{field}": expression for field, expression in expected_stats().items()}
+    differs = reduce(or_, (~Q(**{field: F(f"expected_{field}")}) for field in STATS_FIELDS))
+    return queryset.annotate(**expected).filter(differs).values_list("pk", flat=True)
+
+
+def reconcile(tickets: QuerySet | None = None, dry_run: bool = False, batch_size: int = 2000) -> int:
+    """Recompute the aggregates of the drifted tickets (all tickets by default); returns their number."""
+    pks = list(drifted_tickets(tickets).iterator(chunk_size=batch_size))
+    if not dry_run:
+        for start in range(0, len(pks), batch_size):
+            Ticket.objects.filter(pk__in=pks[start:start + batch_size]).update(**expected_stats())
+    return len(pks)
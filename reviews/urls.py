@@ -9,9 +9,17 @@ app_name = "reviews"
 urlpatterns = [
     # temporary placeholders so header links resolve
     path("", views.feed, name="feed"),
+    path("ordre/", views.set_feed_order, name="set_feed_order"),
+    path("recherche/", views.search, name="search"),
+    path("livre/<int:book_id>/", views.book, name="book"),
+
+    # Public leaderboards
+    path("tendances/", views.trending, name="trending"),
+    path("mieux-notes/", views.top_rated, name="top_rated"),
 
     # Tickets (Request for Critiques)
     path("ticket/creer/", views.TicketCreateView.as_view(), name="create_ticket"),
+    path("ticket/similaires/", views.similar_tickets, name="similar_tickets"),
     path("ticket/<int:ticket_id>/modifier/", views.TicketUpdateView.as_view(), name="edit_ticket"),
     path("ticket/<int:ticket_id>/supprimer/", views.TicketDeleteView.as_view(), name="delete_ticket"),
 
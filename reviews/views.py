@@ -2,7 +2,6 @@
 
 from __future__ import annotations
 
-from itertools import chain
 from typing import Any, TypeAlias, cast
 
 from django.contrib import messages
@@ -11,21 +10,40 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.messages.views import SuccessMessageMixin
 from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
 from django.db import IntegrityError, transaction
-from django.db.models import Q, QuerySet
-from django.http import HttpRequest, HttpResponse
+from django.db.models import Count, QuerySet, Sum
+from django.http import HttpRequest, HttpResponse, QueryDict
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse, reverse_lazy
+from django.utils import timezone
 from django.views import View
 from django.views.generic import CreateView, DeleteView, UpdateView
 
 from LITRevu.utils.toast import redirect_with_toast
-from users.models import UserFollows
-
-from .forms import CreateTicketForm, ReviewForm
-from .models import Review, Ticket
+from users.models import User, UserFollows
+
+from .feed import (
+    chronological,
+    group_by_ticket,
+    load_items,
+    ranked_items,
+    visible_posts,
+    with_card_data,
+)
+from .forms import CreateTicketForm, FeedFilterForm, ReviewForm
+from .leaderboards import leaderboard_page
+from .models import Book, Leaderboard, Review, Ticket
+from .recommendations import recommended_tickets
+from .search import search as search_posts
+from .similar_tickets import similar_tickets as find_similar_tickets
 
 FeedItem: TypeAlias = Ticket | Review
 
+# Most recent requests listed on a book page
+BOOK_TICKETS = 50
+
+# Shorter titles match too many tickets to be worth a lookup while typing
+MIN_TITLE_LENGTH = 3
+
 # --------- HELPER MIXINS FOR TICKET AND REVIEW FORMS TO GET CONTEXT
 
 
@@ -57,6 +75,60 @@ class OwnerQuerySetMixin(LoginRequiredMixin):
 # --------- FEED VIEW (READ OPERATION)
 
 
+def paginate(items: list | QuerySet, page_number, count: int | None = None) -> Page:
+    """Page `page_number` of `items`, 10 per page (the first one or the last one when out of range).
+
+    `count`, when the caller already knows the number of items, saves the COUNT query.
+    """
+    # Paginator works over a Python sequence or a queryset (COUNT, then LIMIT/OFFSET)
+    paginator: Paginator = Paginator(items, 10)
+    if count is not None:
+        paginator.count = count
+    try:
+        page = paginator.page(page_number)
+    except PageNotAnInteger:
+        page = paginator.page(1)
+    except EmptyPage:
+        page = paginator.page(paginator.num_pages)
+    # the links of the pages around this one and of both ends, "…" between: a history of thousands of
+    # pages would otherwise render a link per page
+    page.page_links = list(paginator.get_elided_page_range(page.number, on_each_side=2, on_ends=1))
+    return page
+
+
+def feed_order(request: HttpRequest) -> str:
+    """Feed mode of the request: `ordre` when valid, else the user's preference (saved by set_feed_order)."""
+    order = request.GET.get("ordre")
+    return order if order in dict(User.FEED_ORDERS) else request.user.feed_order
+
+
+def filter_query(request: HttpRequest, *excluded: str) -> str:
+    """The request's filter parameters (and `ordre`), urlencoded for the pagination links (page left out)."""
+    params = request.GET.copy()
+    for name in ("page", "toast_type", "toast_msg", *excluded):
+        params.pop(name, None)
+    return params.urlencode()
+
+
+@login_required
+def set_feed_order(request: HttpRequest) -> HttpResponse:
+    """Save the feed mode picked in the order tabs as the user's preference, then show its first page, same filters."""
+    if request.method != "POST":
+        return redirect("reviews:feed")
+
+    user = request.user
+    order = request.POST.get("ordre")
+    if order in dict(User.FEED_ORDERS) and order != user.feed_order:
+        user.feed_order = order
+        user.save(update_fields=["feed_order"])
+    # the tabs post the page's filter parameters back; rebuilt here so only a query string of the feed is followed
+    filters = QueryDict(request.POST.get("filtres", ""), mutable=True)
+    for name in ("ordre", "page"):
+        filters.pop(name, None)
+    query = filters.urlencode()
+    return redirect(f"{reverse('reviews:feed')}?{query}" if query else reverse("reviews:feed"))
+
+
 @login_required
 def feed(request: HttpRequest) -> HttpResponse:
     """Display the main feed for the logged-in user and followed accounts."""
@@ -78,42 +150,32 @@ def feed(request: HttpRequest) -> HttpResponse:
     # Final list of IDs visible in the feed
     visible_ids: list[int] = [*following_ids, user_id]
 
-    # QuerySet[Ticket]: tickets written by visible users
-    tickets: QuerySet[Ticket] = Ticket.objects.filter(user_id__in=visible_ids)
-
-    # QuerySet[Review]: reviews written by visible users OR reviews answering one of *my* tickets
-    # distinct() removes duplicate rows if queryset ends up matching the same Review with more than 1 path
-    # Thereby keeping single / unique rows for Reviews
-    reviews: QuerySet[Review] = Review.objects.filter(
-        Q(user_id__in=visible_ids) | Q(ticket__user=user)
-    ).distinct()
-
-    # chain() creates an iterator of (Ticket | Review).
-    # sorted() consumes it into a list[FeedItem] ordered by time_created desc.
-    feed_items: list[FeedItem] = sorted(
-        chain(tickets, reviews),
-        key=lambda obj: obj.time_created,
-        reverse=True,
-    )
-
-    # Paginator works over a Python sequence (here: list[FeedItem])
-    paginator: Paginator = Paginator(feed_items, 10)
-
     # GET params are strings (or None). Use default "1" to keep type consistent.
     page_number = request.GET.get("page", 1)
 
-    # Page: contains the items for the current page
-    try:
-        page_obj: Page = paginator.page(page_number)
-    except PageNotAnInteger:
-        page_obj = paginator.page(1)
-    except EmptyPage:
-        page_obj = paginator.page(paginator.num_pages)
+    # Visibility rules, then the filters: every predicate runs in SQL (reviews.feed)
+    filter_form = FeedFilterForm(request.GET)
+    sources = filter_form.filters().apply(visible_posts(user, visible_ids))
+
+    order = feed_order(request)
+    if order == User.PERTINENCE:
+        # Bounded candidate window ranked by reviews.feed
+        page_obj = paginate(ranked_items(user, sources, timezone.now()), page_number)
+    else:
+        # One UNION ALL of (kind, id, date) rows, ordered and paginated by the database
+        page_obj = paginate(chronological(sources), page_number)
+    # Only the page's cards are loaded (author + review flag included: no query per card)
+    feed_items: list[FeedItem] = load_items(page_obj.object_list)
 
     # What templates consume:
     context = {
-        "feed_items": page_obj.object_list,
+        # Threads: the page's tickets and reviews grouped by ticket (one card each)
+        "feed_items": group_by_ticket(feed_items) if order == User.THREADS else feed_items,
         "page_obj": page_obj,
+        "feed_order": order,
+        "feed_orders": User.FEED_ORDERS,
+        "filter_form": filter_form,
+        "filter_query": filter_query(request),
         # is_my_posts_page is False by default in template tag
     }
 
@@ -123,9 +185,65 @@ def feed(request: HttpRequest) -> HttpResponse:
     if is_ajax:
         return render(request, "reviews/partials/feed_list.html", context)
 
-    # Normal full-page render
+    # Normal full-page render, with the precomputed recommendations (one indexed read)
+    context["recommended"] = recommended_tickets(user)
     return render(request, "reviews/pages/feed.html", context)
 
+# --------- SEARCH VIEW (READ OPERATION)
+
+
+@login_required
+def search(request: HttpRequest) -> HttpResponse:
+    """Full-text search over the tickets and reviews visible in the user's feed.
+
+    `q` is the free-text query; `apres` is the keyset cursor of the next page
+    (see reviews.search), so deep pages cost as much as the first one.
+    """
+    query: str = request.GET.get("q", "").strip()
+    page = search_posts(request.user, query, cursor=request.GET.get("apres")) if query else None
+    return render(request, "reviews/pages/search.html", {"query": query, "page": page})
+
+# --------- BOOK VIEW (READ OPERATION)
+
+
+@login_required
+def book(request: HttpRequest, book_id: int) -> HttpResponse:
+    """Every request for one book (see reviews.books), with the ratings of all its tickets combined."""
+    book = get_object_or_404(Book, pk=book_id)
+    tickets = book.tickets.all()
+    totals = tickets.aggregate(
+        ticket_count=Count("pk"), review_count=Sum("review_count"), rating_sum=Sum("rating_sum")
+    )
+    review_count = totals["review_count"] or 0
+    return render(request, "reviews/pages/book.html", {
+        "book": book,
+        "tickets": with_card_data(tickets)[:BOOK_TICKETS],
+        "ticket_count": totals["ticket_count"],
+        "review_count": review_count,
+        "average_rating": totals["rating_sum"] / review_count if review_count else None,
+    })
+
+# --------- LEADERBOARDS (PUBLIC, READ OPERATION)
+
+
+def trending(request: HttpRequest) -> HttpResponse:
+    """Public "Tendances" page: tickets with the most recent review activity."""
+    return _leaderboard(request, Leaderboard.TRENDING)
+
+
+def top_rated(request: HttpRequest) -> HttpResponse:
+    """Public "Mieux notés" page: tickets with the best (Bayesian) average rating."""
+    return _leaderboard(request, Leaderboard.TOP_RATED)
+
+
+def _leaderboard(request: HttpRequest, name: str) -> HttpResponse:
+    """Render a page of a precomputed board (see reviews.leaderboards); `apres` is the keyset cursor."""
+    page = leaderboard_page(name, cursor=request.GET.get("apres"))
+    return render(request, "reviews/pages/leaderboard.html", {
+        "page": page,
+        "title": dict(Leaderboard.NAMES)[name],
+    })
+
 # ----------------------------------------
 # TICKET CRUD Operations
 # ----------------------------------------
@@ -146,6 +264,20 @@ class TicketCreateView(TicketFormContextMixin, LoginRequiredMixin, CreateView):
         return super().form_valid(form)
 
 
+@login_required
+def similar_tickets(request: HttpRequest) -> HttpResponse:
+    """Tickets resembling the one being typed (AJAX partial of the ticket form).
+
+    Reads `title`, `author` and `description` from the query string; nothing is
+    looked up before the title has MIN_TITLE_LENGTH characters.
+    """
+    title = request.GET.get("title", "").strip()
+    similar = []
+    if len(title) >= MIN_TITLE_LENGTH:
+        similar = find_similar_tickets(title, request.GET.get("author", ""), request.GET.get("description", ""))
+    return render(request, "reviews/partials/similar_tickets.html", {"similar_tickets": similar})
+
+
 class TicketUpdateView(TicketFormContextMixin, OwnerQuerySetMixin, UpdateView):
     """Update a Ticket owned by the logged-in user.
 
@@ -217,6 +349,9 @@ class ReviewCreateView(LoginRequiredMixin, View):
                 "is_response_mode": True,
                 "ticket": ticket,
                 "review_form": form,
+                "similar_tickets": find_similar_tickets(
+                    ticket.title, ticket.author, ticket.description, exclude=ticket.pk
+                ),
             })
 
         # standalone mode
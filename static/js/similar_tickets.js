@@ -0,0 +1,42 @@
+// similar_tickets.js – live "Billets similaires" suggestions while a ticket is typed.
+// The form carries data-similar-url; the suggestions replace [data-similar-tickets].
+
+(function () {
+  const DELAY_MS = 400;
+
+  document.addEventListener("DOMContentLoaded", () => {
+    const form = document.querySelector("[data-similar-url]");
+    const container = document.querySelector("[data-similar-tickets]");
+    if (!form || !container) return;
+
+    let timer = null;
+    let lastQuery = "";
+
+    function refresh() {
+      const params = new URLSearchParams();
+      ["title", "author", "description"].forEach((name) => {
+        const field = form.elements[name];
+        params.set(name, field ? field.value : "");
+      });
+      const query = params.toString();
+      if (query === lastQuery) return;
+      lastQuery = query;
+
+      fetch(`${form.dataset.similarUrl}?${query}`, {
+        headers: { "X-Requested-With": "XMLHttpRequest" },
+      })
+        .then((response) => (response.ok ? response.text() : ""))
+        .then((html) => {
+          // Drop answers to an older query that arrived late
+          if (query === lastQuery) container.innerHTML = html;
+        })
+        .catch(() => {});
+    }
+
+    form.addEventListener("input", (event) => {
+      if (!["title", "author", "description"].includes(event.target.name)) return;
+      clearTimeout(timer);
+      timer = setTimeout(refresh, DELAY_MS);
+    });
+  });
+})();
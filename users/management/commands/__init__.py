@@ -0,0 +1 @@
+"""Custom manage.py commands for the users app."""
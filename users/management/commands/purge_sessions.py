@@ -0,0 +1,64 @@
+"""
+Delete expired rows from ``django_session`` in small batches.
+
+Django's own ``clearsessions`` issues a single DELETE over the whole table,
+which holds SQLite's write lock for as long as it runs. This command deletes
+``--batch-size`` rows per transaction and sleeps between batches, so requests
+logging in (or sliding their expiry) can write in between.
+"""
+
+import time
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    """Batched cleanup of expired database sessions."""
+
+    help = "Delete expired sessions in small batches (DB-backed session strategies only)."
+
+    def add_arguments(self, parser):
+        """Declare batch size and pause between batches."""
+        parser.add_argument("--batch-size", type=int, default=500, help="Rows deleted per transaction.")
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=0.05,
+            help="Seconds to sleep between batches so other writers get the lock.",
+        )
+
+    def handle(self, *args, **options):
+        """Delete expired sessions batch by batch and report the totals."""
+        if settings.SESSION_STRATEGY == "signed_cookies":
+            self.stdout.write("purge_sessions: signed-cookie sessions have no rows to purge.")
+            return
+
+        batch_size = options["batch_size"]
+        now = timezone.now()
+        started = time.perf_counter()
+        deleted = batches = 0
+
+        while True:
+            with transaction.atomic():
+                keys = list(
+                    Session.objects.filter(expire_date__lt=now)
+                    .values_list("session_key", flat=True)[:batch_size]
+                )
+                if not keys:
+                    break
+                count, _ = Session.objects.filter(session_key__in=keys).delete()
+
+            deleted += count
+            batches += 1
+            if len(keys) < batch_size:
+                break
+            time.sleep(options["sleep"])
+
+        self.stdout.write(
+            f"purge_sessions: deleted {deleted} expired sessions in {batches} batches, "
+            f"{time.perf_counter() - started:.2f}s"
+        )
@@ -0,0 +1,64 @@
+"""Session middleware helpers for the users app."""
+
+import time
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+
+# Unix timestamp of the last time the session was written to its store
+SESSION_REFRESHED_KEY = "_session_refreshed_at"
+
+
+def refresh_session_if_due(session, now: float | None = None) -> bool:
+    """
+    Mark the session for saving only when its stored expiry needs to slide.
+
+    The session store keeps the expiry computed at the last save, so an active
+    user would be logged out `get_expiry_age()` seconds after logging in.
+    Rewriting on every request (SESSION_SAVE_EVERY_REQUEST) fixes that at the
+    cost of one write per request; here the session is rewritten once
+    SESSION_REFRESH_RATIO of its lifetime has elapsed since the last write.
+
+    Sessions with an absolute expiry date (set_expiry(datetime)) never slide.
+
+    Returns True when the session will be saved by SessionMiddleware.
+    """
+    if not isinstance(session.get("_session_expiry", 0), int):
+        return session.modified
+
+    now = time.time() if now is None else now
+    refreshed_at = session.get(SESSION_REFRESHED_KEY)
+    # get_expiry_age() covers both "Se souvenir de moi" (explicit age) and
+    # browser-close sessions (stored for SESSION_COOKIE_AGE server-side).
+    refresh_after = session.get_expiry_age() * settings.SESSION_REFRESH_RATIO
+
+    if session.modified or refreshed_at is None or now - refreshed_at >= refresh_after:
+        # Setting the key marks the session as modified -> saved once.
+        session[SESSION_REFRESHED_KEY] = int(now)
+        return True
+    return False
+
+
+class SessionRefreshMiddleware:
+    """
+    Slide session expiry without writing the session store on every request.
+
+    Must be placed after SessionMiddleware so its response phase runs first.
+    """
+
+    def __init__(self, get_response):
+        """Store the next middleware/view callable."""
+        self.get_response = get_response
+
+    def __call__(self, request):
+        """Refresh the session stamp on the way out, only when it is due."""
+        response = self.get_response(request)
+
+        session = getattr(request, "session", None)
+        # No cookie and nothing stored: don't create a session for anonymous visitors.
+        if session is None or (session.session_key is None and not session.modified):
+            return response
+        # Only authenticated sessions slide (a flushed session after logout is empty).
+        if not session.is_empty() and SESSION_KEY in session:
+            refresh_session_if_due(session)
+        return response
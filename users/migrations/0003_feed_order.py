@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-19 03:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_userfollows'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='feed_order',
+            field=models.CharField(choices=[('recent', 'Récents'), ('pertinence', 'Pertinence')], default='recent', max_length=16, verbose_name='Ordre du flux'),
+        ),
+    ]
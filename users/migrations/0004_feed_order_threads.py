@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-19 03:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_feed_order'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='feed_order',
+            field=models.CharField(choices=[('recent', 'Récents'), ('pertinence', 'Pertinence'), ('threads', 'Par ticket')], default='recent', max_length=16, verbose_name='Ordre du flux'),
+        ),
+    ]
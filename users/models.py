@@ -6,9 +6,19 @@ from django.db import models
 
 
 class User(AbstractUser):
-    """Custom user model for LITRevu."""
-
-    pass
+    """Custom user model for LITRevu; `feed_order` is the feed mode used when none is asked for."""
+
+    RECENT = "recent"
+    PERTINENCE = "pertinence"
+    THREADS = "threads"
+    FEED_ORDERS = [
+        (RECENT, "Récents"),
+        (PERTINENCE, "Pertinence"),
+        # chronological, each ticket of a page shown once with its reviews (reviews.feed.Thread)
+        (THREADS, "Par ticket"),
+    ]
+
+    feed_order = models.CharField("Ordre du flux", max_length=16, choices=FEED_ORDERS, default=RECENT)
 
 
 class UserFollows(models.Model):
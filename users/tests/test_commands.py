@@ -0,0 +1,29 @@
+"""Tests for the custom management commands of the users app."""
+
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+
+class PurgeSessionsCommandTests(TestCase):
+    """Batched cleanup of expired sessions."""
+
+    def test_only_expired_sessions_are_deleted_in_batches(self):
+        """Expired rows go away batch by batch, live sessions are kept."""
+        now = timezone.now()
+        expired = [
+            Session(session_key=f"old{i}", session_data="", expire_date=now - timedelta(days=1))
+            for i in range(5)
+        ]
+        live = Session(session_key="live", session_data="", expire_date=now + timedelta(days=1))
+        Session.objects.bulk_create([*expired, live])
+
+        out = StringIO()
+        call_command("purge_sessions", "--batch-size", "2", "--sleep", "0", stdout=out)
+
+        self.assertEqual(list(Session.objects.values_list("session_key", flat=True)), ["live"])
+        self.assertIn("deleted 5 expired sessions in 3 batches", out.getvalue())
@@ -1,9 +1,17 @@
 """Tests User Views (Homepage, Feed, Follows/Unfollows, Login/Logout, etc)."""
 
+import re
+import time
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from LITRevu.utils.page_cache import CSRF_PLACEHOLDER
+from users.middleware import SESSION_REFRESHED_KEY
 from users.models import UserFollows
 
 User = get_user_model()
@@ -423,3 +431,128 @@ class UnfollowUserViewTests(TestCase):
         self.assertFalse(
             UserFollows.objects.filter(pk=relation.pk).exists()
         )
+
+
+class SessionWriteTests(TestCase):
+    """Authenticated requests must not write the session store on every hit."""
+
+    def setUp(self):
+        """Create a user and the helpers used to log in through the homepage."""
+        self.user = User.objects.create_user(username="lea", password="StrongPassw0rd!")
+        self.home_url = reverse("home")
+        self.feed_url = reverse(FEED_NAME)
+
+    def _session_queries(self, queries):
+        """Return (reads, writes) issued against django_session."""
+        statements = [q["sql"] for q in queries if "django_session" in q["sql"]]
+        writes = [sql for sql in statements if sql.lstrip().upper().startswith(("INSERT", "UPDATE"))]
+        return len(statements) - len(writes), len(writes)
+
+    def _login(self, remember_me):
+        data = {"username": "lea", "password": "StrongPassw0rd!"}
+        if remember_me:
+            data["remember_me"] = True
+        self.client.post(self.home_url, data)
+
+    def test_authenticated_gets_do_not_write_the_session(self):
+        """After login, browsing the feed costs no session write."""
+        self._login(remember_me=True)
+        for _ in range(3):
+            with CaptureQueriesContext(connection) as ctx:
+                resp = self.client.get(self.feed_url)
+            self.assertEqual(resp.status_code, 200)
+            _, writes = self._session_queries(ctx.captured_queries)
+            self.assertEqual(writes, 0)
+
+    def test_session_is_rewritten_once_refresh_is_due(self):
+        """Past SESSION_REFRESH_RATIO of the lifetime, one request slides the expiry."""
+        self._login(remember_me=True)
+        session = self.client.session
+        session[SESSION_REFRESHED_KEY] = int(time.time()) - 1209600
+        session.save()
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(self.feed_url)
+        _, writes = self._session_queries(ctx.captured_queries)
+        self.assertEqual(writes, 1)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(self.feed_url)
+        _, writes = self._session_queries(ctx.captured_queries)
+        self.assertEqual(writes, 0)
+
+    def test_refresh_keeps_remember_me_semantics(self):
+        """Sliding the expiry keeps the 2-week / browser-close choice made at login."""
+        self._login(remember_me=False)
+        session = self.client.session
+        session[SESSION_REFRESHED_KEY] = 0
+        session.save()
+
+        resp = self.client.get(self.feed_url)
+        self.assertTrue(resp.wsgi_request.session.get_expire_at_browser_close())
+
+        self._login(remember_me=True)
+        session = self.client.session
+        session[SESSION_REFRESHED_KEY] = 0
+        session.save()
+
+        resp = self.client.get(self.feed_url)
+        self.assertEqual(resp.wsgi_request.session.get_expiry_age(), 1209600)
+
+
+@override_settings(ANONYMOUS_PAGE_CACHE_TIMEOUT=60)
+class AnonymousPageCacheTests(TestCase):
+    """Homepage and registration shells are cached for anonymous visitors."""
+
+    def setUp(self):
+        """Start every test from an empty cache."""
+        cache.clear()
+        self.home_url = reverse("home")
+
+    def _csrf_value(self, resp):
+        return re.search(r'name="csrfmiddlewaretoken" value="([^"]+)"', resp.content.decode()).group(1)
+
+    def test_second_anonymous_get_is_a_hit_with_fresh_csrf_token(self):
+        """The cached shell is served with the visitor's own CSRF token."""
+        first = self.client.get(self.home_url)
+        second = Client().get(self.home_url)
+
+        self.assertEqual(first["X-Page-Cache"], "miss")
+        self.assertEqual(second["X-Page-Cache"], "hit")
+        self.assertNotIn(CSRF_PLACEHOLDER, second.content.decode())
+        self.assertNotEqual(self._csrf_value(first), self._csrf_value(second))
+        self.assertContains(second, "Connectez-vous")
+
+    def test_login_from_cached_page_passes_csrf_checks(self):
+        """The token injected on a hit is accepted by CsrfViewMiddleware."""
+        User.objects.create_user(username="nina", password="StrongPassw0rd!")
+        self.client.get(self.home_url)  # warm the cache
+
+        client = Client(enforce_csrf_checks=True)
+        page = client.get(self.home_url)
+        self.assertEqual(page["X-Page-Cache"], "hit")
+
+        resp = client.post(self.home_url, {
+            "username": "nina",
+            "password": "StrongPassw0rd!",
+            "csrfmiddlewaretoken": self._csrf_value(page),
+        })
+        self.assertEqual(resp.status_code, 302)
+        self.assertIn(reverse(FEED_NAME), resp.url)
+
+    def test_register_page_is_cached_too(self):
+        """Registration shares the same anonymous cache."""
+        self.client.get(reverse("users:register"))
+        resp = self.client.get(reverse("users:register"))
+        self.assertEqual(resp["X-Page-Cache"], "hit")
+        self.assertContains(resp, "Inscrivez-vous")
+
+    def test_authenticated_users_bypass_the_cache(self):
+        """Logged-in users always get the view's own rendering."""
+        self.client.get(self.home_url)  # warm the cache
+        user = User.objects.create_user(username="omar", password="StrongPassw0rd!")
+        self.client.force_login(user)
+
+        resp = self.client.get(self.home_url)
+        self.assertNotIn("X-Page-Cache", resp.headers)
+        self.assertContains(resp, 'id="burgerBtn"')
@@ -12,6 +12,8 @@ urlpatterns = [
 
     # User areas
     path("moi/posts/", views.my_posts, name="my_posts"),
+    path("moi/posts/supprimer/", views.delete_my_posts, name="delete_my_posts"),
+    path("moi/export/", views.export_data, name="export_data"),
     path("moi/follows/", views.my_follows, name="my_follows"),
     path("moi/follows/unfollow/<int:user_id>/", views.unfollow_user, name="unfollow"),
 ]
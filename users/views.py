@@ -1,16 +1,23 @@
 """Defines Behavior of User Views to register, logout, follow/unfollow and for user posts."""
 
-from itertools import chain
+from dataclasses import replace
 
 from django.contrib.auth import get_user_model, logout
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
-from django.http import HttpResponseRedirect
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponseRedirect, StreamingHttpResponse
 from django.shortcuts import redirect, render
 from django.urls import reverse
+from django.utils.http import content_disposition_header
 
+from LITRevu.utils.page_cache import cache_anonymous_page
 from LITRevu.utils.toast import redirect_with_toast
-from reviews.models import Review, Ticket
+from reviews.archive import month_label, month_range, months, parse_month, posts_in
+from reviews.bulk import MAX_POSTS, NotOwned, delete_posts
+from reviews.export import CONTENT_TYPES, export, filename, gzipped
+from reviews.feed import chronological, load_items, own_posts
+from reviews.forms import FeedFilterForm
+from reviews.views import filter_query, paginate
 
 from .forms import RegistrationForm
 from .models import UserFollows
@@ -18,6 +25,7 @@ from .models import UserFollows
 User = get_user_model()
 
 
+@cache_anonymous_page
 def register(request):
     """Create a new user and redirect to home with a querystring allowing toast to display message."""
     if request.method == "POST":
@@ -110,32 +118,40 @@ def unfollow_user(request, user_id):
 
 @login_required
 def my_posts(request):
-    """Display only the current user's tickets and reviews."""
-    user = request.user
-
-    tickets = Ticket.objects.filter(user=user)
-    reviews = Review.objects.filter(user=user)
-
-    feed_items = sorted(
-        chain(tickets, reviews),
-        key=lambda obj: obj.time_created,
-        reverse=True,
-    )
-
-    paginator = Paginator(feed_items, 10)
-    page_number = request.GET.get("page", 1)
-
-    try:
-        page_obj = paginator.page(page_number)
-    except PageNotAnInteger:
-        page_obj = paginator.page(1)
-    except EmptyPage:
-        page_obj = paginator.page(paginator.num_pages)
+    """
+    Display only the current user's tickets and reviews, filtered like the feed (author aside).
+
+    The sidebar lists the months with posts (reviews.archive). `mois`
+    (YYYY-MM) opens one of them, replacing du / au: the page is a range
+    seek on the month and, unless a rating or date filter is set, its
+    count comes from the archive row instead of a COUNT query.
+    """
+    filter_form = FeedFilterForm(request.GET, with_author=False)
+    filters = filter_form.filters()
+    archive = list(months(request.user))
+    month = parse_month(request.GET.get("mois"))
+    count = None
+    if month is not None:
+        if filters.min_rating is None and filters.since is None and filters.until is None:
+            count = posts_in(next((row for row in archive if row.month == month), None), filters.kind)
+        since, until = month_range(month)
+        filters = replace(filters, since=since, until=until)
+    sources = filters.apply(own_posts(request.user))
+
+    # One UNION ALL query paginated by the database, then the cards of the page
+    page_obj = paginate(chronological(sources), request.GET.get("page", 1), count)
 
     context = {
-        "feed_items": page_obj.object_list,
+        "feed_items": load_items(page_obj.object_list),
         "page_obj": page_obj,
         "is_my_posts_page": True,  # template tag depends on this
+        "filter_form": filter_form,
+        "filter_query": filter_query(request),
+        "archive": archive,
+        "month": month,
+        "month_label": month_label(month) if month else "",
+        # the archive links keep the type and rating filters, not the dates
+        "archive_query": filter_query(request, "mois", "du", "au"),
     }
 
     # AJAX: reuse the same partial as the feed
@@ -144,3 +160,65 @@ def my_posts(request):
 
     # Full page
     return render(request, "users/pages/my_posts.html", context)
+
+
+@login_required
+def delete_my_posts(request):
+    """Delete the tickets and reviews selected on "Mes posts" at once (reviews.bulk), then toast a summary."""
+    if request.method != "POST":
+        return redirect("users:my_posts")
+
+    to = reverse("users:my_posts")
+    try:
+        ticket_ids = [int(pk) for pk in request.POST.getlist("tickets")]
+        review_ids = [int(pk) for pk in request.POST.getlist("critiques")]
+    except ValueError:
+        return redirect_with_toast(request, "error", "Sélection invalide.", to=to)
+    if not ticket_ids and not review_ids:
+        return redirect_with_toast(request, "info", "Aucun post sélectionné.", to=to)
+    if len(ticket_ids) + len(review_ids) > MAX_POSTS:
+        return redirect_with_toast(request, "error", f"Pas plus de {MAX_POSTS} posts à la fois.", to=to)
+
+    try:
+        deleted = delete_posts(request.user, ticket_ids, review_ids)
+    except NotOwned:
+        message = "Certains posts sélectionnés n'existent plus ou ne sont pas à vous : rien n'a été supprimé."
+        return redirect_with_toast(request, "error", message, to=to)
+    return redirect_with_toast(request, "success", deleted.message(), to=to)
+
+
+# French names of the exported datasets in the query string (reviews.export.DATASETS)
+EXPORT_DATA = {"tickets": ["tickets"], "critiques": ["reviews"], "abonnements": ["follows"],
+               "tout": ["tickets", "reviews", "follows"]}
+
+
+@login_required
+def export_data(request):
+    """
+    Stream the user's data as a download (reviews.export): nothing is built in memory.
+
+    GET parameters: format (jsonl, default, or csv), donnees (tout, default,
+    tickets, critiques or abonnements; a single one in CSV), gzip=1 to
+    compress on the fly, site=1 (staff only) for every user's data.
+    """
+    fmt = request.GET.get("format", "jsonl")
+    names = EXPORT_DATA.get(request.GET.get("donnees", "tout"))
+    to = reverse("users:my_posts")
+    if fmt not in CONTENT_TYPES or names is None:
+        return redirect_with_toast(request, "error", "Export inconnu.", to=to)
+    if fmt == "csv" and len(names) > 1:
+        return redirect_with_toast(request, "error", "Un export CSV ne contient qu'un type de données.", to=to)
+    site = request.GET.get("site") == "1"
+    if site and not request.user.is_staff:
+        raise PermissionDenied
+
+    compressed = request.GET.get("gzip") == "1"
+    chunks = export(names, fmt, None if site else request.user)
+    response = StreamingHttpResponse(
+        gzipped(chunks) if compressed else chunks,
+        content_type="application/gzip" if compressed else CONTENT_TYPES[fmt],
+    )
+    name = filename(names, fmt, "site" if site else request.user.username, compressed)
+    # filename*=utf-8'' for names outside ASCII (any Unicode letter is allowed in a username)
+    response["Content-Disposition"] = content_disposition_header(True, name)
+    return response